@@ -25,6 +25,7 @@ function App() {
   const [aiQuestion, setAiQuestion] = useState('');
   const [aiAnswer, setAiAnswer] = useState('');
   const [aiLoading, setAiLoading] = useState(false);
+  const [aiDocId, setAiDocId] = useState(null);  // server-side session of the parsed result
 
   // Wake up both backend servers on component mount
 useEffect(() => {
@@ -82,6 +83,7 @@ useEffect(() => {
     setResult(null);
     setError(null);
     setAiAnswer('');
+    setAiDocId(null);
   };
 
   /**
@@ -107,6 +109,7 @@ useEffect(() => {
     setError(null);
     setResult(null);
     setAiAnswer('');
+    setAiDocId(null);
 
     const formData = new FormData();
     formData.append('file', file);
@@ -169,9 +172,13 @@ useEffect(() => {
   };
 
   /**
-   * Send a user question and the parsed document to the backend AI endpoint,
-   * then store the returned answer in `aiAnswer`.
+   * Send a user question about the parsed document to the backend AI session
+   * and show the answer in `aiAnswer` while it streams in.
    *
+   * - The parsed `result` is registered once (POST /ask_ai/sessions); later
+   *   questions only send the question, the backend keeps the history.
+   * - The answer arrives as Server-Sent Events ("token" pieces, then "done").
+   * - An expired session is registered again and the question re-sent.
    * - No operation if there is no parsed `result` or the question is empty.
    * - Toggles `aiLoading` during the request.
    *
@@ -184,13 +191,56 @@ useEffect(() => {
     setAiLoading(true);
     setAiAnswer('');
 
+    const baseUrl = 'https://construction-document-parser.onrender.com';
+
     try {
-      const response = await axios.post('https://construction-document-parser.onrender.com/ask_ai/', {
-        question: aiQuestion,
-        document_data: result.result
-      });
+      let docId = aiDocId;
+      let response = null;
+      for (let attempt = 0; attempt < 2; attempt++) {
+        if (!docId) {
+          const session = await axios.post(`${baseUrl}/ask_ai/sessions`, {
+            document_data: result.result
+          });
+          docId = session.data.doc_id;
+          setAiDocId(docId);
+        }
+        response = await fetch(`${baseUrl}/ask_ai/sessions/${docId}/ask`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ question: aiQuestion })
+        });
+        if (response.status !== 404) break;
+        docId = null;  // session expired
+      }
+      if (!response.ok) {
+        const body = await response.json().catch(() => ({}));
+        throw new Error(body.detail || response.statusText);
+      }
 
-      setAiAnswer(response.data.answer);
+      // Parse the event stream: blocks of "event: <name>" + "data: <json>"
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop();
+        for (const block of blocks) {
+          const event = block.match(/^event: (.*)$/m)?.[1];
+          const data = block.match(/^data: (.*)$/m)?.[1];
+          if (!event || !data) continue;
+          const payload = JSON.parse(data);
+          if (event === 'token') {
+            setAiAnswer((answer) => answer + payload.text);
+          } else if (event === 'done') {
+            setAiAnswer(payload.answer);
+          } else if (event === 'error') {
+            throw new Error(payload.detail);
+          }
+        }
+      }
     } catch (err) {
       setAiAnswer('Error: ' + (err.response?.data?.detail || err.message));
     } finally {
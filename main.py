@@ -1,20 +1,30 @@
 from fastapi.middleware.cors import CORSMiddleware
-import gc 
 from fastapi import FastAPI, UploadFile, HTTPException
 from PIL import Image 
-import src.plan2data.titleBlockInfo as floorplan_parser
 import io
 import uuid
-import src.gantt2data.ganttParser as gantt_parser
-import src.boq2data.camelot_setup.boq2data_mistral as boq
-import src.plan2data.voronoi_functions as vor
-import src.plan2data.full_plan_ai as full
-import src.plan2data.helper as helper
+from contextlib import asynccontextmanager
+import src.common.executor as executor
+import src.common.jobs as jobs
+import src.common.llm_cache as llm_cache
+import src.common.llm_gateway as llm_gateway
+import src.common.metrics as metrics
+import src.common.pages as multipage
+import src.common.pipelines as pipelines
+import src.common.progress as progress
+import src.common.result_cache as result_cache
+import src.common.retrieval as retrieval
+import src.common.sessions as sessions
+import src.common.uploads as uploads
 from pydantic import BaseModel
 from enum import Enum
-from openai import OpenAI
 import json
 from fastapi import Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
+import functools
+import re
+import time
 
 import os
 os.environ['OMP_NUM_THREADS'] = '1'  # Limit OpenCV threads
@@ -25,12 +35,10 @@ os.environ['OPENBLAS_NUM_THREADS'] = '1'
 # ========================================
 
 # ========================================
-# OPENAI API KEY
+# LLM CLIENTS
 # ========================================
-from dotenv import load_dotenv
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# OpenAI / Mistral API keys are read from the environment (.env) by the shared
+# gateway, which creates its pooled clients on first use (src/common/llm_gateway.py)
 # =============================================================================
 # IMPORTS AND MODEL DEFINITIONS
 # =============================================================================
@@ -172,10 +180,28 @@ upload and parse **Floor Plans**.
 """
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan: the parser process pool is started in the
+    background and its workers import the parser libraries
+    (PARSER_POOL_PREWARM) while the API process itself stays light; it is
+    shut down together with the server. Job workers start with the server
+    and re-queue jobs left unfinished by a previous run.
+    """
+    executor.prewarm(pipelines.warm_up, executor.PREWARM_PARSERS)
+    await jobs.start()
+    yield
+    await jobs.stop()
+    executor.shutdown()
+    await llm_gateway.aclose()
+
+
 # Initialize FastAPI application with metadata
 app = FastAPI(
     title="Construction Document Parser for LLM based AI assistants",
-    description=description
+    description=description,
+    lifespan=lifespan
 )
 
 
@@ -186,6 +212,66 @@ app = FastAPI(
 # Note: after installation of fastapi run -- fastapi dev main.py -- in terminal to start server locally 
 # Go to http://127.0.0.1:8000/docs to view the automatically created API docs
 
+# Reject oversized request bodies from Content-Length, before the multipart
+# body is parsed and spooled (per-file limits are enforced in src/common/uploads.py)
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > uploads.UPLOAD_MAX_REQUEST_BYTES:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Request exceeds the limit of {uploads.UPLOAD_MAX_REQUEST_BYTES} bytes"}
+        )
+    return await call_next(request)
+
+
+# Upload endpoints and their queue check. Starlette parses the multipart
+# body before a handler runs, so the check happens here: a saturated server
+# answers 429/503 without receiving the upload. The batch endpoints wait for
+# free slots instead and are not listed.
+ADMISSION_ROUTES = [
+    (re.compile(r"^/gantt_parser/[^/]+/?$"), functools.partial(executor.admit, "gantt")),
+    (re.compile(r"^/financial_parser/?$"), functools.partial(executor.admit, "financial")),
+    (re.compile(r"^/drawing_parser/[^/]+/?$"), functools.partial(executor.admit, "drawing")),
+    (re.compile(r"^/jobs/[^/]+/?$"), jobs.admit),
+]
+
+
+@app.middleware("http")
+async def admit_before_body(request: Request, call_next):
+    if request.method == "POST":
+        for pattern, admit in ADMISSION_ROUTES:
+            if pattern.match(request.url.path):
+                try:
+                    admit()
+                except HTTPException as e:
+                    return JSONResponse(status_code=e.status_code, content={"detail": e.detail}, headers=e.headers)
+                break
+    return await call_next(request)
+
+
+# Per-endpoint latency histogram for GET /metrics. Labels use the route
+# template (e.g. /drawing_parser/{content_type}/), not the raw path; for
+# streaming responses the time until the response starts is recorded.
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.observe(
+            "http_request_duration_seconds",
+            time.perf_counter() - start,
+            endpoint=getattr(route, "path", "unmatched"),
+            method=request.method,
+            status=status,
+        )
+
+
 # Configure CORS (Cross-Origin Resource Sharing) middleware
 # Allows frontend applications to make requests to this API
 app.add_middleware(
@@ -235,7 +321,7 @@ async def hello_world():
 # =============================================================================
 
 @app.post("/gantt_parser/{chart_format}")
-async def create_upload_file_gantt(file: UploadFile, chart_format: ChartFormat):
+async def create_upload_file_gantt(file: UploadFile, chart_format: ChartFormat, pages: str | None = None):
     """
     Parse Gantt chart from uploaded file and extract project schedule data.
     
@@ -253,6 +339,9 @@ async def create_upload_file_gantt(file: UploadFile, chart_format: ChartFormat):
     Args:
         file (UploadFile): Uploaded PDF file containing Gantt chart
         chart_format (ChartFormat): Layout format ("visual" or "tabular")
+        pages (str | None): Query parameter, "all" or e.g. "1-3,5" to parse
+            several pages in parallel (src/common/pages.py); only the first
+            page is parsed if omitted
     
     Returns:
         Response: Standardized response with extracted schedule data
@@ -270,79 +359,65 @@ async def create_upload_file_gantt(file: UploadFile, chart_format: ChartFormat):
                 ],
                 "project_info": {...}
             }
+            With `pages`: {"pages": [{"page": 1, "result": [...], ...}, ...],
+                           "merged": [...continuous task list, tasks tagged with "page"...]}
     
     Raises:
-        HTTPException 400: If file is not a PDF
+        HTTPException 400: If file is not a PDF, is malformed or encrypted, or
+                           the page selection is invalid
+        HTTPException 413: If the file exceeds UPLOAD_MAX_BYTES or UPLOAD_MAX_PAGES
         HTTPException 500: If processing fails (corrupted PDF, parsing error)
+        HTTPException 429/503: If the gantt queue or the parser pool is saturated
     
     Example:
         curl -X POST "http://localhost:8000/gantt_parser/visual" \
              -F "file=@project_schedule.pdf"
+        curl -X POST "http://localhost:8000/gantt_parser/visual?pages=all" \
+             -F "file=@multi_page_schedule.pdf"
     
     Note:
         - Only PDFs accepted (images not supported for Gantt parsing)
         - File automatically deleted after processing (no storage)
         - Large files may take 10-30 seconds to process
     """
-    # Create upload directory if it doesn't exist
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = None  # Track file path for cleanup in finally block
-    
     try:
         # =====================================================================
-        # VALIDATION: Ensure file is PDF
+        # ADMISSION + VALIDATION: Ensure file is a readable PDF
         # =====================================================================
-        if not (file.content_type == 'application/pdf'):
-            raise HTTPException(
-                status_code=400, 
-                detail="File must be a PDF"
-            )
+        # Checked before the body is read by `admit_before_body`; repeated
+        # here since the queue may have filled while the upload arrived
+        executor.admit("gantt")
+
+        # Size limit, content sniffing and PDF preflight (pages, encryption)
+        # The parser opens the PDF from bytes; nothing is written to disk
+        # except Camelot's tmpfs spool file (tabular charts)
+        source, input_format = await uploads.ingest(file, "gantt", chart_format.value)
         
         # =====================================================================
-        # FILE HANDLING: Generate unique filename and save
+        # PARSING: Extract Gantt chart data in the parser process pool
         # =====================================================================
         
-        # Extract file extension (should be .pdf)
-        file_extension = os.path.splitext(file.filename)[1] if file.filename else '.pdf'
-        
-        # Generate unique filename using UUID to prevent collisions
-        # Important for concurrent requests
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        # Read uploaded file content into memory
-        file_content = await file.read()
-        
-        # Save PDF to disk
-        # Note: For images, code includes conversion logic (currently unreachable due to PDF-only validation)
-        if file.content_type == 'application/pdf':
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
+        # Repeated uploads are served from the result cache
+        # Returns: (result_dict, method_str, is_successful_bool, None)
+        if pages is not None:
+            # Selected pages fanned out across the pool, merged into one task list
+            result, method, is_succesful, confidence = await multipage.run_pages(
+                "gantt", source, chart_format.value, input_format,
+                await multipage.select(source, input_format, pages)
+            )
         else:
-            # Image handling (unreachable code - kept for future extensibility)
-            with Image.open(io.BytesIO(file_content)) as im:
-                # Convert RGBA/P images to RGB for JPEG compatibility
-                if im.mode in ("RGBA", "P"):
-                    im = im.convert("RGB")
-                im.save(file_path, 'JPEG')
-        
-        # =====================================================================
-        # PARSING: Extract Gantt chart data
-        # =====================================================================
-        
-        # Call appropriate parser based on chart format
-        # Returns: (result_dict, method_str, is_successful_bool)
-        result, method, is_succesful = gantt_parser.parse_gantt_chart(file_path, chart_format)
+            result, method, is_succesful, confidence = await result_cache.run_parser_cached(
+                "gantt", source, chart_format.value, input_format
+            )
 
         # =====================================================================
         # RESPONSE CONSTRUCTION
         # =====================================================================
         
         response = Response(
-            input_format=file.content_type,  # "application/pdf"
+            input_format=input_format,  # "application/pdf"
             is_extraction_succesful=is_succesful,  # Based on parser validation
-            confident_value=None,  # Gantt parsing doesn't use AI confidence scores
+            confident_value=confidence,  # Gantt parsing doesn't use AI confidence scores
             extraction_method=method,  # "visual" or "tabular"
             result=result  # Structured schedule data
         )
@@ -359,14 +434,6 @@ async def create_upload_file_gantt(file: UploadFile, chart_format: ChartFormat):
             status_code=500, 
             detail=f"Error processing file: {str(e)}"
         )
-    finally:
-        # =====================================================================
-        # CLEANUP: Always delete temporary file
-        # =====================================================================
-        # Ensures no disk space leaks even if errors occur
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-        gc.collect()  # Force garbage collection to free memory
 
 
 # =============================================================================
@@ -417,8 +484,10 @@ async def create_upload_file_fin(file: UploadFile):
             }
     
     Raises:
-        HTTPException 400: If file is not PDF or image
+        HTTPException 400: If file is not PDF or image, or is malformed or encrypted
+        HTTPException 413: If the file exceeds the upload size, page or pixel limits
         HTTPException 500: If processing fails
+        HTTPException 429/503: If the financial queue or the parser pool is saturated
     
     Example:
         curl -X POST "http://localhost:8000/financial_parser/" \
@@ -429,53 +498,34 @@ async def create_upload_file_fin(file: UploadFile):
         - is_extraction_succesful = True only if confidence > 0.5
         - For critical financial docs, manually verify high-value items
     """
-    # Create upload directory
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = None
-    
     try:
         # =====================================================================
-        # VALIDATION: PDF or image
+        # ADMISSION + VALIDATION: PDF or image
         # =====================================================================
         # Note: Current implementation only processes PDFs
         # Image handling is validated but not implemented in boq module
-        if not (file.content_type == 'application/pdf' or file.content_type.startswith('image/')):  # type: ignore
-            raise HTTPException(
-                status_code=400, 
-                detail="File must be a PDF or image"
-            )
-        
-        # =====================================================================
-        # FILE HANDLING: Save uploaded file
-        # =====================================================================
-        
-        file_extension = os.path.splitext(file.filename)[1] if file.filename else '.pdf'
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        file_content = await file.read()
-        
-        # Save PDF (images not currently processed by BOQ module)
-        if file.content_type == 'application/pdf':
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
+        executor.admit("financial")
+
+        # Size limit, content sniffing and preflight; the upload stays in
+        # memory (Camelot needs a path: the worker spools the bytes to tmpfs)
+        source, input_format = await uploads.ingest(file, "financial", None)
 
         # =====================================================================
-        # PARSING: Extract BOQ data
+        # PARSING: Extract BOQ data (hybrid Camelot + Mistral approach)
         # =====================================================================
         
-        # Note: financial_boq() is commented out (stub function)
-        # Using extract_boq_mistral() which implements hybrid Camelot + Mistral approach
-        # result, method, is_succesful = boq.financial_boq(file_path)  # Stub
-        result, method, is_succesful, confidence = boq.extract_boq_mistral(file_path)
+        # Runs in the parser process pool so the event loop stays responsive;
+        # repeated uploads are served from the result cache
+        result, method, is_succesful, confidence = await result_cache.run_parser_cached(
+            "financial", source, None, input_format
+        )
         
         # =====================================================================
         # RESPONSE CONSTRUCTION
         # =====================================================================
         
         response = Response(
-            input_format=file.content_type,
+            input_format=input_format,
             is_extraction_succesful=is_succesful,  # True if confidence > 0.5
             confident_value=confidence,  # AI confidence score (0.0-1.0)
             extraction_method=method,  # "hybrid" (Camelot + Mistral)
@@ -492,13 +542,6 @@ async def create_upload_file_fin(file: UploadFile):
             status_code=500, 
             detail=f"Error processing file: {str(e)}"
         )
-    finally:
-        # =====================================================================
-        # CLEANUP
-        # =====================================================================
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-        gc.collect()
 
 
 # =============================================================================
@@ -506,7 +549,7 @@ async def create_upload_file_fin(file: UploadFile):
 # =============================================================================
 
 @app.post("/drawing_parser/{content_type}/")
-async def create_upload_file_floorplans(file: UploadFile, content_type: ContentType):
+async def create_upload_file_floorplans(file: UploadFile, content_type: ContentType, pages: str | None = None):
     """
     Parse floor plan and extract metadata based on specified content type.
     
@@ -542,6 +585,9 @@ async def create_upload_file_floorplans(file: UploadFile, content_type: ContentT
     Args:
         file (UploadFile): Floor plan file (PDF or image based on content_type)
         content_type (ContentType): Extraction mode/strategy
+        pages (str | None): Query parameter, "all" or e.g. "1-3,5" to parse
+            several sheets of a plan set in parallel (PDFs only,
+            src/common/pages.py); only the first page is parsed if omitted
     
     Returns:
         Response: Standardized response with extracted floor plan data
@@ -567,10 +613,17 @@ async def create_upload_file_floorplans(file: UploadFile, content_type: ContentT
                 "titleBlock": {...},
                 "roomAdjacency": {...}
             }
+            
+            With `pages`: {"pages": [{"page": 1, "result": {...}, ...}, ...],
+                           "merged": {"page 1": {...}, "page 2": {...}}}  (one result per floor)
     
     Raises:
-        HTTPException 400: If file type doesn't match content_type requirements
+        HTTPException 400: If file type doesn't match content_type requirements,
+                           the file is malformed or encrypted, or the page
+                           selection is invalid
+        HTTPException 413: If the file exceeds the upload size, page or pixel limits
         HTTPException 500: If processing fails
+        HTTPException 429/503: If the drawing queue or the parser pool is saturated
     
     Example:
         # Extract room adjacencies with Voronoi (deterministic)
@@ -580,6 +633,10 @@ async def create_upload_file_floorplans(file: UploadFile, content_type: ContentT
         # Extract room adjacencies with AI (handles unlabeled plans)
         curl -X POST "http://localhost:8000/drawing_parser/rooms-ai/" \
              -F "file=@sketch.jpg"
+        
+        # Room graph of every floor of a plan set
+        curl -X POST "http://localhost:8000/drawing_parser/rooms-deterministic/?pages=all" \
+             -F "file=@plan_set.pdf"
     
     Note:
         - Deterministic method requires labeled rooms in PDF
@@ -587,145 +644,42 @@ async def create_upload_file_floorplans(file: UploadFile, content_type: ContentT
         - PDF to image conversion happens automatically for titleblock-hybrid
         - Both original and converted files cleaned up automatically
     """
-    # Create upload directory
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = None  # Original uploaded file path
-    converted_image_path = None  # Track PDF->image conversion separately
-    
     try:
         # =====================================================================
-        # VALIDATION: File type based on content_type requirements
+        # ADMISSION + VALIDATION: File type based on content_type requirements
         # =====================================================================
-        
-        # rooms-deterministic and full-plan-ai require PDF (need text layer)
-        if content_type in ["rooms-deterministic", "full-plan-ai"]:
-            if not file.content_type == 'application/pdf':
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Deterministic or Hybrid plan parsing requires PDF file"
-                )
-        
-        # titleblock-hybrid accepts both image and PDF
-        # PDF will be converted to image for OCR processing
-        elif content_type == "titleblock-hybrid":
-            if not (file.content_type.startswith('image/') or file.content_type == 'application/pdf'):
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Titleblock Hybrid parsing requires Image or PDF file"
-                )
-        
-        # rooms-ai accepts both (AI vision works with images directly)
-        elif content_type == "rooms-ai":
-            if not (file.content_type.startswith('image/') or file.content_type == 'application/pdf'):
-                raise HTTPException(
-                    status_code=400, 
-                    detail="File must be an image or PDF"
-                )
-        
-        # Fallback: images only (future content types)
-        else:
-            if not file.content_type.startswith('image/'):
-                raise HTTPException(
-                    status_code=400, 
-                    detail="File must be an image"
-                )
-        
-        # =====================================================================
-        # FILE HANDLING: Save and potentially convert
-        # =====================================================================
-        
-        # Determine file extension
-        file_extension = os.path.splitext(file.filename)[1] if file.filename else '.jpg'
-        
-        # Generate unique filename
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        # Read file content
-        file_content = await file.read()
-        
-        # Handle PDF files
-        if file.content_type == 'application/pdf':
-            # Special case: titleblock-hybrid needs image, so convert PDF->image
-            if content_type == "titleblock-hybrid":
-                # Step 1: Save PDF temporarily
-                with open(file_path, 'wb') as f:
-                    f.write(file_content)
-                
-                # Step 2: Convert first page of PDF to image
-                # helper.convert_pdf2img returns list of image paths
-                converted_image_paths = helper.convert_pdf2img(file_path, pages=(0,))
-
-                # Step 3: Extract single image path from list
-                if isinstance(converted_image_paths, list) and len(converted_image_paths) > 0:
-                    converted_image_path = converted_image_paths[0]  # First page
-                else:
-                    converted_image_path = converted_image_paths
-
-                # Use converted image for titleblock processing
-                processing_file_path = converted_image_path
-            else:
-                # For other content types: Use PDF directly
-                with open(file_path, 'wb') as f:
-                    f.write(file_content)
-                processing_file_path = file_path
-        else:
-            # Handle image files: Save as JPEG with RGB conversion
-            with Image.open(io.BytesIO(file_content)) as im:
-                # Convert RGBA (transparency) and P (palette) to RGB
-                # Required for JPEG format compatibility
-                if im.mode in ("RGBA", "P"):
-                    im = im.convert("RGB")
-                im.save(file_path, 'JPEG')
-            processing_file_path = file_path
+        executor.admit("drawing")
+
+        # Size limit, content sniffing and preflight. PDFs are kept as-is,
+        # images as RGB JPEG, in memory; titleblock-hybrid PDFs are
+        # rasterized to an array inside the worker
+        source, input_format = await uploads.ingest(file, "drawing", content_type.value)
         
         # =====================================================================
         # PARSING: Call appropriate parser based on content_type
         # =====================================================================
         
-        # Initialize default values
-        method = "None"
-        is_succesful = False
-        confidence = None
-        
-        # Route to appropriate parser
-        if content_type == "titleblock-hybrid":
-            # Extract title block: project info, scale, architect, dates
-            # Uses OCR + Vision AI hybrid
-            # Returns: (result_dict, method_str, is_successful_bool, confidence_float)
-            result, method, is_succesful, confidence = floorplan_parser.get_title_block_info(processing_file_path)
-            
-        elif content_type == "rooms-deterministic":
-            # Extract room adjacencies using Voronoi tessellation
-            # Deterministic method: no confidence score
-            # Returns: dict mapping rooms to neighbor lists
-            result = vor.neighboring_rooms_voronoi(processing_file_path)
-            method = "deterministic"
-            is_succesful = True  # Deterministic methods don't have confidence thresholds
-            confidence = None  # No AI involved, no confidence score
-            
-        elif content_type == "rooms-ai":
-            # Extract room adjacencies using pure AI vision
-            # Can handle unlabeled plans and images
-            # Returns: (result_dict, method_str, is_successful_bool, confidence_float)
-            result, method, is_succesful, confidence = full.get_neighbouring_rooms_with_ai(processing_file_path)
-            
-        elif content_type == "full-plan-ai":
-            # Extract complete floor plan: title block + room adjacencies
-            # Uses hybrid approach (Voronoi for rooms, AI for context)
-            # Returns: dict with nested titleBlock and roomAdjacency
-            result = vor.extract_full_floorplan(processing_file_path)
-            method = "hybrid"
-            is_succesful = True
-            confidence = None  # Hybrid method doesn't return single confidence score
+        # Routing (titleblock / Voronoi / AI / full plan) happens in
+        # pipelines.parse_drawing, executed in the parser process pool
+        # (or served from the result cache for repeated uploads)
+        # Returns: (result, method_str, is_successful_bool, confidence_float | None)
+        if pages is not None:
+            # Selected sheets fanned out across the pool, one result per floor
+            result, method, is_succesful, confidence = await multipage.run_pages(
+                "drawing", source, content_type.value, input_format,
+                await multipage.select(source, input_format, pages)
+            )
+        else:
+            result, method, is_succesful, confidence = await result_cache.run_parser_cached(
+                "drawing", source, content_type.value, input_format
+            )
             
         # =====================================================================
         # RESPONSE CONSTRUCTION
         # =====================================================================
         
         response = Response(
-            input_format=file.content_type,  # Original MIME type (before conversion)
+            input_format=input_format,  # Sniffed MIME type of the upload (before conversion)
             is_extraction_succesful=is_succesful,  # Based on confidence or deterministic success
             confident_value=confidence,  # AI confidence (None for deterministic)
             extraction_method=method,  # "hybrid", "deterministic", or "ai"
@@ -742,23 +696,184 @@ async def create_upload_file_floorplans(file: UploadFile, content_type: ContentT
             status_code=500, 
             detail=f"Error processing file: {str(e)}"
         )
-    finally:
-        # =====================================================================
-        # CLEANUP: Remove both original and converted files
-        # =====================================================================
-        # Important: titleblock-hybrid creates two files (PDF + converted image)
-        # Both must be cleaned up to prevent disk space leaks
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-        if converted_image_path and os.path.exists(converted_image_path):
-            os.remove(converted_image_path)
-        gc.collect()  # Force garbage collection
     
 
+# =============================================================================
+# BATCH ENDPOINTS
+# =============================================================================
+
+# Documents of one batch processed at the same time (further bounded by the
+# per-endpoint limits in src/common/executor.py)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# Maximum number of files accepted in a single batch request
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+
+
+async def stream_batch(parser: str, variant: str | None, files: list[UploadFile]) -> StreamingResponse:
+    """
+    Parse many uploads concurrently and stream one NDJSON line per document.
+
+    All uploads are validated and read into memory before streaming starts
+    (the request body is gone once the response begins). Documents then run with at most
+    BATCH_CONCURRENCY in flight, and each line is written as soon as its
+    document finishes, so the output order is completion order, not upload
+    order. A failing document produces an error line instead of aborting the
+    batch.
+
+    Line format:
+        {"index": 0, "filename": "BOQ1.pdf", "status_code": 200, "response": {...Response...}}
+        {"index": 1, "filename": "notes.txt", "status_code": 400, "detail": "File must be a PDF or image"}
+
+    Args:
+        parser (str): "financial" or "drawing"
+        variant (str | None): ContentType value for drawings, None for financial
+        files (list[UploadFile]): Uploaded documents
+
+    Returns:
+        StreamingResponse: application/x-ndjson stream
+
+    Raises:
+        HTTPException 400: If no files or more than BATCH_MAX_FILES were sent
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Too many files: at most {BATCH_MAX_FILES} per batch"
+        )
+
+    # Read every upload up front; files that fail validation get an error line
+    documents = []  # [index, filename, content_type, source bytes | None, error line | None]
+    for index, file in enumerate(files):
+        try:
+            source, input_format = await uploads.ingest(file, parser, variant)
+            documents.append([index, file.filename, input_format, source, None])
+        except HTTPException as e:
+            documents.append([index, file.filename, file.content_type, None,
+                              {"index": index, "filename": file.filename, "status_code": e.status_code, "detail": e.detail}])
+        except Exception as e:
+            documents.append([index, file.filename, file.content_type, None,
+                              {"index": index, "filename": file.filename, "status_code": 400, "detail": f"Could not read file: {str(e)}"}])
+
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def process(document):
+        index, filename, content_type, source, _ = document
+        async with slots:
+            try:
+                result, method, is_succesful, confidence = await result_cache.run_parser_cached(
+                    parser, source, variant, content_type, backpressure=False, priority="batch"
+                )
+                response = Response(
+                    input_format=content_type,
+                    is_extraction_succesful=is_succesful,
+                    confident_value=confidence,
+                    extraction_method=method,
+                    result=result
+                )
+                return {"index": index, "filename": filename, "status_code": 200, "response": response.model_dump()}
+            except HTTPException as e:
+                # e.g. 413 from the memory budget (executor._check_budget)
+                print(f"Error processing file {filename}: {e.detail}")
+                return {"index": index, "filename": filename, "status_code": e.status_code, "detail": e.detail}
+            except Exception as e:
+                print(f"Error processing file {filename}: {str(e)}")
+                return {"index": index, "filename": filename, "status_code": 500,
+                        "detail": f"Error processing file: {str(e)}"}
+            finally:
+                document[3] = None  # release the upload bytes early
+
+    async def lines():
+        tasks = [asyncio.create_task(process(document)) for document in documents if document[4] is None]
+        try:
+            for document in documents:
+                if document[4] is not None:
+                    yield json.dumps(document[4], ensure_ascii=False) + "\n"
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished, ensure_ascii=False) + "\n"
+        finally:
+            # Client disconnected: stop documents that have not finished yet
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/financial_parser/batch/")
+async def create_upload_files_fin(files: list[UploadFile]):
+    """
+    Parse several Bills of Quantities in one request.
+
+    Same pipeline as /financial_parser/, with documents processed concurrently
+    and results streamed as newline-delimited JSON (see `stream_batch`).
+
+    Example:
+        curl -N -X POST "http://localhost:8000/financial_parser/batch/" \
+             -F "files=@BOQ1.pdf" -F "files=@BOQ2.pdf"
+    """
+    return await stream_batch("financial", None, files)
+
+
+@app.post("/drawing_parser/{content_type}/batch/")
+async def create_upload_files_floorplans(files: list[UploadFile], content_type: ContentType):
+    """
+    Parse several floor plans with the same extraction mode in one request.
+
+    Same pipeline as /drawing_parser/{content_type}/, with documents processed
+    concurrently and results streamed as newline-delimited JSON (see `stream_batch`).
+
+    Example:
+        curl -N -X POST "http://localhost:8000/drawing_parser/rooms-ai/batch/" \
+             -F "files=@plan1.pdf" -F "files=@plan2.png"
+    """
+    return await stream_batch("drawing", content_type.value, files)
+
+
 # =============================================================================
 # AI CHATBOT ENDPOINT
 # =============================================================================
 
+# Model answering /ask_ai questions
+ASK_AI_MODEL = "gpt-4o-mini"
+
+
+async def scoped_context(document, question: str, key: str | None = None) -> tuple[str, dict]:
+    """Document context of a question (see src/common/retrieval.py), built off the event loop."""
+    context, context_stats = await asyncio.to_thread(retrieval.build_context, document, question, key)
+    print(f"ask_ai context: {context_stats['context_tokens']} of "
+          f"{context_stats['document_tokens']} document tokens ({context_stats['mode']}, "
+          f"{context_stats['chunks_sent']}/{context_stats['chunks_total']} parts)")
+    return context, context_stats
+
+
+def ask_ai_prompt(context: str, question: str) -> str:
+    """
+    Create the context-aware prompt of a question.
+
+    Key elements:
+    1. Role definition: "helpful assistant analyzing construction documents"
+    2. Document context: full JSON, or schema summary + relevant parts
+    3. User question
+    4. Strict instructions: Answer ONLY from provided data
+    """
+    return f"""You are a helpful assistant analyzing construction document data.
+
+{context}
+
+User question: {question}
+
+Instructions:
+- Answer the question based ONLY on the data provided above
+- Be concise and specific
+- If the information is not in the data, say "This information is not available in the parsed document"
+- Focus on construction-related insights
+
+Answer:"""
+
+
 @app.post("/ask_ai/")
 async def ask_ai(request: Request):
     """
@@ -770,9 +885,11 @@ async def ask_ai(request: Request):
     
     Workflow:
     1. Receive question + parsed document data
-    2. Construct prompt with document context
+    2. Select the document context: small documents are sent whole, larger
+       ones as a schema summary plus the parts most relevant to the question
+       (BM25 over per-item chunks, src/common/retrieval.py)
     3. Call OpenAI GPT-4o-mini
-    4. Return answer + token usage stats
+    4. Return answer + token usage and context stats
     
     Use Cases:
     - "What is the total project cost?"
@@ -800,12 +917,21 @@ async def ask_ai(request: Request):
                     "prompt_tokens": 1523,
                     "completion_tokens": 45,
                     "total_tokens": 1568
+                },
+                "context": {
+                    "mode": "retrieval",       # or "full"
+                    "chunks_total": 205,
+                    "chunks_sent": 12,
+                    "document_tokens": 13119,  # whole document as JSON
+                    "context_tokens": 813,     # context actually sent
+                    "token_reduction": 0.938
                 }
             }
     
     Raises:
         HTTPException 400: If question or document_data missing
         HTTPException 500: If OpenAI API call fails
+        HTTPException 504: If OpenAI does not answer within LLM_TIMEOUT_SECONDS
     
     Example:
         curl -X POST "http://localhost:8000/ask_ai/" \
@@ -817,6 +943,8 @@ async def ask_ai(request: Request):
     
     Note:
         - Answers based ONLY on provided document data (no external knowledge)
+        - Context size is bounded by ASK_AI_TOP_K / ASK_AI_CONTEXT_TOKENS;
+          documents up to ASK_AI_FULL_DOCUMENT_TOKENS are sent whole
         - Token usage returned for cost tracking
         - Temperature=0.7 balances accuracy and natural language
         - Max 500 tokens keeps responses concise and cost-effective
@@ -848,26 +976,10 @@ async def ask_ai(request: Request):
         # PROMPT CONSTRUCTION
         # =====================================================================
         
-        # Create context-aware prompt
-        # Key elements:
-        # 1. Role definition: "helpful assistant analyzing construction documents"
-        # 2. Document context: Full parsed JSON data
-        # 3. User question
-        # 4. Strict instructions: Answer ONLY from provided data
-        prompt = f"""You are a helpful assistant analyzing construction document data.
-
-Here is the parsed construction document data in JSON format:
-{json.dumps(document_data, indent=2)}
-
-User question: {question}
-
-Instructions:
-- Answer the question based ONLY on the data provided above
-- Be concise and specific
-- If the information is not in the data, say "This information is not available in the parsed document"
-- Focus on construction-related insights
-
-Answer:"""
+        # Document context scoped to the question (chunking + BM25 ranking;
+        # the index is cached per document for follow-up questions)
+        context, context_stats = await scoped_context(document_data, question)
+        prompt = ask_ai_prompt(context, question)
 
         # =====================================================================
         # OPENAI API CALL
@@ -877,9 +989,14 @@ Answer:"""
         # Alternative models:
         # - gpt-4o: More accurate but more expensive
         # - gpt-3.5-turbo: Cheaper but less capable
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",  # Optimized for cost/performance balance
-            messages=[{"role": "user", "content": prompt}],
+        # The async gateway client shares its keep-alive connections across requests
+        response = await executor.run_io(
+            "ask_ai",
+            llm_gateway.complete_async,
+            "ask_ai",
+            ASK_AI_MODEL,  # Optimized for cost/performance balance
+            [{"role": "user", "content": prompt}],
+            provider="openai",
             max_tokens=500,  # Limit response length (cost control)
                             # Increase for detailed reports
                             # Decrease for simple queries
@@ -898,7 +1015,7 @@ Answer:"""
         # Return answer + metadata for tracking
         return {
             "answer": answer,
-            "model": "gpt-4o-mini",
+            "model": ASK_AI_MODEL,
             "usage": {
                 # Token usage for cost calculation
                 # Pricing (as of 2024):
@@ -907,9 +1024,17 @@ Answer:"""
                 "prompt_tokens": response.usage.prompt_tokens,
                 "completion_tokens": response.usage.completion_tokens,
                 "total_tokens": response.usage.total_tokens
-            }
+            },
+            "context": context_stats
         }
         
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"OpenAI did not answer within {llm_gateway.LLM_TIMEOUT:.0f} seconds"
+        )
     except Exception as e:
         # =====================================================================
         # ERROR HANDLING
@@ -919,7 +1044,414 @@ Answer:"""
             status_code=500, 
             detail=str(e)
         )
-        gc.collect()  # Cleanup on error
+
+# =============================================================================
+# AI CHATBOT SESSIONS
+# =============================================================================
+# Register a parsed document once, then ask follow-up questions by doc_id with
+# a bounded server-side history; answers stream as Server-Sent Events
+# (src/common/sessions.py).
+
+@app.post("/ask_ai/sessions")
+async def create_ask_ai_session(request: Request):
+    """
+    Register a parsed document for follow-up questions.
+
+    Args:
+        request (Request): JSON body with either the parsed document or the
+            id of a succeeded job whose result should be used:
+            {"document_data": {"Sections": [...], "confidence": 0.85}}
+            {"job_id": "3f2a..."}
+
+    Returns:
+        dict: Session record
+            {
+                "doc_id": "9c1e...",
+                "source": "upload" | "job:<id>",
+                "created_at": 1767225600.0,
+                "used_at": 1767225600.0,
+                "document_tokens": 13119,
+                "chunks": 205,
+                "turns": []
+            }
+
+    Raises:
+        HTTPException 400: If neither document_data nor job_id is given
+        HTTPException 404: If the job id is unknown
+        HTTPException 409: If the job has not succeeded (yet)
+    """
+    data = await request.json()
+    document_data = data.get("document_data")
+    job_id = data.get("job_id")
+    source = "upload"
+
+    if not document_data and job_id:
+        job = await jobs.get_async(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["status"] != jobs.SUCCEEDED:
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}, not succeeded")
+        document_data = (job["result"] or {}).get("result")
+        source = f"job:{job_id}"
+
+    if not document_data:
+        raise HTTPException(
+            status_code=400,
+            detail="Missing 'document_data' or 'job_id' field"
+        )
+    return await asyncio.to_thread(sessions.create, document_data, source)
+
+
+@app.get("/ask_ai/sessions/{doc_id}")
+async def get_ask_ai_session(doc_id: str):
+    """
+    Return a session record with its kept question / answer turns.
+
+    Raises:
+        HTTPException 404: If the session is unknown or expired
+    """
+    session = await asyncio.to_thread(sessions.get, doc_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+@app.delete("/ask_ai/sessions/{doc_id}")
+async def delete_ask_ai_session(doc_id: str):
+    """
+    Delete a session and its history.
+
+    Raises:
+        HTTPException 404: If the session is unknown or expired
+    """
+    if not await asyncio.to_thread(sessions.delete, doc_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"doc_id": doc_id, "deleted": True}
+
+
+async def stream_answer(doc_id: str, question: str, messages: list, context_stats: dict):
+    """
+    Stream an answer as Server-Sent Events and store the finished turn.
+
+    Events:
+        context   retrieval stats of the question (sent first)
+        token     {"text"} for every piece of the answer
+        done      {"answer", "model", "usage", "context"}
+        error     {"status", "detail"}; the turn is not stored
+
+    The endpoint gate is held until the answer is complete; a client that
+    disconnects cancels the OpenAI request.
+    """
+    yield progress.sse("context", context_stats)
+    parts, usage = [], None
+    try:
+        async with executor.io_slot("ask_ai"):
+            async for event in llm_gateway.stream_async(
+                "ask_ai", ASK_AI_MODEL, messages, provider="openai", max_tokens=500, temperature=0.7
+            ):
+                if "delta" in event:
+                    parts.append(event["delta"])
+                    yield progress.sse("token", {"text": event["delta"]})
+                else:
+                    usage = event["usage"]
+    except HTTPException as e:
+        yield progress.sse("error", {"status": e.status_code, "detail": e.detail})
+        return
+    except asyncio.TimeoutError:
+        yield progress.sse("error", {
+            "status": 504, "detail": f"OpenAI did not answer within {llm_gateway.LLM_TIMEOUT:.0f} seconds"
+        })
+        return
+    except Exception as e:
+        print(f"Error in ask_ai session {doc_id}: {str(e)}")
+        yield progress.sse("error", {"status": 500, "detail": str(e)})
+        return
+
+    answer = "".join(parts)
+    await asyncio.to_thread(sessions.add_turn, doc_id, question, answer)
+    yield progress.sse("done", {"answer": answer, "model": ASK_AI_MODEL, "usage": usage, "context": context_stats})
+
+
+@app.post("/ask_ai/sessions/{doc_id}/ask")
+async def ask_ai_session(doc_id: str, request: Request):
+    """
+    Ask a question about a registered document.
+
+    The prompt holds the document context scoped to the question (retrieval
+    uses the previous question too, so follow-ups like "and its rate?" find
+    the same parts) and the session's recent turns (SESSION_HISTORY_TURNS /
+    SESSION_HISTORY_TOKENS).
+
+    Args:
+        doc_id (str): Session id from POST /ask_ai/sessions
+        request (Request): JSON body
+            {"question": "What is the rate of item 2.5.1?", "stream": true}
+
+    Returns:
+        StreamingResponse: text/event-stream of "context", "token" ... and a
+            final "done" (or "error") event, see `stream_answer`.
+        dict: With "stream": false, the answer as returned by /ask_ai/.
+
+    Raises:
+        HTTPException 400: If the question is missing
+        HTTPException 404: If the session is unknown or expired
+        HTTPException 429: If too many /ask_ai requests are in flight
+        HTTPException 500 / 504: With "stream": false, as /ask_ai/
+
+    Example:
+        curl -N -X POST "http://localhost:8000/ask_ai/sessions/9c1e.../ask" \
+             -H "Content-Type: application/json" \
+             -d '{"question": "Which rooms are adjacent to the kitchen?"}'
+        → event: context / event: token (repeated) / event: done
+    """
+    data = await request.json()
+    question = data.get("question")
+    if not question:
+        raise HTTPException(
+            status_code=400,
+            detail="Missing 'question' field"
+        )
+
+    loaded = await asyncio.to_thread(sessions.load, doc_id)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    document_data, document_hash = loaded
+    turns = await asyncio.to_thread(sessions.history, doc_id)
+
+    query = f"{turns[-1]['question']} {question}" if turns else question
+    context, context_stats = await scoped_context(document_data, query, document_hash)
+    messages = []
+    for turn in turns:
+        messages.append({"role": "user", "content": turn["question"]})
+        messages.append({"role": "assistant", "content": turn["answer"]})
+    messages.append({"role": "user", "content": ask_ai_prompt(context, question)})
+
+    if not data.get("stream", True):
+        try:
+            response = await executor.run_io(
+                "ask_ai",
+                llm_gateway.complete_async,
+                "ask_ai",
+                ASK_AI_MODEL,
+                messages,
+                provider="openai",
+                max_tokens=500,
+                temperature=0.7
+            )
+        except HTTPException:
+            raise
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=504,
+                detail=f"OpenAI did not answer within {llm_gateway.LLM_TIMEOUT:.0f} seconds"
+            )
+        except Exception as e:
+            print(f"Error in ask_ai session {doc_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+        answer = response.choices[0].message.content
+        await asyncio.to_thread(sessions.add_turn, doc_id, question, answer)
+        return {
+            "answer": answer,
+            "model": ASK_AI_MODEL,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens
+            },
+            "context": context_stats
+        }
+
+    # Refuse before the stream starts; the slot itself is taken in stream_answer
+    executor.check_capacity("ask_ai")
+    return StreamingResponse(
+        stream_answer(doc_id, question, messages, context_stats),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# =============================================================================
+# ASYNCHRONOUS JOB ENDPOINTS
+# =============================================================================
+
+class Parser(str, Enum):
+    """
+    Parsers available through the job API.
+
+    Values:
+        gantt: Gantt chart parser (variant: ChartFormat value)
+        financial: Bill of Quantities parser (no variant)
+        drawing: Floor plan parser (variant: ContentType value)
+    """
+    gantt = "gantt"
+    financial = "financial"
+    drawing = "drawing"
+
+
+@app.post("/jobs/{parser}")
+async def submit_job(file: UploadFile, parser: Parser, variant: str | None = None):
+    """
+    Submit a document for background extraction and return immediately.
+
+    Use this instead of the synchronous parser endpoints for long-running
+    extractions (full plan AI, full AI Gantt, multi-page BOQs) that would
+    otherwise exceed client or proxy timeouts.
+
+    Args:
+        file (UploadFile): Uploaded PDF or image
+        parser (Parser): "gantt", "financial" or "drawing"
+        variant (str | None): Query parameter, required for gantt (ChartFormat
+            value, e.g. "visual") and drawing (ContentType value, e.g. "rooms-ai")
+
+    Returns:
+        dict: Job record with "job_id" and status "queued"
+
+    Raises:
+        HTTPException 400: If the variant or file type is invalid
+        HTTPException 413: If the file exceeds the upload size, page or pixel limits
+        HTTPException 429: If JOB_QUEUE_DEPTH jobs are already waiting
+        HTTPException 500: If the upload cannot be stored
+
+    Example:
+        curl -X POST "http://localhost:8000/jobs/drawing?variant=full-plan-ai" \
+             -F "file=@floorplan.pdf"
+        → {"job_id": "3f2a...", "status": "queued", ...}
+        curl "http://localhost:8000/jobs/3f2a..."
+    """
+    # Validate the variant against the same enums the synchronous endpoints use
+    variants = {
+        Parser.gantt: [f.value for f in ChartFormat],
+        Parser.drawing: [c.value for c in ContentType],
+        Parser.financial: [None],
+    }[parser]
+    if variant not in variants:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid variant for {parser.value}: expected one of {variants}"
+        )
+    source, input_format = await uploads.ingest(file, parser.value, variant)
+
+    upload_dir = "uploads"
+    file_path = None
+
+    try:
+        # Extension from the sniffed type (images are stored as JPEG by ingest)
+        file_path = await asyncio.to_thread(uploads.save_upload, source, input_format, upload_dir)
+        job = await jobs.submit(parser.value, variant, file_path, input_format, file.filename)
+        file_path = None  # moved into the job store
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error submitting job: {str(e)}")
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error submitting job: {str(e)}"
+        )
+    finally:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Return the status of a job, and its result once finished.
+
+    Status is one of "queued", "running", "succeeded", "failed", "cancelled".
+    For succeeded jobs "result" holds the same fields as the synchronous
+    `Response` model; for failed jobs "error" holds the error message.
+
+    Raises:
+        HTTPException 404: If the job id is unknown
+    """
+    job = await jobs.get_async(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """
+    Stream a job's progress as Server-Sent Events (text/event-stream).
+
+    Pushes "status" on every status change, "stage_start" / "stage_end" /
+    "stage_failed" with stage durations, "partial" with intermediate results
+    (e.g. the Voronoi neighbours of a full floor plan before the
+    connected-rooms vision call returns) and a final "done" event carrying the
+    job record. Reconnecting clients resume after the Last-Event-ID header.
+
+    Raises:
+        HTTPException 404: If the job id is unknown
+    """
+    if await jobs.get_async(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    last_event_id = request.headers.get("last-event-id", "0")
+    return StreamingResponse(
+        jobs.stream_events(job_id, int(last_event_id) if last_event_id.isdigit() else 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job. Finished jobs are returned unchanged.
+
+    Raises:
+        HTTPException 404: If the job id is unknown
+    """
+    job = await jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# =============================================================================
+# METRICS ENDPOINT
+# =============================================================================
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus scrape endpoint (text exposition format 0.0.4).
+
+    Latency histograms per endpoint and pipeline stage, LLM call / retry /
+    429 / token counters per model and call site, and gauges for in-flight
+    jobs and queue depth. See src/common/metrics.py.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# =============================================================================
+# RESULT CACHE ENDPOINTS
+# =============================================================================
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss counters and size of the parser result cache and the LLM
+    response cache.
+
+    Returns:
+        dict: See src/common/result_cache.py `stats()`; "llm" holds
+              src/common/llm_cache.py `stats()`
+
+    Example:
+        GET http://localhost:8000/cache/stats
+        → {"enabled": true, "hits": 12, "misses": 4, "hit_rate": 0.75, "entries": 4, ...,
+           "llm": {"mode": "off", ...}}
+    """
+    return {**result_cache.stats(), "llm": llm_cache.stats()}
+
+
+@app.delete("/cache/")
+async def cache_clear():
+    """Remove all cached parser results (e.g. after changing prompts)."""
+    result_cache.clear()
+    return result_cache.stats()
 
 
 # =============================================================================
@@ -931,12 +1463,60 @@ Answer:"""
 #
 # Current implementation uses:
 # - async/await for I/O operations (file uploads, API calls)
-# - Synchronous processing for CPU-intensive tasks (PDF parsing, Voronoi)
+# - A bounded process pool for CPU-intensive tasks (PDF parsing, Voronoi),
+#   see src/common/executor.py. Pool size and per-endpoint limits are set via
+#   PARSER_POOL_WORKERS, PARSER_POOL_QUEUE_DEPTH, PARSER_CONCURRENCY_<ENDPOINT>
+#   and PARSER_QUEUE_<ENDPOINT>; saturated endpoints answer 429/503.
+#   Benchmark: python script-benchmark-concurrency.py
+# - Parser libraries are imported lazily (src/common/pipelines.py) and pre-warmed
+#   in the pool workers (PARSER_POOL_PREWARM); the API process imports main in
+#   ~0.8 s instead of ~4.3 s. Startup benchmark / regression check:
+#   python script-benchmark-startup.py --baseline <file saved with --save>
+# - Worker memory governance instead of per-request gc.collect(): peak RSS is
+#   tracked per job and stage, workers are recycled after PARSER_WORKER_MAX_TASKS
+#   jobs or above PARSER_WORKER_MAX_RSS_MB, and documents whose predicted memory
+#   (page size × DPI) exceeds MEMORY_JOB_BUDGET_MB get 413, see src/common/memory.py
+# - Multi-page Gantt charts and plan sets (?pages=all) are split into
+#   single-page PDFs parsed as separate pool jobs, PARSER_PAGE_CONCURRENCY
+#   pages per document at a time, see src/common/pages.py
+# - Each request opens its upload once: a DocumentContext (src/common/documents.py)
+#   memoizes text dicts, words, tables, rects and renders per (page, dpi, clip)
+#   and is shared by all stages of a pipeline (document_artifacts_total).
+#   Benchmark: python script-benchmark-document-context.py
 #
 # Potential improvements:
-# 1. Use asyncio.gather() for parallel processing when handling multiple files
-# 2. Implement background tasks for long-running extractions (FastAPI BackgroundTasks)
-# 3. Add Redis caching for frequently requested documents
-# 4. Use connection pooling for database operations (if added)
-# 5. Implement rate limiting to prevent API abuse
-# 6. Add request queuing for resource-intensive operations
\ No newline at end of file
+# 1. Multiple files can be parsed in one request via the batch endpoints
+#    (/financial_parser/batch/, /drawing_parser/{content_type}/batch/), streamed as NDJSON
+# 2. Long-running extractions can be submitted to the job API (POST /jobs/{parser},
+#    src/common/jobs.py); jobs persist in JOB_STORE_DIR and run on JOB_WORKERS workers,
+#    at most JOB_QUEUE_DEPTH jobs wait (429 beyond).
+#    Stage progress and partial results are streamed via GET /jobs/{id}/events (SSE)
+#    Latency histograms, LLM call/token counters and queue gauges are served in
+#    Prometheus format at GET /metrics (src/common/metrics.py)
+# 3. Parser results are cached on disk by upload hash (src/common/result_cache.py,
+#    RESULT_CACHE_*); a shared Redis cache would help multi-host deployments.
+#    LLM answers can be cached / recorded / replayed per prompt and image hash
+#    (src/common/llm_cache.py, LLM_CACHE_MODE=read|record|replay)
+# 4. LLM calls share pooled keep-alive clients with per-call timeouts
+#    (src/common/llm_gateway.py, LLM_TIMEOUT_SECONDS, LLM_MAX_CONNECTIONS) and
+#    a host-wide token bucket with priority classes and 429 backoff
+#    (src/common/rate_limit.py, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE);
+#    vision images are sized to the model's pixel limits and encoded by content
+#    (src/common/image_encoder.py, e.g. a 13 MB 300 DPI PNG becomes a 0.4 MB JPEG);
+#    image chunks and BOQ table shards (BOQ_SHARD_TOKENS) are sent in parallel
+#    (src/common/fanout.py, FANOUT_CONCURRENCY);
+#    oversized Gantt charts and plans are tiled by page size and model limits,
+#    cut between text rows / along walls and rendered clip by clip while earlier
+#    tiles are in flight (src/common/tiler.py, TILE_MIN_DPI, TILE_MAX_COUNT);
+#    title block OCR and vision extraction are hedged (src/plan2data/titleBlockInfo.py,
+#    TITLEBLOCK_MODE, TITLEBLOCK_HEDGE_DELAY_SECONDS);
+#    LLM_BASE_URL points the gateway at the local mock server for offline
+#    benchmarks (script-mock-llm-server.py, src/common/mock_llm.py);
+#    /ask_ai sends a schema summary plus the BM25-ranked parts of large
+#    documents instead of the whole JSON (src/common/retrieval.py, ASK_AI_TOP_K,
+#    ASK_AI_CONTEXT_TOKENS);
+#    documents can be registered once as /ask_ai sessions with a bounded
+#    server-side history and answers streamed token by token
+#    (POST /ask_ai/sessions, src/common/sessions.py, SESSION_HISTORY_TURNS);
+#    use connection pooling for database operations too (if added)
+# 5. Implement rate limiting to prevent API abuse
\ No newline at end of file
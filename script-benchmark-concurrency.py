@@ -0,0 +1,146 @@
+"""
+Concurrent-request throughput benchmark for the parser endpoints.
+
+Fires N uploads at one parser endpoint with a given client concurrency while
+probing the root endpoint ("/") every 100 ms, once with parsers running inline
+on the event loop (PARSER_POOL_WORKERS=0, the old behaviour) and once with the
+process pool. Reports throughput, upload latency and health-check latency.
+
+The app is served in-process through httpx's ASGI transport, so no server has
+to be started. Parsers that call Mistral need MISTRAL_API_KEY (or the mock LLM
+server) to produce real results; failed parses still exercise the CPU path and
+are counted by status code.
+
+Usage:
+    python script-benchmark-concurrency.py
+    python script-benchmark-concurrency.py --endpoint /financial_parser/ \
+        --file examples/FinancialDocuments/BOQ1.pdf --requests 8 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("MISTRAL_API_KEY", "benchmark")
+
+import httpx
+
+import main
+import src.common.executor as executor
+
+
+def percentile(values, pct):
+    """Return the `pct` percentile of `values` (nearest-rank), or 0.0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_mode(workers, endpoint, file_path, n_requests, concurrency):
+    """
+    Run one benchmark pass.
+
+    Args:
+        workers:     Pool size passed to executor.configure (0 = inline).
+        endpoint:    Upload endpoint, e.g. "/gantt_parser/visual".
+        file_path:   PDF uploaded with every request.
+        n_requests:  Total number of uploads.
+        concurrency: Uploads in flight at the same time.
+
+    Returns:
+        dict with wall time, throughput, latency percentiles and status codes.
+    """
+    # Large enough limits so the benchmark measures throughput, not rejections
+    for name in executor.ENDPOINT_DEFAULTS:
+        os.environ[f"PARSER_QUEUE_{name.upper()}"] = str(n_requests)
+        os.environ[f"PARSER_CONCURRENCY_{name.upper()}"] = str(max(workers, 1))
+    executor.configure(workers=workers, queue_depth=n_requests)
+
+    with open(file_path, "rb") as f:
+        payload = f.read()
+    file_name = os.path.basename(file_path)
+
+    transport = httpx.ASGITransport(app=main.app)
+    upload_latencies = []
+    health_latencies = []
+    status_codes = Counter()
+    done = asyncio.Event()
+    slots = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+
+        async def upload():
+            async with slots:
+                start = time.perf_counter()
+                response = await client.post(
+                    endpoint, files={"file": (file_name, payload, "application/pdf")}
+                )
+                upload_latencies.append(time.perf_counter() - start)
+                status_codes[response.status_code] += 1
+
+        async def probe_health():
+            # Latency includes how late the probe got scheduled, which is
+            # where a blocked event loop shows up
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.1)
+                await client.get("/")
+                health_latencies.append(time.perf_counter() - start - 0.1)
+
+        # Warm the pool so process start-up is not part of the measurement
+        if workers:
+            await upload()
+            upload_latencies.clear()
+            status_codes.clear()
+
+        prober = asyncio.create_task(probe_health())
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(upload() for _ in range(n_requests)))
+        wall = time.perf_counter() - wall_start
+        done.set()
+        await prober
+
+    executor.shutdown()
+    return {
+        "workers": workers,
+        "wall_s": wall,
+        "throughput_rps": n_requests / wall if wall else 0.0,
+        "upload_p50_s": statistics.median(upload_latencies) if upload_latencies else 0.0,
+        "upload_p95_s": percentile(upload_latencies, 95),
+        "health_p50_ms": statistics.median(health_latencies) * 1000 if health_latencies else 0.0,
+        "health_max_ms": max(health_latencies) * 1000 if health_latencies else 0.0,
+        "status_codes": dict(status_codes),
+    }
+
+
+def print_result(label, r):
+    print(f"\n## {label} (PARSER_POOL_WORKERS={r['workers']})")
+    print(f"   wall time:        {r['wall_s']:.2f} s")
+    print(f"   throughput:       {r['throughput_rps']:.2f} req/s")
+    print(f"   upload p50 / p95: {r['upload_p50_s']:.2f} s / {r['upload_p95_s']:.2f} s")
+    print(f"   health p50 / max: {r['health_p50_ms']:.1f} ms / {r['health_max_ms']:.1f} ms")
+    print(f"   status codes:     {r['status_codes']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", default="/gantt_parser/visual")
+    parser.add_argument("--file", default="src/validation/Gantt/testdata/test-vis-excel-1.pdf")
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    args = parser.parse_args()
+
+    before = asyncio.run(run_mode(0, args.endpoint, args.file, args.requests, args.concurrency))
+    after = asyncio.run(run_mode(args.workers, args.endpoint, args.file, args.requests, args.concurrency))
+
+    print_result("Before: inline on the event loop", before)
+    print_result("After: process pool", after)
+    if before["wall_s"]:
+        print(f"\nSpeed-up: {before['wall_s'] / after['wall_s']:.2f}x wall time, "
+              f"health max {before['health_max_ms']:.0f} ms -> {after['health_max_ms']:.0f} ms")
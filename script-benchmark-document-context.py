@@ -0,0 +1,133 @@
+"""
+Per-request document benchmark: one handle per step vs. a shared DocumentContext.
+
+Replays the LLM-free document work of a request both ways and reports wall
+time, how often the PDF was opened and how many artifacts (text dicts,
+words, tables, renders) were computed or reused:
+
+  floorplan   room-name text (all pages) -> words left of the title block
+              -> 300 DPI render for the vision call (full-plan-ai)
+  gantt       pdfplumber table + rects -> 144 DPI render (visual fallback)
+              -> page tiles rendered clip by clip (full ai)
+
+Before: every step opens the upload itself, as the parsers did when they got
+bytes or a path. After: the steps share one DocumentContext, as
+src/common/pipelines.run now passes it.
+
+No LLM calls are made, so no API key is needed.
+
+Usage:
+    python script-benchmark-document-context.py
+    python script-benchmark-document-context.py --stages gantt --rounds 5 \
+        --gantt examples/ganttDiagrams/zn_Potenziale_entfalten_GanttChartExample-2-2.pdf
+"""
+import argparse
+import statistics
+import time
+from collections import Counter
+
+import fitz
+
+import src.common.documents as documents
+import src.gantt2data.helper as gantt_helper
+import src.plan2data.voronoi_functions as voronoi
+
+
+# ==================== STEPS ====================
+
+def floorplan_steps(document):
+    voronoi.extract_text_from_pdf(document)
+    page = document.page(0)
+    document.words(0, fitz.Rect(0, 0, page.rect.width * 0.8, page.rect.height))
+    documents.render_page(document, 0, dpi=300)
+
+
+def gantt_steps(document):
+    document.table(0)
+    document.rects(0)
+    documents.render_page(document, 0, zoom=2)
+    for chunk in gantt_helper.pdf_to_split_images(document, 0):
+        chunk.close()
+
+
+STAGES = {
+    "floorplan": floorplan_steps,
+    "gantt": gantt_steps,
+}
+
+
+class PerStep(documents.DocumentContext):
+    """
+    A DocumentContext that memoizes nothing: every artifact is computed on a
+    fresh handle of the upload, like the parsers did when each step got the
+    bytes or a path.
+    """
+
+    def __init__(self, payload: bytes):
+        super().__init__(payload)
+        self._handles = []
+
+    def _memo(self, artifact, key, compute):
+        if artifact in ("bytes", "plumber_page"):
+            return compute()
+        document = documents.DocumentContext(self.source)
+        self._handles.append(document)
+        return getattr(document, artifact)(*key)
+
+    def close(self):
+        for document in self._handles:
+            self.counts.update(document.counts)
+            document.close()
+        self._handles.clear()
+        super().close()
+
+
+def before(steps, payload: bytes) -> Counter:
+    with PerStep(payload) as document:
+        steps(document)
+    return document.counts
+
+
+def after(steps, payload: bytes) -> Counter:
+    with documents.DocumentContext(payload) as document:
+        steps(document)
+        return document.counts
+
+
+def measure(fn, steps, payload: bytes, rounds: int) -> tuple[float, Counter]:
+    """Median wall time (ms) over `rounds` runs and the counts of the last run."""
+    fn(steps, payload)  # warm-up (imports, font caches)
+    times, counts = [], Counter()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        counts = fn(steps, payload)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, counts
+
+
+def summary(counts: Counter) -> str:
+    opens = counts[("pdf_open", "computed")] + counts[("plumber_open", "computed")]
+    computed = sum(n for (artifact, outcome), n in counts.items() if outcome == "computed" and not artifact.endswith("_open"))
+    reused = sum(n for (_, outcome), n in counts.items() if outcome == "reused")
+    return f"{opens:3d} opens   {computed:3d} computed   {reused:3d} reused"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--floorplan", default="examples/FloorplansAndSectionViews/Simple Floorplan/01_Simple.pdf")
+    parser.add_argument("--gantt", default="examples/ganttDiagrams/commercial-building-construction-gantt-chart.pdf")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    args = parser.parse_args()
+
+    print(f"{args.rounds} rounds, spool: {documents.SPOOL_DIR}")
+    for stage in args.stages.split(","):
+        pdf = getattr(args, stage)
+        with open(pdf, "rb") as f:
+            payload = f.read()
+        before_ms, before_counts = measure(before, STAGES[stage], payload, args.rounds)
+        after_ms, after_counts = measure(after, STAGES[stage], payload, args.rounds)
+        print(f"\n## {stage} ({pdf})")
+        print(f"   before: {before_ms:8.1f} ms   {summary(before_counts)}")
+        print(f"   after:  {after_ms:8.1f} ms   {summary(after_counts)}")
+        print(f"   saved per request: {before_ms - after_ms:.1f} ms")
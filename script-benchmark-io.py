@@ -0,0 +1,159 @@
+"""
+Per-request I/O benchmark: temp-file pipeline vs. in-memory pipeline.
+
+Replays the pre-LLM stages of a request both ways and reports wall time and
+the bytes this process wrote and read through the file system (from
+/proc/self/io wchar/rchar, so tmpfs and page-cache I/O count too):
+
+  titleblock  Before: save upload -> convert_pdf2img (300 DPI PNG in CWD)
+                      -> cv2.imread -> base64 of the PNG (AI fallback)
+              After:  render_page(bytes) -> numpy array -> in-memory JPEG base64
+  gantt       Before: save upload -> pdfplumber(path) -> convert_pdf2img (2x PNG)
+                      -> base64 of the PNG
+              After:  pdfplumber(BytesIO) -> render_page(zoom=2) -> JPEG base64
+  financial   Before: save upload to uploads/
+              After:  spool bytes to SPOOL_DIR (tmpfs) for Camelot
+
+No LLM calls are made, so no API key is needed.
+
+Usage:
+    python script-benchmark-io.py
+    python script-benchmark-io.py --pdf examples/ganttDiagrams/commercial-building-construction-gantt-chart.pdf --rounds 5
+"""
+import argparse
+import base64
+import os
+import statistics
+import time
+import uuid
+
+import cv2
+
+import src.common.documents as documents
+import src.gantt2data.helper as gantt_helper
+import src.plan2data.helper as plan_helper
+
+
+def io_counters() -> tuple[int, int]:
+    """Bytes written and read by this process so far (wchar, rchar)."""
+    counters = {}
+    with open("/proc/self/io") as f:
+        for line in f:
+            name, value = line.split(":")
+            counters[name] = int(value)
+    return counters["wchar"], counters["rchar"]
+
+
+def save_upload(payload: bytes) -> str:
+    """The old handler behaviour: write the upload under uploads/."""
+    os.makedirs("uploads", exist_ok=True)
+    path = os.path.join("uploads", f"{uuid.uuid4()}.pdf")
+    with open(path, "wb") as f:
+        f.write(payload)
+    return path
+
+
+# ==================== BEFORE ====================
+
+def titleblock_before(payload: bytes):
+    path = save_upload(payload)
+    try:
+        image_path = plan_helper.convert_pdf2img(path, pages=(0,))[0]
+        image = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2RGB)
+        with open(image_path, "rb") as f:
+            encoded = base64.b64encode(f.read())
+        os.remove(image_path)
+        return image.shape, len(encoded)
+    finally:
+        os.remove(path)
+
+
+def gantt_before(payload: bytes):
+    path = save_upload(payload)
+    try:
+        import pdfplumber
+
+        with pdfplumber.open(path) as pdf:
+            pdf.pages[0].rects
+        image_path = gantt_helper.convert_pdf2img(path)
+        with open(image_path, "rb") as f:
+            encoded = base64.b64encode(f.read())
+        os.remove(image_path)
+        return len(encoded)
+    finally:
+        os.remove(path)
+
+
+def financial_before(payload: bytes):
+    path = save_upload(payload)
+    os.remove(path)
+
+
+# ==================== AFTER ====================
+
+def titleblock_after(payload: bytes):
+    image = documents.render_page(payload, 0, dpi=300)
+    encoded = documents.image_to_base64(image)
+    return image.shape, len(encoded)
+
+
+def gantt_after(payload: bytes):
+    with documents.open_plumber(payload) as pdf:
+        pdf.pages[0].rects
+    image = documents.render_page(payload, 0, zoom=2)
+    return len(documents.image_to_base64(image))
+
+
+def financial_after(payload: bytes):
+    with documents.spooled_path(payload) as path:
+        os.path.getsize(path)
+
+
+STAGES = {
+    "titleblock": (titleblock_before, titleblock_after),
+    "gantt": (gantt_before, gantt_after),
+    "financial": (financial_before, financial_after),
+}
+
+
+def measure(fn, payload: bytes, rounds: int) -> dict:
+    """Run `fn` `rounds` times and return median wall time and mean bytes per call."""
+    fn(payload)  # warm-up (imports, font caches)
+    times = []
+    written_before, read_before = io_counters()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(payload)
+        times.append(time.perf_counter() - start)
+    written_after, read_after = io_counters()
+    return {
+        "ms": statistics.median(times) * 1000,
+        "written": (written_after - written_before) / rounds,
+        "read": (read_after - read_before) / rounds,
+    }
+
+
+def mib(n: float) -> str:
+    return f"{n / (1024 * 1024):8.2f} MiB"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default="src/validation/Floorplan/titleblock/testdata/floorplan-test-1.pdf")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        payload = f.read()
+
+    print(f"Input: {args.pdf} ({mib(len(payload)).strip()}), {args.rounds} rounds, spool: {documents.SPOOL_DIR}")
+    for stage in args.stages.split(","):
+        before_fn, after_fn = STAGES[stage]
+        before = measure(before_fn, payload, args.rounds)
+        after = measure(after_fn, payload, args.rounds)
+        print(f"\n## {stage}")
+        print(f"   before: {before['ms']:8.1f} ms   written {mib(before['written'])}   read {mib(before['read'])}")
+        print(f"   after:  {after['ms']:8.1f} ms   written {mib(after['written'])}   read {mib(after['read'])}")
+        print(f"   saved per request: {mib(before['written'] - after['written'])} written, "
+              f"{mib(before['read'] - after['read'])} read")
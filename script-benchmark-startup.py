@@ -0,0 +1,189 @@
+"""
+Startup benchmark for the API process, based on `python -X importtime`.
+
+Imports main.py in a fresh interpreter several times and reports:
+  - the median cumulative import time of `main` and the wall time until the
+    app answers its first request (lifespan included)
+  - the most expensive modules (median cumulative / self time)
+  - heavy parser dependencies that must stay lazy (camelot, matplotlib,
+    pdfplumber, pandas, scipy, the LLM clients, the parser packages); any of
+    them imported at startup counts as a regression
+
+With --save the per-module medians are written to a JSON baseline; with
+--baseline the run is compared against it and modules whose cumulative
+import time grew by more than --tolerance are listed. The exit code is 1 on
+any regression, so the script can run in CI.
+
+No network access or API key is needed.
+
+Usage:
+    python script-benchmark-startup.py
+    python script-benchmark-startup.py --rounds 5 --save output/startup-baseline.json
+    python script-benchmark-startup.py --baseline output/startup-baseline.json --max-ms 1500
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Modules the API process must not import before the first parser request
+LAZY_MODULES = (
+    "camelot", "matplotlib", "pdfplumber", "pandas", "scipy", "cv2", "pytesseract", "easyocr",
+    "mistralai", "openai",
+    "src.boq2data", "src.gantt2data", "src.plan2data",
+)
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    client.get("/")
+    print("first-response", time.perf_counter() - start)
+"""
+
+
+def environment() -> dict:
+    """Environment for the child interpreters (dummy keys, throw-away stores)."""
+    store = tempfile.mkdtemp(prefix="startup-benchmark-")
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark"),
+        "MISTRAL_API_KEY": os.environ.get("MISTRAL_API_KEY", "benchmark"),
+        "JOB_STORE_DIR": os.path.join(store, "jobs"),
+        "RESULT_CACHE_DIR": os.path.join(store, "cache"),
+        "PYTHONPATH": os.getcwd(),
+    }
+
+
+def import_times(env: dict) -> dict:
+    """
+    Import main.py once under -X importtime.
+
+    Returns:
+        dict: module → (self µs, cumulative µs) for every module imported.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return modules
+
+
+def first_request_seconds(env: dict) -> float:
+    """Wall time from interpreter start of `import main` until GET / is answered."""
+    proc = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST], env=env, capture_output=True, text=True, check=True,
+    )
+    line = next(line for line in proc.stdout.splitlines() if line.startswith("first-response "))
+    return float(line.split()[1])
+
+
+def median_times(runs: list[dict]) -> dict:
+    """Median self / cumulative time (ms) per module over all runs."""
+    names = set().union(*runs)
+    result = {}
+    for name in names:
+        samples = [run[name] for run in runs if name in run]
+        result[name] = {
+            "self_ms": statistics.median(s for s, _ in samples) / 1000,
+            "cumulative_ms": statistics.median(c for _, c in samples) / 1000,
+        }
+    return result
+
+
+def is_lazy(name: str) -> bool:
+    """True if `name` is (part of) a module listed in LAZY_MODULES."""
+    return any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+
+
+def lazy_violations(modules: dict) -> list[str]:
+    """Heavy modules (see LAZY_MODULES) imported at startup, without their submodules."""
+    return sorted(
+        name for name in modules
+        if is_lazy(name) and not (is_lazy(name.rpartition(".")[0]) and name.rpartition(".")[0] in modules)
+    )
+
+
+def regressions(current: dict, baseline: dict, tolerance: float, min_ms: float) -> list[tuple]:
+    """Modules whose cumulative time grew by more than `tolerance` (and `min_ms`)."""
+    found = []
+    for name, times in current.items():
+        before = baseline.get(name, {"cumulative_ms": 0.0})["cumulative_ms"]
+        growth = times["cumulative_ms"] - before
+        if growth > min_ms and times["cumulative_ms"] > before * (1 + tolerance):
+            found.append((name, before, times["cumulative_ms"]))
+    return sorted(found, key=lambda item: item[2] - item[1], reverse=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Modules listed by cumulative import time")
+    parser.add_argument("--save", help="Write the per-module medians to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a JSON file written with --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative growth per module")
+    parser.add_argument("--min-ms", type=float, default=20.0, help="Ignore growth below this many ms")
+    parser.add_argument("--max-ms", type=float, help="Fail if importing main takes longer (median)")
+    args = parser.parse_args()
+
+    env = environment()
+    runs = [import_times(env) for _ in range(args.rounds)]
+    modules = median_times(runs)
+    total_ms = modules["main"]["cumulative_ms"]
+    first_request = statistics.median(first_request_seconds(env) for _ in range(args.rounds))
+
+    print(f"import main:       {total_ms:8.1f} ms (median of {args.rounds}, {len(modules)} modules)")
+    print(f"first response:    {first_request * 1000:8.1f} ms (import + lifespan + GET /)")
+
+    print(f"\n## Top {args.top} modules by cumulative import time")
+    ranked = sorted(modules.items(), key=lambda item: item[1]["cumulative_ms"], reverse=True)
+    for name, times in ranked[1:args.top + 1]:
+        print(f"   {times['cumulative_ms']:8.1f} ms  (self {times['self_ms']:6.1f} ms)  {name}")
+
+    failed = False
+    violations = lazy_violations(modules)
+    print("\n## Lazy parser dependencies")
+    if violations:
+        failed = True
+        for name in violations:
+            print(f"   REGRESSION: {name} imported at startup ({modules[name]['cumulative_ms']:.1f} ms)")
+    else:
+        print("   none imported at startup")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(modules, baseline, args.tolerance, args.min_ms)
+        print(f"\n## Compared with {args.baseline} "
+              f"(main: {baseline['main']['cumulative_ms']:.1f} ms -> {total_ms:.1f} ms)")
+        if found:
+            failed = True
+            for name, before, after in found[:args.top]:
+                print(f"   REGRESSION: {name}: {before:.1f} ms -> {after:.1f} ms")
+        else:
+            print("   no module regressed")
+
+    if args.max_ms is not None and total_ms > args.max_ms:
+        failed = True
+        print(f"\nREGRESSION: import main took {total_ms:.1f} ms, limit is {args.max_ms:.1f} ms")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(modules, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save}")
+
+    sys.exit(1 if failed else 0)
@@ -1,3 +1,9 @@
+import os
+
+# Re-runs reuse recorded parser / judge answers instead of calling Mistral again
+# (src/common/llm_cache.py); LLM_CACHE_MODE=record refreshes them, =off disables
+os.environ.setdefault("LLM_CACHE_MODE", "read")
+
 import src.gantt2data.ganttParser as parser
 import src.validation.Gantt.validator as validator
 
@@ -0,0 +1,77 @@
+"""
+Local mock LLM server for offline, reproducible benchmarks and load tests.
+
+Serves POST /v1/chat/completions for the Mistral and OpenAI SDKs with
+answers taken from recorded LLM cache entries or from templates built on the
+stored outputs under src/validation/ (see src/common/mock_llm.py), with a
+configurable latency distribution, 429 injection and token accounting
+(GET /stats).
+
+Point the API, the parsers or a benchmark at it with:
+    LLM_BASE_URL=http://127.0.0.1:8089 MISTRAL_API_KEY=mock OPENAI_API_KEY=mock ...
+
+Usage:
+    python script-mock-llm-server.py
+    python script-mock-llm-server.py --latency lognormal --latency-params 2.0 0.5 \
+        --seconds-per-token 0.01 --error-rate 0.05 --rpm 60 --seed 1
+    python script-mock-llm-server.py --recordings cache/llm.db --routes my-routes.json
+"""
+import argparse
+import json
+import time
+
+import src.common.mock_llm as mock_llm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", choices=mock_llm.LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-params", type=float, nargs="+", default=[0.5],
+                        help="fixed: SECONDS; uniform: LOW HIGH; lognormal: MEDIAN SIGMA")
+    parser.add_argument("--seconds-per-token", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before 429 (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute before 429 (0 = unlimited)")
+    parser.add_argument("--routes", help="JSON file: call site → response template")
+    parser.add_argument("--recordings", help="LLM cache database (llm.db) to replay answers from")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    expected = {"fixed": 1, "uniform": 2, "lognormal": 2}[args.latency]
+    if len(args.latency_params) != expected:
+        parser.error(f"--latency {args.latency} takes {expected} --latency-params value(s)")
+
+    routes = None
+    if args.routes:
+        with open(args.routes, encoding="utf-8") as f:
+            routes = json.load(f)
+
+    config = mock_llm.MockConfig(
+        latency=args.latency,
+        latency_params=tuple(args.latency_params),
+        seconds_per_token=args.seconds_per_token,
+        error_rate=args.error_rate,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        retry_after=args.retry_after,
+        routes=routes,
+        recordings=args.recordings,
+        seed=args.seed,
+    )
+    server = mock_llm.start(config, args.host, args.port)
+    url = f"http://{args.host}:{server.server_port}"
+    print(f"Mock LLM server on {url} (stats: {url}/stats)")
+    print(f"  LLM_BASE_URL={url} MISTRAL_API_KEY=mock OPENAI_API_KEY=mock")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print("Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+import os
+
+# Re-runs reuse recorded parser / judge answers instead of calling Mistral again
+# (src/common/llm_cache.py); LLM_CACHE_MODE=record refreshes them, =off disables
+os.environ.setdefault("LLM_CACHE_MODE", "read")
+
 import src.plan2data.titleBlockInfo as parser
 import src.validation.Floorplan.titleblock.llm_as_a_judge as llm_judge
 import src.plan2data.helper as helper
@@ -1,5 +1,6 @@
 import camelot
 import json
+import re
 import pandas as pd
 import json
 
@@ -193,12 +194,21 @@ def cam_stream_merge(tables):
     """
     camelot.plot(tables[0], kind='grid').show()
     data = []
+    page_headers = {}  # text of the top rows of a page → page it first appeared on
     
     for table in tables:
         df = table.df  # pandas DataFrame
-        for _, row in df.iterrows():
+        for index, (_, row) in enumerate(df.iterrows()):
             # Convert each row to a dictionary with column indices as keys
-            data.append({str(i): str(row[i]).strip() for i in range(len(row))})
+            cells = {str(i): str(row[i]).strip() for i in range(len(row))}
+            if index < PAGE_HEADER_ROWS and not has_amounts(cells):
+                # Drop page headers repeated from an earlier page (column titles,
+                # document title) so they are not sent to the LLM once per page;
+                # item rows (with quantities / amounts) are kept even if repeated
+                text = row_text(cells)
+                if text and page_headers.setdefault(text, table.page) != table.page:
+                    continue
+            data.append(cells)
     
     # Merge multi-line rows
     output = []
@@ -227,6 +237,37 @@ def cam_stream_merge(tables):
     return formatted_output
 
 
+# Rows at the top of each page that are compared against earlier pages
+PAGE_HEADER_ROWS = 3
+
+
+# A quantity, rate or amount cell, e.g. "150", "3,750.00", "1 250,00"
+AMOUNT = re.compile(r"[-+]?\d[\d.,' ]*")
+
+
+def has_amounts(row):
+    """
+    True if a cell after the position and description columns holds a number,
+    i.e. the row is a BOQ item rather than a page header.
+    
+    Args:
+        row (dict): Row dictionary (column key → cell text)
+    """
+    return any(AMOUNT.fullmatch(str(value).strip()) for value in list(row.values())[2:])
+
+
+def row_text(row):
+    """
+    Normalized text of a row, used to recognize repeated headers.
+    
+    Args:
+        row (dict): Row dictionary (column key → cell text)
+    
+    Returns:
+        str: Non-empty cells joined by single spaces, lowercased
+    """
+    return " ".join(" ".join(str(value).split()) for value in row.values() if str(value).strip()).lower()
+
 
 
 
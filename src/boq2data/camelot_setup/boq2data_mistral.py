@@ -1,26 +1,27 @@
-import src.boq2data.camelot_setup.Camelot_Functions as cam 
 import json
-import camelot
+import os
 import src.boq2data.camelot_setup.prompts as prompts 
-from mistralai import Mistral
+import src.common.documents as documents
+import src.common.fanout as fanout
+import src.common.llm_gateway as llm_gateway
+import src.common.pipelines as pipelines
+import src.common.progress as progress
 
 
 ## Retrieve the API key from environment variables
 #api_key = os.environ["MISTRAL_API_KEY"]
 
-model = "mistral-small-2503"
-from dotenv import load_dotenv
-import os
-load_dotenv()
-api_key = os.getenv("MISTRAL_API_KEY")
-client = Mistral(api_key=api_key)
+model = pipelines.PARSER_MODELS["financial"]
+# The shared Mistral client (API key, connection pool, timeouts) lives in src/common/llm_gateway.py
 def call_mistral_boq(path):
     """
     Extract Bill of Quantities (BOQ) data from PDF using hybrid Camelot + Mistral AI approach.
     
     This function implements a two-stage extraction pipeline:
     1. Stage 1 (Deterministic): Camelot extracts raw table data from PDF
-    2. Stage 2 (AI): Mistral AI structures, validates, and cleans the extracted data
+    2. Stage 2 (AI): Mistral AI structures, validates, and cleans the extracted data;
+       large tables are split into token-budgeted shards (BOQ_SHARD_TOKENS) that
+       are structured concurrently and merged in document order
     
     The hybrid approach leverages:
     - Camelot's reliable table boundary detection and cell extraction
@@ -28,7 +29,7 @@ def call_mistral_boq(path):
       formatting, and semantic grouping of BOQ sections
     
     Args:
-        path (str): Path to PDF file containing Bill of Quantities tables
+        path (str | bytes): Path to PDF file containing Bill of Quantities tables, or the PDF bytes
     
     Returns:
         str: JSON string containing structured BOQ data in format:
@@ -57,12 +58,16 @@ def call_mistral_boq(path):
     
     Note:
         - Returns raw JSON string (not parsed dict) - parsing happens in extract_boq_mistral()
+        - If some shards failed, "failed_shards" lists them and the confidence is lowered
         - Stream flavor works best for tables without visible gridlines
         - For tables with clear borders, consider changing to flavor="lattice"
     """
     # ============================================================================
     # STAGE 1: TABLE EXTRACTION WITH CAMELOT (DETERMINISTIC)
     # ============================================================================
+    # Camelot is imported here so importing this module (e.g. for `model`) stays cheap
+    import camelot
+    import src.boq2data.camelot_setup.Camelot_Functions as cam
     
     # Configuration for Camelot PDF table extraction
     page_num = "all"  # Process all pages in the PDF
@@ -75,7 +80,11 @@ def call_mistral_boq(path):
     
     # Extract all tables from PDF using Camelot
     # Returns: TableList object containing detected tables with their data
-    tables = camelot.read_pdf(path, flavor=flav, pages=page_num)
+    # Camelot needs a file path: in-memory uploads are spooled to tmpfs
+    # (once per request when `path` is the request's DocumentContext)
+    spooled = path.path() if isinstance(path, documents.DocumentContext) else documents.spooled_path(path)
+    with spooled as pdf_path, progress.stage("camelot"):
+        tables = camelot.read_pdf(pdf_path, flavor=flav, pages=page_num)
     
     # ============================================================================
     # STAGE 2: TABLE PROCESSING AND MERGING
@@ -90,24 +99,192 @@ def call_mistral_boq(path):
     # - Converting to JSON-compatible dictionary structure
     tables_boq_processed = cam.cam_stream_merge(tables)
     
-    # Convert processed tables to formatted JSON string for LLM consumption
-    # indent=2: Makes JSON human-readable with 2-space indentation
-    #           (helps LLM understand structure better)
-    # ensure_ascii=False: Preserves non-ASCII characters (€, ü, ñ, 中文, etc.)
-    #                     Important for international BOQs with special characters
-    processed_str = json.dumps(tables_boq_processed, indent=2, ensure_ascii=False)
+    # ============================================================================
+    # STAGE 3: SHARDING AND COMPACT SERIALIZATION
+    # ============================================================================
+    
+    # The rows used to go into a single prompt as json.dumps(..., indent=2),
+    # which repeats every column name on every row. Large BOQs then hit the
+    # context and output-token limits, and the whole document waited for one
+    # slow call. Instead:
+    # - rows are split into shards of about BOQ_SHARD_TOKENS tokens, cut
+    #   before section headings where possible
+    # - each shard is serialized compactly: column names once, then one
+    #   " | "-delimited line per row
+    shards = shard_rows(tables_boq_processed)
+    print(f"[boq] {len(tables_boq_processed)} rows → {len(shards)} shard(s)")
+    if not shards:
+        return json.dumps({"Sections": [], "confidence": 0})
+    
+    # ============================================================================
+    # STAGE 4: AI STRUCTURING WITH MISTRAL (ONE CALL PER SHARD, CONCURRENT)
+    # ============================================================================
+    
+    # Shards are structured in parallel (bounded concurrency, rate-limited,
+    # unparsable answers retried, see src/common/fanout.py)
+    raw_responses = {}  # shard index → last raw answer (for error reporting)
+    
+    def structure(shard):
+        index, rows, context = shard
+        response = call_mistral_boq_shard(rows, context, index, len(shards))
+        raw_responses[index] = response
+        return normalize_boq_output(json.loads(response))
+    
+    with progress.stage("structuring"):
+        results = fanout.map_chunks("call_mistral_boq", structure, shards)
     
     # ============================================================================
-    # STAGE 3: AI STRUCTURING WITH MISTRAL
+    # STAGE 5: MERGING
     # ============================================================================
     
+    if all(result is None for result in results):
+        # Nothing usable: hand the raw answer to extract_boq_mistral(), which
+        # reports it as invalid JSON
+        return raw_responses.get(0, "")
+    
+    merged = merge_boq_shards(results, [len(rows) for _, rows, _ in shards])
+    
+    # ============================================================================
+    # DEBUG UTILITIES (COMMENTED OUT)
+    # ============================================================================
+    
+    # Uncomment these lines when troubleshooting extraction issues:
+    # - LLM returning unexpected format
+    # - JSON parsing errors in extract_boq_mistral()
+    # - Missing or malformed data in output
+    # 
+    # print("=" * 80)
+    # print("RAW LLM RESPONSES:")
+    # print({index: raw[:1000] for index, raw in raw_responses.items()})
+    # print("=" * 80)
+    
+    return json.dumps(merged, ensure_ascii=False)
+
+
+# ==================== SHARDING ====================
+
+# Approximate prompt tokens of table data per LLM call (~4 characters per token)
+BOQ_SHARD_TOKENS = int(os.getenv("BOQ_SHARD_TOKENS", "3000"))
+
+
+def is_section_heading(row):
+    """
+    True if a row looks like a section / subsection heading: a position or
+    title, but no unit, quantity, rate or amount.
+    
+    Args:
+        row (dict): Row from cam_stream_merge (column name → cell text)
+    """
+    values = [str(value).strip() for value in row.values()]
+    return any(values[:2]) and not any(values[2:])
+
+
+def compact_row(row):
+    """Serialize a row as " | "-delimited cells, trailing empty cells dropped."""
+    cells = [" ".join(str(value).split()).replace("|", "/") for value in row.values()]
+    while cells and not cells[-1]:
+        cells.pop()
+    return " | ".join(cells)
+
+
+def compact_table(columns, rows, context=None):
+    """
+    Serialize table rows for the prompt: column names once, then one line per row.
+    
+    Args:
+        columns (list[str]): Column names
+        rows (list[dict]): Rows of this shard
+        context (str | None): Heading of the section the shard continues, if
+                              the shard does not start with a heading
+    
+    Returns:
+        str: Compact table text, e.g.
+             Columns: Item_Number | Description | Unit | Quantity | Rate | Amount
+             (one row per line, cells separated by " | ", missing trailing cells are empty)
+             2.5.1 | Fillings
+             2.5.1.1.1 | Fill obtained from ... | m³ | 150 | 25.00 | 3750.00
+    """
+    lines = [
+        "Columns: " + " | ".join(columns),
+        '(one row per line, cells separated by " | ", missing trailing cells are empty)',
+    ]
+    if context:
+        lines.append(f"(these rows continue the section: {context})")
+    lines.extend(compact_row(row) for row in rows)
+    return "\n".join(lines)
+
+
+def shard_rows(rows, max_tokens=None):
+    """
+    Split BOQ rows into shards of about `max_tokens` prompt tokens.
+    
+    A shard that grows too large is cut before its last section heading
+    (so sections stay together), or before the current row if the section
+    alone exceeds the budget. The column-name row and exact repeats of it
+    (page headers) are dropped, as the names are sent once per shard.
+    
+    Args:
+        rows (list[dict]): Rows from cam_stream_merge
+        max_tokens (int | None): Token budget per shard (default BOQ_SHARD_TOKENS)
+    
+    Returns:
+        list[tuple]: (index, rows, context) per shard, where context is the
+                     heading of the section the shard continues (or None)
+    """
+    max_tokens = max_tokens or BOQ_SHARD_TOKENS
+    if not rows:
+        return []
+    columns = list(rows[0].keys())
+    header = " | ".join(columns).lower()
+    rows = [row for row in rows if compact_row(row).lower() != header]
+    
+    groups, current, tokens = [], [], 0
+    for row in rows:
+        row_tokens = len(compact_row(row)) // 4 + 1
+        if current and tokens + row_tokens > max_tokens:
+            headings = [i for i in range(1, len(current)) if is_section_heading(current[i])]
+            cut = headings[-1] if headings else len(current)
+            groups.append(current[:cut])
+            current = current[cut:]
+            tokens = sum(len(compact_row(r)) // 4 + 1 for r in current)
+        current.append(row)
+        tokens += row_tokens
+    if current:
+        groups.append(current)
+    
+    shards, last_heading = [], None
+    for index, group in enumerate(groups):
+        context = last_heading if not is_section_heading(group[0]) else None
+        shards.append((index, group, context))
+        for row in group:
+            if is_section_heading(row):
+                last_heading = compact_row(row)
+    return shards
+
+
+def call_mistral_boq_shard(rows, context, index, count):
+    """
+    Structure one shard of BOQ rows with Mistral.
+    
+    Args:
+        rows (list[dict]): Rows of the shard
+        context (str | None): Section the shard continues (see shard_rows)
+        index (int): Zero-based shard index
+        count (int): Number of shards
+    
+    Returns:
+        str: Cleaned JSON string returned by the model
+    """
     # Create specialized prompt for BOQ data structuring
     # prompts.create_preproccesed_prompt adds:
     # - Instructions for identifying BOQ sections (structural work, MEP, finishes)
     # - Rules for parsing position numbers (1.1, 1.2.3, etc.)
     # - Guidance for extracting quantities, units, and prices
     # - Schema definition for expected output format
-    user_message = prompts.create_preproccesed_prompt(processed_str)
+    table_text = compact_table(list(rows[0].keys()), rows, context)
+    if count > 1:
+        table_text = f"(part {index + 1} of {count} of the table)\n" + table_text
+    user_message = prompts.create_preproccesed_prompt(table_text)
     
     # Construct message array for Mistral chat completion API
     messages = [
@@ -122,13 +299,12 @@ def call_mistral_boq(path):
         },
         {
             "role": "user",
-            "content": user_message,  # Contains preprocessed table data + instructions
+            "content": user_message,  # Contains compact table data + instructions
         }
     ]
     
     # Call Mistral API for intelligent BOQ structuring
-    chat_response = client.chat.complete(
-        model=model,  # Model defined globally (e.g., "mistral-small-2503")
+    chat_response = llm_gateway.complete("call_mistral_boq", model,
         messages=messages,
         response_format={
             "type": "json_object",  # Forces valid JSON output (no markdown, no plaintext)
@@ -143,7 +319,7 @@ def call_mistral_boq(path):
     response = chat_response.choices[0].message.content
     
     # ============================================================================
-    # STAGE 4: RESPONSE CLEANING (DEFENSIVE PROGRAMMING)
+    # RESPONSE CLEANING (DEFENSIVE PROGRAMMING)
     # ============================================================================
     
     # Even with response_format="json_object", some edge cases can occur:
@@ -172,21 +348,75 @@ def call_mistral_boq(path):
     # Final cleanup of any remaining whitespace
     response = response.strip()
     
-    # ============================================================================
-    # DEBUG UTILITIES (COMMENTED OUT)
-    # ============================================================================
+    return response
+
+
+# ==================== MERGING ====================
+
+def normalize_boq_output(output):
+    """
+    Bring a parsed shard answer into {"Sections": [...], "confidence": x} form.
     
-    # Uncomment these lines when troubleshooting extraction issues:
-    # - LLM returning unexpected format
-    # - JSON parsing errors in extract_boq_mistral()
-    # - Missing or malformed data in output
-    # 
-    # print("=" * 80)
-    # print("RAW LLM RESPONSE:")
-    # print(response[:1000])  # First 1000 chars (avoid overwhelming console)
-    # print("=" * 80)
+    Despite the system message the model sometimes returns a bare array of
+    sections; it is wrapped with a medium confidence of 0.5 (the structure
+    was not followed, see extract_boq_mistral).
+    """
+    if isinstance(output, list):
+        print("Warning: LLM returned a list instead of expected object structure")
+        return {"Sections": output, "confidence": 0.5}
+    if not isinstance(output, dict):
+        raise ValueError(f"Unexpected BOQ answer of type {type(output).__name__}")
+    output.setdefault("Sections", [])
+    return output
+
+
+def _section_title(section):
+    if not isinstance(section, dict):
+        return None
+    return section.get("Section Title") or section.get("section_name")
+
+
+def merge_boq_shards(results, row_counts):
+    """
+    Merge the structured shards into one BOQ in document order.
     
-    return response
+    Sections keep the order of their shards. A section cut by a shard
+    boundary (same title at the end of one shard and the start of the next)
+    becomes one section with the items of both. The combined confidence is
+    the mean of the shard confidences weighted by their row counts; a failed
+    shard counts as confidence 0 and is listed in "failed_shards".
+    
+    Args:
+        results (list[dict | None]): Normalized shard answers, None if a shard failed
+        row_counts (list[int]): Rows per shard
+    
+    Returns:
+        dict: {"Sections": [...], "confidence": float} plus
+              "failed_shards" (1-based shard numbers) if any shard failed
+    """
+    sections, failed = [], []
+    weighted, total_rows = 0.0, sum(row_counts) or 1
+    for number, (result, rows) in enumerate(zip(results, row_counts), start=1):
+        if result is None:
+            failed.append(number)
+            continue
+        try:
+            weighted += float(result.get("confidence", 0) or 0) * rows
+        except (TypeError, ValueError):
+            pass
+        for section in result["Sections"]:
+            title = _section_title(section)
+            previous = sections[-1] if sections else None
+            if (title and title == _section_title(previous)
+                    and isinstance(section.get("Items"), list) and isinstance(previous.get("Items"), list)):
+                previous["Items"].extend(section["Items"])
+                continue
+            sections.append(section)
+    
+    merged = {"Sections": sections, "confidence": round(weighted / total_rows, 3)}
+    if failed:
+        merged["failed_shards"] = failed
+    return merged
 
 
 def extract_boq_mistral(path):
@@ -200,7 +430,7 @@ def extract_boq_mistral(path):
     - Provide consistent return signature for pipeline integration
     
     Args:
-        path (str): Path to PDF file containing Bill of Quantities
+        path (str | bytes): Path to PDF file containing Bill of Quantities, or the PDF bytes
     
     Returns:
         tuple: (output, method, is_success, confidence)
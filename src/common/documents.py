@@ -0,0 +1,408 @@
+import base64
+import io
+import os
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+import pymupdf
+from PIL import Image
+
+import src.common.metrics as metrics
+
+
+###############################################################################
+# In-Memory Document Sources
+#
+# Parsers used to receive a path under uploads/, re-open the file several
+# times and write intermediate PNGs into the working directory that were then
+# read back (cv2.imread, base64 encoding). These helpers let the pipelines
+# work on the upload bytes directly:
+#
+#   - a "source" is either a file path (str) or the raw upload (bytes)
+#   - PDFs open from memory (pymupdf stream / pdfplumber on BytesIO)
+#   - pages render straight into numpy arrays (pixmap samples, no PNG)
+#   - images are encoded to base64 in memory for the vision models
+#
+# Only Camelot needs a real path; `spooled_path` writes the bytes to a
+# tmpfs-backed spool directory (SPOOL_DIR, /dev/shm when available) for the
+# duration of the call.
+#
+# Within one request the pipelines used to open the same upload several
+# times (full floor plan: extractDICT of every page, extractWORDS, a 300 DPI
+# render; visual Gantt: pdfplumber plus a separate pymupdf render). A
+# `DocumentContext` is created once per request (pipelines.run) and passed
+# down instead of the source: it holds one pymupdf and one pdfplumber
+# handle and memoizes per-page text dicts, word lists, drawings, pdfplumber
+# rects / tables / text and renders keyed by (page, dpi, clip). Every
+# function that takes a source also accepts a context; `document_context`
+# wraps plain sources for callers outside a pipeline. Computed and reused
+# artifacts are counted in document_artifacts_total
+# (see script-benchmark-document-context.py).
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+SPOOL_DIR = os.getenv("SPOOL_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+
+
+# ==================== SOURCES ====================
+
+def read_bytes(source: str | bytes) -> bytes:
+    """Return the content of a source, reading it from disk if it is a path."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def is_pdf(source: str | bytes) -> bool:
+    """True if the source is a PDF (by magic bytes for in-memory sources)."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:5]) == b"%PDF-"
+    return source.lower().endswith(".pdf")
+
+
+def open_pdf(source: str | bytes) -> pymupdf.Document:
+    """Open a PDF with pymupdf from a path or from memory."""
+    with metrics.timed("pdf_open"):
+        if isinstance(source, (bytes, bytearray)):
+            return pymupdf.open(stream=source, filetype="pdf")
+        return pymupdf.open(source)
+
+
+def open_plumber(source: str | bytes):
+    """Open a PDF with pdfplumber from a path or from memory."""
+    import pdfplumber
+
+    if isinstance(source, (bytes, bytearray)):
+        return pdfplumber.open(io.BytesIO(source))
+    return pdfplumber.open(source)
+
+
+def split_pages(source: str | bytes, pages: list[int]) -> list[bytes]:
+    """
+    Copy pages of a PDF into single-page PDFs (see src/common/pages.py).
+
+    Objects not used by a page (other pages' images, fonts) are dropped, so a
+    worker parsing one page never loads the rest of the document.
+
+    Args:
+        source: File path or PDF bytes.
+        pages:  Zero-based page indices.
+
+    Returns:
+        list[bytes]: One PDF per requested page, in the given order.
+    """
+    doc = open_pdf(source)
+    try:
+        parts = []
+        for page in pages:
+            part = pymupdf.open()
+            try:
+                part.insert_pdf(doc, from_page=page, to_page=page)
+                parts.append(part.tobytes(garbage=3, deflate=True))
+            finally:
+                part.close()
+        return parts
+    finally:
+        doc.close()
+
+
+@contextmanager
+def spooled_path(source: str | bytes, suffix: str = ".pdf"):
+    """
+    Yield a file path for libraries that only accept paths (Camelot).
+
+    Paths are passed through unchanged. Bytes are written to SPOOL_DIR and
+    removed when the block exits.
+
+    Args:
+        source: File path or upload bytes.
+        suffix: File extension for the spooled file.
+
+    Yields:
+        str: Path to a file with the source's content.
+    """
+    if not isinstance(source, (bytes, bytearray)):
+        yield source
+        return
+
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Warning: Could not delete {path}: {e}")
+
+
+# ==================== DOCUMENT CONTEXT ====================
+
+def _clip_key(clip) -> tuple | None:
+    return None if clip is None else tuple(round(float(value), 2) for value in clip)
+
+
+class DocumentContext:
+    """
+    One upload, opened once per request, with memoized derived artifacts.
+
+    Artifacts are computed on first use and shared by every later caller, so
+    returned objects must be treated as read-only (renders are read-only
+    numpy arrays). Use as a context manager or call `close`.
+
+    Attributes:
+        source: File path or upload bytes.
+        counts (Counter): (artifact, "computed" | "reused") → calls, e.g. for
+                          benchmarks.
+    """
+
+    def __init__(self, source: str | bytes):
+        self.source = source
+        self.counts = Counter()
+        self._artifacts = {}
+        self._lock = threading.RLock()  # fanned-out chunk tasks may render concurrently
+        self._pdf = None
+        self._plumber = None
+        self._spooled = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _memo(self, artifact: str, key: tuple, compute):
+        with self._lock:
+            if (artifact, key) in self._artifacts:
+                self.counts[(artifact, "reused")] += 1
+                metrics.inc("document_artifacts_total", artifact=artifact, outcome="reused")
+                return self._artifacts[(artifact, key)]
+            value = compute()
+            self._artifacts[(artifact, key)] = value
+            self.counts[(artifact, "computed")] += 1
+            metrics.inc("document_artifacts_total", artifact=artifact, outcome="computed")
+            return value
+
+    # ---- handles ----
+
+    @property
+    def data(self) -> bytes:
+        """Content of the upload (read from disk once for path sources)."""
+        return self._memo("bytes", (), lambda: read_bytes(self.source))
+
+    @property
+    def is_pdf(self) -> bool:
+        return is_pdf(self.source)
+
+    @property
+    def pdf(self) -> pymupdf.Document:
+        """The pymupdf document, opened on first use."""
+        with self._lock:
+            if self._pdf is None:
+                self._pdf = open_pdf(self.source)
+                self.counts[("pdf_open", "computed")] += 1
+            return self._pdf
+
+    @property
+    def plumber(self):
+        """The pdfplumber document, opened on first use."""
+        with self._lock:
+            if self._plumber is None:
+                self._plumber = open_plumber(self.source)
+                self.counts[("plumber_open", "computed")] += 1
+            return self._plumber
+
+    @property
+    def page_count(self) -> int:
+        return self.pdf.page_count
+
+    @contextmanager
+    def path(self, suffix: str = ".pdf"):
+        """Like `spooled_path`, but bytes are spooled once and kept until `close`."""
+        if not isinstance(self.source, (bytes, bytearray)):
+            yield self.source
+            return
+        with self._lock:
+            if self._spooled is None:
+                fd, self._spooled = tempfile.mkstemp(suffix=suffix, dir=SPOOL_DIR)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self.source)
+        yield self._spooled
+
+    # ---- pymupdf artifacts ----
+
+    def page(self, page: int = 0) -> pymupdf.Page:
+        """A page of the pymupdf document (kept alive with the document)."""
+        return self._memo("page", (page,), lambda: self.pdf[page])
+
+    def text_dict(self, page: int = 0, clip=None) -> dict:
+        """`extractDICT` of a page (optionally clipped to a rect)."""
+        return self._memo(
+            "text_dict", (page, _clip_key(clip)),
+            lambda: self.page(page).get_textpage(clip).extractDICT(),
+        )
+
+    def words(self, page: int = 0, clip=None) -> list:
+        """`extractWORDS` of a page: (x0, y0, x1, y1, word, block, line, word_no) tuples."""
+        return self._memo(
+            "words", (page, _clip_key(clip)),
+            lambda: self.page(page).get_textpage(clip).extractWORDS(),
+        )
+
+    def drawings(self, page: int = 0) -> list:
+        """Vector paths of a page (`get_drawings`)."""
+        return self._memo("drawings", (page,), lambda: self.page(page).get_drawings())
+
+    def bboxes(self, page: int = 0) -> list:
+        """(kind, rect) of every drawing operation of a page (`get_bboxlog`), cheaper than `drawings`."""
+        return self._memo("bboxes", (page,), lambda: self.page(page).get_bboxlog())
+
+    def render(self, page: int = 0, dpi: int = 300, clip=None, keep: bool = True) -> np.ndarray:
+        """
+        Page (or a clip of it, in PDF points) rendered into a read-only RGB array.
+
+        Args:
+            page: Zero-based page index.
+            dpi:  Resolution (zoom 2 = 144 DPI).
+            clip: Optional (x0, y0, x1, y1) area of the page.
+            keep: False for one-off renders (streamed tiles), which are not
+                  memoized and are freed as soon as the caller drops them.
+        """
+        def compute():
+            with metrics.timed("render_page"):
+                pix = self.page(page).get_pixmap(dpi=dpi, clip=clip, alpha=False)
+                image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n).copy()
+            image.setflags(write=False)
+            return image
+
+        if not keep:
+            with self._lock:
+                self.counts[("render", "computed")] += 1
+                metrics.inc("document_artifacts_total", artifact="render", outcome="computed")
+                return compute()
+        return self._memo("render", (page, int(dpi), _clip_key(clip)), compute)
+
+    # ---- pdfplumber artifacts ----
+
+    def plumber_page(self, page: int = 0):
+        return self._memo("plumber_page", (page,), lambda: self.plumber.pages[page])
+
+    def rects(self, page: int = 0) -> list:
+        """pdfplumber rectangles of a page."""
+        return self._memo("rects", (page,), lambda: self.plumber_page(page).rects)
+
+    def table(self, page: int = 0) -> list | None:
+        """pdfplumber `extract_table` of a page."""
+        return self._memo("table", (page,), lambda: self.plumber_page(page).extract_table())
+
+    def text(self, page: int = 0) -> str:
+        """pdfplumber `extract_text` of a page."""
+        return self._memo("text", (page,), lambda: self.plumber_page(page).extract_text())
+
+    def close(self):
+        """Close the handles, drop the artifacts and remove a spooled file."""
+        with self._lock:
+            self._artifacts.clear()
+            if self._plumber is not None:
+                self._plumber.close()
+                self._plumber = None
+            if self._pdf is not None:
+                self._pdf.close()
+                self._pdf = None
+            if self._spooled is not None:
+                try:
+                    os.remove(self._spooled)
+                except OSError as e:
+                    print(f"Warning: Could not delete {self._spooled}: {e}")
+                self._spooled = None
+
+
+@contextmanager
+def document_context(source):
+    """
+    Yield a DocumentContext for `source`.
+
+    An existing context is passed through (its owner closes it); a path or
+    bytes get a new context that is closed when the block exits.
+    """
+    if isinstance(source, DocumentContext):
+        yield source
+        return
+    with DocumentContext(source) as document:
+        yield document
+
+
+# ==================== IMAGES ====================
+
+def render_page(source: str | bytes | pymupdf.Document, page: int = 0, dpi: int | None = None,
+                zoom: float | None = None) -> np.ndarray:
+    """
+    Rasterize a PDF page directly into an RGB numpy array.
+
+    The pixmap's sample buffer is handed over without PNG encoding, so the
+    result can go straight to OpenCV / Tesseract or to `image_to_base64`.
+
+    Args:
+        source: File path, PDF bytes, an open pymupdf document or a
+                DocumentContext (the render is memoized there, read-only).
+        page:   Zero-based page index.
+        dpi:    Render resolution (e.g. 300 for OCR).
+        zoom:   Alternative to `dpi`: scale factor relative to 72 DPI.
+
+    Returns:
+        np.ndarray: H × W × 3 uint8 array.
+    """
+    if isinstance(source, DocumentContext):
+        return source.render(page, round(zoom * 72) if zoom is not None else (dpi or 300))
+    doc = source if isinstance(source, pymupdf.Document) else open_pdf(source)
+    try:
+        with metrics.timed("render_page"):
+            if zoom is not None:
+                pix = doc[page].get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            else:
+                pix = doc[page].get_pixmap(dpi=dpi or 300, alpha=False)
+            image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+            return image.copy()  # detach from the pixmap buffer
+    finally:
+        if doc is not source:
+            doc.close()
+
+
+def load_image(source: str | bytes | np.ndarray) -> np.ndarray:
+    """Decode an image path or image bytes into an RGB numpy array."""
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with Image.open(source) as im:
+        return np.asarray(im.convert("RGB"))
+
+
+def image_to_base64(image, format: str = "JPEG") -> str:
+    """
+    Base64-encode an in-memory image for the vision models.
+
+    Args:
+        image:  numpy array, PIL image or already encoded image bytes.
+        format: Encoding used for arrays / PIL images ("JPEG" matches the
+                data:image/jpeg URLs the prompts send).
+
+    Returns:
+        str: Base64-encoded UTF-8 string.
+    """
+    if isinstance(image, (bytes, bytearray)):
+        return base64.b64encode(image).decode("utf-8")
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    if format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, quality=90)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
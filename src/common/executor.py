@@ -0,0 +1,501 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+import src.common.memory as memory
+import src.common.metrics as metrics
+
+
+###############################################################################
+# Parser Executor
+#
+# The upload handlers in main.py are `async def`, but the parsers they call
+# (Camelot, pymupdf rendering, Tesseract, Voronoi, the synchronous LLM
+# clients) block for seconds at a time. Running them directly on the event
+# loop stalls every other request on the worker, health checks included.
+#
+# This module dispatches parser entry points to a bounded process pool:
+#   - one shared pool sized by PARSER_POOL_WORKERS
+#   - a per-endpoint gate limiting concurrent jobs and waiting jobs
+#   - backpressure: 429 when an endpoint's queue is full,
+#                   503 when the whole pool is saturated
+#
+#   - memory governance: workers are recycled after a number of jobs or
+#     above an RSS threshold, and jobs are admitted by predicted memory
+#     (see src/common/memory.py)
+#
+# Setting PARSER_POOL_WORKERS=0 runs parsers inline on the event loop
+# (the previous behaviour), which the concurrency benchmark uses as baseline.
+###############################################################################
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to `default`."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+# ==================== CONFIGURATION ====================
+
+# Number of worker processes (0 = run inline on the event loop)
+POOL_WORKERS = _env_int("PARSER_POOL_WORKERS", max(1, (os.cpu_count() or 2) - 1))
+
+# Jobs allowed to wait for a free worker across all endpoints
+POOL_QUEUE_DEPTH = _env_int("PARSER_POOL_QUEUE_DEPTH", 2 * max(POOL_WORKERS, 1))
+
+# "spawn" avoids forking a process that already runs an event loop and
+# HTTP client threads
+POOL_START_METHOD = os.getenv("PARSER_POOL_START_METHOD", "spawn")
+
+# Parsers whose modules are imported in every worker as soon as it starts
+# (comma-separated; empty or "0" disables pre-warming)
+PREWARM_PARSERS = tuple(
+    name.strip() for name in os.getenv("PARSER_POOL_PREWARM", "gantt,financial,drawing").split(",")
+    if name.strip() and name.strip() != "0"
+)
+
+# Seconds suggested to clients in the Retry-After header when rejected
+RETRY_AFTER_SECONDS = _env_int("PARSER_RETRY_AFTER", 5)
+
+# Per-endpoint limits: (max concurrent jobs, max waiting jobs).
+# Override with e.g. PARSER_CONCURRENCY_FINANCIAL=2 / PARSER_QUEUE_FINANCIAL=6
+ENDPOINT_DEFAULTS = {
+    "gantt": (2, 4),
+    "financial": (2, 4),
+    "drawing": (2, 4),
+    "ask_ai": (8, 16),
+}
+
+
+# ==================== STATE ====================
+
+class EndpointGate:
+    """
+    Concurrency limit and queue-depth counter for a single endpoint.
+
+    Attributes:
+        name (str):        Endpoint identifier (e.g. "financial").
+        concurrency (int): Jobs allowed to run at the same time.
+        queue_depth (int): Jobs allowed to wait for a free slot.
+        pending (int):     Jobs currently running or waiting.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_depth: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.pending = 0
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    @property
+    def running(self) -> int:
+        return min(self.pending, self.concurrency)
+
+    @property
+    def waiting(self) -> int:
+        return max(0, self.pending - self.concurrency)
+
+
+_pool = None
+_gates = {}
+_pending = 0  # jobs running or waiting across all endpoints
+_reserved = 0  # predicted bytes of the jobs currently in the pool
+_memory_freed = None  # asyncio.Condition signalled when a reservation is released
+_warm_up = None  # (fn, args) submitted to every new pool, see prewarm()
+
+
+def _get_gate(endpoint: str) -> EndpointGate:
+    """Return the gate for `endpoint`, creating it from env/defaults on first use."""
+    gate = _gates.get(endpoint)
+    if gate is None:
+        default_concurrency, default_queue = ENDPOINT_DEFAULTS.get(endpoint, (2, 4))
+        key = endpoint.upper()
+        gate = EndpointGate(
+            endpoint,
+            _env_int(f"PARSER_CONCURRENCY_{key}", default_concurrency),
+            _env_int(f"PARSER_QUEUE_{key}", default_queue),
+        )
+        _gates[endpoint] = gate
+    return gate
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Create the shared process pool lazily so importing main.py stays cheap."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=POOL_WORKERS,
+            mp_context=multiprocessing.get_context(POOL_START_METHOD),
+            max_tasks_per_child=memory.WORKER_MAX_TASKS or None,
+        )
+    return _pool
+
+
+def _recycle_pool(pool: ProcessPoolExecutor, reason: str):
+    """
+    Replace `pool` with a fresh one (created on the next job).
+
+    Jobs already submitted to the old pool finish in its workers, which then
+    exit and return their memory to the OS. Does nothing if `pool` was already
+    replaced by another job's report.
+    """
+    global _pool
+    if pool is not _pool:
+        return
+    _pool = None
+    pool.shutdown(wait=False)
+    memory.count("recycles")
+    print(f"[memory] Replacing parser workers: {reason}")
+    if _warm_up is not None:
+        prewarm(*_warm_up)
+
+
+def _call(fn, args, kwargs):
+    """
+    Run `fn` inside a worker process and measure its memory use.
+
+    Returns (result, error, report), see memory.measure; the report also
+    carries the metrics samples recorded during the job. Some library
+    exceptions (e.g. pytesseract's TesseractNotFoundError) cannot be
+    unpickled in the parent, which breaks the whole pool. Those are
+    returned as RuntimeError carrying the original message.
+    """
+    result, error, report = memory.measure(fn, *args, **kwargs)
+    report["metrics"] = metrics.drain()
+    if error is not None:
+        try:
+            pickle.loads(pickle.dumps(error))
+        except Exception:
+            error = RuntimeError(f"{type(error).__name__}: {error}")
+    return result, error, report
+
+
+def _pool_capacity() -> int:
+    """Maximum number of jobs (running + waiting) the pool accepts."""
+    return max(POOL_WORKERS, 1) + POOL_QUEUE_DEPTH
+
+
+def _pool_budget() -> int:
+    """Predicted bytes allowed in the pool at once (0 = unlimited)."""
+    return memory.MEMORY_POOL_BUDGET or memory.MEMORY_JOB_BUDGET * max(POOL_WORKERS, 1)
+
+
+def _check_budget(predicted_bytes: int):
+    """
+    Refuse a job whose predicted memory exceeds the per-job budget.
+
+    Raises:
+        HTTPException 413: The document is too large to process.
+    """
+    if memory.MEMORY_JOB_BUDGET and predicted_bytes > memory.MEMORY_JOB_BUDGET:
+        memory.count("refused")
+        raise HTTPException(
+            status_code=413,
+            detail=(f"Document would need about {predicted_bytes // memory.MIB} MiB to process, "
+                    f"the limit is {memory.MEMORY_JOB_BUDGET // memory.MIB} MiB"),
+        )
+
+
+async def _reserve(predicted_bytes: int):
+    """Wait until `predicted_bytes` fit into the pool budget, then reserve them."""
+    global _reserved, _memory_freed
+    budget = _pool_budget()
+    if budget and predicted_bytes:
+        if _memory_freed is None:
+            _memory_freed = asyncio.Condition()
+        async with _memory_freed:
+            # A job is always admitted into an empty pool
+            await _memory_freed.wait_for(lambda: _reserved == 0 or _reserved + predicted_bytes <= budget)
+    _reserved += predicted_bytes
+
+
+def _release(predicted_bytes: int):
+    """Release a reservation and wake up jobs waiting for memory (on the event loop)."""
+    global _reserved
+    _reserved -= predicted_bytes
+    if _memory_freed is not None and predicted_bytes:
+        asyncio.get_running_loop().create_task(_notify_memory_freed())
+
+
+async def _notify_memory_freed():
+    async with _memory_freed:
+        _memory_freed.notify_all()
+
+
+def _release_when_done(future, predicted_bytes: int):
+    """
+    Keep a reservation until the pool future finishes.
+
+    A cancelled request does not stop a job a worker already runs; releasing
+    its memory at cancellation would let the budget over-admit while that
+    worker is still busy.
+    """
+    loop = asyncio.get_running_loop()
+
+    def done(_):
+        try:
+            loop.call_soon_threadsafe(_release, predicted_bytes)
+        except RuntimeError:
+            pass  # event loop closed (shutdown): nothing left to admit
+
+    future.add_done_callback(done)
+
+
+# ==================== PUBLIC API ====================
+
+def configure(workers: int | None = None, queue_depth: int | None = None):
+    """
+    Change pool size and global queue depth at runtime.
+
+    Shuts down the current pool (if any); a new one is created on the next
+    job. Used by the benchmark to compare inline and pooled execution.
+
+    Args:
+        workers:     Number of worker processes (0 = inline on the event loop).
+        queue_depth: Jobs allowed to wait across all endpoints.
+    """
+    global POOL_WORKERS, POOL_QUEUE_DEPTH, _memory_freed
+    shutdown()
+    if workers is not None:
+        POOL_WORKERS = workers
+    if queue_depth is not None:
+        POOL_QUEUE_DEPTH = queue_depth
+    _gates.clear()
+    _memory_freed = None
+
+
+def prewarm(fn, *args):
+    """
+    Start all pool workers now and run `fn(*args)` in each of them.
+
+    Used at startup with pipelines.warm_up so that spawning the workers and
+    importing the parser libraries does not land on the first requests.
+    Replacement pools (see _recycle_pool) are warmed the same way. Does
+    nothing when parsers run inline or PARSER_POOL_PREWARM is empty.
+
+    Args:
+        fn:    Module-level warm-up function; its return value (seconds) is logged.
+        *args: Arguments for `fn`.
+    """
+    global _warm_up
+    if POOL_WORKERS == 0 or not PREWARM_PARSERS:
+        return
+    _warm_up = (fn, args)
+    pool = _get_pool()
+
+    def _report(future):
+        if future.exception() is not None:
+            print(f"[executor] Worker warm-up failed: {future.exception()}")
+        else:
+            print(f"[executor] Worker warmed up in {future.result():.1f}s")
+
+    # One task per worker: each submit spawns a new process while none is idle
+    for _ in range(POOL_WORKERS):
+        pool.submit(fn, *args).add_done_callback(_report)
+
+
+def shutdown(wait: bool = True):
+    """Shut down the worker pool. Called from the application lifespan."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=wait, cancel_futures=True)
+        _pool = None
+
+
+def admit(endpoint: str):
+    """
+    Reject a request early if `endpoint` or the pool has no room left.
+
+    Handlers call this before reading the upload so a saturated server does
+    not buffer documents it is going to turn away anyway. `run_parser`
+    repeats the check when the job is actually scheduled.
+
+    Raises:
+        HTTPException 429: The endpoint's queue is full.
+        HTTPException 503: The process pool is saturated.
+    """
+    gate = _get_gate(endpoint)
+    if _pending >= _pool_capacity():
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other documents, please retry later",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+    if gate.pending >= gate.concurrency + gate.queue_depth:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many concurrent '{endpoint}' requests, please retry later",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+
+
+async def run_parser(endpoint: str, fn, *args, backpressure: bool = True, predicted_bytes: int = 0,
+                     **kwargs):
+    """
+    Run a CPU-bound parser entry point in the process pool.
+
+    `fn` must be a module-level function (picklable) and its arguments must be
+    picklable as well. The call is admitted only if both the endpoint gate and
+    the global pool have room; otherwise the request is rejected immediately
+    instead of piling up behind slow uploads. Jobs predicted to exceed the
+    memory budget are refused; otherwise they wait until their prediction
+    fits next to the jobs already running. The reservation lasts until the
+    worker finishes, even if the awaiting request is cancelled. In inline
+    mode (PARSER_POOL_WORKERS=0) jobs run one at a time on the event loop
+    and only the per-job budget is checked.
+
+    Args:
+        endpoint:        Gate name (e.g. "financial", "drawing", "gantt").
+        fn:              Parser entry point to execute.
+        *args:           Positional arguments for `fn`.
+        backpressure:    If False, wait for a free slot instead of rejecting.
+                         Used by the job queue, which is bounded on its own.
+        predicted_bytes: Memory the job is expected to need (memory.predict).
+        **kwargs:        Keyword arguments for `fn`.
+
+    Returns:
+        Whatever `fn` returns.
+
+    Raises:
+        HTTPException 413: The job's predicted memory exceeds the budget.
+        HTTPException 429: The endpoint's queue is full.
+        HTTPException 503: The process pool is saturated.
+    """
+    global _pending
+    gate = _get_gate(endpoint)
+    _check_budget(predicted_bytes)
+    if backpressure:
+        admit(endpoint)
+
+    gate.pending += 1
+    _pending += 1
+    try:
+        async with gate.semaphore:
+            if POOL_WORKERS == 0:
+                # Legacy behaviour: block the event loop. Jobs run one at a
+                # time, so only the per-job budget (413 above) applies and
+                # nothing is reserved
+                return fn(*args, **kwargs)
+            await _reserve(predicted_bytes)
+            try:
+                pool = _get_pool()
+                future = pool.submit(_call, fn, args, kwargs)
+            except BaseException:
+                _release(predicted_bytes)
+                raise
+            # Released when the worker is done, also if this request is cancelled
+            # (a job not started yet is withdrawn from the pool by the cancellation)
+            _release_when_done(future, predicted_bytes)
+            result, error, report = await asyncio.wrap_future(future)
+            metrics.merge(report.pop("metrics"))
+            memory.record(endpoint, report, predicted_bytes)
+            if memory.WORKER_MAX_RSS and report["rss_after"] > memory.WORKER_MAX_RSS:
+                _recycle_pool(pool, f"worker {report['pid']} holds {report['rss_after'] // memory.MIB} MiB "
+                                    f"after a '{endpoint}' job")
+            if error is not None:
+                raise error
+            return result
+    finally:
+        gate.pending -= 1
+        _pending -= 1
+
+
+def check_capacity(endpoint: str):
+    """Raise 429 if the endpoint's gate has no free slot or queue position."""
+    gate = _get_gate(endpoint)
+    if gate.pending >= gate.concurrency + gate.queue_depth:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many concurrent '{endpoint}' requests, please retry later",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+
+
+@asynccontextmanager
+async def io_slot(endpoint: str):
+    """
+    Hold a slot of the endpoint's gate for the duration of the block, e.g.
+    while an answer is streamed to the client.
+
+    Raises:
+        HTTPException 429: If the gate is saturated (see `check_capacity`).
+    """
+    check_capacity(endpoint)
+    gate = _get_gate(endpoint)
+    gate.pending += 1
+    try:
+        async with gate.semaphore:
+            yield
+    finally:
+        gate.pending -= 1
+
+
+async def run_io(endpoint: str, fn, *args, **kwargs):
+    """
+    Run an I/O call under the endpoint's gate: coroutine functions (e.g.
+    `llm_gateway.complete_async`) are awaited, blocking functions run in a
+    thread.
+
+    Uses the same endpoint gate and backpressure rules as `run_parser` but
+    does not occupy a worker process.
+    """
+    async with io_slot(endpoint):
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(*args, **kwargs)
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+def stats() -> dict:
+    """
+    Snapshot of pool and per-endpoint load.
+
+    Returns:
+        dict: {"workers", "queue_depth", "pending", "reserved_bytes",
+               "endpoints": {name: {...}}, "memory": {...}}
+    """
+    return {
+        "workers": POOL_WORKERS,
+        "queue_depth": POOL_QUEUE_DEPTH,
+        "pending": _pending,
+        "reserved_bytes": _reserved,
+        "endpoints": {
+            name: {
+                "concurrency": gate.concurrency,
+                "queue_depth": gate.queue_depth,
+                "running": gate.running,
+                "waiting": gate.waiting,
+            }
+            for name, gate in _gates.items()
+        },
+        "memory": memory.stats(),
+    }
+
+
+def _collect_metrics() -> list:
+    """Gauges for GET /metrics (see metrics.register_collector)."""
+    memory_stats = memory.stats()
+    return [
+        ("parser_pool_workers", "gauge", "Parser worker processes", [({}, POOL_WORKERS)]),
+        ("parser_jobs_pending", "gauge", "Parser jobs running or waiting across all endpoints", [({}, _pending)]),
+        ("parser_jobs_running", "gauge", "Parser jobs running per endpoint",
+         [({"endpoint": name}, gate.running) for name, gate in _gates.items()]),
+        ("parser_jobs_waiting", "gauge", "Parser jobs waiting for a slot per endpoint (queue depth)",
+         [({"endpoint": name}, gate.waiting) for name, gate in _gates.items()]),
+        ("parser_memory_reserved_bytes", "gauge", "Predicted memory of the jobs in the pool", [({}, _reserved)]),
+        ("parser_memory_refused_total", "counter", "Jobs refused for exceeding the memory budget",
+         [({}, memory_stats["refused"])]),
+        ("parser_worker_recycles_total", "counter", "Parser pool replacements above the RSS threshold",
+         [({}, memory_stats["recycles"])]),
+        ("parser_job_peak_rss_bytes", "gauge", "Worker peak RSS during the last parser job per endpoint",
+         [({"endpoint": name}, entry["last_peak_rss"]) for name, entry in memory_stats["endpoints"].items()]),
+    ]
+
+
+metrics.register_collector(_collect_metrics)
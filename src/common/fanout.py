@@ -0,0 +1,171 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import src.common.llm_cache as llm_cache
+import src.common.metrics as metrics
+
+
+###############################################################################
+# Chunk Fan-Out
+#
+# Chunked vision extraction (plan2data/helper.extract_room_names_from_chunks,
+# ganttParserVisual.extract_gantt_chart_from_chunks) sent its image chunks
+# to Mistral one after another, so a 4-chunk document took 4× the latency of
+# a single call.
+#
+# `map_chunks` runs one task per chunk on a small thread pool:
+#   - at most FANOUT_CONCURRENCY chunks are in flight per document; each
+#     LLM call still passes the provider's rate limiter and 429 backoff in
+#     src/common/llm_gateway.py, so the fan-out cannot exceed the budget
+#   - a chunk whose task raises (network error, unparsable answer) is
+#     retried FANOUT_RETRIES times, then skipped with a warning; retries
+#     bypass the LLM cache (src/common/llm_cache.py) so an unparsable answer
+#     is not served again, and in replay mode, where the recorded answer is
+#     all there is, chunks are not retried
+#   - chunks may come from a generator (src/common/tiler.py): the next chunk
+#     is produced only when a slot is free, so rendering overlaps the calls
+#     and at most FANOUT_CONCURRENCY chunks exist at a time
+#   - each chunk is released (temp file deleted / buffer closed) as soon as
+#     its task is done; when the caller is interrupted, the generator is
+#     closed so no further chunks are produced
+#   - results come back in chunk order, whatever order the calls finish in
+#
+# Wall-clock time of a chunked document is about that of its slowest chunk.
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Chunks of one document processed at the same time
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "4"))
+
+# Extra attempts for a chunk whose task failed
+FANOUT_RETRIES = int(os.getenv("FANOUT_RETRIES", "2"))
+
+# Seconds before the first retry (doubled for each further retry)
+FANOUT_RETRY_DELAY = float(os.getenv("FANOUT_RETRY_DELAY", "1"))
+
+
+# ==================== RELEASING CHUNKS ====================
+
+def remove_file(path: str):
+    """Delete a temporary chunk file if it still exists."""
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except Exception as e:
+        print(f"Warning: Could not delete {path}: {e}")
+
+
+def close_image(image):
+    """Free the pixel buffer of an in-memory (PIL) chunk."""
+    try:
+        image.close()
+    except Exception as e:
+        print(f"Warning: Could not close chunk image: {e}")
+
+
+def release_chunk(chunk):
+    """Release a chunk of either kind: delete a chunk file, close an in-memory image."""
+    if isinstance(chunk, str):
+        remove_file(chunk)
+    else:
+        close_image(chunk)
+
+
+# ==================== FAN-OUT ====================
+
+_END = object()  # end of the chunk iterator
+
+def _run_chunk(call_site: str, task, chunk, index: int, count: int | None, retries: int):
+    """Run `task` on one chunk with retries; returns None if every attempt failed."""
+    label = f"chunk {index + 1}/{count}" if count is not None else f"chunk {index + 1}"
+    if llm_cache.replaying():
+        retries = 0
+    for attempt in range(retries + 1):
+        try:
+            if attempt == 0:
+                result = task(chunk)
+            else:
+                with llm_cache.bypass():
+                    result = task(chunk)
+        except Exception as e:
+            if attempt == retries:
+                print(f"Warning: {call_site} {label} failed after {attempt + 1} attempts: {e}")
+                metrics.inc("fanout_chunks_total", call_site=call_site, outcome="failed")
+                return None
+            delay = FANOUT_RETRY_DELAY * 2 ** attempt
+            print(f"⏳ {call_site} {label} failed ({e}), retrying in {delay:.1f} s")
+            metrics.inc("fanout_chunks_total", call_site=call_site, outcome="retried")
+            time.sleep(delay)
+            continue
+        metrics.inc("fanout_chunks_total", call_site=call_site, outcome="ok")
+        return result
+
+
+def map_chunks(call_site: str, task, chunks, release=None,
+               concurrency: int | None = None, retries: int | None = None) -> list:
+    """
+    Run `task` on every chunk concurrently and return the results in chunk order.
+
+    Args:
+        call_site:   Name used in log lines and the fanout_chunks_total metric.
+        task:        Function chunk → result. Raising marks the attempt as
+                     failed (it is retried, then the chunk is skipped).
+        chunks:      Chunk file paths or in-memory images: a list, or an
+                     iterable (e.g. the `tiler.tiles` generator) that is
+                     consumed lazily, one chunk per free slot.
+        release:     Optional function chunk → None that frees a chunk
+                     (`remove_file`, `close_image`, `release_chunk`); called
+                     exactly once per chunk, right after its task finished.
+        concurrency: Chunks in flight at once (default FANOUT_CONCURRENCY).
+        retries:     Extra attempts per chunk (default FANOUT_RETRIES).
+
+    Returns:
+        list: One entry per chunk, in input order; None for chunks that failed.
+    """
+    concurrency = max(1, FANOUT_CONCURRENCY if concurrency is None else concurrency)
+    retries = FANOUT_RETRIES if retries is None else retries
+    count = len(chunks) if hasattr(chunks, "__len__") else None
+    source = iter(chunks)
+    results = []
+
+    def run(index: int, chunk):
+        try:
+            return _run_chunk(call_site, task, chunk, index, count, retries)
+        finally:
+            if release is not None:
+                release(chunk)
+
+    try:
+        if concurrency == 1 or (count is not None and count <= 1):
+            for index, chunk in enumerate(source):
+                results.append(run(index, chunk))
+            return results
+        with ThreadPoolExecutor(max_workers=concurrency if count is None else min(concurrency, count),
+                                thread_name_prefix=f"fanout-{call_site}") as pool:
+            # The next chunk is produced (rendered) only when a slot is free
+            in_flight = set()
+            futures = []
+            index = 0
+            while True:
+                if len(in_flight) >= concurrency:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                chunk = next(source, _END)
+                if chunk is _END:
+                    break
+                future = pool.submit(run, index, chunk)
+                futures.append(future)
+                in_flight.add(future)
+                index += 1
+            return [future.result() for future in futures]
+    finally:
+        # Interrupted fan-out: stop a generator before it renders more chunks,
+        # release listed chunks whose task never started
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+        elif release is not None:
+            for chunk in source:
+                release(chunk)
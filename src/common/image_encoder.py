@@ -0,0 +1,209 @@
+import base64
+import io
+import math
+import os
+
+import numpy as np
+from PIL import Image
+
+import src.common.documents as documents
+import src.common.metrics as metrics
+
+
+###############################################################################
+# Vision Image Encoder
+#
+# Vision calls used to send whatever the parser had at hand: 300 DPI PNG
+# renders (convert_pdf_to_base64), 300 DPI PNG files labelled image/jpeg
+# (helper.convert_pdf2img + encode_image) and 2x zoom renders. For A1 / A0
+# sheets that is a multi-megabyte base64 string per call, although the model
+# scales every image down to its own pixel limit anyway.
+#
+# All vision payloads are now produced here:
+#   - resolution: images are scaled to fit VISION_MAX_DIMENSION and
+#     VISION_MAX_PIXELS (the model limits also used by
+#     ganttParserVisual.to_be_chunked); PDF pages are rendered directly at
+#     the DPI that fits instead of rendering at 300 DPI and scaling down
+#   - content: a thumbnail decides between line drawing (mostly paper and
+#     ink) and continuous tone, and between grayscale and colour
+#       line drawing  → PNG (grayscale, or a palette for coloured plans);
+#                       JPEG if the PNG would be VISION_PNG_MAX_RATIO times
+#                       larger (scans with paper noise)
+#       continuous    → VISION_LOSSY_FORMAT (JPEG or WEBP), grayscale if
+#                       the image has no colour
+#   - the data URL carries the real media type (no more PNG labelled JPEG)
+#
+# Input and sent bytes are counted in vision_image_bytes_total (see
+# src/common/metrics.py); "input" is the size of the file / upload, or the
+# uncompressed pixels of a rendered page. vision_images_total counts the
+# encoded images by format and detected content.
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Model pixel limits (ganttParserVisual.to_be_chunked splits larger charts)
+MAX_DIMENSION = int(os.getenv("VISION_MAX_DIMENSION", "1700"))
+MAX_PIXELS = int(os.getenv("VISION_MAX_PIXELS", "2890000"))
+
+# Highest resolution pages are rendered at before fitting to the limits
+MAX_RENDER_DPI = 300
+
+# Encoding for photos / shaded images: "JPEG" or "WEBP"
+LOSSY_FORMAT = os.getenv("VISION_LOSSY_FORMAT", "JPEG").upper()
+LOSSY_QUALITY = int(os.getenv("VISION_LOSSY_QUALITY", "85"))
+
+# A line drawing's PNG may be this many times larger than its JPEG
+PNG_MAX_RATIO = float(os.getenv("VISION_PNG_MAX_RATIO", "1.5"))
+
+# Content analysis on a thumbnail: mean channel spread below GRAY_SPREAD means
+# grayscale; at least LINE_ART_SHARE of pixels near white / black means line drawing
+GRAY_SPREAD = 6
+LINE_ART_SHARE = 0.9
+THUMBNAIL = 256
+
+MEDIA_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# First characters of the base64 encoding of each format's magic bytes
+_BASE64_MAGIC = {"iVBORw0KGgo": "image/png", "/9j/": "image/jpeg", "UklGR": "image/webp", "R0lGOD": "image/gif"}
+
+
+# ==================== ANALYSIS ====================
+
+def fit_scale(width: int, height: int) -> float:
+    """Scale factor (≤ 1) that fits an image into MAX_DIMENSION and MAX_PIXELS."""
+    return min(1.0, MAX_DIMENSION / max(width, height), math.sqrt(MAX_PIXELS / (width * height)))
+
+
+def fitted_dpi(width_pt: float, height_pt: float) -> int:
+    """Highest DPI (≤ MAX_RENDER_DPI) at which a `width_pt` × `height_pt` point area fits the model limits."""
+    scale = fit_scale(width_pt * MAX_RENDER_DPI / 72, height_pt * MAX_RENDER_DPI / 72)
+    return max(1, int(MAX_RENDER_DPI * scale))
+
+
+def analyze(image: Image.Image) -> tuple[bool, bool]:
+    """
+    Classify an image from a thumbnail.
+
+    Returns:
+        tuple: (is_grayscale, is_line_art)
+    """
+    thumb = image.convert("RGB")
+    thumb.thumbnail((THUMBNAIL, THUMBNAIL))
+    rgb = np.asarray(thumb, dtype=np.int16)
+    spread = float((rgb.max(axis=2) - rgb.min(axis=2)).mean())
+    luminance = np.asarray(thumb.convert("L"))
+    extremes = float(((luminance < 80) | (luminance > 200)).mean())
+    return spread < GRAY_SPREAD, extremes >= LINE_ART_SHARE
+
+
+def _save(image: Image.Image, format: str) -> bytes:
+    buffer = io.BytesIO()
+    if format == "PNG":
+        image.save(buffer, format="PNG", optimize=False, compress_level=6)
+    else:
+        image.save(buffer, format=format, quality=LOSSY_QUALITY)
+    return buffer.getvalue()
+
+
+# ==================== ENCODING ====================
+
+def _to_pil(image) -> tuple[Image.Image, int]:
+    """Load any supported input as a PIL image; also returns its input size in bytes."""
+    if isinstance(image, Image.Image):
+        return image, image.width * image.height * len(image.getbands())
+    if isinstance(image, documents.DocumentContext):
+        # First page of a PDF, rendered at the DPI that fits the model limits
+        image = render_pdf_page(image)
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image), image.nbytes
+    if isinstance(image, (bytes, bytearray)):
+        with Image.open(io.BytesIO(image)) as im:
+            im.load()
+            return im.copy(), len(image)
+    with Image.open(image) as im:
+        im.load()
+        return im.copy(), os.path.getsize(image)
+
+
+def encode(image) -> tuple[str, str]:
+    """
+    Encode an image for a vision call at the smallest adequate size.
+
+    Args:
+        image: File path, encoded image bytes, numpy array (e.g. from
+               documents.render_page), PIL image or the DocumentContext of
+               a PDF (first page).
+
+    Returns:
+        tuple: (base64 string, media type)
+    """
+    pil, input_bytes = _to_pil(image)
+    scale = fit_scale(pil.width, pil.height)
+    if scale < 1.0:
+        size = (max(1, round(pil.width * scale)), max(1, round(pil.height * scale)))
+        pil = pil.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+    grayscale, line_art = analyze(pil)
+    if grayscale:
+        pil = pil.convert("L")
+    elif pil.mode != "RGB":
+        pil = pil.convert("RGB")
+
+    lossy = LOSSY_FORMAT if LOSSY_FORMAT in MEDIA_TYPES and LOSSY_FORMAT != "PNG" else "JPEG"
+    if line_art:
+        png = _save(pil if grayscale else pil.quantize(colors=256), "PNG")
+        jpeg = _save(pil, lossy)
+        data, format = (png, "PNG") if len(png) <= len(jpeg) * PNG_MAX_RATIO else (jpeg, lossy)
+    else:
+        data, format = _save(pil, lossy), lossy
+
+    metrics.inc("vision_image_bytes_total", input_bytes, kind="input")
+    metrics.inc("vision_image_bytes_total", len(data), kind="sent", format=format.lower())
+    metrics.inc("vision_images_total", format=format.lower(),
+                content="line_art" if line_art else "continuous", color="gray" if grayscale else "color")
+    return base64.b64encode(data).decode("utf-8"), MEDIA_TYPES[format]
+
+
+def render_pdf_page(source, page: int = 0) -> np.ndarray:
+    """
+    Render a PDF page at the highest DPI (≤ MAX_RENDER_DPI) that fits the
+    model's pixel limits, so no full 300 DPI raster is ever built.
+
+    Args:
+        source: File path, PDF bytes, an open pymupdf document or a
+                DocumentContext (render memoized there).
+        page:   Zero-based page index.
+
+    Returns:
+        np.ndarray: H × W × 3 uint8 array.
+    """
+    if isinstance(source, documents.DocumentContext):
+        rect = source.page(page).rect
+        return source.render(page, fitted_dpi(rect.width, rect.height))
+    doc = source if not isinstance(source, (str, bytes, bytearray)) else documents.open_pdf(source)
+    try:
+        rect = doc[page].rect
+        return documents.render_page(doc, page, dpi=fitted_dpi(rect.width, rect.height))
+    finally:
+        if doc is not source:
+            doc.close()
+
+
+def data_url(image) -> str:
+    """Encode an image (see `encode`) as a data: URL for an image_url message part."""
+    encoded, media_type = encode(image)
+    return f"data:{media_type};base64,{encoded}"
+
+
+def as_data_url(value: str) -> str:
+    """
+    Wrap a base64 string produced by `encode` in a data: URL with the media
+    type detected from its magic bytes; data URLs pass through unchanged.
+    """
+    if value.startswith("data:"):
+        return value
+    for prefix, media_type in _BASE64_MAGIC.items():
+        if value.startswith(prefix):
+            return f"data:{media_type};base64,{value}"
+    return f"data:image/jpeg;base64,{value}"
@@ -0,0 +1,409 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from fastapi import HTTPException
+
+import src.common.metrics as metrics
+import src.common.progress as progress
+import src.common.result_cache as result_cache
+
+
+###############################################################################
+# Asynchronous Job Queue
+#
+# Full floor plan extraction, full-AI Gantt parsing and multi-page BOQs take
+# 10-60 s (minutes when Mistral rate limits kick in), which exceeds proxy
+# timeouts. Instead of holding the HTTP request open, clients submit a job,
+# receive its id immediately and poll for the result.
+#
+#   - Jobs and their results live in a SQLite table (JOB_STORE_DIR/jobs.db)
+#   - Uploads are moved to JOB_STORE_DIR/files/ so queued jobs survive a
+#     restart; on startup, queued and interrupted jobs are re-queued
+#   - JOB_WORKERS asyncio workers pull job ids from a queue and run them in
+#     the parser process pool (src/common/executor.py), through the result
+#     cache (src/common/result_cache.py)
+#   - At most JOB_QUEUE_DEPTH jobs wait; further submissions get 429 (`admit`)
+#   - SQLite work of the async functions runs in a worker thread
+#
+#   - Pipeline stages emit progress events (src/common/progress.py) that
+#     `stream_events` delivers as Server-Sent Events (GET /jobs/{id}/events)
+#
+# Job status lifecycle:
+#   queued → running → succeeded | failed
+#   queued | running → cancelled   (DELETE /jobs/{id})
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+JOB_STORE_DIR = os.getenv("JOB_STORE_DIR", "jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Jobs allowed to wait for a job worker; further submissions are rejected
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "50"))
+
+# Seconds suggested to clients in the Retry-After header when rejected
+JOB_RETRY_AFTER = int(os.getenv("JOB_RETRY_AFTER", "30"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# How often the event stream polls for new events (seconds)
+EVENT_POLL_INTERVAL = float(os.getenv("JOB_EVENT_POLL_INTERVAL", "0.25"))
+
+# Comment line sent on idle event streams to keep proxies from closing them
+EVENT_KEEPALIVE = 15
+
+
+# ==================== STATE ====================
+
+_db = None
+_db_lock = threading.Lock()
+_queue = None
+_workers = []
+_running_tasks = {}  # job id → asyncio.Task currently executing it
+_cancel_requested = set()  # job ids cancelled via the API (vs. server shutdown)
+
+
+# ==================== PERSISTENCE ====================
+
+def _connect() -> sqlite3.Connection:
+    """Open (and create if needed) the job database."""
+    global _db
+    if _db is None:
+        os.makedirs(os.path.join(JOB_STORE_DIR, "files"), exist_ok=True)
+        _db = sqlite3.connect(os.path.join(JOB_STORE_DIR, "jobs.db"), check_same_thread=False)
+        _db.row_factory = sqlite3.Row
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id           TEXT PRIMARY KEY,
+                parser       TEXT NOT NULL,
+                variant      TEXT,
+                status       TEXT NOT NULL,
+                filename     TEXT,
+                input_format TEXT NOT NULL,
+                input_path   TEXT NOT NULL,
+                created_at   REAL NOT NULL,
+                started_at   REAL,
+                finished_at  REAL,
+                result       TEXT,
+                error        TEXT
+            )
+            """
+        )
+        _db.commit()
+    return _db
+
+
+def _execute(sql: str, params: tuple = ()) -> list:
+    """Run a statement under the module lock and return all rows."""
+    with _db_lock:
+        db = _connect()
+        rows = db.execute(sql, params).fetchall()
+        db.commit()
+        return rows
+
+
+def _to_dict(row: sqlite3.Row) -> dict:
+    """Convert a job row into the JSON shape returned by the API."""
+    job = {
+        "job_id": row["id"],
+        "parser": row["parser"],
+        "variant": row["variant"],
+        "status": row["status"],
+        "filename": row["filename"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+    }
+    return job
+
+
+def _set_status(job_id: str, status: str, **fields):
+    """Update a job's status and any additional columns."""
+    columns = ["status = ?"] + [f"{name} = ?" for name in fields]
+    _execute(
+        f"UPDATE jobs SET {', '.join(columns)} WHERE id = ?",
+        (status, *fields.values(), job_id),
+    )
+
+
+def _remove_input(path: str):
+    """Delete a job's stored upload once it is no longer needed."""
+    try:
+        if path and os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        print(f"Warning: Could not delete {path}: {e}")
+
+
+def _finish_cancelled(job_id: str, input_path: str):
+    """Mark a job cancelled and delete its upload."""
+    _set_status(job_id, CANCELLED, finished_at=time.time())
+    _remove_input(input_path)
+
+
+# ==================== WORKERS ====================
+
+async def _run_job(job_id: str):
+    """Execute one job in the parser pool and store its outcome."""
+    rows = await asyncio.to_thread(_execute, "SELECT * FROM jobs WHERE id = ?", (job_id,))
+    if not rows or rows[0]["status"] != QUEUED:
+        return  # cancelled (or deleted) while waiting in the queue
+    row = rows[0]
+
+    await asyncio.to_thread(_set_status, job_id, RUNNING, started_at=time.time())
+    try:
+        result, method, is_succesful, confidence = await result_cache.run_parser_cached(
+            row["parser"],
+            row["input_path"],
+            row["variant"],
+            row["input_format"],
+            backpressure=False,
+            job_id=job_id,
+            priority="batch",
+        )
+        response = {
+            "input_format": row["input_format"],
+            "is_extraction_succesful": is_succesful,
+            "confident_value": confidence,
+            "extraction_method": method,
+            "result": result,
+        }
+        await asyncio.to_thread(
+            _set_status, job_id, SUCCEEDED, finished_at=time.time(), result=json.dumps(response, ensure_ascii=False)
+        )
+    except asyncio.CancelledError:
+        if job_id in _cancel_requested:
+            _cancel_requested.discard(job_id)
+            # Shielded: the task is already cancelled, the update must still land
+            await asyncio.shield(asyncio.to_thread(_finish_cancelled, job_id, row["input_path"]))
+        # Otherwise the server is shutting down: the job stays "running" with
+        # its upload on disk and is re-queued by start()
+        raise
+    except Exception as e:
+        print(f"Error processing job {job_id}: {str(e)}")
+        await asyncio.to_thread(_set_status, job_id, FAILED, finished_at=time.time(), error=str(e))
+        await asyncio.to_thread(_remove_input, row["input_path"])
+    else:
+        await asyncio.to_thread(_remove_input, row["input_path"])
+
+
+async def _worker():
+    """Pull job ids from the queue forever, one job at a time."""
+    while True:
+        job_id = await _queue.get()
+        task = asyncio.create_task(_run_job(job_id))
+        _running_tasks[job_id] = task
+        try:
+            await task
+        except asyncio.CancelledError:
+            # Either the worker itself is shutting down (propagate) or only
+            # this job was cancelled via DELETE (keep serving the queue)
+            if asyncio.current_task().cancelling():
+                raise
+        finally:
+            _running_tasks.pop(job_id, None)
+            _queue.task_done()
+
+
+async def start():
+    """
+    Start the job workers and re-queue unfinished jobs from a previous run.
+
+    Jobs that were running when the server stopped are started again from
+    their stored upload.
+    """
+    global _queue
+    _queue = asyncio.Queue()
+    progress.prune()
+    for row in _execute("SELECT id FROM jobs WHERE status = ?", (RUNNING,)):
+        progress.prune(row["id"])  # interrupted run, its stages start over
+    _execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING))
+    for row in _execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)):
+        _queue.put_nowait(row["id"])
+    for _ in range(JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop():
+    """Stop the job workers. Interrupted jobs are re-queued on next start."""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+# ==================== PUBLIC API ====================
+
+def admit():
+    """
+    Reject a submission early if the job queue is full.
+
+    Called before the upload is read (see `admit_before_body` in main.py)
+    and again by `submit`.
+
+    Raises:
+        HTTPException 429: JOB_QUEUE_DEPTH jobs are already waiting.
+    """
+    if _queue is not None and _queue.qsize() >= JOB_QUEUE_DEPTH:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many queued jobs, please retry later",
+            headers={"Retry-After": str(JOB_RETRY_AFTER)},
+        )
+
+
+def _store(parser: str, variant: str | None, upload_path: str, input_format: str, filename: str | None) -> str:
+    """Move the upload into the job store and insert the job row; returns the job id."""
+    job_id = str(uuid.uuid4())
+    extension = os.path.splitext(upload_path)[1]
+    input_path = os.path.join(JOB_STORE_DIR, "files", f"{job_id}{extension}")
+    _connect()
+    shutil.move(upload_path, input_path)
+
+    _execute(
+        "INSERT INTO jobs (id, parser, variant, status, filename, input_format, input_path, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (job_id, parser, variant, QUEUED, filename, input_format, input_path, time.time()),
+    )
+    return job_id
+
+
+async def submit(parser: str, variant: str | None, upload_path: str, input_format: str, filename: str | None) -> dict:
+    """
+    Register a new job and queue it for execution.
+
+    The upload is moved into the job store so it outlives the request.
+
+    Args:
+        parser:       "gantt", "financial" or "drawing".
+        variant:      ChartFormat / ContentType value, or None.
+        upload_path:  Path of the saved upload (moved, not copied).
+        input_format: MIME type of the upload.
+        filename:     Original client-side file name.
+
+    Returns:
+        dict: The job record (status "queued").
+
+    Raises:
+        HTTPException 429: The job queue is full.
+    """
+    admit()
+    job_id = await asyncio.to_thread(_store, parser, variant, upload_path, input_format, filename)
+    _queue.put_nowait(job_id)
+    return await get_async(job_id)
+
+
+def get(job_id: str) -> dict | None:
+    """Return the job record, or None if the id is unknown."""
+    rows = _execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+    return _to_dict(rows[0]) if rows else None
+
+
+async def get_async(job_id: str) -> dict | None:
+    """`get` in a worker thread, for callers on the event loop."""
+    return await asyncio.to_thread(get, job_id)
+
+
+async def cancel(job_id: str) -> dict | None:
+    """
+    Cancel a queued or running job.
+
+    A queued job is marked cancelled and skipped by the workers. A running job
+    has its task cancelled; work already handed to a worker process finishes
+    in the background but its result is discarded. Finished jobs are left
+    unchanged.
+
+    Returns:
+        dict | None: The updated job record, or None if the id is unknown.
+    """
+    job = await get_async(job_id)
+    if job is None or job["status"] in FINISHED_STATES:
+        return job
+
+    task = _running_tasks.get(job_id)
+    if task is not None:
+        _cancel_requested.add(job_id)
+        task.cancel()
+    else:
+        rows = await asyncio.to_thread(_execute, "SELECT input_path FROM jobs WHERE id = ?", (job_id,))
+        await asyncio.to_thread(_finish_cancelled, job_id, rows[0]["input_path"])
+    job["status"] = CANCELLED
+    return job
+
+
+def _collect_metrics() -> list:
+    """Job queue gauges for GET /metrics (see metrics.register_collector)."""
+    return [
+        ("jobs_queued", "gauge", "Jobs waiting in the job queue", [({}, _queue.qsize() if _queue else 0)]),
+        ("jobs_running", "gauge", "Jobs currently executed by the job workers", [({}, len(_running_tasks))]),
+    ]
+
+
+metrics.register_collector(_collect_metrics)
+
+
+async def stream_events(job_id: str, last_event_id: int = 0):
+    """
+    Stream a job's progress as Server-Sent Events until it finishes.
+
+    Events:
+        status        {"job_id", "status"} on every status change
+        stage_start / stage_end / stage_failed / partial
+                      pipeline progress, see src/common/progress.py
+        done          the final job record (as returned by `get`)
+
+    Progress events carry their id, so a reconnecting client that sends
+    Last-Event-ID only receives events it has not seen. Jobs served from the
+    result cache finish without stage events.
+
+    Args:
+        job_id:        Job id (must exist).
+        last_event_id: Id of the last event the client received.
+
+    Yields:
+        str: SSE-formatted messages.
+    """
+    status = None
+    idle = 0.0
+    while True:
+        job = await get_async(job_id)
+        changed = job["status"] != status
+        status = job["status"]
+        finished = status in FINISHED_STATES
+        if changed and not finished:
+            yield progress.sse("status", {"job_id": job_id, "status": status})
+            idle = 0.0
+
+        # Read after the job row, so a finished job's last events are included
+        for event in await asyncio.to_thread(progress.events, job_id, last_event_id):
+            last_event_id = event["id"]
+            yield progress.sse(event["event"], event["data"], event["id"])
+            idle = 0.0
+
+        if finished:
+            yield progress.sse("status", {"job_id": job_id, "status": status})
+            yield progress.sse("done", job)
+            return
+
+        if idle >= EVENT_KEEPALIVE:
+            yield ": keepalive\n\n"
+            idle = 0.0
+        await asyncio.sleep(EVENT_POLL_INTERVAL)
+        idle += EVENT_POLL_INTERVAL
@@ -0,0 +1,308 @@
+import base64
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+###############################################################################
+# LLM Response Cache
+#
+# Re-running the validation scripts or re-parsing the example PDFs sent the
+# same prompts and images to Mistral again. Completions made through
+# src/common/llm_gateway.py can be stored on disk, keyed by
+#     provider + model + normalized messages + completion parameters
+# where inline images (data: URLs) are replaced by the SHA-256 of their
+# decoded bytes, so the key does not depend on base64 line breaks or on how
+# the image was embedded.
+#
+# LLM_CACHE_MODE:
+#   off     no caching (default for the API; parser results are cached by
+#           src/common/result_cache.py)
+#   read    read-through: serve stored answers, call the API on a miss and
+#           store the answer (development, validation scripts)
+#   record  always call the API and overwrite stored answers (refresh a
+#           recording after changing prompts)
+#   replay  serve stored answers only; a miss raises LLMCacheMiss, so
+#           offline benchmarks are deterministic and never reach the network
+#
+#   - SQLite table in LLM_CACHE_DIR/llm.db (shared by all processes)
+#   - entries expire after LLM_CACHE_TTL seconds (except in replay mode)
+#   - least recently used entries are evicted once the stored answers exceed
+#     LLM_CACHE_MAX_BYTES
+#   - inside `bypass()` (a caller retrying an answer it could not use,
+#     e.g. fanout._run_chunk) stored answers are skipped in read mode and the
+#     fresh answer replaces them
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+MODES = ("off", "read", "record", "replay")
+
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.getenv("RESULT_CACHE_DIR", "cache"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+
+if LLM_CACHE_MODE not in MODES:
+    raise ValueError(f"LLM_CACHE_MODE must be one of {MODES}, got '{LLM_CACHE_MODE}'")
+
+# Completion arguments that do not change the answer
+IGNORED_PARAMS = ("timeout", "timeout_ms", "priority", "stream", "stream_options", "http_headers", "retries", "server_url")
+
+
+class LLMCacheMiss(LookupError):
+    """No stored answer for a call in replay mode."""
+
+
+# ==================== STATE ====================
+
+_db = None
+_db_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+# Set inside `bypass()`; context variables follow asyncio.to_thread and tasks
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+# ==================== PERSISTENCE ====================
+
+def _connect() -> sqlite3.Connection:
+    """Open (and create if needed) the cache database."""
+    global _db
+    if _db is None:
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        _db = sqlite3.connect(os.path.join(LLM_CACHE_DIR, "llm.db"), check_same_thread=False, timeout=10)
+        _db.row_factory = sqlite3.Row
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key         TEXT PRIMARY KEY,
+                provider    TEXT NOT NULL,
+                model       TEXT NOT NULL,
+                call_site   TEXT NOT NULL,
+                value       TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        _db.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at)")
+        _db.commit()
+    return _db
+
+
+def _evict(db: sqlite3.Connection):
+    """Drop expired entries, then least recently used ones until under the size limit."""
+    expired = db.execute(
+        "DELETE FROM completions WHERE created_at < ?", (time.time() - LLM_CACHE_TTL,)
+    ).rowcount
+    _counters["expirations"] += expired
+
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+    if total <= LLM_CACHE_MAX_BYTES:
+        return
+    for row in db.execute("SELECT key, size FROM completions ORDER BY accessed_at").fetchall():
+        if total <= LLM_CACHE_MAX_BYTES:
+            break
+        db.execute("DELETE FROM completions WHERE key = ?", (row["key"],))
+        total -= row["size"]
+        _counters["evictions"] += 1
+
+
+# ==================== KEYS ====================
+
+def _normalize(value):
+    """
+    Turn a message payload into plain JSON data with images replaced by hashes.
+
+    SDK message objects become dicts, strings are stripped of surrounding
+    whitespace and `data:...;base64,` URLs become "sha256:<digest of the
+    decoded image bytes>".
+    """
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, str):
+        if value.startswith("data:") and ";base64," in value:
+            data = value.split(";base64,", 1)[1]
+            try:
+                raw = base64.b64decode("".join(data.split()), validate=False)
+            except ValueError:
+                raw = data.encode("utf-8")
+            return "sha256:" + hashlib.sha256(raw).hexdigest()
+        return value.strip()
+    return value
+
+
+def make_key(provider: str, model: str, messages: list, params: dict) -> str:
+    """
+    Build the cache key of a completion call.
+
+    Args:
+        provider: "mistral" or "openai".
+        model:    Model name.
+        messages: Chat messages (dicts or SDK message objects).
+        params:   Further completion arguments (response_format, temperature, ...);
+                  IGNORED_PARAMS do not count.
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    payload = {
+        "provider": provider,
+        "model": model,
+        "messages": _normalize(messages),
+        "params": _normalize({key: value for key, value in params.items() if key not in IGNORED_PARAMS}),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+# ==================== RESPONSES ====================
+
+def _dump(response) -> str:
+    return json.dumps(response.model_dump(mode="json"), ensure_ascii=False)
+
+
+def _load(provider: str, value: str):
+    """Rebuild the SDK response type, so callers cannot tell a hit from a live call."""
+    data = json.loads(value)
+    if provider == "mistral":
+        from mistralai.models import ChatCompletionResponse
+        return ChatCompletionResponse.model_validate(data)
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(data)
+
+
+def from_content(provider: str, model: str, content: str, usage: dict | None = None):
+    """SDK response holding a streamed answer, so it is stored like a completion."""
+    usage = usage or {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    data = {
+        "id": "stream-" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:16],
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+    return _load(provider, json.dumps(data))
+
+
+# ==================== PUBLIC API ====================
+
+def enabled() -> bool:
+    """True unless LLM_CACHE_MODE is "off"."""
+    return LLM_CACHE_MODE != "off"
+
+
+def replaying() -> bool:
+    """True in replay mode, where every call returns its recorded answer (retrying cannot help)."""
+    return LLM_CACHE_MODE == "replay"
+
+
+@contextlib.contextmanager
+def bypass():
+    """
+    Skip stored answers for the calls made inside the block.
+
+    In read mode those calls go to the API and their answers overwrite the
+    stored ones, so a retry after an unusable answer does not get the same
+    answer again. Replay mode is not affected (see `replaying`).
+    """
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def get(key: str, provider: str):
+    """
+    Return the stored response for `key`.
+
+    Returns None on a miss (and always in record mode, which refreshes
+    entries, or inside `bypass()` in read mode); raises LLMCacheMiss on a
+    miss in replay mode.
+    """
+    if LLM_CACHE_MODE in ("off", "record") or (LLM_CACHE_MODE == "read" and _bypass.get()):
+        return None
+    now = time.time()
+    with _db_lock:
+        db = _connect()
+        row = db.execute("SELECT value, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+        if row is not None and LLM_CACHE_MODE != "replay" and row["created_at"] < now - LLM_CACHE_TTL:
+            db.execute("DELETE FROM completions WHERE key = ?", (key,))
+            db.commit()
+            _counters["expirations"] += 1
+            row = None
+        if row is None:
+            _counters["misses"] += 1
+            if LLM_CACHE_MODE == "replay":
+                raise LLMCacheMiss(f"No recorded LLM answer for key {key} (LLM_CACHE_MODE=replay)")
+            return None
+        db.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+        db.commit()
+        _counters["hits"] += 1
+    return _load(provider, row["value"])
+
+
+def put(key: str, provider: str, model: str, call_site: str, response):
+    """Store a response (read and record modes) and evict old entries if needed."""
+    if LLM_CACHE_MODE not in ("read", "record"):
+        return
+    value = _dump(response)
+    now = time.time()
+    with _db_lock:
+        db = _connect()
+        db.execute(
+            "INSERT OR REPLACE INTO completions (key, provider, model, call_site, value, size, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, provider, model, call_site, value, len(value.encode("utf-8")), now, now),
+        )
+        _counters["stores"] += 1
+        _evict(db)
+        db.commit()
+
+
+def clear():
+    """Remove all stored answers."""
+    with _db_lock:
+        db = _connect()
+        db.execute("DELETE FROM completions")
+        db.commit()
+
+
+def stats() -> dict:
+    """
+    Hit/miss counters (since process start) and current cache size.
+
+    Returns:
+        dict: {"mode", "hits", "misses", "hit_rate", "stores", "evictions",
+               "expirations", "entries", "bytes", "max_bytes", "ttl_seconds"}
+    """
+    entries, size = 0, 0
+    if enabled():
+        with _db_lock:
+            db = _connect()
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+    lookups = _counters["hits"] + _counters["misses"]
+    return {
+        "mode": LLM_CACHE_MODE,
+        **_counters,
+        "hit_rate": _counters["hits"] / lookups if lookups else 0.0,
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": LLM_CACHE_MAX_BYTES,
+        "ttl_seconds": LLM_CACHE_TTL,
+    }
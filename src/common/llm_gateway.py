@@ -0,0 +1,411 @@
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+import src.common.llm_cache as llm_cache
+import src.common.metrics as metrics
+import src.common.rate_limit as rate_limit
+
+load_dotenv()
+
+
+###############################################################################
+# LLM Gateway
+#
+# Every parser module and validator used to build its own module-level
+# `Mistral(api_key=...)` client, and main.py its own OpenAI client, so each
+# process held several unrelated connection pools and a call from one module
+# could not reuse the TLS connection opened by another.
+#
+# All chat completions now go through this module:
+#   - `complete`        blocking facade (parser workers, validation scripts)
+#   - `complete_async`  coroutine facade (API handlers), cancellable
+#   - `stream_async`    async generator of answer pieces (streamed /ask_ai
+#                       answers), cancellable
+#
+# Clients are created lazily (the SDKs are slow to import, see
+# script-benchmark-startup.py) and shared per process and provider, on top of
+# keep-alive HTTP pools of LLM_MAX_CONNECTIONS connections. Every call gets a
+# timeout (LLM_TIMEOUT_SECONDS unless the caller passes one), passes the
+# provider's rate limiter (src/common/rate_limit.py), is retried after 429s
+# and is recorded in the llm_* metrics (see src/common/metrics.py). With
+# LLM_CACHE_MODE set, answers are served from / recorded to the on-disk
+# cache in src/common/llm_cache.py before any of that happens (in a thread
+# for the async facades, the cache is SQLite).
+#
+# Async clients are bound to the event loop that first used them; when a
+# script runs several `asyncio.run(...)` loops they are recreated.
+#
+# LLM_BASE_URL points both providers at another endpoint, e.g. the local mock
+# server for offline benchmarks (src/common/mock_llm.py,
+# script-mock-llm-server.py). Calls then carry their call site and cache key
+# as X-Call-Site / X-Request-Key headers so the mock can pick a response.
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Upper bound for one completion call (seconds)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+# Connections per provider pool, and how many of them are kept alive when idle
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+
+# Idle keep-alive connections are closed after this many seconds
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+
+PROVIDERS = ("mistral", "openai")
+
+# Alternative API endpoints (both providers, or per provider)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+MISTRAL_SERVER_URL = os.getenv("MISTRAL_SERVER_URL", LLM_BASE_URL)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", f"{LLM_BASE_URL.rstrip('/')}/v1" if LLM_BASE_URL else None)
+
+
+# ==================== CLIENTS ====================
+
+_lock = threading.Lock()
+_clients = {}        # provider → sync client
+_async_clients = {}  # provider → async client (bound to _async_loop)
+_async_loop = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _create(provider: str, asynchronous: bool):
+    """Create a client for `provider` on a pooled keep-alive HTTP client."""
+    if provider == "mistral":
+        from mistralai import Mistral
+        # A custom endpoint (mock server) may be used without an API key
+        api_key = MISTRAL_API_KEY or ("unused" if MISTRAL_SERVER_URL else None)
+        if asynchronous:
+            return Mistral(
+                api_key=api_key,
+                server_url=MISTRAL_SERVER_URL,
+                async_client=httpx.AsyncClient(limits=_limits(), timeout=LLM_TIMEOUT),
+                timeout_ms=int(LLM_TIMEOUT * 1000),
+            )
+        return Mistral(
+            api_key=api_key,
+            server_url=MISTRAL_SERVER_URL,
+            client=httpx.Client(limits=_limits(), timeout=LLM_TIMEOUT),
+            timeout_ms=int(LLM_TIMEOUT * 1000),
+        )
+    if provider == "openai":
+        # The OpenAI SDK keeps its own keep-alive pool per client instance
+        from openai import AsyncOpenAI, OpenAI
+        cls = AsyncOpenAI if asynchronous else OpenAI
+        api_key = OPENAI_API_KEY or ("unused" if OPENAI_BASE_URL else None)
+        return cls(api_key=api_key, base_url=OPENAI_BASE_URL, timeout=LLM_TIMEOUT, max_retries=0)
+    raise ValueError(f"Unknown LLM provider '{provider}', expected one of {PROVIDERS}")
+
+
+def client(provider: str = "mistral"):
+    """
+    Return the shared blocking client of `provider`, creating it on first use.
+
+    Args:
+        provider: "mistral" or "openai".
+
+    Returns:
+        The `Mistral` or `OpenAI` client of this process.
+    """
+    with _lock:
+        if provider not in _clients:
+            _clients[provider] = _create(provider, asynchronous=False)
+        return _clients[provider]
+
+
+async def async_client(provider: str = "mistral"):
+    """
+    Return the shared async client of `provider` for the running event loop.
+
+    The SDK import on first use runs in a thread so the event loop is not
+    blocked.
+    """
+    global _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_loop is not loop:
+        # Pools of a previous (closed) loop cannot be reused
+        _async_clients.clear()
+        _async_loop = loop
+    if provider not in _async_clients:
+        created = await asyncio.to_thread(_create, provider, True)
+        _async_clients.setdefault(provider, created)
+    return _async_clients[provider]
+
+
+def _timeout_kwargs(provider: str, timeout: float | None) -> dict:
+    """Per-call timeout argument in the SDK's own spelling."""
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+    if provider == "mistral":
+        return {"timeout_ms": int(timeout * 1000)}
+    return {"timeout": timeout}
+
+
+def _routing_kwargs(provider: str, call_site: str, key: str | None, model: str,
+                    messages: list, kwargs: dict) -> dict:
+    """Headers identifying a call for the mock server (only with a custom endpoint)."""
+    if (MISTRAL_SERVER_URL if provider == "mistral" else OPENAI_BASE_URL) is None:
+        return {}
+    headers = {
+        "X-Call-Site": call_site,
+        "X-Request-Key": key or llm_cache.make_key(provider, model, messages, kwargs),
+    }
+    return {"http_headers": headers} if provider == "mistral" else {"extra_headers": headers}
+
+
+# ==================== COMPLETIONS ====================
+
+def _usage_tokens(response) -> int | None:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage is not None else None
+
+
+def _cache_lookup(call_site: str, provider: str, model: str, messages: list, kwargs: dict) -> tuple:
+    """(cache key or None, stored response or None) of a call."""
+    if not llm_cache.enabled():
+        return None, None
+    key = llm_cache.make_key(provider, model, messages, kwargs)
+    cached = llm_cache.get(key, provider)
+    if cached is not None:
+        metrics.inc("llm_calls_total", model=model, call_site=call_site, outcome="cached")
+    return key, cached
+
+
+async def _cache_lookup_async(call_site: str, provider: str, model: str, messages: list, kwargs: dict) -> tuple:
+    """`_cache_lookup` for the async paths: the SQLite lookup runs in a thread."""
+    if not llm_cache.enabled():
+        return None, None
+    return await asyncio.to_thread(_cache_lookup, call_site, provider, model, messages, kwargs)
+
+
+def complete(call_site: str, model: str, messages: list, provider: str = "mistral",
+             timeout: float | None = None, priority: str | None = None, **kwargs):
+    """
+    Run a chat completion and wait for the response.
+
+    Args:
+        call_site: Function issuing the call, used as metrics label
+                   (e.g. "call_mistral_boq").
+        model:     Model name.
+        messages:  Chat messages.
+        provider:  "mistral" or "openai".
+        timeout:   Seconds before one attempt fails (default LLM_TIMEOUT_SECONDS).
+        priority:  Rate limiter class "interactive", "batch" or "validation"
+                   (default: rate_limit.current_priority()).
+        **kwargs:  Further completion arguments (response_format, max_tokens, ...).
+
+    Returns:
+        The SDK's chat completion response.
+
+    Raises:
+        llm_cache.LLMCacheMiss: In LLM_CACHE_MODE=replay if no answer was recorded.
+    """
+    key, cached = _cache_lookup(call_site, provider, model, messages, kwargs)
+    if cached is not None:
+        return cached
+    llm = client(provider)
+    create = llm.chat.complete if provider == "mistral" else llm.chat.completions.create
+    cost = rate_limit.estimate_tokens(messages, kwargs.get("max_tokens"))
+    routing = _routing_kwargs(provider, call_site, key, model, messages, kwargs)
+    for attempt in range(rate_limit.MAX_RETRIES + 1):
+        rate_limit.acquire(provider, cost, priority)
+        try:
+            response = metrics.llm_call(
+                call_site, model, create,
+                model=model, messages=messages, **_timeout_kwargs(provider, timeout), **routing, **kwargs,
+            )
+        except Exception as e:
+            delay = rate_limit.backoff(provider, e, attempt)
+            if delay is None:
+                raise
+            print(f"⏳ {call_site} rate limited or overloaded ({e}), retrying in {delay:.1f} s (attempt {attempt + 1}/{rate_limit.MAX_RETRIES})")
+            metrics.llm_retry(call_site, model)
+            continue
+        rate_limit.settle(provider, cost, _usage_tokens(response))
+        if key is not None:
+            llm_cache.put(key, provider, model, call_site, response)
+        return response
+
+
+async def complete_async(call_site: str, model: str, messages: list, provider: str = "mistral",
+                         timeout: float | None = None, priority: str | None = None, **kwargs):
+    """
+    Run a chat completion without blocking the event loop.
+
+    Same arguments as `complete`. The timeout is enforced on each attempt
+    (including waiting for a pooled connection); waiting for the rate
+    limiter yields to the event loop. Cancelling the awaiting task aborts
+    the HTTP request and releases its connection and queue position.
+
+    Raises:
+        asyncio.TimeoutError: If an attempt takes longer than `timeout`.
+    """
+    key, cached = await _cache_lookup_async(call_site, provider, model, messages, kwargs)
+    if cached is not None:
+        return cached
+    llm = await async_client(provider)
+    create = llm.chat.complete_async if provider == "mistral" else llm.chat.completions.create
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+    cost = rate_limit.estimate_tokens(messages, kwargs.get("max_tokens"))
+    routing = _routing_kwargs(provider, call_site, key, model, messages, kwargs)
+    for attempt in range(rate_limit.MAX_RETRIES + 1):
+        await rate_limit.acquire_async(provider, cost, priority)
+        try:
+            response = await asyncio.wait_for(
+                metrics.llm_call_async(
+                    call_site, model, create,
+                    model=model, messages=messages, **_timeout_kwargs(provider, timeout), **routing, **kwargs,
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            raise
+        except Exception as e:
+            delay = await rate_limit.backoff_async(provider, e, attempt)
+            if delay is None:
+                raise
+            print(f"⏳ {call_site} rate limited or overloaded ({e}), retrying in {delay:.1f} s (attempt {attempt + 1}/{rate_limit.MAX_RETRIES})")
+            metrics.llm_retry(call_site, model)
+            continue
+        await rate_limit.settle_async(provider, cost, _usage_tokens(response))
+        if key is not None:
+            await asyncio.to_thread(llm_cache.put, key, provider, model, call_site, response)
+        return response
+
+
+def _usage_dict(usage) -> dict | None:
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+    }
+
+
+async def _close_stream(stream):
+    close = getattr(stream, "close", None)
+    if close is not None:
+        await close()  # openai AsyncStream
+    else:
+        await stream.response.aclose()  # mistral EventStreamAsync
+
+
+async def stream_async(call_site: str, model: str, messages: list, provider: str = "mistral",
+                       timeout: float | None = None, priority: str | None = None, **kwargs):
+    """
+    Run a chat completion and yield the answer while it is generated.
+
+    Same arguments as `complete`. Rate limiting and 429 retries apply until
+    the stream is opened; `timeout` bounds opening the stream and the wait
+    for every further piece. Cached answers are yielded in one piece, and
+    finished streams are stored in the LLM cache like other answers.
+    Closing the generator (client disconnected) aborts the HTTP request.
+
+    Yields:
+        dict: {"delta": text} for each piece of the answer, then once
+              {"usage": {"prompt_tokens", "completion_tokens", "total_tokens"}}
+              (None if the provider reported no usage).
+
+    Raises:
+        asyncio.TimeoutError: If opening the stream or a piece takes longer than `timeout`.
+    """
+    key, cached = await _cache_lookup_async(call_site, provider, model, messages, kwargs)
+    if cached is not None:
+        yield {"delta": cached.choices[0].message.content or ""}
+        yield {"usage": _usage_dict(cached.usage)}
+        return
+    llm = await async_client(provider)
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+    cost = rate_limit.estimate_tokens(messages, kwargs.get("max_tokens"))
+    routing = _routing_kwargs(provider, call_site, key, model, messages, kwargs)
+    call = dict(model=model, messages=messages, **_timeout_kwargs(provider, timeout), **routing, **kwargs)
+    if provider == "mistral":
+        open_stream = lambda: llm.chat.stream_async(**call)
+    else:
+        open_stream = lambda: llm.chat.completions.create(stream=True, stream_options={"include_usage": True}, **call)
+
+    for attempt in range(rate_limit.MAX_RETRIES + 1):
+        await rate_limit.acquire_async(provider, cost, priority)
+        start = time.perf_counter()
+        try:
+            stream = await asyncio.wait_for(open_stream(), timeout)
+            break
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            metrics.llm_stream_finished(call_site, model, start, error=e)
+            raise
+        except Exception as e:
+            metrics.llm_stream_finished(call_site, model, start, error=e)
+            delay = await rate_limit.backoff_async(provider, e, attempt)
+            if delay is None:
+                raise
+            print(f"⏳ {call_site} rate limited or overloaded ({e}), retrying in {delay:.1f} s (attempt {attempt + 1}/{rate_limit.MAX_RETRIES})")
+            metrics.llm_retry(call_site, model)
+
+    parts, usage = [], None
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+            except StopAsyncIteration:
+                break
+            data = chunk.data if provider == "mistral" else chunk
+            if data.usage is not None:
+                usage = _usage_dict(data.usage)
+            content = data.choices[0].delta.content if data.choices else None
+            if isinstance(content, str) and content:
+                if not parts:
+                    metrics.observe("llm_time_to_first_token_seconds", time.perf_counter() - start,
+                                    model=model, call_site=call_site)
+                parts.append(content)
+                yield {"delta": content}
+    except GeneratorExit:
+        metrics.llm_stream_finished(call_site, model, start, error=asyncio.CancelledError())
+        raise
+    except (Exception, asyncio.CancelledError) as e:
+        metrics.llm_stream_finished(call_site, model, start, error=e)
+        raise
+    finally:
+        await _close_stream(stream)
+
+    metrics.llm_stream_finished(call_site, model, start, usage=usage)
+    await rate_limit.settle_async(provider, cost, usage["total_tokens"] if usage else None)
+    if key is not None:
+        answer = llm_cache.from_content(provider, model, "".join(parts), usage)
+        await asyncio.to_thread(llm_cache.put, key, provider, model, call_site, answer)
+    yield {"usage": usage}
+
+
+# ==================== SHUTDOWN ====================
+
+async def aclose():
+    """Close the async clients' connection pools (API shutdown)."""
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for llm in clients:
+        await _close(llm)
+
+
+async def _close(llm):
+    if hasattr(llm, "close") and asyncio.iscoroutinefunction(llm.close):
+        await llm.close()  # AsyncOpenAI
+        return
+    async_http = getattr(getattr(llm, "sdk_configuration", None), "async_client", None)
+    if async_http is not None:
+        await async_http.aclose()  # Mistral
@@ -0,0 +1,300 @@
+import io
+import os
+import resource
+import time
+from contextlib import contextmanager
+
+from PIL import Image
+
+import src.common.documents as documents
+
+
+###############################################################################
+# Worker Memory Governance
+#
+# Parser workers rasterize pages at 300 DPI (an A0 sheet is ~420 MB of RGB
+# samples), and Camelot / pdfminer build large object graphs. Handlers used to
+# end with a forced `gc.collect()`, which cost latency on every request but
+# could not return fragmented pixmap / pdfminer memory to the OS.
+#
+# Instead the parser pool is governed by measured and predicted memory:
+#   - workers track peak RSS per job and per `stage(...)` block
+#     (VmHWM from /proc, reset between stages via /proc/self/clear_refs)
+#   - a worker is recycled after PARSER_WORKER_MAX_TASKS jobs, and the pool
+#     is replaced once a worker ends a job above PARSER_WORKER_MAX_RSS_MB
+#   - before a job is scheduled its memory is predicted from page size × DPI
+#     (see `predict` and pipelines.RENDER_DPI); jobs above MEMORY_JOB_BUDGET_MB
+#     are refused, and jobs wait while the predictions of running jobs would
+#     exceed MEMORY_POOL_BUDGET_MB
+#
+# The worker side (`measure`, `stage`) runs inside the pool processes; the
+# accounting side (`record`, `stats`) runs in the API process. See
+# src/common/executor.py for recycling and admission.
+###############################################################################
+
+
+MIB = 1024 * 1024
+
+
+def _env_mib(name: str, default: int) -> int:
+    """Read a size in MiB from the environment and return it in bytes."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default * MIB
+    return int(value) * MIB
+
+
+# ==================== CONFIGURATION ====================
+
+# Largest predicted memory for a single job; larger documents are refused (0 = no limit)
+MEMORY_JOB_BUDGET = _env_mib("MEMORY_JOB_BUDGET_MB", 2048)
+
+# Predicted memory of all running jobs together (0 = job budget × pool workers)
+MEMORY_POOL_BUDGET = _env_mib("MEMORY_POOL_BUDGET_MB", 0)
+
+# Jobs a worker process runs before it is replaced (0 = never)
+WORKER_MAX_TASKS = int(os.getenv("PARSER_WORKER_MAX_TASKS", "100"))
+
+# RSS after a job above which the pool is replaced (0 = never)
+WORKER_MAX_RSS = _env_mib("PARSER_WORKER_MAX_RSS_MB", 1536)
+
+# A job is logged only if its memory growth exceeds the prediction by this factor
+MISPREDICTION_FACTOR = float(os.getenv("MEMORY_MISPREDICTION_FACTOR", "2"))
+
+# Live copies of a rendered page during a job: pixmap samples, numpy copy,
+# grayscale / threshold images or PIL image, and the encoded JPEG / PNG
+RENDER_COPIES = 4
+
+# Memory per byte of PDF held by pdfminer / Camelot / pdfplumber object trees
+PDF_OBJECT_FACTOR = 40
+
+# Upper bound of that allowance: large files are mostly image streams, which
+# the object trees reference but do not expand. Defaults to half the job
+# budget, so every upload within uploads.UPLOAD_MAX_BYTES stays predictable
+# under MEMORY_JOB_BUDGET_MB (0 = no bound)
+PDF_OBJECT_MAX = _env_mib("MEMORY_PDF_OBJECT_MAX_MB", MEMORY_JOB_BUDGET // 2 // MIB)
+
+# Fixed per-job allowance (parser state, LLM client buffers, results)
+JOB_OVERHEAD = 64 * MIB
+
+
+# ==================== RSS ====================
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size since process start or the last `reset_peak`."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux and cannot be reset
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def reset_peak():
+    """Reset the peak RSS counter to the current RSS (Linux only, no-op elsewhere)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# ==================== WORKER SIDE ====================
+
+_open = []    # running peaks of the current job and its open stages
+_stages = []  # finished stages of the current job
+
+
+def _fold():
+    """Fold the peak since the last reset into every open job / stage."""
+    peak = peak_rss_bytes()
+    for entry in _open:
+        entry["peak"] = max(entry["peak"], peak)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Record the peak RSS and duration of a block inside a job.
+
+    Stages may be nested; an inner stage's peak also counts for the outer
+    ones. Outside of `measure` (e.g. scripts calling parsers directly) this
+    is a no-op.
+
+    Args:
+        name: Stage label reported in executor stats (e.g. "render", "camelot").
+    """
+    if not _open:
+        yield
+        return
+
+    _fold()
+    reset_peak()
+    entry = {"peak": rss_bytes(), "start": time.perf_counter()}
+    _open.append(entry)
+    try:
+        yield
+    finally:
+        _fold()
+        _open.remove(entry)
+        _stages.append({
+            "stage": name,
+            "peak_rss": entry["peak"],
+            "seconds": round(time.perf_counter() - entry["start"], 3),
+        })
+
+
+def measure(fn, *args, **kwargs) -> tuple:
+    """
+    Run a job and report its memory use. Called inside the worker process.
+
+    Args:
+        fn:       Parser entry point.
+        *args:    Positional arguments for `fn`.
+        **kwargs: Keyword arguments for `fn`.
+
+    Returns:
+        tuple: (result, error, report) — `error` is the exception raised by
+               `fn` or None; `report` is a dict with "pid", "rss_before",
+               "peak_rss", "rss_after" and "stages".
+    """
+    _stages.clear()
+    reset_peak()
+    rss_before = rss_bytes()
+    job = {"peak": rss_before, "start": time.perf_counter()}
+    _open[:] = [job]
+    result, error = None, None
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        error = e
+    finally:
+        _fold()
+        _open.clear()
+    report = {
+        "pid": os.getpid(),
+        "rss_before": rss_before,
+        "peak_rss": job["peak"],
+        "rss_after": rss_bytes(),
+        "seconds": round(time.perf_counter() - job["start"], 3),
+        "stages": list(_stages),
+    }
+    _stages.clear()
+    return result, error, report
+
+
+# ==================== PREDICTION ====================
+
+def render_bytes(width_pt: float, height_pt: float, dpi: int, channels: int = 3) -> int:
+    """Size of a page rendered at `dpi` (PDF points are 1/72 inch)."""
+    return int(width_pt * dpi / 72) * int(height_pt * dpi / 72) * channels
+
+
+def predict(source: str | bytes, dpi, is_pdf: bool) -> int:
+    """
+    Predict the memory a job needs on top of an idle worker.
+
+    PDFs: first page rendered at `dpi` (× RENDER_COPIES) plus the object
+    trees built from the file (× PDF_OBJECT_FACTOR, at most PDF_OBJECT_MAX).
+    Images: decoded pixels
+    (× RENDER_COPIES), read from the header only. Only metadata is read, so
+    this is cheap enough to run in the API process.
+
+    Args:
+        source: Upload bytes or path of the stored upload.
+        dpi:    Resolution the parser renders at; a function (width, height in
+                points) → DPI for renders fitted to the page size
+                (image_encoder.fitted_dpi); None if it does not render.
+        is_pdf: True for PDF uploads.
+
+    Returns:
+        int: Predicted bytes.
+    """
+    if not is_pdf:
+        with Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source) as im:
+            width, height = im.size
+        return JOB_OVERHEAD + width * height * 3 * RENDER_COPIES
+
+    size = len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source)
+    objects = size * PDF_OBJECT_FACTOR
+    predicted = JOB_OVERHEAD + (min(objects, PDF_OBJECT_MAX) if PDF_OBJECT_MAX else objects)
+    if dpi:
+        doc = documents.open_pdf(source)
+        try:
+            rect = doc[0].rect
+        finally:
+            doc.close()
+        if callable(dpi):
+            dpi = dpi(rect.width, rect.height)
+        predicted += render_bytes(rect.width, rect.height, dpi) * RENDER_COPIES
+    return predicted
+
+
+# ==================== ACCOUNTING (API PROCESS) ====================
+
+_endpoints = {}
+_stage_peaks = {}
+_counters = {"refused": 0, "recycles": 0}
+
+
+def record(endpoint: str, report: dict, predicted: int):
+    """Add a worker report to the per-endpoint and per-stage statistics."""
+    entry = _endpoints.setdefault(endpoint, {
+        "jobs": 0, "last_peak_rss": 0, "max_peak_rss": 0, "max_job_rss": 0,
+        "last_predicted": 0, "max_predicted": 0,
+    })
+    entry["jobs"] += 1
+    entry["last_peak_rss"] = report["peak_rss"]
+    entry["max_peak_rss"] = max(entry["max_peak_rss"], report["peak_rss"])
+    entry["max_job_rss"] = max(entry["max_job_rss"], report["peak_rss"] - report["rss_before"])
+    entry["last_predicted"] = predicted
+    entry["max_predicted"] = max(entry["max_predicted"], predicted)
+
+    for item in report["stages"]:
+        key = f"{endpoint}:{item['stage']}"
+        peak = _stage_peaks.setdefault(key, {"runs": 0, "max_peak_rss": 0, "max_seconds": 0.0})
+        peak["runs"] += 1
+        peak["max_peak_rss"] = max(peak["max_peak_rss"], item["peak_rss"])
+        peak["max_seconds"] = max(peak["max_seconds"], item["seconds"])
+
+    # Jobs are visible in GET /metrics; only mispredictions are worth a log line
+    job_rss = report["peak_rss"] - report["rss_before"]
+    if predicted and job_rss > MISPREDICTION_FACTOR * predicted:
+        print(f"[memory] {endpoint} pid {report['pid']}: grew {job_rss / MIB:.0f} MiB, "
+              f"predicted {predicted / MIB:.0f} MiB (peak {report['peak_rss'] / MIB:.0f} MiB)")
+
+
+def count(event: str):
+    """Increment a governor counter ("refused" or "recycles")."""
+    _counters[event] += 1
+
+
+def stats() -> dict:
+    """
+    Memory governor settings and peak RSS per endpoint and stage.
+
+    Returns:
+        dict: {"job_budget", "pool_budget", "worker_max_tasks", "worker_max_rss",
+               "refused", "recycles", "endpoints": {...}, "stages": {...}}
+    """
+    return {
+        "job_budget": MEMORY_JOB_BUDGET,
+        "pool_budget": MEMORY_POOL_BUDGET,
+        "worker_max_tasks": WORKER_MAX_TASKS,
+        "worker_max_rss": WORKER_MAX_RSS,
+        **_counters,
+        "endpoints": {name: dict(entry) for name, entry in _endpoints.items()},
+        "stages": {name: dict(entry) for name, entry in _stage_peaks.items()},
+    }
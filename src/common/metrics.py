@@ -0,0 +1,259 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from contextlib import contextmanager
+
+
+###############################################################################
+# Prometheus Metrics
+#
+# Exposes where request time goes — PDF open, rasterization, OCR, Camelot,
+# Voronoi, every Mistral / OpenAI call — in the Prometheus text format at
+# GET /metrics. No client library is needed: counters and histograms are
+# plain dicts behind a lock, so recording a sample costs a few microseconds.
+#
+#   - http_request_duration_seconds     per endpoint (route template) + status
+#   - pipeline_stage_duration_seconds   per pipeline stage (progress.stage,
+#                                       pdf_open, render_page)
+#   - llm_calls_total / llm_call_duration_seconds / llm_retries_total /
+#     llm_tokens_total /
+#     llm_time_to_first_token_seconds   per model and call site
+#   - llm_rate_limit_wait_seconds       per provider and priority class
+#   - vision_image_bytes_total          image payload before / after encoding
+#   - vision_images_total               encoded images by format and content
+#   - gauges for in-flight jobs and queue depth, read from the executor and
+#     job queue at scrape time (`register_collector`)
+#
+# Parser stages run in worker processes. Each worker collects samples in its
+# own registry; executor._call ships them back with the job (`drain`) and the
+# API process adds them to its registry (`merge`).
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# name: (type, help)
+METRICS = {
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by endpoint and status code"),
+    "pipeline_stage_duration_seconds": ("histogram", "Duration of parser pipeline stages"),
+    "llm_calls_total": ("counter", "LLM API calls by model, call site and outcome (ok, error, rate_limited, cancelled, cached)"),
+    "llm_call_duration_seconds": ("histogram", "LLM API call latency by model and call site"),
+    "llm_retries_total": ("counter", "LLM API calls retried after an error"),
+    "llm_tokens_total": ("counter", "LLM tokens by model, call site and kind (prompt, completion)"),
+    "llm_time_to_first_token_seconds": ("histogram", "Time until the first piece of a streamed LLM answer by model and call site"),
+    "document_pages_total": ("counter", "Pages of multi-page documents fanned out to the parser pool by parser"),
+    "document_artifacts_total": ("counter", "Per-request document artifacts (renders, text dicts, words, tables) computed or reused from the DocumentContext"),
+    "vision_image_bytes_total": ("counter", "Image bytes given to the vision encoder (input) and sent to the model (sent)"),
+    "vision_images_total": ("counter", "Images encoded for vision calls by format, content (line_art, continuous) and color (gray, color)"),
+    "llm_rate_limit_wait_seconds": ("histogram", "Time LLM calls waited for the rate limiter by provider and priority"),
+    "fanout_chunks_total": ("counter", "Chunks of fanned-out vision extraction by call site and outcome (ok, retried, failed)"),
+    "titleblock_hedge_total": ("counter", "Hedged title block extractions by winning path (ocr, vision, none) and how the vision request started"),
+    "ask_ai_context_tokens_total": ("counter", "Document tokens of /ask_ai questions (document) and tokens actually sent as context (sent)"),
+}
+
+
+# ==================== STATE ====================
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) → value
+_histograms = {}  # (name, labels) → [bucket counts..., +Inf count, sum]
+_collectors = []
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+# ==================== RECORDING ====================
+
+def inc(name: str, value: float = 1, **labels):
+    """Increment a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels):
+    """Add a sample to a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        buckets = _histograms.get(key)
+        if buckets is None:
+            buckets = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                buckets[i] += 1
+                break
+        else:
+            buckets[len(LATENCY_BUCKETS)] += 1
+        buckets[-1] += value
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the duration of a block in pipeline_stage_duration_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("pipeline_stage_duration_seconds", time.perf_counter() - start, stage=stage)
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    """True if an LLM client error is an HTTP 429."""
+    return getattr(error, "status_code", None) == 429 or "429" in str(error)
+
+
+def _record_llm(call_site: str, model: str, start: float, response=None, error: BaseException | None = None):
+    """Record one LLM call: outcome, latency and token usage."""
+    observe("llm_call_duration_seconds", time.perf_counter() - start, model=model, call_site=call_site)
+    if error is not None:
+        if isinstance(error, (asyncio.CancelledError, asyncio.TimeoutError)):
+            outcome = "cancelled"
+        else:
+            outcome = "rate_limited" if _is_rate_limit(error) else "error"
+        inc("llm_calls_total", model=model, call_site=call_site, outcome=outcome)
+        return
+    inc("llm_calls_total", model=model, call_site=call_site, outcome="ok")
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        inc("llm_tokens_total", getattr(usage, "prompt_tokens", 0) or 0,
+            model=model, call_site=call_site, kind="prompt")
+        inc("llm_tokens_total", getattr(usage, "completion_tokens", 0) or 0,
+            model=model, call_site=call_site, kind="completion")
+
+
+def llm_call(call_site: str, model: str, fn, /, *args, **kwargs):
+    """
+    Call an LLM client method and record calls, latency, 429s and tokens.
+
+    Args:
+        call_site: Function issuing the call (e.g. "call_mistral_boq").
+        model:     Model name.
+        fn:        Client method, e.g. `client.chat.complete`.
+        *args:     Positional arguments for `fn`.
+        **kwargs:  Keyword arguments for `fn`.
+
+    Returns:
+        The client response.
+    """
+    start = time.perf_counter()
+    try:
+        response = fn(*args, **kwargs)
+    except Exception as e:
+        _record_llm(call_site, model, start, error=e)
+        raise
+    _record_llm(call_site, model, start, response)
+    return response
+
+
+async def llm_call_async(call_site: str, model: str, fn, /, *args, **kwargs):
+    """Async variant of `llm_call` for coroutine client methods; cancellations are counted too."""
+    start = time.perf_counter()
+    try:
+        response = await fn(*args, **kwargs)
+    except (Exception, asyncio.CancelledError) as e:
+        _record_llm(call_site, model, start, error=e)
+        raise
+    _record_llm(call_site, model, start, response)
+    return response
+
+
+def llm_stream_finished(call_site: str, model: str, start: float, usage: dict | None = None,
+                        error: BaseException | None = None):
+    """Record a streamed LLM call once its last piece arrived (or it failed); `start` is its perf_counter start."""
+    response = SimpleNamespace(usage=SimpleNamespace(**usage)) if usage else None
+    _record_llm(call_site, model, start, response, error)
+
+
+def llm_retry(call_site: str, model: str):
+    """Count a retried LLM call."""
+    inc("llm_retries_total", model=model, call_site=call_site)
+
+
+# ==================== WORKER → API PROCESS ====================
+
+def drain() -> dict:
+    """Return and reset this process's samples (called in parser workers)."""
+    with _lock:
+        snapshot = {"counters": dict(_counters), "histograms": dict(_histograms)}
+        _counters.clear()
+        _histograms.clear()
+    return snapshot
+
+
+def merge(snapshot: dict):
+    """Add samples drained from a worker process."""
+    with _lock:
+        for key, value in snapshot["counters"].items():
+            _counters[key] = _counters.get(key, 0) + value
+        for key, buckets in snapshot["histograms"].items():
+            own = _histograms.get(key)
+            if own is None:
+                _histograms[key] = list(buckets)
+            else:
+                for i, value in enumerate(buckets):
+                    own[i] += value
+
+
+# ==================== EXPOSITION ====================
+
+def register_collector(collector):
+    """
+    Register a function called at scrape time.
+
+    The collector returns a list of (name, type, help, samples) with samples
+    being (labels dict, value) pairs — used for gauges such as queue depth.
+    """
+    _collectors.append(collector)
+
+
+def _escape(value) -> str:
+    """Escape a label value (backslash, double quote, newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra: dict | None = None) -> str:
+    """Format label pairs as {name="value",...}."""
+    items = list(labels) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+def render() -> str:
+    """Render all metrics in the Prometheus text exposition format (0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(value) for key, value in _histograms.items()}
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+            continue
+        for (metric, labels), buckets in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, {'le': bound})} {cumulative}")
+            cumulative += buckets[len(LATENCY_BUCKETS)]
+            lines.append(f"{name}_bucket{_labels(labels, {'le': '+Inf'})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {buckets[-1]}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+    for collector in _collectors:
+        for name, kind, help_text, samples in collector():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(sorted(labels.items()))} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,378 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import src.common.rate_limit as rate_limit
+
+
+###############################################################################
+# Mock LLM Server
+#
+# Benchmarks and load tests of the parsers used to call Mistral / OpenAI, so
+# their results depended on provider latency and cost money. This is a
+# local stand-in implementing POST /v1/chat/completions, the endpoint both
+# SDKs use (OpenAI-compatible request and response bodies).
+#
+# Point the gateway at it with LLM_BASE_URL=http://127.0.0.1:<port>
+# (src/common/llm_gateway.py); calls then carry X-Call-Site and
+# X-Request-Key headers. The answer of a call is, in this order:
+#   1. the recorded answer for X-Request-Key from an LLM cache database
+#      (src/common/llm_cache.py, --recordings cache/llm.db)
+#   2. the route of its call site (DEFAULT_ROUTES, or a --routes JSON file)
+#   3. DEFAULT_RESPONSE
+# Routes are JSON templates: a string "@<path>" is replaced by the JSON
+# content of that file (e.g. the stored parser outputs under
+# src/validation/.../testdata), {"choices": [...]} picks one template per
+# request (stable for the same request).
+#
+# Behaviour knobs (MockConfig / CLI flags):
+#   - latency distribution: fixed, uniform, lognormal; plus seconds per
+#     completion token to model generation speed
+#   - 429 injection: random error rate, and requests / tokens per minute
+#     limits answered with 429 + Retry-After like the real providers
+#   - streaming ("stream": true): the answer is sent as chat.completion.chunk
+#     Server-Sent Events, the first after the sampled latency and the rest
+#     at seconds per token, so time to first token can be measured
+#   - token accounting: prompt tokens (~4 characters per token, images
+#     rate_limit.IMAGE_TOKENS each) and completion tokens are returned in
+#     `usage` and summed per call site at GET /stats (POST /stats/reset)
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Answers of the parser and validator call sites, built from stored outputs
+DEFAULT_ROUTES = {
+    "call_mistral_boq": {
+        "Sections": "@src/validation/Financial/LLM as a judge/testdata/BOQ1_extracted_boq_data.json",
+        "confidence": 0.9,
+    },
+    "call_mistral_for_titleblock_extraction_from_image":
+        "@src/validation/Floorplan/titleblock/parsing_result_titleblock/full ai/cluttered 01 full ai.json",
+    "call_mistral_for_content_extraction":
+        "@src/validation/Floorplan/titleblock/parsing_result_titleblock/full ai/cluttered 01 full ai.json",
+    "call_mistral_for_room_adjacency_extraction":
+        "@src/validation/Floorplan/neighboring rooms/testdata_ai/Cluttered_01_ai.json",
+    "call_mistral_connected_rooms":
+        "@src/validation/Floorplan/neighboring rooms/testdata_ai/Cluttered_01_ai.json",
+    "call_mistral_for_room_extraction_voronoi": ["01 Besprechung", "02 Besprechung", "04 Empfang"],
+    "call_mistral_roomnames": ["01 Besprechung", "02 Besprechung", "04 Empfang", "08 Eingangshalle"],
+    "call_mistral_full_ai_parsing": {"choices": [
+        "@src/validation/Gantt/testdata/parsing-results/result-test-vis.json",
+        "@src/validation/Gantt/testdata/parsing-results/result-vis-excel-1.json",
+    ]},
+    "call_mistral_timeline": {"timeline_present": True},
+    "judge_titleblock":
+        "@src/validation/Floorplan/titleblock/validation_result_tileblock/full ai/validation-result-cluttered 01 ai.json",
+    "judge_neighboring_rooms":
+        "@src/validation/Floorplan/neighboring rooms/LLM as a judge output ai/Cluttered 01_neighbors_ai_llm.json",
+    "judge_gantt": "@src/validation/Gantt/validation-result/validation-result.json",
+    "judge_gantt_visual": "@src/validation/Gantt/validation-result/visual-w-timeline/validation-result-vis.json",
+    "ask_ai": "This is a mock answer from the local LLM server.",
+}
+
+DEFAULT_RESPONSE = {"mock": True}
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+class MockConfig:
+    """
+    Behaviour of the mock server.
+
+    Attributes:
+        latency (str):             "fixed", "uniform" or "lognormal".
+        latency_params (tuple):    fixed: (seconds,); uniform: (low, high);
+                                   lognormal: (median, sigma).
+        seconds_per_token (float): Extra latency per completion token.
+        error_rate (float):        Share of requests answered with 429 at random.
+        requests_per_minute (int): 429 above this request rate (0 = no limit).
+        tokens_per_minute (int):   429 above this token rate (0 = no limit).
+        retry_after (float):       Retry-After sent with random 429s (seconds).
+        routes (dict):             Call site → response template.
+        recordings (str | None):   LLM cache database to replay answers from.
+        seed (int | None):         Random seed for reproducible runs.
+    """
+
+    def __init__(self, latency: str = "fixed", latency_params: tuple = (0.0,), seconds_per_token: float = 0.0,
+                 error_rate: float = 0.0, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 retry_after: float = 1.0, routes: dict | None = None, recordings: str | None = None,
+                 seed: int | None = None):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{latency}', expected one of {LATENCY_DISTRIBUTIONS}")
+        self.latency = latency
+        self.latency_params = tuple(latency_params)
+        self.seconds_per_token = seconds_per_token
+        self.error_rate = error_rate
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.retry_after = retry_after
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.recordings = recordings
+        self.seed = seed
+
+
+# ==================== RESPONSES ====================
+
+def _load_json(path: str):
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def render(template, request_key: str = ""):
+    """
+    Resolve a route template into response data.
+
+    "@<path>" strings are replaced by the JSON content of the file (relative
+    to the repository root), {"choices": [...]} picks one entry by
+    `request_key`, so the same request always gets the same answer.
+    """
+    if isinstance(template, str):
+        return _load_json(template[1:]) if template.startswith("@") else template
+    if isinstance(template, dict):
+        if set(template) == {"choices"}:
+            choices = template["choices"]
+            index = int(hashlib.sha256(request_key.encode("utf-8")).hexdigest(), 16) % len(choices)
+            return render(choices[index], request_key)
+        return {key: render(value, request_key) for key, value in template.items()}
+    if isinstance(template, list):
+        return [render(item, request_key) for item in template]
+    return template
+
+
+def prompt_tokens(messages: list) -> int:
+    """Prompt tokens of a request: ~4 characters per token, images IMAGE_TOKENS each."""
+    tokens = 0
+    for message in messages:
+        content = message.get("content") or ""
+        for part in content if isinstance(content, list) else [content]:
+            if isinstance(part, dict) and part.get("type") == "image_url":
+                tokens += rate_limit.IMAGE_TOKENS
+            elif isinstance(part, dict):
+                tokens += len(part.get("text") or "") // 4
+            else:
+                tokens += len(str(part)) // 4
+    return tokens
+
+
+def completion_body(model: str, content: str, prompt: int, completion: int) -> dict:
+    """OpenAI-compatible chat.completion body (also accepted by the Mistral SDK)."""
+    return {
+        "id": "mock-" + hashlib.sha1(f"{time.time_ns()}".encode()).hexdigest()[:16],
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion},
+    }
+
+
+def chunk_body(model: str, completion_id: str, content: str | None, finish_reason: str | None = None,
+               usage: dict | None = None) -> dict:
+    """OpenAI-compatible chat.completion.chunk body of a streamed answer (also accepted by the Mistral SDK)."""
+    body = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "delta": {"role": "assistant", "content": content} if content is not None else {},
+            "finish_reason": finish_reason,
+        }],
+    }
+    if usage is not None:
+        body["usage"] = usage
+    return body
+
+
+# ==================== SERVER ====================
+
+class MockLLM:
+    """Answer selection, fault injection and accounting shared by all handler threads."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.window = deque()  # (timestamp, tokens) of accepted requests in the last minute
+        self.stats = {}
+        self.recordings = None
+        if config.recordings:
+            self.recordings = sqlite3.connect(
+                f"file:{config.recordings}?mode=ro", uri=True, check_same_thread=False
+            )
+
+    def _count(self, call_site: str, **values):
+        with self.lock:
+            entry = self.stats.setdefault(call_site, {
+                "requests": 0, "rate_limited": 0, "recorded": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "latency_seconds": 0.0,
+            })
+            for name, value in values.items():
+                entry[name] += value
+
+    def latency(self, completion: int) -> float:
+        """Sampled response time of a request with `completion` tokens."""
+        params = self.config.latency_params
+        with self.lock:
+            if self.config.latency == "uniform":
+                seconds = self.random.uniform(params[0], params[1])
+            elif self.config.latency == "lognormal":
+                seconds = self.random.lognormvariate(0, params[1]) * params[0]
+            else:
+                seconds = params[0]
+        return seconds + completion * self.config.seconds_per_token
+
+    def throttle(self, tokens: int) -> float | None:
+        """Seconds to retry after if this request must get a 429, else None (request admitted)."""
+        config = self.config
+        now = time.time()
+        with self.lock:
+            if config.error_rate and self.random.random() < config.error_rate:
+                return config.retry_after
+            while self.window and self.window[0][0] <= now - 60:
+                self.window.popleft()
+            if config.requests_per_minute and len(self.window) >= config.requests_per_minute:
+                return max(0.1, self.window[0][0] + 60 - now)
+            used = sum(count for _, count in self.window)
+            if config.tokens_per_minute and self.window and used + tokens > config.tokens_per_minute:
+                return max(0.1, self.window[0][0] + 60 - now)
+            self.window.append((now, tokens))
+        return None
+
+    def recorded(self, request_key: str) -> str | None:
+        """Content of the recorded answer for `request_key`, if any."""
+        if self.recordings is None or not request_key:
+            return None
+        with self.lock:
+            row = self.recordings.execute("SELECT value FROM completions WHERE key = ?", (request_key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])["choices"][0]["message"]["content"]
+
+    def answer(self, call_site: str, request_key: str) -> tuple[str, bool]:
+        """(content, from recording) of a request."""
+        content = self.recorded(request_key)
+        if content is not None:
+            return content, True
+        data = render(self.config.routes.get(call_site, DEFAULT_RESPONSE), request_key)
+        return (data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)), False
+
+
+def _handler(mock: MockLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body, headers: dict | None = None):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            try:
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client cancelled the request (e.g. a hedged call)
+
+        def _stream(self, model: str, content: str, prompt: int, completion: int, first_token: float):
+            """Send `content` word by word as Server-Sent Events, then [DONE]."""
+            completion_id = "mock-" + hashlib.sha1(f"{time.time_ns()}".encode()).hexdigest()[:16]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            usage = {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+            try:
+                time.sleep(first_token)
+                for piece in re.findall(r"\s*\S+\s*", content) or [content]:
+                    self.wfile.write(f"data: {json.dumps(chunk_body(model, completion_id, piece))}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(len(piece) / 4 * mock.config.seconds_per_token)
+                final = chunk_body(model, completion_id, None, "stop", usage)
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client stopped reading (e.g. the browser closed the answer stream)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with mock.lock:
+                    self._send(200, mock.stats)
+            elif self.path == "/health":
+                self._send(200, {"status": "ok"})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path == "/stats/reset":
+                with mock.lock:
+                    mock.stats.clear()
+                self._send(200, {"status": "reset"})
+                return
+            if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                self._send(404, {"error": "not found"})
+                return
+            request = json.loads(body or b"{}")
+            call_site = self.headers.get("X-Call-Site", "unknown")
+            request_key = self.headers.get("X-Request-Key") or hashlib.sha256(body).hexdigest()
+
+            prompt = prompt_tokens(request.get("messages", []))
+            retry_after = mock.throttle(prompt)
+            if retry_after is not None:
+                mock._count(call_site, requests=1, rate_limited=1)
+                self._send(429, {"message": "Requests rate limit exceeded (mock)", "type": "rate_limited"},
+                           {"Retry-After": f"{retry_after:.1f}"})
+                return
+
+            content, recorded = mock.answer(call_site, request_key)
+            completion = len(content) // 4
+            latency = mock.latency(completion)
+            mock._count(call_site, requests=1, recorded=int(recorded), prompt_tokens=prompt,
+                        completion_tokens=completion, latency_seconds=latency)
+            if request.get("stream"):
+                self._stream(request.get("model", "mock"), content, prompt, completion, mock.latency(0))
+                return
+            time.sleep(latency)
+            self._send(200, completion_body(request.get("model", "mock"), content, prompt, completion))
+
+    return Handler
+
+
+def start(config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Start the mock server on a background thread.
+
+    Args:
+        config: Behaviour (default: no latency, no errors, DEFAULT_ROUTES).
+        host:   Interface to bind.
+        port:   Port (0 picks a free one, see `server.server_port`).
+
+    Returns:
+        ThreadingHTTPServer: The running server; call `shutdown()` to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _handler(MockLLM(config or MockConfig())))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
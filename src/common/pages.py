@@ -0,0 +1,214 @@
+import asyncio
+import os
+
+from fastapi import HTTPException
+
+import src.common.documents as documents
+import src.common.executor as executor
+import src.common.metrics as metrics
+import src.common.result_cache as result_cache
+
+
+###############################################################################
+# Multi-Page Documents
+#
+# The Gantt parsers and the floor plan parsers read only the first page
+# (pdfplumber / pymupdf page 0, Camelot's default page 1), so plan sets and
+# multi-page schedules had to be split and uploaded page by page.
+#
+# With `?pages=all` (or e.g. `?pages=1-3,5`) the synchronous endpoints fan
+# the pages out across the parser process pool:
+#   - the requested pages are copied into single-page PDFs
+#     (documents.split_pages), so a worker only loads its own page and each
+#     page job's memory is predicted from that page alone
+#   - every page is an ordinary parser job (executor.run_parser via the
+#     result cache, so a page already parsed is not parsed again); at most
+#     PARSER_PAGE_CONCURRENCY pages of one document are in the pool at once,
+#     further bounded by the endpoint gate and the pool memory budget
+#   - a failing page produces an error entry instead of failing the document
+#
+# The response carries the per-page results plus a merged view:
+#   gantt    one continuous task list in page order, each task tagged with
+#            its page; tasks repeated on continuation pages are kept once
+#   drawing  one room graph (or title block, ...) per floor, keyed by page
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Pages of one document in the parser pool at the same time
+PAGE_CONCURRENCY = int(os.getenv("PARSER_PAGE_CONCURRENCY", "2"))
+
+
+# ==================== PAGE SELECTION ====================
+
+def parse_spec(spec: str, page_count: int) -> list[int]:
+    """
+    Turn a page selection into zero-based page indices.
+
+    Args:
+        spec:       "all", or 1-based pages and ranges, e.g. "1-3,5".
+        page_count: Pages in the document.
+
+    Returns:
+        list[int]: Sorted, unique zero-based page indices.
+
+    Raises:
+        ValueError: If the selection is malformed or out of range.
+    """
+    if spec.strip().lower() == "all":
+        return list(range(page_count))
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise ValueError(f"Invalid page selection '{part}': expected e.g. 'all' or '1-3,5'")
+        if first < 1 or last > page_count or first > last:
+            raise ValueError(f"Page selection '{part}' is outside the document's {page_count} pages")
+        pages.update(range(first - 1, last))
+    if not pages:
+        raise ValueError("Empty page selection")
+    return sorted(pages)
+
+
+def _page_count(source: bytes) -> int:
+    doc = documents.open_pdf(source)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+async def select(source: bytes, input_format: str, spec: str) -> list[int]:
+    """
+    Validate a page selection for an ingested upload.
+
+    The PDF is opened in a thread to count its pages, so the event loop is
+    not blocked.
+
+    Raises:
+        HTTPException 400: Not a PDF, or an invalid selection.
+    """
+    if input_format != "application/pdf":
+        raise HTTPException(status_code=400, detail="Page selection is only supported for PDFs")
+    page_count = await asyncio.to_thread(_page_count, source)
+    try:
+        return parse_spec(spec, page_count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ==================== FAN-OUT ====================
+
+async def run_pages(parser: str, source: bytes, variant: str | None, input_format: str, pages: list[int],
+                    backpressure: bool = True, priority: str = "interactive") -> tuple:
+    """
+    Parse the selected pages of a PDF in parallel and merge the results.
+
+    Args:
+        parser:       "gantt" or "drawing".
+        source:       PDF bytes of the upload.
+        variant:      ChartFormat / ContentType value.
+        input_format: MIME type of the upload.
+        pages:        Zero-based page indices (see `select`).
+        backpressure: Reject the document (429/503) if the endpoint or the pool
+                      is saturated; its pages then wait for free slots.
+        priority:     Rate limiter class of the LLM calls (see pipelines.run).
+
+    Returns:
+        tuple: (result, method, is_successful, confidence) where result is
+               {"pages": [{"page", "result", "extraction_method",
+               "is_extraction_succesful", "confident_value"} or {"page", "error"}],
+               "merged": ...}; the document counts as successful if any
+               page is, and its confidence is the lowest page confidence.
+    """
+    if backpressure:
+        executor.admit(parser)
+    parts = await asyncio.to_thread(documents.split_pages, source, pages)
+    slots = asyncio.Semaphore(max(1, PAGE_CONCURRENCY))
+    metrics.inc("document_pages_total", len(pages), parser=parser)
+
+    async def parse(index: int, page: int):
+        async with slots:
+            try:
+                result, method, is_succesful, confidence = await result_cache.run_parser_cached(
+                    parser, parts[index], variant, input_format, backpressure=False, priority=priority,
+                )
+            except HTTPException as e:
+                print(f"Error processing page {page + 1}: {e.detail}")
+                return {"page": page + 1, "error": e.detail}
+            except Exception as e:
+                print(f"Error processing page {page + 1}: {str(e)}")
+                return {"page": page + 1, "error": str(e)}
+            finally:
+                parts[index] = None  # release the page bytes early
+            return {
+                "page": page + 1,
+                "result": result,
+                "extraction_method": method,
+                "is_extraction_succesful": is_succesful,
+                "confident_value": confidence,
+            }
+
+    page_results = await asyncio.gather(*(parse(index, page) for index, page in enumerate(pages)))
+
+    parsed = [entry for entry in page_results if "error" not in entry]
+    methods = sorted({entry["extraction_method"] for entry in parsed})
+    confidences = [entry["confident_value"] for entry in parsed if entry["confident_value"] is not None]
+    result = {"pages": page_results, "merged": merge(parser, page_results)}
+    return (
+        result,
+        ",".join(methods) or "None",
+        any(entry["is_extraction_succesful"] for entry in parsed),
+        min(confidences) if confidences else None,
+    )
+
+
+# ==================== MERGING ====================
+
+def merge(parser: str, page_results: list[dict]):
+    """
+    Merged view of the per-page results (see module header).
+
+    Returns:
+        list | dict: Continuous task list (gantt) or results keyed by
+        "page <n>" (drawing); failed pages are left out.
+    """
+    parsed = [entry for entry in page_results if "error" not in entry]
+    if parser == "gantt":
+        return merge_tasks(parsed)
+    return {f"page {entry['page']}": entry["result"] for entry in parsed}
+
+
+def merge_tasks(page_results: list[dict]) -> list[dict]:
+    """
+    Concatenate the task lists of consecutive schedule pages.
+
+    Continuation pages often repeat the last rows (or summary tasks) of the
+    previous page; a task with the same name, start and finish as one
+    already merged is kept once, with the page it first appeared on.
+    """
+    merged, seen = [], set()
+    for entry in page_results:
+        tasks = entry["result"]
+        if not isinstance(tasks, list):
+            continue
+        for task in tasks:
+            if not isinstance(task, dict):
+                continue
+            key = (
+                str(task.get("task") or task.get("name") or "").strip().lower(),
+                str(task.get("start") or "").strip(),
+                str(task.get("finish") or task.get("end") or "").strip(),
+            )
+            if key[0] and key in seen:
+                continue
+            seen.add(key)
+            merged.append({**task, "page": entry["page"]})
+    return merged
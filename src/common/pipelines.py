@@ -0,0 +1,240 @@
+import importlib
+import time
+
+import src.common.documents as documents
+import src.common.image_encoder as image_encoder
+import src.common.memory as memory
+import src.common.progress as progress
+import src.common.rate_limit as rate_limit
+
+
+###############################################################################
+# Parser Entry Points
+#
+# Module-level functions executed inside the parser process pool
+# (see src/common/executor.py). They must stay picklable: plain arguments in
+# (upload bytes or file paths, enum values as strings), plain results out.
+#
+# A "source" is either the upload bytes (synchronous and batch endpoints,
+# nothing is written to disk) or a file path (jobs, whose uploads are stored
+# so they survive a restart). See src/common/documents.py. `run` wraps it in
+# a DocumentContext, so each pipeline opens the upload once and shares text
+# dicts, words, tables and renders between its stages.
+#
+# Every entry point returns the same 4-tuple so the API layer can build a
+# `Response` without knowing which parser ran:
+#     (result, method, is_successful, confidence)
+#
+# Parser modules (camelot, pdfplumber, scipy, pandas, the Mistral clients)
+# are imported on first use, so the API process starts without them; pool
+# workers load them up front through `warm_up` (PARSER_POOL_PREWARM).
+###############################################################################
+
+
+# Modules each parser needs, imported lazily (see `warm_up`)
+PARSER_MODULES = {
+    "gantt": ("src.gantt2data.ganttParser", "camelot"),
+    "financial": ("src.boq2data.camelot_setup.boq2data_mistral", "camelot"),
+    "drawing": ("src.plan2data.titleBlockInfo", "src.plan2data.voronoi_functions", "src.plan2data.full_plan_ai"),
+}
+
+
+def warm_up(parsers: tuple = ("gantt", "financial", "drawing")) -> float:
+    """
+    Import the modules of `parsers` ahead of the first job.
+
+    Runs inside pool workers right after they start (see
+    executor.prewarm), so the first request does not pay for the imports.
+
+    Returns:
+        float: Seconds spent importing.
+    """
+    start = time.perf_counter()
+    for parser in parsers:
+        for module in PARSER_MODULES.get(parser, ()):
+            importlib.import_module(module)
+    return time.perf_counter() - start
+
+
+def parse_gantt(source, chart_format: str) -> tuple:
+    """
+    Parse a Gantt chart PDF.
+
+    Args:
+        source:       Upload bytes, path to the PDF or DocumentContext.
+        chart_format: "visual", "tabular" or "full ai".
+
+    Returns:
+        tuple: (result, method, is_successful, confidence) — confidence is
+               always None because Gantt parsing has no AI confidence score.
+    """
+    import src.gantt2data.ganttParser as gantt_parser
+
+    with progress.stage(f"gantt-{chart_format}"):
+        result, method, is_succesful = gantt_parser.parse_gantt_chart(source, chart_format)
+    return result, method, is_succesful, None
+
+
+def parse_financial(source) -> tuple:
+    """
+    Parse a Bill of Quantities PDF with the hybrid Camelot + Mistral pipeline.
+
+    Args:
+        source: Upload bytes, path to the PDF or DocumentContext.
+
+    Returns:
+        tuple: (result, method, is_successful, confidence)
+    """
+    import src.boq2data.camelot_setup.boq2data_mistral as boq
+
+    with progress.stage("boq"):
+        result, method, is_succesful, confidence = boq.extract_boq_mistral(source)
+    return result, method, is_succesful, confidence
+
+
+def parse_drawing(source, content_type: str, is_pdf: bool) -> tuple:
+    """
+    Parse a floor plan according to the requested extraction mode.
+
+    For "titleblock-hybrid" PDFs the DocumentContext is handed on: OCR renders
+    only the title block clip, the vision call a page fitted to the model limits.
+
+    Args:
+        source:       Upload bytes, path to the uploaded PDF or JPEG, or
+                      DocumentContext of the upload.
+        content_type: ContentType value ("titleblock-hybrid", "rooms-deterministic",
+                      "rooms-ai", "full-plan-ai").
+        is_pdf:       True if the upload was a PDF.
+
+    Returns:
+        tuple: (result, method, is_successful, confidence)
+    """
+    import src.plan2data.titleBlockInfo as floorplan_parser
+    import src.plan2data.voronoi_functions as vor
+    import src.plan2data.full_plan_ai as full
+
+    method = "None"
+    is_succesful = False
+    confidence = None
+    result = {}
+    # Images and whole-file vision calls take the upload itself
+    upload = source.source if isinstance(source, documents.DocumentContext) else source
+
+    if content_type == "titleblock-hybrid":
+        # No full-sheet 300 DPI raster: OCR renders the title block clip only
+        with progress.stage("titleblock"):
+            result, method, is_succesful, confidence = floorplan_parser.get_title_block_info(
+                source if is_pdf else upload
+            )
+
+    elif content_type == "rooms-deterministic":
+        with progress.stage("voronoi"):
+            result = vor.neighboring_rooms_voronoi(source)
+        method = "deterministic"
+        is_succesful = True
+
+    elif content_type == "rooms-ai":
+        with progress.stage("rooms-ai"):
+            result, method, is_succesful, confidence = full.get_neighbouring_rooms_with_ai(upload)
+
+    elif content_type == "full-plan-ai":
+        with progress.stage("full-plan"):
+            result = vor.extract_full_floorplan(source)
+        method = "hybrid"
+        is_succesful = True
+
+    return result, method, is_succesful, confidence
+
+
+# ==================== DISPATCH ====================
+
+# Parser names accepted by `run`; each one is also its executor gate name
+PARSERS = ("gantt", "financial", "drawing")
+
+# Bump whenever a parser's output changes so cached results are invalidated
+# (see src/common/result_cache.py)
+PARSER_VERSION = "1"
+
+# Mistral model of each parser. Kept here rather than read from the parser
+# modules so that building a cache key does not import them (see warm_up)
+PARSER_MODELS = {
+    "gantt": "mistral-small-2506",
+    "financial": "mistral-small-2503",
+    "drawing": "mistral-small-2503",
+}
+
+# Renders at the DPI that fits the vision model limits (image_encoder.render_pdf_page);
+# the DPI depends on the page size
+FITTED = "fitted"
+
+# Resolution at which each parser / variant rasterizes the first page
+# (None = text layer only). Used to predict a job's memory before it is scheduled.
+RENDER_DPI = {
+    ("gantt", "visual"): 144,   # 2x page render, only if an AI fallback fires
+    ("gantt", "tabular"): None,
+    ("gantt", "full ai"): 144,  # 2x page render; oversized pages are tiled clip by clip
+    ("financial", None): None,  # Camelot stream flavor, no rendering
+    ("drawing", "titleblock-hybrid"): 100,  # locate render; OCR gets a 300 DPI clip
+    ("drawing", "rooms-deterministic"): None,
+    ("drawing", "rooms-ai"): None,  # PDF is sent to Mistral as is
+    ("drawing", "full-plan-ai"): FITTED,  # convert_pdf_to_base64 → image_encoder.render_pdf_page
+}
+
+
+def model_name(parser: str) -> str:
+    """Return the Mistral model used by a parser (part of the result cache key)."""
+    if parser not in PARSER_MODELS:
+        raise ValueError(f"Unknown parser: {parser}")
+    return PARSER_MODELS[parser]
+
+
+def predict_memory(parser: str, source: str | bytes, variant: str | None, input_format: str) -> int:
+    """
+    Predict the memory `run` will need for an upload (see memory.predict).
+
+    Args:
+        parser:       "gantt", "financial" or "drawing".
+        source:       Upload bytes or path to the stored upload.
+        variant:      ChartFormat / ContentType value, or None.
+        input_format: MIME type of the upload.
+
+    Returns:
+        int: Predicted bytes.
+    """
+    is_pdf = input_format == "application/pdf"
+    dpi = RENDER_DPI.get((parser, variant if parser != "financial" else None), 300)
+    if dpi == FITTED:
+        dpi = image_encoder.fitted_dpi
+    return memory.predict(source, dpi, is_pdf)
+
+
+def run(parser: str, source: str | bytes, variant: str | None, input_format: str,
+        job_id: str | None = None, priority: str = "interactive") -> tuple:
+    """
+    Run a parser by name. Shared by the synchronous endpoints and the job queue.
+
+    Args:
+        parser:       "gantt", "financial" or "drawing".
+        source:       Upload bytes or path to the stored upload.
+        variant:      ChartFormat value (gantt) or ContentType value (drawing);
+                      ignored for financial.
+        input_format: MIME type of the upload (e.g. "application/pdf").
+        job_id:       Job whose progress stream receives the stage events
+                      (None for the synchronous endpoints).
+        priority:     Rate limiter class of the parser's LLM calls
+                      ("interactive" or "batch", see src/common/rate_limit.py).
+
+    Returns:
+        tuple: (result, method, is_successful, confidence)
+
+    Raises:
+        ValueError: If `parser` is unknown.
+    """
+    with progress.bind(job_id), rate_limit.priority(priority), documents.DocumentContext(source) as document:
+        if parser == "gantt":
+            return parse_gantt(document, variant)
+        if parser == "financial":
+            return parse_financial(document)
+        if parser == "drawing":
+            return parse_drawing(document, variant, input_format == "application/pdf")
+    raise ValueError(f"Unknown parser: {parser}")
@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import src.common.memory as memory
+import src.common.metrics as metrics
+
+
+###############################################################################
+# Pipeline Progress Events
+#
+# Multi-stage pipelines (full floor plan, visual Gantt) used to report
+# progress only through `print`. Stages now emit events that the job API
+# streams to clients as Server-Sent Events (GET /jobs/{id}/events), so a
+# frontend can show e.g. the Voronoi neighbours while the connected-rooms
+# vision call is still running.
+#
+#   stage_start   {"stage"}
+#   stage_end     {"stage", "duration"}
+#   stage_failed  {"stage", "duration", "error"}
+#   partial       {"stage", "result"}      intermediate result of a stage
+#
+# Events are written by the parser worker processes into a SQLite table
+# (JOB_STORE_DIR/events.db, next to the job store) and read by the API
+# process. Outside of a job (synchronous endpoints, scripts) emitting is a
+# no-op, so parsers can be instrumented unconditionally.
+#
+# `stage` also records the stage's peak RSS (see src/common/memory.py) and
+# its duration in the pipeline_stage_duration_seconds histogram
+# (see src/common/metrics.py).
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Same directory as the job store (src/common/jobs.py)
+EVENT_STORE_DIR = os.getenv("JOB_STORE_DIR", "jobs")
+
+# Events of finished jobs are pruned after this many seconds
+EVENT_TTL = int(os.getenv("JOB_EVENT_TTL", str(24 * 3600)))
+
+
+# ==================== STATE ====================
+
+_db = None
+_db_lock = threading.Lock()  # SSE streams read events from several threads at once
+_job_id = None  # job the current worker process is running, if any
+
+
+def _connect() -> sqlite3.Connection:
+    """Open (and create if needed) the event database of this process. Call with `_db_lock` held."""
+    global _db
+    if _db is None:
+        os.makedirs(EVENT_STORE_DIR, exist_ok=True)
+        _db = sqlite3.connect(os.path.join(EVENT_STORE_DIR, "events.db"), check_same_thread=False, timeout=10)
+        _db.row_factory = sqlite3.Row
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id      TEXT NOT NULL,
+                created_at  REAL NOT NULL,
+                event       TEXT NOT NULL,
+                stage       TEXT,
+                data        TEXT NOT NULL
+            )
+            """
+        )
+        _db.execute("CREATE INDEX IF NOT EXISTS events_job ON events (job_id, id)")
+        _db.commit()
+    return _db
+
+
+# ==================== EMITTING (WORKER SIDE) ====================
+
+@contextmanager
+def bind(job_id: str | None):
+    """Route events emitted inside the block to `job_id` (None = discard)."""
+    global _job_id
+    previous, _job_id = _job_id, job_id
+    try:
+        yield
+    finally:
+        _job_id = previous
+
+
+def emit(event: str, stage: str | None = None, **data):
+    """
+    Record a progress event for the current job.
+
+    Args:
+        event:  Event name ("stage_start", "stage_end", "stage_failed", "partial").
+        stage:  Stage the event belongs to.
+        **data: JSON-serializable payload.
+    """
+    if _job_id is None:
+        return
+    try:
+        value = json.dumps({"stage": stage, **data}, ensure_ascii=False, default=str)
+        with _db_lock:
+            db = _connect()
+            db.execute(
+                "INSERT INTO events (job_id, created_at, event, stage, data) VALUES (?, ?, ?, ?, ?)",
+                (_job_id, time.time(), event, stage, value),
+            )
+            db.commit()
+    except sqlite3.Error as e:
+        # Progress is best effort and must never fail the parse
+        print(f"Warning: Could not record progress event {event}: {e}")
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Mark a pipeline stage: emits stage_start / stage_end (or stage_failed)
+    with its duration and records its peak RSS and latency.
+
+    Args:
+        name: Stage label (e.g. "voronoi", "connected-rooms").
+    """
+    emit("stage_start", name)
+    start = time.perf_counter()
+    try:
+        with memory.stage(name):
+            yield
+    except Exception as e:
+        duration = time.perf_counter() - start
+        metrics.observe("pipeline_stage_duration_seconds", duration, stage=name)
+        emit("stage_failed", name, duration=round(duration, 3), error=str(e))
+        raise
+    duration = time.perf_counter() - start
+    metrics.observe("pipeline_stage_duration_seconds", duration, stage=name)
+    emit("stage_end", name, duration=round(duration, 3))
+
+
+def partial(name: str, result):
+    """Publish an intermediate result of stage `name` (e.g. Voronoi neighbours)."""
+    emit("partial", name, result=result)
+
+
+# ==================== READING (API PROCESS) ====================
+
+def events(job_id: str, after: int = 0) -> list[dict]:
+    """
+    Return the events of a job in order.
+
+    Args:
+        job_id: Job id.
+        after:  Only return events with an id greater than this
+                (SSE Last-Event-ID).
+
+    Returns:
+        list[dict]: {"id", "event", "created_at", "data"} per event.
+    """
+    with _db_lock:
+        rows = _connect().execute(
+            "SELECT id, event, created_at, data FROM events WHERE job_id = ? AND id > ? ORDER BY id",
+            (job_id, after),
+        ).fetchall()
+    return [
+        {"id": row["id"], "event": row["event"], "created_at": row["created_at"], "data": json.loads(row["data"])}
+        for row in rows
+    ]
+
+
+def sse(event: str, data, event_id: int | None = None) -> str:
+    """Format one Server-Sent Event (job progress, streamed /ask_ai answers)."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, ensure_ascii=False, default=str)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def prune(job_id: str | None = None):
+    """Delete the events of `job_id`, or all events older than EVENT_TTL."""
+    with _db_lock:
+        db = _connect()
+        if job_id is not None:
+            db.execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+        else:
+            db.execute("DELETE FROM events WHERE created_at < ?", (time.time() - EVENT_TTL,))
+        db.commit()
@@ -0,0 +1,453 @@
+import asyncio
+import email.utils
+import heapq
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import src.common.metrics as metrics
+
+
+###############################################################################
+# LLM Rate Limiting
+#
+# Only `call_mistral_connected_rooms` used to handle 429s, by sleeping 60 s
+# and then 120 s inside the worker; every other call site failed outright.
+# All calls made through src/common/llm_gateway.py now pass a token bucket
+# per provider, limited by requests and by tokens per minute:
+#
+#   - tokens are estimated before the call (text length, images, max_tokens)
+#     and settled against the reported usage afterwards
+#   - callers queue by priority class: interactive (synchronous endpoints,
+#     /ask_ai/) before batch (job API, batch endpoints) before validation
+#     (LLM-as-a-judge scripts); within a class first come, first served
+#   - 429 / 502 / 503 / 504 responses are retried with jittered exponential
+#     backoff; a Retry-After header pauses the whole bucket, so other callers
+#     stop hitting the limit too
+#   - async callers never block the event loop: they queue in memory per
+#     process (asyncio.Condition), only the first in line polls the shared
+#     bucket, and every SQLite transaction runs in a worker thread;
+#     blocking callers (parser workers) wait only as long as the bucket needs
+#     to refill instead of a fixed minute
+#
+# The bucket lives in SQLite. With LLM_RATE_LIMIT_SHARED=1 (default) it is a
+# file next to the job store, shared by the API process, all parser workers
+# and validation scripts on the host; with 0 it is an in-memory database and
+# the limits apply per process.
+###############################################################################
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a number from the environment, falling back to `default`."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+
+# ==================== CONFIGURATION ====================
+
+# Limits per provider (0 = unlimited). Override per provider with e.g.
+# LLM_REQUESTS_PER_MINUTE_MISTRAL=60 / LLM_TOKENS_PER_MINUTE_OPENAI=200000
+REQUESTS_PER_MINUTE = _env_float("LLM_REQUESTS_PER_MINUTE", 60)
+TOKENS_PER_MINUTE = _env_float("LLM_TOKENS_PER_MINUTE", 500_000)
+
+# Share the buckets between processes through a SQLite file
+RATE_LIMIT_SHARED = os.getenv("LLM_RATE_LIMIT_SHARED", "1") == "1"
+RATE_LIMIT_DIR = os.getenv("JOB_STORE_DIR", "jobs")
+
+# Retries of a rate-limited / overloaded call, and the backoff bounds (seconds)
+MAX_RETRIES = int(_env_float("LLM_MAX_RETRIES", 4))
+BACKOFF_BASE = _env_float("LLM_BACKOFF_BASE_SECONDS", 2.0)
+BACKOFF_MAX = _env_float("LLM_BACKOFF_MAX_SECONDS", 60.0)
+
+# Token estimate for an image in a message, and for the answer if the call
+# sets no max_tokens
+IMAGE_TOKENS = int(_env_float("LLM_IMAGE_TOKENS", 2000))
+COMPLETION_TOKENS = int(_env_float("LLM_COMPLETION_TOKENS", 1000))
+
+# Lower value = served first
+PRIORITIES = {"interactive": 0, "batch": 1, "validation": 2}
+
+RETRY_STATUS = (429, 502, 503, 504)
+
+# Queue entries not refreshed for this long belong to a dead process
+WAITER_TTL = 10.0
+
+# Longest single wait before the queue position is re-checked
+POLL_INTERVAL = 0.5
+
+
+def limits(provider: str) -> tuple[float, float]:
+    """(requests per minute, tokens per minute) of `provider`, 0 = unlimited."""
+    key = provider.upper()
+    return (
+        _env_float(f"LLM_REQUESTS_PER_MINUTE_{key}", REQUESTS_PER_MINUTE),
+        _env_float(f"LLM_TOKENS_PER_MINUTE_{key}", TOKENS_PER_MINUTE),
+    )
+
+
+# ==================== STORE ====================
+
+_lock = threading.Lock()
+_db = None
+_db_pid = None
+_priority = "interactive"  # class of calls made by this process, see `priority`
+
+
+def _connect() -> sqlite3.Connection:
+    """Open (and create if needed) the bucket store of this process."""
+    global _db, _db_pid
+    if _db is None or _db_pid != os.getpid():
+        if RATE_LIMIT_SHARED:
+            os.makedirs(RATE_LIMIT_DIR, exist_ok=True)
+            path = os.path.join(RATE_LIMIT_DIR, "ratelimit.db")
+        else:
+            path = ":memory:"
+        _db = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        _db.row_factory = sqlite3.Row
+        if RATE_LIMIT_SHARED:
+            _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                provider       TEXT PRIMARY KEY,
+                requests       REAL NOT NULL,
+                tokens         REAL NOT NULL,
+                updated_at     REAL NOT NULL,
+                blocked_until  REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS waiters (
+                id        INTEGER PRIMARY KEY AUTOINCREMENT,
+                provider  TEXT NOT NULL,
+                priority  INTEGER NOT NULL,
+                seen_at   REAL NOT NULL
+            )
+            """
+        )
+        _db_pid = os.getpid()
+    return _db
+
+
+@contextmanager
+def _transaction():
+    """Serialize bucket updates between threads (lock) and processes (IMMEDIATE)."""
+    with _lock:
+        db = _connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+
+def _bucket(db: sqlite3.Connection, provider: str, now: float) -> dict:
+    """Load a bucket and refill it for the time since its last update."""
+    rpm, tpm = limits(provider)
+    row = db.execute("SELECT * FROM buckets WHERE provider = ?", (provider,)).fetchone()
+    if row is None:
+        return {"requests": rpm, "tokens": tpm, "blocked_until": 0.0}
+    elapsed = max(0.0, now - row["updated_at"])
+    return {
+        "requests": min(rpm, row["requests"] + elapsed * rpm / 60),
+        "tokens": min(tpm, row["tokens"] + elapsed * tpm / 60),
+        "blocked_until": row["blocked_until"],
+    }
+
+
+def _store(db: sqlite3.Connection, provider: str, bucket: dict, now: float):
+    db.execute(
+        "INSERT OR REPLACE INTO buckets (provider, requests, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?, ?)",
+        (provider, bucket["requests"], bucket["tokens"], now, bucket["blocked_until"]),
+    )
+
+
+# ==================== PRIORITY ====================
+
+@contextmanager
+def priority(name: str):
+    """
+    Set the priority class of LLM calls made inside the block.
+
+    Args:
+        name: "interactive", "batch" or "validation".
+    """
+    global _priority
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{name}', expected one of {list(PRIORITIES)}")
+    previous, _priority = _priority, name
+    try:
+        yield
+    finally:
+        _priority = previous
+
+
+def current_priority() -> str:
+    """Priority class of calls made by this process right now."""
+    return _priority
+
+
+# ==================== ACQUIRING ====================
+
+def estimate_tokens(messages: list, max_tokens: int | None = None) -> int:
+    """
+    Estimate the tokens a chat completion consumes (prompt + answer).
+
+    Text counts ~4 characters per token, every image IMAGE_TOKENS and the
+    answer `max_tokens` (COMPLETION_TOKENS if unset).
+    """
+    tokens = max_tokens or COMPLETION_TOKENS
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", "")
+        parts = content if isinstance(content, list) else [content]
+        for part in parts:
+            if isinstance(part, dict) and part.get("type") == "image_url":
+                tokens += IMAGE_TOKENS
+            elif isinstance(part, dict):
+                tokens += len(part.get("text") or "") // 4
+            elif part:
+                tokens += len(part if isinstance(part, str) else json.dumps(part, default=str)) // 4
+    return tokens
+
+
+def _try_acquire(provider: str, waiter: int, rank: int, cost: int) -> float:
+    """
+    Take a request and `cost` tokens if this waiter is first in line.
+
+    Returns:
+        float: 0 if granted, otherwise seconds to wait before trying again.
+    """
+    rpm, tpm = limits(provider)
+    now = time.time()
+    with _transaction() as db:
+        db.execute("UPDATE waiters SET seen_at = ? WHERE id = ?", (now, waiter))
+        db.execute("DELETE FROM waiters WHERE seen_at < ?", (now - WAITER_TTL,))
+        bucket = _bucket(db, provider, now)
+        if bucket["blocked_until"] > now:
+            return min(bucket["blocked_until"] - now, POLL_INTERVAL)
+
+        ahead = db.execute(
+            "SELECT 1 FROM waiters WHERE provider = ? AND (priority < ? OR (priority = ? AND id < ?)) LIMIT 1",
+            (provider, rank, rank, waiter),
+        ).fetchone()
+        if ahead is not None:
+            return POLL_INTERVAL / 10
+
+        wait = 0.0
+        if rpm > 0 and bucket["requests"] < 1:
+            wait = max(wait, (1 - bucket["requests"]) * 60 / rpm)
+        cost = min(cost, tpm) if tpm > 0 else 0
+        if tpm > 0 and bucket["tokens"] < cost:
+            wait = max(wait, (cost - bucket["tokens"]) * 60 / tpm)
+        if wait > 0:
+            return min(wait, POLL_INTERVAL)
+
+        if rpm > 0:
+            bucket["requests"] -= 1
+        bucket["tokens"] -= cost
+        _store(db, provider, bucket, now)
+        db.execute("DELETE FROM waiters WHERE id = ?", (waiter,))
+        return 0.0
+
+
+def _enqueue(provider: str, rank: int) -> int:
+    with _transaction() as db:
+        return db.execute(
+            "INSERT INTO waiters (provider, priority, seen_at) VALUES (?, ?, ?)", (provider, rank, time.time())
+        ).lastrowid
+
+
+def _dequeue(waiter: int):
+    with _transaction() as db:
+        db.execute("DELETE FROM waiters WHERE id = ?", (waiter,))
+
+
+def acquire(provider: str, cost: int, priority_class: str | None = None) -> float:
+    """
+    Wait (blocking) until the bucket of `provider` admits a call.
+
+    Args:
+        provider:       "mistral" or "openai".
+        cost:           Estimated tokens of the call (see `estimate_tokens`).
+        priority_class: "interactive", "batch" or "validation"
+                        (default: `current_priority()`).
+
+    Returns:
+        float: Seconds waited.
+    """
+    priority_class = priority_class or _priority
+    start = time.perf_counter()
+    waiter = _enqueue(provider, PRIORITIES[priority_class])
+    try:
+        while (wait := _try_acquire(provider, waiter, PRIORITIES[priority_class], cost)) > 0:
+            time.sleep(wait)
+    finally:
+        _dequeue(waiter)
+    waited = time.perf_counter() - start
+    metrics.observe("llm_rate_limit_wait_seconds", waited, provider=provider, priority=priority_class)
+    return waited
+
+
+class _LocalQueue:
+    """
+    Async waiters of this process, served by priority class, then arrival.
+
+    Only the waiter at the head polls the shared bucket (in a thread); the
+    others wait on the condition until the head is granted or leaves, so N
+    queued calls cost one SQLite transaction per poll, not N.
+    """
+
+    def __init__(self):
+        self.condition = asyncio.Condition()
+        self.waiting = []  # heap of (rank, sequence)
+        self.sequence = 0
+
+
+# One queue per event loop (asyncio primitives are bound to their loop)
+_local_queues = weakref.WeakKeyDictionary()
+
+
+def _local_queue() -> _LocalQueue:
+    loop = asyncio.get_running_loop()
+    if loop not in _local_queues:
+        _local_queues[loop] = _LocalQueue()
+    return _local_queues[loop]
+
+
+async def acquire_async(provider: str, cost: int, priority_class: str | None = None) -> float:
+    """
+    Like `acquire`, but never blocks the event loop; cancelling leaves the queue.
+
+    Waiters of this process queue in memory (see `_LocalQueue`); only the
+    head enters the shared queue with its priority, and the SQLite
+    transactions run in a worker thread.
+    """
+    priority_class = priority_class or _priority
+    rank = PRIORITIES[priority_class]
+    start = time.perf_counter()
+    queue = _local_queue()
+    waiter = None  # shared queue entry, held while this call is the head
+    async with queue.condition:
+        queue.sequence += 1
+        entry = (rank, queue.sequence)
+        heapq.heappush(queue.waiting, entry)
+        queue.condition.notify_all()  # a head of lower priority steps back
+        try:
+            while True:
+                if queue.waiting[0] != entry:
+                    if waiter is not None:
+                        await asyncio.shield(asyncio.to_thread(_dequeue, waiter))
+                        waiter = None
+                    await queue.condition.wait()
+                    continue
+                if waiter is None:
+                    waiter = await asyncio.to_thread(_enqueue, provider, rank)
+                wait = await asyncio.to_thread(_try_acquire, provider, waiter, rank, cost)
+                if wait <= 0:
+                    waiter = None  # _try_acquire removed the granted entry
+                    break
+                try:
+                    await asyncio.wait_for(queue.condition.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            queue.waiting.remove(entry)
+            heapq.heapify(queue.waiting)
+            queue.condition.notify_all()
+            if waiter is not None:
+                await asyncio.shield(asyncio.to_thread(_dequeue, waiter))
+    waited = time.perf_counter() - start
+    metrics.observe("llm_rate_limit_wait_seconds", waited, provider=provider, priority=priority_class)
+    return waited
+
+
+def settle(provider: str, estimated: int, actual: int | None):
+    """Correct the token bucket by the difference between estimate and reported usage."""
+    if actual is None or limits(provider)[1] <= 0:
+        return
+    with _transaction() as db:
+        now = time.time()
+        bucket = _bucket(db, provider, now)
+        bucket["tokens"] += min(estimated, limits(provider)[1]) - actual
+        _store(db, provider, bucket, now)
+
+
+async def settle_async(provider: str, estimated: int, actual: int | None):
+    """`settle` in a worker thread, for callers on the event loop."""
+    await asyncio.to_thread(settle, provider, estimated, actual)
+
+
+# ==================== RETRIES ====================
+
+def _status(error: Exception) -> int | None:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "raw_response", None) or getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    if status is None and "429" in str(error):
+        status = 429
+    return status
+
+
+def retry_after(error: Exception) -> float | None:
+    """Seconds from the Retry-After header of a failed call, if any."""
+    response = getattr(error, "raw_response", None) or getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(provider: str, error: Exception, attempt: int) -> float | None:
+    """
+    Decide whether a failed call is retried.
+
+    A 429 / 5xx is retried up to MAX_RETRIES times after a full-jitter
+    exponential delay, or after the Retry-After delay (plus up to 20 %
+    jitter) if the provider sent one. The delay pauses the provider's bucket, so all callers
+    back off together.
+
+    Args:
+        provider: Provider of the failed call.
+        error:    Exception raised by the client.
+        attempt:  0 for the first call.
+
+    Returns:
+        float | None: Seconds to wait before retrying, None to give up.
+    """
+    if attempt >= MAX_RETRIES or _status(error) not in RETRY_STATUS:
+        return None
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    after = retry_after(error)
+    if after is not None:
+        delay = min(BACKOFF_MAX, after) * random.uniform(1.0, 1.2)
+    with _transaction() as db:
+        now = time.time()
+        bucket = _bucket(db, provider, now)
+        bucket["blocked_until"] = max(bucket["blocked_until"], now + delay)
+        _store(db, provider, bucket, now)
+    return delay
+
+
+async def backoff_async(provider: str, error: Exception, attempt: int) -> float | None:
+    """`backoff` in a worker thread, for callers on the event loop."""
+    return await asyncio.to_thread(backoff, provider, error, attempt)
@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import src.common.executor as executor
+import src.common.pipelines as pipelines
+
+
+###############################################################################
+# Result Cache
+#
+# Users re-upload the same drawing or BOQ many times while iterating in the
+# frontend. Every parse costs seconds of Camelot / Voronoi work plus Mistral
+# calls, although the output for identical input is the same.
+#
+# Parsed `Response` payloads are stored on disk, keyed by
+#     SHA-256(upload) + parser + variant + LLM model + pipelines.PARSER_VERSION
+# so a changed model or parser version never serves stale results.
+#
+#   - SQLite table in RESULT_CACHE_DIR/results.db (shared by all workers)
+#   - entries expire after RESULT_CACHE_TTL seconds
+#   - least recently used entries are evicted once the stored payloads exceed
+#     RESULT_CACHE_MAX_BYTES
+#   - only successful extractions are cached
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") == "1"
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "cache")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+# ==================== STATE ====================
+
+_db = None
+_db_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+
+# ==================== PERSISTENCE ====================
+
+def _connect() -> sqlite3.Connection:
+    """Open (and create if needed) the cache database."""
+    global _db
+    if _db is None:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        _db = sqlite3.connect(os.path.join(RESULT_CACHE_DIR, "results.db"), check_same_thread=False)
+        _db.row_factory = sqlite3.Row
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key         TEXT PRIMARY KEY,
+                value       TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        _db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+        _db.commit()
+    return _db
+
+
+def _evict(db: sqlite3.Connection):
+    """Drop expired entries, then least recently used ones until under the size limit."""
+    expired = db.execute(
+        "DELETE FROM results WHERE created_at < ?", (time.time() - RESULT_CACHE_TTL,)
+    ).rowcount
+    _counters["expirations"] += expired
+
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+    if total <= RESULT_CACHE_MAX_BYTES:
+        return
+    for row in db.execute("SELECT key, size FROM results ORDER BY accessed_at").fetchall():
+        if total <= RESULT_CACHE_MAX_BYTES:
+            break
+        db.execute("DELETE FROM results WHERE key = ?", (row["key"],))
+        total -= row["size"]
+        _counters["evictions"] += 1
+
+
+# ==================== PUBLIC API ====================
+
+def file_digest(file_path: str | bytes) -> str:
+    """SHA-256 of the upload bytes, or of a file read in 1 MiB blocks."""
+    if isinstance(file_path, (bytes, bytearray)):
+        return hashlib.sha256(file_path).hexdigest()
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_key(digest: str, parser: str, variant: str | None) -> str:
+    """
+    Build the cache key for an upload.
+
+    Args:
+        digest:  SHA-256 hex digest of the upload.
+        parser:  "gantt", "financial" or "drawing".
+        variant: ChartFormat / ContentType value, or None.
+
+    Returns:
+        str: Key combining upload, parser, variant, model and parser version.
+    """
+    parts = [digest, parser, variant or "", pipelines.model_name(parser), pipelines.PARSER_VERSION]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> dict | None:
+    """Return the cached response for `key`, or None on a miss or expired entry."""
+    now = time.time()
+    with _db_lock:
+        db = _connect()
+        row = db.execute("SELECT value, created_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _counters["misses"] += 1
+            return None
+        if row["created_at"] < now - RESULT_CACHE_TTL:
+            db.execute("DELETE FROM results WHERE key = ?", (key,))
+            db.commit()
+            _counters["expirations"] += 1
+            _counters["misses"] += 1
+            return None
+        db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        db.commit()
+        _counters["hits"] += 1
+        return json.loads(row["value"])
+
+
+def put(key: str, response: dict):
+    """Store a response and evict old entries if the cache is over its limits."""
+    value = json.dumps(response, ensure_ascii=False)
+    now = time.time()
+    with _db_lock:
+        db = _connect()
+        db.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value.encode("utf-8")), now, now),
+        )
+        _counters["stores"] += 1
+        _evict(db)
+        db.commit()
+
+
+def _lookup(parser: str, source: str | bytes, variant: str | None) -> tuple:
+    """Return (key, cached response or None) for an upload."""
+    key = make_key(file_digest(source), parser, variant)
+    return key, get(key)
+
+
+def clear():
+    """Remove all cached results."""
+    with _db_lock:
+        db = _connect()
+        db.execute("DELETE FROM results")
+        db.commit()
+
+
+def stats() -> dict:
+    """
+    Hit/miss counters (since process start) and current cache size.
+
+    Returns:
+        dict: {"enabled", "hits", "misses", "hit_rate", "stores", "evictions",
+               "expirations", "entries", "bytes", "max_bytes", "ttl_seconds"}
+    """
+    with _db_lock:
+        db = _connect()
+        entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+    lookups = _counters["hits"] + _counters["misses"]
+    return {
+        "enabled": RESULT_CACHE_ENABLED,
+        **_counters,
+        "hit_rate": _counters["hits"] / lookups if lookups else 0.0,
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": RESULT_CACHE_MAX_BYTES,
+        "ttl_seconds": RESULT_CACHE_TTL,
+    }
+
+
+async def run_parser_cached(parser: str, source: str | bytes, variant: str | None, input_format: str,
+                            backpressure: bool = True, job_id: str | None = None,
+                            priority: str = "interactive") -> tuple:
+    """
+    Drop-in replacement for `executor.run_parser(parser, pipelines.run, ...)`
+    that serves repeated uploads from the cache.
+
+    On a miss the job's memory is predicted, the parser runs in the process
+    pool and a successful result is stored.
+
+    Args:
+        parser:       "gantt", "financial" or "drawing".
+        source:       Upload bytes or path of the saved upload.
+        variant:      ChartFormat / ContentType value, or None.
+        input_format: MIME type of the upload.
+        backpressure: Passed through to executor.run_parser.
+        job_id:       Job receiving the progress events (see pipelines.run).
+        priority:     Rate limiter class of the parser's LLM calls (see pipelines.run).
+
+    Returns:
+        tuple: (result, method, is_successful, confidence)
+    """
+    # Hashing the upload, SQLite and the memory prediction (opens the PDF)
+    # all block, so they run in threads rather than on the event loop
+    key = None
+    if RESULT_CACHE_ENABLED:
+        key, cached = await asyncio.to_thread(_lookup, parser, source, variant)
+        if cached is not None:
+            return (cached["result"], cached["extraction_method"],
+                    cached["is_extraction_succesful"], cached["confident_value"])
+
+    predicted_bytes = await asyncio.to_thread(pipelines.predict_memory, parser, source, variant, input_format)
+    result, method, is_succesful, confidence = await executor.run_parser(
+        parser, pipelines.run, parser, source, variant, input_format, backpressure=backpressure,
+        predicted_bytes=predicted_bytes, job_id=job_id, priority=priority,
+    )
+    if key is not None and is_succesful:
+        await asyncio.to_thread(put, key, {
+            "is_extraction_succesful": is_succesful,
+            "confident_value": confidence,
+            "extraction_method": method,
+            "result": result,
+        })
+    return result, method, is_succesful, confidence
@@ -0,0 +1,351 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import src.common.metrics as metrics
+
+
+###############################################################################
+# Retrieval-Scoped Context for /ask_ai
+#
+# ask_ai used to paste json.dumps(document_data, indent=2) of the whole
+# parsed document into every prompt: tens of thousands of tokens for a large
+# BOQ, slow answers, and failures beyond the context window.
+#
+# Parsed results are now split into addressable chunks
+#   BOQ          one chunk per item (with its section title), plus the
+#                section-level fields
+#   Gantt        one chunk per task
+#   rooms        one chunk per room and its neighbours
+#   title block  one chunk per field group (projectInfo, planMetadata, ...)
+# (generic rule: the smallest objects of scalar fields, list elements, with
+# the titles of their ancestors as context), indexed with BM25 (local, no
+# network). A question gets
+#   - a compact schema summary of the whole document (keys, list lengths,
+#     item fields), so counting / structure questions keep their context
+#   - the top ASK_AI_TOP_K chunks within ASK_AI_CONTEXT_TOKENS, in document
+#     order, each with its path (e.g. Sections[3].Items[12])
+# Documents below ASK_AI_FULL_DOCUMENT_TOKENS are still sent whole.
+#
+# Indexes of recently asked-about documents are kept in memory (keyed by the
+# document's hash), since follow-up questions resend the same document.
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Chunks sent per question, and their token budget (~4 characters per token)
+TOP_K = int(os.getenv("ASK_AI_TOP_K", "12"))
+CONTEXT_TOKENS = int(os.getenv("ASK_AI_CONTEXT_TOKENS", "3000"))
+
+# Documents up to this size are sent whole (no retrieval)
+FULL_DOCUMENT_TOKENS = int(os.getenv("ASK_AI_FULL_DOCUMENT_TOKENS", "2000"))
+
+# Objects above this size are split into one chunk per field
+MAX_CHUNK_TOKENS = 200
+
+# Indexes kept in memory
+INDEX_CACHE_SIZE = 32
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+# Keys whose value names the object they belong to; carried as context
+# into the chunks below it
+TITLE_KEYS = ("Section Title", "Subsection Title", "section_name", "task", "name", "title")
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens of a text, ~4 characters per token (as in src/common/rate_limit.py)."""
+    return len(text) // 4 + 1
+
+
+# ==================== CHUNKING ====================
+
+class Chunk:
+    """
+    Addressable piece of a parsed document.
+
+    Attributes:
+        path (str):    Location in the document, e.g. "Sections[3].Items[12]".
+        context (str): Titles of the enclosing objects, e.g. "2.5 Excavating".
+        text (str):    Compact JSON of the piece.
+        tokens (int):  Estimated tokens of the rendered chunk.
+    """
+
+    def __init__(self, path: str, context: str, value):
+        self.path = path or "$"
+        self.context = context
+        self.text = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+        self.tokens = estimate_tokens(self.render())
+
+    def render(self) -> str:
+        prefix = f"{self.path}" + (f" ({self.context})" if self.context else "")
+        return f"{prefix}: {self.text}"
+
+
+def _is_scalar(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _title(value: dict) -> str | None:
+    for key in TITLE_KEYS:
+        if isinstance(value.get(key), str) and value[key].strip():
+            return value[key].strip()
+    return None
+
+
+def chunk_document(document, path: str = "", context: tuple = ()) -> list[Chunk]:
+    """
+    Split a parsed document into chunks.
+
+    Objects of scalar fields become one chunk; the scalar fields of an object
+    that also holds lists / objects (e.g. a BOQ section's title and subtotal)
+    become one chunk and its children are chunked recursively. Lists of
+    scalars (e.g. a room's neighbours) stay with their key; objects larger
+    than MAX_CHUNK_TOKENS are split into one chunk per field.
+
+    Args:
+        document: Parsed result (dict / list from a parser).
+        path:     Path of `document` in the whole document.
+        context:  Titles of the enclosing objects.
+
+    Returns:
+        list[Chunk]: Chunks in document order.
+    """
+    if isinstance(document, list):
+        if all(_is_scalar(item) for item in document):
+            return [Chunk(path, " / ".join(context), document)]
+        chunks = []
+        for index, item in enumerate(document):
+            chunks.extend(chunk_document(item, f"{path}[{index}]", context))
+        return chunks
+
+    if isinstance(document, dict):
+        leaves = {
+            key: value for key, value in document.items()
+            if _is_scalar(value) or (isinstance(value, list) and all(_is_scalar(item) for item in value))
+        }
+        nested = {key: value for key, value in document.items() if key not in leaves}
+        title = _title(document)
+        child_context = context + (title,) if title else context
+        chunks = []
+        if leaves:
+            whole = Chunk(path, " / ".join(context), leaves)
+            if whole.tokens <= MAX_CHUNK_TOKENS or len(leaves) == 1:
+                chunks.append(whole)
+            else:
+                # Large maps (e.g. room → neighbours) get one chunk per entry
+                chunks.extend(
+                    Chunk(f"{path}.{key}" if path else str(key), " / ".join(context), {key: value})
+                    for key, value in leaves.items()
+                )
+        for key, value in nested.items():
+            chunks.extend(chunk_document(value, f"{path}.{key}" if path else str(key), child_context))
+        return chunks
+
+    return [Chunk(path, " / ".join(context), document)]
+
+
+def schema_summary(value, depth: int = 0, max_depth: int = 4) -> str:
+    """
+    Compact structure of a document: keys, list lengths and item fields.
+
+    Example:
+        {Sections: list[12] of {Section Title, Items: list[5..40] of {Item Number,
+        Item Description, Unit, Quantity, Rate, Amount, Currency}}, confidence: 0.85}
+    """
+    if isinstance(value, dict):
+        if depth >= max_depth:
+            return "{...}"
+        if len(value) > 20 and all(isinstance(item, list) for item in value.values()):
+            # Map of names (e.g. room → neighbours): show the size, not every key
+            return f"map[{len(value)}] of name → list"
+        parts = []
+        for key, item in value.items():
+            if _is_scalar(item):
+                parts.append(f"{key}: {json.dumps(item, ensure_ascii=False)}" if key == "confidence" else str(key))
+            else:
+                parts.append(f"{key}: {schema_summary(item, depth + 1, max_depth)}")
+        return "{" + ", ".join(parts) + "}"
+    if isinstance(value, list):
+        if not value:
+            return "list[0]"
+        if all(_is_scalar(item) for item in value):
+            return f"list[{len(value)}] of values"
+        # Describe the elements by the union of their keys
+        keys, lengths = {}, {}
+        for item in value:
+            if isinstance(item, dict):
+                for key, child in item.items():
+                    keys.setdefault(key, child)
+                    if isinstance(child, list):
+                        lengths.setdefault(key, []).append(len(child))
+        if not keys:
+            return f"list[{len(value)}]"
+        parts = []
+        for key, child in keys.items():
+            if _is_scalar(child):
+                parts.append(str(key))
+            elif key in lengths and min(lengths[key]) != max(lengths[key]):
+                inner = schema_summary(child, depth + 1, max_depth).split(" of ", 1)[-1]
+                parts.append(f"{key}: list[{min(lengths[key])}..{max(lengths[key])}] of {inner}")
+            else:
+                parts.append(f"{key}: {schema_summary(child, depth + 1, max_depth)}")
+        return f"list[{len(value)}] of {{" + ", ".join(parts) + "}"
+    return type(value).__name__
+
+
+# ==================== BM25 INDEX ====================
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens; numbers like 2.5.1 also yield their parts."""
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1 or token.isdigit()]
+
+
+class Index:
+    """
+    BM25 index over the chunks of one document.
+
+    Attributes:
+        chunks (list[Chunk]): Chunks in document order.
+        schema (str):         Schema summary of the document.
+        document_tokens (int): Estimated tokens of the whole document as
+                               previously sent (indented JSON).
+    """
+
+    def __init__(self, document):
+        self.chunks = chunk_document(document)
+        self.schema = schema_summary(document)
+        self.document_tokens = estimate_tokens(json.dumps(document, indent=2, default=str))
+        self.terms = []
+        self.frequencies = Counter()
+        for chunk in self.chunks:
+            terms = Counter(tokenize(f"{chunk.path} {chunk.context} {chunk.text}"))
+            self.terms.append(terms)
+            self.frequencies.update(terms.keys())
+        lengths = [sum(terms.values()) for terms in self.terms]
+        self.average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        self.lengths = lengths
+
+    def scores(self, question: str) -> list[float]:
+        """BM25 score of every chunk for `question`."""
+        query = set(tokenize(question))
+        count = len(self.chunks)
+        scores = []
+        for terms, length in zip(self.terms, self.lengths):
+            score = 0.0
+            for term in query:
+                frequency = terms.get(term)
+                if not frequency:
+                    continue
+                documents = self.frequencies[term]
+                idf = math.log(1 + (count - documents + 0.5) / (documents + 0.5))
+                norm = frequency + K1 * (1 - B + B * length / (self.average_length or 1))
+                score += idf * frequency * (K1 + 1) / norm
+            scores.append(score)
+        return scores
+
+    def search(self, question: str, top_k: int = TOP_K, max_tokens: int = CONTEXT_TOKENS) -> list[Chunk]:
+        """
+        Best chunks for `question` within `top_k` and `max_tokens`, in document order.
+
+        Without any lexical match the first chunks of the document are used.
+        """
+        scores = self.scores(question)
+        ranked = sorted(range(len(self.chunks)), key=lambda i: (-scores[i], i))
+        matched = any(score > 0 for score in scores)
+        if not matched:
+            ranked = list(range(len(self.chunks)))
+        selected, tokens = [], 0
+        for index in ranked:
+            if len(selected) >= top_k or (matched and scores[index] <= 0):
+                break
+            chunk = self.chunks[index]
+            if selected and tokens + chunk.tokens > max_tokens:
+                continue
+            selected.append(index)
+            tokens += chunk.tokens
+        return [self.chunks[index] for index in sorted(selected)]
+
+
+_indexes = OrderedDict()  # document hash → Index
+_lock = threading.Lock()
+
+
+def get_index(document, key: str | None = None) -> Index:
+    """
+    Index of `document`, built on first use and kept for follow-up questions.
+
+    Args:
+        document: Parsed document data.
+        key:      SHA-256 of the document's sorted-key JSON, if already known
+                  (document sessions, src/common/sessions.py).
+    """
+    key = key or hashlib.sha256(
+        json.dumps(document, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = Index(document)
+    with _lock:
+        _indexes[key] = index
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+# ==================== CONTEXT ====================
+
+def build_context(document, question: str, key: str | None = None) -> tuple[str, dict]:
+    """
+    Document context of an /ask_ai prompt.
+
+    Args:
+        document: Parsed document data sent by the client.
+        question: User question (for follow-ups, with the previous question).
+        key:      Document hash, see `get_index`.
+
+    Returns:
+        tuple: (context text, stats) where stats is
+               {"mode": "full" | "retrieval", "chunks_total", "chunks_sent",
+                "document_tokens", "context_tokens", "token_reduction"}
+    """
+    index = get_index(document, key)
+    if index.document_tokens <= FULL_DOCUMENT_TOKENS:
+        text = "Parsed construction document data in JSON format:\n" + json.dumps(document, indent=2, default=str)
+        mode, sent = "full", len(index.chunks)
+    else:
+        chunks = index.search(question)
+        text = (
+            "Document overview (structure, list lengths and field names):\n"
+            f"{index.schema}\n\n"
+            f"Excerpts of the parsed construction document relevant to the question "
+            f"({len(chunks)} of {len(index.chunks)} parts, each with its path in the document):\n"
+            + "\n".join(chunk.render() for chunk in chunks)
+        )
+        mode, sent = "retrieval", len(chunks)
+
+    context_tokens = estimate_tokens(text)
+    stats = {
+        "mode": mode,
+        "chunks_total": len(index.chunks),
+        "chunks_sent": sent,
+        "document_tokens": index.document_tokens,
+        "context_tokens": context_tokens,
+        "token_reduction": round(1 - context_tokens / index.document_tokens, 3) if mode == "retrieval" else 0.0,
+    }
+    metrics.inc("ask_ai_context_tokens_total", index.document_tokens, kind="document")
+    metrics.inc("ask_ai_context_tokens_total", context_tokens, kind="sent")
+    return text, stats
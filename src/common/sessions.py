@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import src.common.retrieval as retrieval
+
+
+###############################################################################
+# /ask_ai Document Sessions
+#
+# The frontend re-posted the whole parsed document with every /ask_ai
+# question, so upload size grew with the document and a conversation had no
+# memory of earlier questions. Clients now register a parsed document once
+# (POST /ask_ai/sessions) and ask follow-up questions by its doc_id.
+#
+#   - Sessions (the document and its hash) and their question / answer turns
+#     live in a SQLite table (SESSION_STORE_DIR/sessions.db, next to the job
+#     store), so they survive a restart and are shared by API workers
+#   - Only the last SESSION_HISTORY_TURNS turns are kept, and the history
+#     sent with a question is cut to SESSION_HISTORY_TOKENS (newest first),
+#     so prompts stay bounded however long the conversation runs
+#   - Sessions unused for SESSION_TTL_SECONDS are deleted
+#
+# The document hash doubles as the key of the retrieval index
+# (src/common/retrieval.py); the index is built when the session is created,
+# so the first question does not wait for it.
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Same directory as the job store (src/common/jobs.py)
+SESSION_STORE_DIR = os.getenv("SESSION_STORE_DIR", os.getenv("JOB_STORE_DIR", "jobs"))
+
+# Sessions not used for this long are deleted
+SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600)))
+
+# Question / answer turns kept per session, and their token budget per prompt
+SESSION_HISTORY_TURNS = int(os.getenv("SESSION_HISTORY_TURNS", "6"))
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "1500"))
+
+
+# ==================== STATE ====================
+
+_db = None
+_db_lock = threading.Lock()
+
+
+# ==================== PERSISTENCE ====================
+
+def _connect() -> sqlite3.Connection:
+    """Open (and create if needed) the session database."""
+    global _db
+    if _db is None:
+        os.makedirs(SESSION_STORE_DIR, exist_ok=True)
+        _db = sqlite3.connect(os.path.join(SESSION_STORE_DIR, "sessions.db"), check_same_thread=False, timeout=10)
+        _db.row_factory = sqlite3.Row
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id            TEXT PRIMARY KEY,
+                document      TEXT NOT NULL,
+                document_hash TEXT NOT NULL,
+                tokens        INTEGER NOT NULL,
+                chunks        INTEGER NOT NULL,
+                source        TEXT,
+                created_at    REAL NOT NULL,
+                used_at       REAL NOT NULL
+            )
+            """
+        )
+        _db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS turns (
+                id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id  TEXT NOT NULL,
+                question    TEXT NOT NULL,
+                answer      TEXT NOT NULL,
+                created_at  REAL NOT NULL
+            )
+            """
+        )
+        _db.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, id)")
+        _db.commit()
+    return _db
+
+
+def _execute(sql: str, params: tuple = ()) -> list:
+    """Run a statement under the module lock and return all rows."""
+    with _db_lock:
+        db = _connect()
+        rows = db.execute(sql, params).fetchall()
+        db.commit()
+        return rows
+
+
+def _expire():
+    """Delete sessions (and their turns) unused for SESSION_TTL seconds."""
+    cutoff = time.time() - SESSION_TTL
+    _execute("DELETE FROM turns WHERE session_id IN (SELECT id FROM sessions WHERE used_at < ?)", (cutoff,))
+    _execute("DELETE FROM sessions WHERE used_at < ?", (cutoff,))
+
+
+# ==================== PUBLIC API ====================
+
+def create(document, source: str | None = None) -> dict:
+    """
+    Register a parsed document, build its retrieval index and return its session.
+
+    Args:
+        document: Parsed result (dict / list from a parser).
+        source:   Where the document came from (e.g. "job:<id>"), informational.
+
+    Returns:
+        dict: Session record (see `get`).
+    """
+    _expire()
+    text = json.dumps(document, ensure_ascii=False, default=str)
+    document_hash = hashlib.sha256(
+        json.dumps(document, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+    index = retrieval.get_index(document, document_hash)
+    doc_id = uuid.uuid4().hex
+    now = time.time()
+    _execute(
+        "INSERT INTO sessions (id, document, document_hash, tokens, chunks, source, created_at, used_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (doc_id, text, document_hash, index.document_tokens, len(index.chunks), source, now, now),
+    )
+    return get(doc_id)
+
+
+def get(doc_id: str) -> dict | None:
+    """
+    Return a session's record, or None if it does not exist (or expired).
+
+    Returns:
+        dict: {"doc_id", "source", "created_at", "used_at", "document_tokens",
+               "chunks", "turns"} where "turns" lists the kept
+              {"question", "answer", "created_at"}.
+    """
+    rows = _execute(
+        "SELECT id, source, created_at, used_at, tokens, chunks FROM sessions WHERE id = ?", (doc_id,)
+    )
+    if not rows:
+        return None
+    row = rows[0]
+    turns = _execute("SELECT question, answer, created_at FROM turns WHERE session_id = ? ORDER BY id", (doc_id,))
+    return {
+        "doc_id": row["id"],
+        "source": row["source"],
+        "created_at": row["created_at"],
+        "used_at": row["used_at"],
+        "document_tokens": row["tokens"],
+        "chunks": row["chunks"],
+        "turns": [dict(turn) for turn in turns],
+    }
+
+
+def load(doc_id: str) -> tuple | None:
+    """
+    Return (document, document hash) of a session and mark it as used.
+
+    Returns:
+        tuple | None: None if the session does not exist.
+    """
+    rows = _execute("SELECT document, document_hash FROM sessions WHERE id = ?", (doc_id,))
+    if not rows:
+        return None
+    _execute("UPDATE sessions SET used_at = ? WHERE id = ?", (time.time(), doc_id))
+    return json.loads(rows[0]["document"]), rows[0]["document_hash"]
+
+
+def history(doc_id: str) -> list[dict]:
+    """
+    Recent turns of a session that fit SESSION_HISTORY_TOKENS, oldest first.
+
+    Returns:
+        list[dict]: {"question", "answer"} per turn.
+    """
+    rows = _execute(
+        "SELECT question, answer FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+        (doc_id, SESSION_HISTORY_TURNS),
+    )
+    turns, tokens = [], 0
+    for row in rows:
+        cost = retrieval.estimate_tokens(row["question"] + row["answer"])
+        if turns and tokens + cost > SESSION_HISTORY_TOKENS:
+            break
+        turns.append({"question": row["question"], "answer": row["answer"]})
+        tokens += cost
+    return turns[::-1]
+
+
+def add_turn(doc_id: str, question: str, answer: str):
+    """Append a question / answer turn and drop turns beyond SESSION_HISTORY_TURNS."""
+    _execute(
+        "INSERT INTO turns (session_id, question, answer, created_at) VALUES (?, ?, ?, ?)",
+        (doc_id, question, answer, time.time()),
+    )
+    _execute(
+        "DELETE FROM turns WHERE session_id = ? AND id NOT IN "
+        "(SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+        (doc_id, doc_id, SESSION_HISTORY_TURNS),
+    )
+
+
+def delete(doc_id: str) -> bool:
+    """Delete a session and its turns; False if it did not exist."""
+    if not _execute("SELECT id FROM sessions WHERE id = ?", (doc_id,)):
+        return False
+    _execute("DELETE FROM turns WHERE session_id = ?", (doc_id,))
+    _execute("DELETE FROM sessions WHERE id = ?", (doc_id,))
+    return True
@@ -0,0 +1,240 @@
+import math
+import os
+
+import numpy as np
+from PIL import Image
+
+import src.common.image_encoder as image_encoder
+
+
+###############################################################################
+# Content-Aware Page Tiler
+#
+# Oversized Gantt charts and floor plans are sent to the vision model in
+# pieces. The chunkers used to render the whole page at 300 DPI, crop fixed
+# quarters (or quadrants) out of it with a 10 % overlap, and hand the list
+# over once every chunk existed. Cuts went straight through table rows and
+# room labels, and a 300 DPI A0 raster was held for the whole fan-out.
+#
+# `tiles` yields the pieces one at a time instead:
+#   - tile count: the fewest tiles that keep text at TILE_MIN_DPI or more
+#     within the model's pixel limits (image_encoder.MAX_DIMENSION /
+#     MAX_PIXELS), at most TILE_MAX_COUNT; "rows" mode (Gantt charts) keeps
+#     full-width strips so every strip stays aligned with the timeline
+#   - boundaries: each cut may move TILE_SNAP of a tile's extent away from
+#     the even split, to the position crossing the least content; words of
+#     the vector text layer cost TEXT_WEIGHT, drawing operations (walls,
+#     bars, grid lines) 1, page-sized frames nothing. Cuts land between
+#     text rows and along walls rather than through them
+#   - rendering: every tile is rendered directly from the page with
+#     get_pixmap(clip=...) at the DPI that fits the model limits (at most
+#     image_encoder.MAX_RENDER_DPI), so no full-page raster exists and the
+#     encoder has nothing left to scale down
+#   - a header (the Gantt timeline) can be stacked on top of every tile
+#
+# Used as a generator by fanout.map_chunks, which renders the next tile only
+# when a slot is free, so at most FANOUT_CONCURRENCY tiles are in memory.
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Lowest resolution at which text must stay readable inside a tile
+TILE_MIN_DPI = int(os.getenv("TILE_MIN_DPI", "150"))
+
+# Upper bound on the number of tiles per page (each tile is one LLM call)
+TILE_MAX_COUNT = int(os.getenv("TILE_MAX_COUNT", "8"))
+
+# Share of a tile's extent a cut may move to avoid content
+TILE_SNAP = float(os.getenv("TILE_SNAP", "0.25"))
+
+# Overlap added on each inner edge, as a share of the page extent
+TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", "0.02"))
+
+# Cost of cutting through a word relative to cutting through a line
+TEXT_WEIGHT = 10
+
+# Drawing operations spanning more than this share of the page (frames,
+# borders, backgrounds) do not count as content
+FRAME_SHARE = 0.5
+
+
+# ==================== TILE COUNT ====================
+
+def tile_counts(width: float, height: float, rows_only: bool = False, header: float = 0.0) -> tuple[int, int]:
+    """
+    Number of tile columns and rows for an area of `width` × `height` points.
+
+    Args:
+        width, height: Area to tile, in PDF points.
+        rows_only:     Full-width strips (one column).
+        header:        Height in points stacked on top of every tile.
+
+    Returns:
+        tuple: (columns, rows)
+    """
+    scale = TILE_MIN_DPI / 72
+    w, h, head = width * scale, height * scale, header * scale
+    if rows_only:
+        # Strips keep the full width; the encoder scales them to MAX_DIMENSION wide
+        r = min(1.0, image_encoder.MAX_DIMENSION / w)
+        limit = min(image_encoder.MAX_DIMENSION, image_encoder.MAX_PIXELS / (w * r))
+        available = max(limit - head * r, limit / 4)
+        columns, rows = 1, max(1, math.ceil(h * r / available))
+    else:
+        columns = max(1, math.ceil(w / image_encoder.MAX_DIMENSION))
+        rows = max(1, math.ceil(h / image_encoder.MAX_DIMENSION))
+        while (w / columns) * (h / rows) > image_encoder.MAX_PIXELS:
+            if w / columns >= h / rows:
+                columns += 1
+            else:
+                rows += 1
+    # Cap the LLM calls; tiles are then rendered below TILE_MIN_DPI
+    while columns * rows > TILE_MAX_COUNT:
+        if rows >= columns and rows > 1:
+            rows -= 1
+        else:
+            columns -= 1
+    return columns, rows
+
+
+# ==================== CONTENT-AWARE CUTS ====================
+
+def cost_profile(document, page: int, axis: int) -> np.ndarray:
+    """
+    Cost of a cut at every point along one axis of the page.
+
+    Args:
+        document: DocumentContext of the PDF.
+        page:     Zero-based page index.
+        axis:     0 for vertical cuts (x positions), 1 for horizontal cuts (y positions).
+
+    Returns:
+        np.ndarray: Cost per point from the page origin (words and drawing
+                    operations whose extent strictly contains the position).
+    """
+    rect = document.page(page).rect
+    origin = rect.x0 if axis == 0 else rect.y0
+    extent = rect.width if axis == 0 else rect.height
+    size = int(math.ceil(extent)) + 2
+    delta = np.zeros(size + 1)
+
+    def add(low: float, high: float, weight: float):
+        start = max(0, int(math.floor(low - origin)) + 1)
+        end = min(size, int(math.ceil(high - origin)))
+        if start < end:
+            delta[start] += weight
+            delta[end] -= weight
+
+    for word in document.words(page):
+        add(word[axis], word[axis + 2], TEXT_WEIGHT)
+    for kind, box in document.bboxes(page):
+        if kind.endswith("text"):
+            continue  # already counted as words
+        low, high = box[axis], box[axis + 2]
+        if high - low < extent * FRAME_SHARE:
+            add(low, high, 1)
+    return np.cumsum(delta)[:size]
+
+
+def snap(profile: np.ndarray, origin: float, nominal: float, window: float) -> float:
+    """
+    Move a cut to the cheapest position within `window` points of `nominal`.
+
+    Ties go to the position closest to the even split.
+    """
+    low = max(0, int(nominal - origin - window))
+    high = min(len(profile) - 1, int(nominal - origin + window))
+    if high <= low:
+        return nominal
+    positions = np.arange(low, high + 1)
+    distance = np.abs(positions - (nominal - origin)) / max(window, 1.0)
+    best = positions[np.argmin(profile[low:high + 1] + 0.5 * distance)]
+    return origin + float(best)
+
+
+def cuts(profile: np.ndarray, origin: float, start: float, end: float, count: int) -> list[float]:
+    """Boundaries of `count` tiles between `start` and `end` (both included)."""
+    step = (end - start) / count
+    inner = [snap(profile, origin, start + i * step, TILE_SNAP * step) for i in range(1, count)]
+    return [start] + sorted(inner) + [end]
+
+
+# ==================== TILES ====================
+
+def plan_tiles(document, page: int = 0, rows_only: bool = False, header_ratio: float | None = None) -> tuple:
+    """
+    Choose the tile clips of a page.
+
+    Args:
+        document:     DocumentContext of the PDF.
+        page:         Zero-based page index.
+        rows_only:    Full-width strips instead of a grid.
+        header_ratio: Share of the page height (from the top) stacked on top
+                      of every tile, e.g. a Gantt timeline; its lower edge is
+                      snapped like a cut.
+
+    Returns:
+        tuple: (list of (x0, y0, x1, y1) clips in reading order, header clip or None)
+    """
+    rect = document.page(page).rect
+    x_profile = cost_profile(document, page, 0)
+    y_profile = cost_profile(document, page, 1)
+
+    header = None
+    top = rect.y0
+    if header_ratio:
+        nominal = rect.y0 + header_ratio * rect.height
+        top = snap(y_profile, rect.y0, nominal, 0.5 * header_ratio * rect.height)
+        header = (rect.x0, rect.y0, rect.x1, top)
+
+    columns, rows = tile_counts(rect.width, rect.y1 - top, rows_only, top - rect.y0)
+    xs = cuts(x_profile, rect.x0, rect.x0, rect.x1, columns)
+    ys = cuts(y_profile, rect.y0, top, rect.y1, rows)
+    x_overlap = TILE_OVERLAP * rect.width
+    y_overlap = TILE_OVERLAP * (rect.y1 - top)
+
+    clips = []
+    for row in range(rows):
+        for column in range(columns):
+            clips.append((
+                max(rect.x0, xs[column] - x_overlap) if column > 0 else xs[column],
+                max(top, ys[row] - y_overlap) if row > 0 else ys[row],
+                min(rect.x1, xs[column + 1] + x_overlap) if column < columns - 1 else xs[column + 1],
+                min(rect.y1, ys[row + 1] + y_overlap) if row < rows - 1 else ys[row + 1],
+            ))
+    return clips, header
+
+
+def tile_dpi(width: float, height: float) -> int:
+    """Highest DPI (≤ MAX_RENDER_DPI) at which a `width` × `height` point area fits the model limits."""
+    return image_encoder.fitted_dpi(width, height)
+
+
+def tiles(document, page: int = 0, rows_only: bool = False, header_ratio: float | None = None):
+    """
+    Render the tiles of a page one at a time (see module header).
+
+    Args:
+        document:     DocumentContext of the PDF.
+        page:         Zero-based page index.
+        rows_only:    Full-width strips (Gantt charts) instead of a grid.
+        header_ratio: Share of the page height repeated on top of every tile.
+
+    Yields:
+        PIL.Image.Image: RGB tile; the consumer closes it when done
+        (fanout.close_image).
+    """
+    clips, header = plan_tiles(document, page, rows_only, header_ratio)
+    header_height = header[3] - header[1] if header else 0
+    headers = {}  # DPI → header raster, held only while the tiles are produced
+    for clip in clips:
+        width, height = clip[2] - clip[0], clip[3] - clip[1]
+        dpi = tile_dpi(width, height + header_height)
+        body = document.render(page, dpi, clip, keep=False)
+        if header is not None:
+            # Same DPI as the body, shared by tiles of equal size
+            if dpi not in headers:
+                headers[dpi] = document.render(page, dpi, header, keep=False)
+            body = np.vstack([headers[dpi], body])
+        yield Image.fromarray(body)
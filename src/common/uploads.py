@@ -0,0 +1,269 @@
+import asyncio
+import io
+import os
+import uuid
+
+import pymupdf
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+try:
+    import magic
+except ImportError:  # libmagic missing: fall back to the signature check below
+    magic = None
+
+
+###############################################################################
+# Upload Ingestion and Preflight
+#
+# Handlers used to `await file.read()` the whole upload, trust the client's
+# Content-Type and only find out inside the worker that a PDF was encrypted,
+# broken or 400 pages long. Under concurrent A0 uploads that costs worker
+# memory for documents that were never going to parse.
+#
+# `ingest` is called before any expensive stage:
+#   1. reject by declared size (UploadFile.size / Content-Length)
+#   2. read the first block and sniff the real type with python-magic
+#   3. validate the type for the parser / variant
+#   4. read the spooled upload (Starlette keeps it on disk past 1 MB) into
+#      one buffer; without a declared size it is measured block by block
+#      first, aborting once UPLOAD_MAX_BYTES is passed
+#   5. preflight: pymupdf metadata + page count for PDFs, header-only image
+#      size check for images
+#   6. normalise images to RGB JPEG (skipped if already a plain JPEG)
+# Steps 5 and 6 run in a worker thread.
+#
+# Starlette parses the whole multipart body before a handler runs, so checks
+# that must happen before the body is read (Content-Length, endpoint queue)
+# live in the middleware of main.py.
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Largest accepted upload (bytes)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Largest accepted request body, checked from Content-Length before the
+# multipart body is parsed (batch requests carry several uploads)
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(4 * UPLOAD_MAX_BYTES)))
+
+# PDFs with more pages are rejected
+UPLOAD_MAX_PAGES = int(os.getenv("UPLOAD_MAX_PAGES", "30"))
+
+# Images with more pixels are rejected (an A0 sheet scanned at 300 DPI is ~140 MP)
+UPLOAD_MAX_IMAGE_PIXELS = int(os.getenv("UPLOAD_MAX_IMAGE_PIXELS", str(150_000_000)))
+
+# Block size for reading uploads
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+# ==================== VALIDATION ====================
+
+def check_input_format(parser: str, variant: str | None, mime_type: str | None):
+    """
+    Validate the upload's MIME type for a parser and extraction variant.
+
+    Shared by the synchronous parser endpoints and the job API.
+
+    Args:
+        parser (str): "gantt", "financial" or "drawing"
+        variant (str | None): ChartFormat / ContentType value, None for financial
+        mime_type (str | None): Sniffed (or client-reported) MIME type
+
+    Raises:
+        HTTPException 400: If the file type is not accepted
+    """
+    mime_type = mime_type or ""
+    is_pdf = mime_type == 'application/pdf'
+    is_image = mime_type.startswith('image/')
+
+    if parser == "gantt":
+        if not is_pdf:
+            raise HTTPException(status_code=400, detail="File must be a PDF")
+
+    elif parser == "financial":
+        if not (is_pdf or is_image):
+            raise HTTPException(status_code=400, detail="File must be a PDF or image")
+
+    # rooms-deterministic and full-plan-ai require PDF (need text layer)
+    elif variant in ["rooms-deterministic", "full-plan-ai"]:
+        if not is_pdf:
+            raise HTTPException(
+                status_code=400,
+                detail="Deterministic or Hybrid plan parsing requires PDF file"
+            )
+
+    # titleblock-hybrid accepts both image and PDF
+    # PDF will be converted to image for OCR processing
+    elif variant == "titleblock-hybrid":
+        if not (is_image or is_pdf):
+            raise HTTPException(
+                status_code=400,
+                detail="Titleblock Hybrid parsing requires Image or PDF file"
+            )
+
+    # rooms-ai accepts both (AI vision works with images directly)
+    elif variant == "rooms-ai":
+        if not (is_image or is_pdf):
+            raise HTTPException(status_code=400, detail="File must be an image or PDF")
+
+    # Fallback: images only (future content types)
+    elif not is_image:
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+
+def sniff_mime_type(head: bytes, declared: str | None) -> str:
+    """
+    Determine the real MIME type from the first bytes of an upload.
+
+    Uses python-magic when libmagic is available, otherwise the PDF / JPEG /
+    PNG signatures. Falls back to the client's Content-Type if the content
+    is not recognised.
+    """
+    if magic is not None:
+        sniffed = magic.from_buffer(head, mime=True)
+        if sniffed and sniffed not in ("application/octet-stream", "text/plain"):
+            return sniffed
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    return declared or "application/octet-stream"
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=detail)
+
+
+def preflight(content: bytes, mime_type: str):
+    """
+    Cheap structural checks before any parser runs.
+
+    PDFs are opened with pymupdf (no rendering) to reject malformed,
+    encrypted, empty or too-long documents. Images are checked from their
+    header only (no decoding) against UPLOAD_MAX_IMAGE_PIXELS.
+
+    Raises:
+        HTTPException 400: Malformed or encrypted file
+        HTTPException 413: Too many pages or pixels
+    """
+    if mime_type == "application/pdf":
+        try:
+            doc = pymupdf.open(stream=content, filetype="pdf")
+        except Exception:
+            raise HTTPException(status_code=400, detail="Malformed PDF: file could not be opened")
+        try:
+            if doc.needs_pass or doc.is_encrypted:
+                raise HTTPException(status_code=400, detail="Encrypted PDFs are not supported")
+            if doc.page_count == 0:
+                raise HTTPException(status_code=400, detail="Malformed PDF: document has no pages")
+            if doc.page_count > UPLOAD_MAX_PAGES:
+                raise _too_large(f"PDF has {doc.page_count} pages, at most {UPLOAD_MAX_PAGES} are accepted")
+        finally:
+            doc.close()
+        return
+
+    try:
+        with Image.open(io.BytesIO(content)) as im:
+            width, height = im.size
+    except Exception:
+        raise HTTPException(status_code=400, detail="Malformed image: file could not be opened")
+    if width * height > UPLOAD_MAX_IMAGE_PIXELS:
+        raise _too_large(f"Image has {width}x{height} pixels, at most {UPLOAD_MAX_IMAGE_PIXELS} are accepted")
+
+
+def normalize_image(content: bytes, mime_type: str) -> bytes:
+    """
+    Re-encode an image as RGB JPEG, which the OCR and vision pipelines expect.
+
+    Plain RGB / grayscale JPEGs are passed through without decoding.
+    """
+    with Image.open(io.BytesIO(content)) as im:
+        if mime_type == "image/jpeg" and im.mode in ("RGB", "L"):
+            return content
+        # Convert RGBA (transparency) and P (palette) to RGB
+        # Required for JPEG format compatibility
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        buffer = io.BytesIO()
+        im.save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+# ==================== INGESTION ====================
+
+async def ingest(file: UploadFile, parser: str, variant: str | None) -> tuple[bytes, str]:
+    """
+    Read, validate and preflight an upload.
+
+    Args:
+        file (UploadFile): The upload
+        parser (str): "gantt", "financial" or "drawing"
+        variant (str | None): ChartFormat / ContentType value
+
+    Returns:
+        tuple: (content, mime_type) — PDF bytes as uploaded or JPEG bytes for
+               images, and the sniffed MIME type of the original upload
+
+    Raises:
+        HTTPException 400: Wrong, malformed or encrypted file
+        HTTPException 413: File too large (bytes, pages or pixels)
+    """
+    if file.size is not None and file.size > UPLOAD_MAX_BYTES:
+        raise _too_large(f"File exceeds the upload limit of {UPLOAD_MAX_BYTES} bytes")
+
+    head = await file.read(READ_BLOCK_SIZE)
+    mime_type = sniff_mime_type(head, file.content_type)
+    check_input_format(parser, variant, mime_type)
+
+    if file.size is None:
+        # Size unknown: measure the spooled upload block by block (nothing is kept)
+        size = len(head)
+        while block := await file.read(READ_BLOCK_SIZE):
+            size += len(block)
+            if size > UPLOAD_MAX_BYTES:
+                raise _too_large(f"File exceeds the upload limit of {UPLOAD_MAX_BYTES} bytes")
+    del head
+
+    # One read of the spooled upload into a single buffer (no intermediate copy)
+    await file.seek(0)
+    content = await file.read()
+    if len(content) > UPLOAD_MAX_BYTES:
+        raise _too_large(f"File exceeds the upload limit of {UPLOAD_MAX_BYTES} bytes")
+
+    # pymupdf open and PIL re-encode are CPU work: keep them off the event loop
+    await asyncio.to_thread(preflight, content, mime_type)
+    if mime_type.startswith("image/"):
+        content = await asyncio.to_thread(normalize_image, content, mime_type)
+    return content, mime_type
+
+
+def save_upload(content: bytes, mime_type: str, upload_dir: str) -> str:
+    """
+    Save ingested upload bytes under a unique name (job API only; the
+    synchronous endpoints keep uploads in memory).
+
+    The extension follows the content, not the client's file name, since
+    later stages (documents.is_pdf, mistralConnection.get_file_type) read the
+    type from it.
+
+    Args:
+        content (bytes): Bytes returned by `ingest`
+        mime_type (str): Sniffed MIME type returned by `ingest`
+        upload_dir (str): Target directory
+
+    Returns:
+        str: Path of the saved file
+    """
+    # Generate unique filename using UUID to prevent collisions
+    # Important for concurrent requests
+    os.makedirs(upload_dir, exist_ok=True)
+    # `ingest` re-encodes every image as JPEG
+    file_extension = ".pdf" if mime_type == "application/pdf" else ".jpg"
+    file_path = os.path.join(upload_dir, f"{uuid.uuid4()}{file_extension}")
+    with open(file_path, 'wb') as f:
+        f.write(content)
+    return file_path
@@ -1,4 +1,3 @@
-import camelot
 import json
 import re
 from pydantic import BaseModel
@@ -7,6 +6,7 @@ import src.gantt2data.mistral as mistral
 import pymupdf as pymupdf
 import pdfplumber
 import src.gantt2data.ganttParserVisual as visual
+import src.common.documents as documents
 
 class Task(BaseModel):
     id: int | None = None
@@ -160,36 +160,59 @@ def create_tasks(column_order: list, df: pd.DataFrame) -> list:
     return tasks
 
 #### MAIN FUNCTION ####
-def parse_gantt_chart(path: str, chart_format: str) -> list: 
+def parse_gantt_chart(path: str, chart_format: str) -> tuple: 
     """
     Parse gantt chart (pdf format) depending on chart layout (tabular/visual).
     Tabular: chart contains table containing activities and their respective data (start,end,id, etc.), bars only for visualization
     Visual: chart contains list of activtities, timeline and bars, bars are used to inferre start and end for each activtity 
     Full Ai: complex/ large gantt charts with visual layout
+    Only the first page is parsed; multi-page charts are split into pages by
+    src/common/pages.py.
     
-    :param path: File path to the Gantt chart PDF.
-    :param chart_format: "tabular","visual", "full_ai"
-    :return: JSON string of Task objects, or an error dict if table recognition failed.
+    :param path: File path to the Gantt chart PDF, the PDF bytes, or the request's DocumentContext.
+    :param chart_format: "tabular","visual", "full ai" (or "full_ai")
+    :return: (result, method, is_successful): list of task dicts (or an error dict if
+             table recognition failed), the chart format, and whether tasks were found.
     """
+    with documents.document_context(path) as document:
+        result = _parse_gantt_chart(document, chart_format)
+    is_successful = isinstance(result, list) and len(result) > 0
+    return result, chart_format, is_successful
+
+
+def _parse_gantt_chart(path, chart_format: str):
     if chart_format== "tabular":
-        tables = camelot.read_pdf(path)
+        # Camelot (slow to import) is only loaded for tabular charts
+        import camelot
+        # Camelot needs a file path: bytes are spooled to tmpfs (once per request)
+        with path.path() as pdf_path:
+            tables = camelot.read_pdf(pdf_path)
+        if len(tables) == 0:
+            return {"Table Recognition": "failed"}
         df = tables[0].df
         processed_df, is_empty = preprocess_df(df)
         if is_empty:
             return {"Table Recognition": "failed"}
         column_order, found_matches = match_column_names_with_task_properties(processed_df)
         if found_matches < ai_fallback_treshhold:
-            with pdfplumber.open(path) as pdf:
-                print("Ai column name extraction")
-                first_page = pdf.pages[0]
-                text = first_page.extract_text()
-                column_order = json.loads(mistral.call_mistral_for_colums(text))
+            print("Ai column name extraction")
+            text = path.text(0)
+            column_order = json.loads(mistral.call_mistral_for_colums(text))
         tasks = create_tasks(column_order, processed_df)
-        json_string = json.dumps([ob.__dict__ for ob in tasks],indent=4)
-        return json_string
-    elif(chart_format == "full_ai"):
-        tasks = visual.parse_full_ai(path)
+        return [ob.__dict__ for ob in tasks]
+    elif chart_format in ("full ai", "full_ai"):
+        result = visual.parse_full_ai(path)
+        # Single-image calls answer with a JSON string, chunked ones with a list
+        if isinstance(result, str):
+            try:
+                result = json.loads(result)
+            except json.JSONDecodeError:
+                print(f"Full AI answer is not valid JSON: {result[:200]}")
+                return {"Full AI parsing": "failed"}
+        # Answers may wrap the task list in an object
+        if isinstance(result, dict) and len(result) == 1 and isinstance(next(iter(result.values())), list):
+            result = next(iter(result.values()))
+        return result
     else:
         tasks = visual.parse_gant_chart_visual(path)
-        json_string = json.dumps([ob.__dict__ for ob in tasks], indent=4)
-        return json_string
\ No newline at end of file
+        return [ob.__dict__ for ob in tasks]
@@ -6,11 +6,12 @@ import pymupdf as pymupdf
 import pdfplumber
 import pandas as pd
 from PIL import Image
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.patches import Rectangle
 import numpy as np
 import src.gantt2data.helper as helper
+import src.common.documents as documents
+import src.common.fanout as fanout
+import src.common.image_encoder as image_encoder
+import src.common.progress as progress
 from collections import Counter
 import os
 
@@ -324,6 +325,10 @@ def visualize_with_matplotlib(pdf_path, gantt_chart_bars, activities_with_loc):
     :param activities_with_loc: List of activity dicts with bounding box coordinates.
     :return: None (displays a matplotlib plot).
     """
+    # matplotlib is only needed for debugging, keep it out of the parser import
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Rectangle
+
     doc = pymupdf.open(pdf_path)
     page = doc[0]
     pix = page.get_pixmap(matrix=pymupdf.Matrix(2, 2))
@@ -531,43 +536,42 @@ def extract_activities_for_full_ai(df):
 #### chunking ####
 def extract_gantt_chart_from_chunks(chunked_chart, timeline):
     """
-    Processes a list of image chunks through Mistral AI, parses each chunk's JSON
-    response, and aggregates the results into a single list. Cleans up all temporary
-    chunk image files afterward (even on failure).
+    Processes a list of image chunks through Mistral AI in parallel, parses each
+    chunk's JSON response, and aggregates the results into a single list in chunk
+    order. Chunks are fanned out via src/common/fanout.py (bounded concurrency,
+    rate-limited calls, retries for unparsable answers); each in-memory chunk is
+    closed as soon as it has been processed.
 
-    :param chunked_chart: List of file paths to image chunk files.
+    :param chunked_chart: PIL image chunks, as a list or a generator (rendered as slots free up).
     :param timeline: True: timeline present, False: chart without timeline
     :return: Combined list of parsed activity dicts from all chunks.
     """
+    def parse_chunk(chunk):
+        chart_json = mistral.call_mistral_full_ai_parsing(chunk, "chunks", None, timeline)
+        try:
+            return json.loads(chart_json)
+        except json.JSONDecodeError:
+            print(f"Raw response: {chart_json}")
+            raise
+
+    results = fanout.map_chunks(
+        "extract_gantt_chart_from_chunks", parse_chunk, chunked_chart, release=fanout.close_image
+    )
+
     parsed_chart = []
-    
-    try:
-        for image_path in chunked_chart:
-            chart_json = mistral.call_mistral_full_ai_parsing(image_path, "chunks", None, timeline)
-            try:
-                chart_part = json.loads(chart_json)
-                parsed_chart.extend(chart_part)
-            except json.JSONDecodeError as e:
-                print(f"Warning: Could not parse JSON from {image_path}: {e}")
-                print(f"Raw response: {chart_json}")
-                continue
-    finally:
-        for image_path in chunked_chart:
-            try:
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-                    print(f"Deleted: {image_path}")
-            except Exception as e:
-                print(f"Warning: Could not delete {image_path}: {e}")
-    
+    for chart_part in results:
+        if chart_part is not None:
+            parsed_chart.extend(chart_part)
     return parsed_chart
      
 def parse_from_chunks(path:str, timeline:bool):
     """
     Splits a Gantt chart PDF into smaller image chunks and parses each chunk
     separately via AI. Handles both timeline-preserving and regular splitting modes.
+    The chunks are rendered one at a time, directly from the page, while earlier
+    chunks are being parsed (see src/common/tiler.py).
 
-    :param path: File path to the Gantt chart PDF.
+    :param path: File path to the Gantt chart PDF, the PDF bytes, or the request's DocumentContext.
     :param timeline: True to preserve timeline header in each chunk,False for basic splitting.
     :return: Combined list of parsed activity dicts from all chunks.
     """
@@ -582,18 +586,23 @@ def to_be_chunked(image_path):
     """
     Determines if an image exceeds size thresholds and needs to be split into
     smaller chunks for AI processing. Checks against maximum dimension (1700px)
-    and maximum total pixel area (2,890,000 px).
+    and maximum total pixel area (2,890,000 px), see VISION_MAX_DIMENSION /
+    VISION_MAX_PIXELS.
 
-    :param image_path: File path to the image to evaluate.
+    :param image_path: File path to the image to evaluate, or the rendered page array.
     :return: True if the image exceeds any size threshold, False otherwise.
     """
     from PIL import Image
-    max_dimension=1700
-    max_area_pixels=2_890_000
+    # Model pixel limits, shared with the vision encoder (src/common/image_encoder.py)
+    max_dimension = image_encoder.MAX_DIMENSION
+    max_area_pixels = image_encoder.MAX_PIXELS
     try:
-        with Image.open(image_path) as img:
-            width, height = img.size
-            total_pixels = width * height
+        if isinstance(image_path, np.ndarray):
+            height, width = image_path.shape[:2]
+        else:
+            with Image.open(image_path) as img:
+                width, height = img.size
+        total_pixels = width * height
             
         if width > max_dimension:
             return True
@@ -608,6 +617,20 @@ def to_be_chunked(image_path):
         print("could not measure image")
         return False
 
+def page_image(document, page: int = 0):
+    """
+    2x render of a page for the AI fallbacks, rendered on first use.
+
+    The DocumentContext memoizes the render, so every fallback of a request
+    shares it, and frees it when the request ends. The deterministic path
+    never calls this and does no raster work.
+
+    :param document: The request's DocumentContext.
+    :param page: Zero-based page index.
+    :return: Read-only RGB array (144 DPI).
+    """
+    return documents.render_page(document, page, zoom=2)
+
 ### main functions ###
 def parse_gant_chart_visual(path: str)-> list:
     """
@@ -615,57 +638,68 @@ def parse_gant_chart_visual(path: str)-> list:
     pipeline: extract table data, identify activities and timeline, locate them on
     the PDF page, match bars to activities, correlate bars with timestamps, and
     determine start/end dates. Falls back to Mistral AI when extraction quality
-    is insufficient (too few activities, timestamps, or failed bar recognition).
+    is insufficient (too few activities, timestamps, or failed bar recognition);
+    only then is the page rendered (see `page_image`).
 
-    :param path: File path to the Gantt chart PDF.
+    :param path: File path to the Gantt chart PDF, the PDF bytes, or the request's DocumentContext.
     :return: List of tasks.
     """
     tolerance = 2
-    with pdfplumber.open(path) as pdf:
+    with documents.document_context(path) as document:
         #Extract pdf data and preprocess df
-        page = pdf.pages[0]
-        image_path = helper.convert_pdf2img(path)
-        tables = page.extract_table()
-        boxes = page.rects
-        df = pd.DataFrame(tables[1:], columns=tables[0])
-        df = df.replace('', None)
-        df = df.dropna(how='all')
-        df = df.dropna(axis='columns', how='all')
+        with progress.stage("table"):
+            page = document.plumber_page(0)
+            # No raster work here: the page is only rendered if an AI fallback fires
+            tables = document.table(0)
+            boxes = document.rects(0)
+            df = pd.DataFrame(tables[1:], columns=tables[0])
+            df = df.replace('', None)
+            df = df.dropna(how='all')
+            df = df.dropna(axis='columns', how='all')
         
         
-        activities = extract_activities(df)
-        row_count = len(df.index)
-        ## Ai Fallback if activity extraction failed completety or was insuffcient
-        if activities is None or len(activities) < row_count - 5:
-            activities = json.loads(mistral.call_mistral_activities(image_path))
-        activities_with_loc, unfound_activites = localize_activities(activities, page)
-        ## Second Ai fallback if localization failed for most activities (semantically bad activity extraction)
-        if unfound_activites > len(activities)-tolerance:
-            activities = json.loads(mistral.call_mistral_activities(image_path))
+        with progress.stage("activities"):
+            activities = extract_activities(df)
+            row_count = len(df.index)
+            ## Ai Fallback if activity extraction failed completety or was insuffcient
+            if activities is None or len(activities) < row_count - 5:
+                with progress.stage("activities-ai"):
+                    activities = json.loads(mistral.call_mistral_activities(page_image(document)))
             activities_with_loc, unfound_activites = localize_activities(activities, page)
+            ## Second Ai fallback if localization failed for most activities (semantically bad activity extraction)
+            if unfound_activites > len(activities)-tolerance:
+                with progress.stage("activities-ai"):
+                    activities = json.loads(mistral.call_mistral_activities(page_image(document)))
+                activities_with_loc, unfound_activites = localize_activities(activities, page)
+        progress.partial("activities", activities)
             
-        time_line_rows= extract_timeline_rows(df)
-        timeline = create_single_timeline(time_line_rows)
-        column_count = len(df.columns)
-        ai_extraction = False
-        
-        ## Ai fallback if timeline extraction was insufficient
-        if len(timeline) < column_count-5 or len(timeline) < 4:
-             timeline = json.loads(mistral.call_mistral_timeline(image_path,"no timeline", None))
-             ai_extraction = True
-        time_line_with_localization, unfound_timestamps = localize_timestamps(timeline, page)
-        
-        ## Second Ai fallback if localization failed for most timestamps (semantically bad timeline extraction)
-        if unfound_timestamps > len(timeline) - tolerance and not ai_extraction:
-            timeline = json.loads(mistral.call_mistral_timeline(image_path, "badly extracted", None))
+        with progress.stage("timeline"):
+            time_line_rows= extract_timeline_rows(df)
+            timeline = create_single_timeline(time_line_rows)
+            column_count = len(df.columns)
+            ai_extraction = False
+            
+            ## Ai fallback if timeline extraction was insufficient
+            if len(timeline) < column_count-5 or len(timeline) < 4:
+                with progress.stage("timeline-ai"):
+                    timeline = json.loads(mistral.call_mistral_timeline(page_image(document), "no timeline", None))
+                ai_extraction = True
             time_line_with_localization, unfound_timestamps = localize_timestamps(timeline, page)
             
-        gantt_chart_bars = find_bars(boxes, activities_with_loc,2)
-        success = check_bar_recognition(gantt_chart_bars)
-        if not success:
-            gantt_chart_bars = identify_bars_with_colours(gantt_chart_bars)
-        activity_timestamps = match_bars_with_timeline(gantt_chart_bars,time_line_with_localization, ai_extraction)
-        activities_with_dates = determine_start_end_of_activity(activity_timestamps)
+            ## Second Ai fallback if localization failed for most timestamps (semantically bad timeline extraction)
+            if unfound_timestamps > len(timeline) - tolerance and not ai_extraction:
+                with progress.stage("timeline-ai"):
+                    timeline = json.loads(mistral.call_mistral_timeline(page_image(document), "badly extracted", None))
+                time_line_with_localization, unfound_timestamps = localize_timestamps(timeline, page)
+        progress.partial("timeline", timeline)
+            
+        with progress.stage("bars"):
+            gantt_chart_bars = find_bars(boxes, activities_with_loc,2)
+            success = check_bar_recognition(gantt_chart_bars)
+            if not success:
+                gantt_chart_bars = identify_bars_with_colours(gantt_chart_bars)
+            activity_timestamps = match_bars_with_timeline(gantt_chart_bars,time_line_with_localization, ai_extraction)
+            activities_with_dates = determine_start_end_of_activity(activity_timestamps)
         return activities_with_dates
 
 
@@ -675,17 +709,16 @@ def parse_full_ai(path):
     presence via Mistral, extracts table data, and delegates to AI for interpretation.
     If the image is too large, it splits it into chunks for processing. 
 
-    :param path: File path to the Gantt chart PDF.
+    :param path: File path to the Gantt chart PDF, the PDF bytes, or the request's DocumentContext.
     :return: AI-parsed result (typically JSON string of activities with dates).
     """
-    with pdfplumber.open(path) as pdf:
-        page = pdf.pages[0]
-        image_path = helper.convert_pdf2img(path)
+    with documents.document_context(path) as document:
+        image_path = page_image(document)
         check_for_timeline = json.loads(mistral.call_mistral_timeline(image_path, "check for timeline", None))
         timeline = False
         if check_for_timeline['timeline_present'] == True:
             timeline = True
-        tables = page.extract_table()
+        tables = document.table(0)
         df = pd.DataFrame(tables[1:], columns=tables[0])
         df = df.replace('', None)
         df = df.dropna(how='all')
@@ -695,15 +728,9 @@ def parse_full_ai(path):
         if len(activities) != 0:
             result=  mistral.call_mistral_full_ai_parsing(image_path, "full ai w activities", activities, timeline)
         elif to_be_chunked(image_path):
-            result= parse_from_chunks(path,timeline)
+            result= parse_from_chunks(document,timeline)
         else:
             result =  mistral.call_mistral_full_ai_parsing(image_path, "full ai", None, timeline)
-        try:
-            if os.path.exists(image_path):
-                os.remove(image_path)
-                print(f"Deleted: {image_path}")
-        except Exception as e:
-            print(f"Warning: Could not delete {image_path}: {e}")
         return result
 
 
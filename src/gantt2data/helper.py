@@ -1,6 +1,8 @@
 import os
 from typing import Tuple, List
 import pymupdf  
+import src.common.documents as documents
+import src.common.tiler as tiler
 def convert_pdf2img(input_file: str, pages: Tuple = None):
     """Converts pdf to image and generates a file by page"""
     # Open the document
@@ -40,132 +42,34 @@ def convert_pdf2img(input_file: str, pages: Tuple = None):
 ######## Chunking ############
 
 def pdf_to_split_images(path, page_number):
-    from PIL import Image
-    import io
     """
-    Convert a pymupdf page to high-res image and split into 4 pieces.
+    Split a pymupdf page into full-width strips, rendered one at a time
+    (see src/common/tiler.py).
+
+    The number of strips follows the page size and the model's pixel limits,
+    and each cut is moved to a gap between table rows where one is close by.
     Args:
-        path: path to PDF file
+        path: path to PDF file, the PDF bytes, or a DocumentContext
         page_number: page number
-    Returns:
-        List of 4 file paths to saved PNG images
+    Yields:
+        PIL images (kept in memory, nothing is written to disk)
     """
-    doc = pymupdf.open(path)
-    page = doc[page_number]
-    
-    # Render page to pixmap (image)
-    pix = page.get_pixmap(dpi=300)
-    
-    # Convert to PIL Image
-    img_data = pix.tobytes("png")
-    img = Image.open(io.BytesIO(img_data))
-    
-    # Get dimensions
-    width, height = img.size
-    quarter_of_height = (1/4)*height
-    sec_quarter_of_height = (1/2)*height
-    third_quarter_of_height = (3/4)*height
-    overlap = int(0.1 * height)
-    # Split into 4 pieces
-    chunks = [
-        img.crop((0, 0, width, quarter_of_height+overlap)),          
-        img.crop((0, quarter_of_height-overlap, width, sec_quarter_of_height+overlap)),       
-        img.crop((0, sec_quarter_of_height-overlap, width, third_quarter_of_height+overlap)),
-        img.crop((0, third_quarter_of_height-overlap, width, height)) 
-    ]
-   
-    
-    # Save chunks to temporary files
-    output_files = []
-    base_name = os.path.splitext(os.path.basename(path))[0]
-    
-    for idx, chunk in enumerate(chunks):
-        # Create temp file or save to specific directory
-        output_file = f"{base_name}_page{page_number + 1}_chunk{idx + 1}.png"
-        chunk.save(output_file)
-        output_files.append(output_file)
-    
-    doc.close()
-    return output_files
+    with documents.document_context(path) as document:
+        yield from tiler.tiles(document, page_number, rows_only=True)
 
 def pdf_to_split_images_with_timeline(path, page_number, timeline_height_ratio=0.15):
-    from PIL import Image
-    import io
     """
-    Convert a pymupdf page to high-res image and split into chunks,
+    Split a pymupdf page into full-width strips, rendered one at a time,
     including the timeline header in each chunk.
     
     Args:
-        path: path to PDF file
+        path: path to PDF file, the PDF bytes, or a DocumentContext
         page_number: page number
-        timeline_height_ratio: proportion of page height that contains the timeline (default 0.15 = 15%)
+        timeline_height_ratio: proportion of page height that contains the timeline (default 0.15 = 15%);
+                               the lower edge of the header is moved to the nearest gap between rows
     
-    Returns:
-        List of file paths to saved PNG images with timeline included
+    Yields:
+        PIL images with timeline included (kept in memory)
     """
-    doc = pymupdf.open(path)
-    page = doc[page_number]
-    
-    # Render page to pixmap (image)
-    pix = page.get_pixmap(dpi=300)
-    
-    # Convert to PIL Image
-    img_data = pix.tobytes("png")
-    img = Image.open(io.BytesIO(img_data))
-    
-    # Get dimensions
-    width, height = img.size
-    
-    # Extract timeline (top portion of the chart)
-    timeline_height = int(timeline_height_ratio * height)
-    timeline = img.crop((0, 0, width, timeline_height))
-    
-    # Calculate remaining content area
-    content_start = timeline_height
-    content_height = height - timeline_height
-    
-    # Define overlap for smooth transitions
-    overlap = int(0.1 * content_height)
-    
-    # Split content into chunks
-    quarter = content_height / 4
-    
-    chunk_boundaries = [
-        (content_start, content_start + quarter),
-        (content_start + quarter, content_start + 2 * quarter),
-        (content_start + 2 * quarter, content_start + 3 * quarter),
-        (content_start + 3 * quarter, height)
-    ]
-    
-    chunks = []
-    for i, (start, end) in enumerate(chunk_boundaries):
-        # Adjust for overlap (except first and last)
-        chunk_start = max(content_start, start - overlap)
-        chunk_end = min(height, end + overlap)
-        
-        # Extract content chunk
-        content_chunk = img.crop((0, chunk_start, width, chunk_end))
-        
-        # Create new image with timeline on top
-        combined_height = timeline_height + content_chunk.height
-        combined = Image.new('RGB', (width, combined_height), 'white')
-        
-        # Paste timeline at top
-        combined.paste(timeline, (0, 0))
-        
-        # Paste content below timeline
-        combined.paste(content_chunk, (0, timeline_height))
-        
-        chunks.append(combined)
-    
-    # Save chunks to files
-    output_files = []
-    base_name = os.path.splitext(os.path.basename(path))[0]
-    
-    for idx, chunk in enumerate(chunks):
-        output_file = f"{base_name}_page{page_number + 1}_chunk{idx + 1}.png"
-        chunk.save(output_file)
-        output_files.append(output_file)
-    
-    doc.close()
-    return output_files
\ No newline at end of file
+    with documents.document_context(path) as document:
+        yield from tiler.tiles(document, page_number, rows_only=True, header_ratio=timeline_height_ratio)
@@ -14,26 +14,21 @@ carefully crafted prompts to Mistral's chat completion endpoint, requesting
 JSON-formatted responses.
 """
 
-from mistralai import Mistral
-import base64
+import src.common.image_encoder as image_encoder
+import src.common.llm_gateway as llm_gateway
+import src.common.pipelines as pipelines
 
 # ---------------------------------------------------------------------------
-# Mistral client configuration
+# Mistral configuration (the shared client lives in src/common/llm_gateway.py)
 # ---------------------------------------------------------------------------
-from dotenv import load_dotenv
-import os
-load_dotenv()
-api_key = os.getenv("MISTRAL_API_KEY")
-model = "mistral-small-2506"
-
-client = Mistral(api_key=api_key)
+model = pipelines.PARSER_MODELS["gantt"]
 
 
 def call_mistral_full_ai_parsing(path: str, option:str, activities:list, timeline:bool)->str:
     """Send gantt chart image to mistral for full ai parsing
 
     Args:
-        path (str): File path to gantt chart image
+        path (str | np.ndarray): File path to gantt chart image, or the rendered page
         option (str): parsing strategy
         activities (list): List of activities contained in gantt chart
         timeline (bool): Bool for timeline presence
@@ -42,8 +37,7 @@ def call_mistral_full_ai_parsing(path: str, option:str, activities:list, timelin
         Raw JSON string returned by the Mistral model.
     """
     message = create_message_for_full_ai_extraction(path, option, activities, timeline)
-    chat_response = client.chat.complete(
-        model=model,
+    chat_response = llm_gateway.complete("call_mistral_full_ai_parsing", model,
         messages=message,
         response_format={
             "type": "json_object",  # Force structured JSON output
@@ -58,7 +52,7 @@ def call_mistral_timeline(path:str, option:str, activties:list)->str:
     depending on the chosen option.
 
     Args:
-        path (str): File path to the Gantt chart image.
+        path (str | np.ndarray): File path to the Gantt chart image, or the rendered page.
         option (str): Extraction mode – one of:
             - "check for timeline": Determine whether a timeline axis exists.
             - "badly extracted" / "no timeline": Parse the time axis values.
@@ -72,8 +66,7 @@ def call_mistral_timeline(path:str, option:str, activties:list)->str:
         str: Raw JSON string returned by the Mistral model.
     """
     message = create_message_for_timeline_extraction(path, option, activties)
-    chat_response = client.chat.complete(
-        model=model,
+    chat_response = llm_gateway.complete("call_mistral_timeline", model,
         messages=message,
         response_format={
             "type": "json_object",  # Force structured JSON output
@@ -89,7 +82,7 @@ def create_message_for_full_ai_extraction(path:str, option:str, activties:list|N
     then pairs it with the base64-encoded chart image.
 
     Args:
-        path (str): File path to the Gantt chart image.
+        path (str | np.ndarray): File path to the Gantt chart image, or the rendered page.
         timeline (bool): timeline present (True|False).
         activties (list[str] | None): Known activities for guided extraction.
 
@@ -123,7 +116,7 @@ def create_message_for_full_ai_extraction(path:str, option:str, activties:list|N
                 },
                 {
                     "type": "image_url",
-                    "image_url": f"data:image/jpeg;base64,{base64_image}"
+                    "image_url": image_encoder.as_data_url(base64_image)
                 }
             ]
         }
@@ -140,7 +133,7 @@ def create_message_for_timeline_extraction(path:str, option:str, activties:list)
     then pairs it with the base64-encoded chart image.
 
     Args:
-        path (str): File path to the Gantt chart image.
+        path (str | np.ndarray): File path to the Gantt chart image, or the rendered page.
         option (str): Extraction mode (see `call_mistral_timeline`).
         activties (list[str] | None): Known activities for guided extraction.
 
@@ -169,7 +162,7 @@ def create_message_for_timeline_extraction(path:str, option:str, activties:list)
                 },
                 {
                     "type": "image_url",
-                    "image_url": f"data:image/jpeg;base64,{base64_image}"
+                    "image_url": image_encoder.as_data_url(base64_image)
                 }
             ]
         }
@@ -189,14 +182,13 @@ def call_mistral_activities(path:str)->str:
     their dates or durations). The returned JSON is a flat list of strings.
 
     Args:
-        path (str): File path to the Gantt chart image.
+        path (str | np.ndarray): File path to the Gantt chart image, or the rendered page.
 
     Returns:
         str: JSON string containing an array of activity names.
     """
     message = create_message_for_activity_extraction(path)
-    chat_response = client.chat.complete(
-        model=model,
+    chat_response = llm_gateway.complete("call_mistral_activities", model,
         messages=message,
         response_format={
             "type": "json_object",
@@ -210,7 +202,7 @@ def create_message_for_activity_extraction(path:str)->list:
     Build the multimodal message for activity-name extraction.
 
     Args:
-        path (str): File path to the Gantt chart image.
+        path (str | np.ndarray): File path to the Gantt chart image, or the rendered page.
 
     Returns:
         list[dict]: Mistral-compatible message list with text + image.
@@ -227,7 +219,7 @@ def create_message_for_activity_extraction(path:str)->list:
                 },
                 {
                     "type": "image_url",
-                    "image_url": f"data:image/jpeg;base64,{base64_image}"
+                    "image_url": image_encoder.as_data_url(base64_image)
                 }
             ]
         }
@@ -261,8 +253,7 @@ def call_mistral_for_colums(text):
             "content": message,
         }
     ]
-    chat_response = client.chat.complete(
-        model=model,
+    chat_response = llm_gateway.complete("call_mistral_for_colums", model,
         messages=messages,
         response_format={
             "type": "json_object",
@@ -275,19 +266,21 @@ def call_mistral_for_colums(text):
 # 4. IMAGE ENCODING UTILITY
 # ===========================================================================
 
-def encode_image(image_path:str):
+def encode_image(image_path):
     """
-    Read an image file from disk and return its base64-encoded string.
+    Return the base64-encoded string of an image file or in-memory image,
+    scaled to the model's pixel limits and encoded by content
+    (see src/common/image_encoder.py).
 
     Args:
-        image_path (str): Absolute or relative path to the image file.
+        image_path (str | np.ndarray | PIL.Image): Absolute or relative path to
+            the image file, or an image rendered in memory (page or chunk).
 
     Returns:
         str | None: Base64-encoded UTF-8 string of the image, or None on error.
     """
     try:
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+        return image_encoder.encode(image_path)[0]
     except FileNotFoundError:
         print(f"Error: The file {image_path} was not found.")
         return None
@@ -1,4 +1,40 @@
-def extract_text_titleblock(image_path: str) -> str | None:
+import os
+
+import numpy as np
+
+import src.common.documents as documents
+
+
+###############################################################################
+# Title Block OCR
+#
+# Images are OCRed as before: one pass over the whole image to find the text
+# in its right 30 %, a second pass over the enclosing crop.
+#
+# PDFs (a DocumentContext) no longer get a full-sheet 300 DPI raster, of
+# which ~70 % was OCRed only to be thrown away. The title block is located
+# first, and only that clip is rendered for OCR (`locate_titleblock`):
+#   1. from the vector text layer (words right of 70 % of the page width),
+#      no rasterization at all
+#   2. for scanned sheets: OCR of the right strip of a TITLEBLOCK_LOCATE_DPI
+#      page render (the render is shared with the OCR failure prediction)
+# The clip is then rendered at TITLEBLOCK_OCR_DPI with get_pixmap(clip=...).
+###############################################################################
+
+
+# ==================== CONFIGURATION ====================
+
+# Low resolution used to locate the title block on sheets without a text layer
+LOCATE_DPI = int(os.getenv("TITLEBLOCK_LOCATE_DPI", "100"))
+
+# Resolution of the title block clip that is OCRed
+OCR_DPI = int(os.getenv("TITLEBLOCK_OCR_DPI", "300"))
+
+# Share of the page width left of the title block search area
+RIGHT_SIDE = 0.7
+
+
+def extract_text_titleblock(image_path) -> str | None:
     """
     Load a floor plan image, locate the title block region using OCR heuristics,
     crop it, and extract its text content.
@@ -11,8 +47,12 @@ def extract_text_titleblock(image_path: str) -> str | None:
         4. Crop the image to that region and run a second, focused OCR pass
            to get cleaner text output.
 
+    PDFs (a DocumentContext) take the clip path instead (see module header).
+
     Args:
-        image_path: File path to the floor plan image.
+        image_path: File path to the floor plan image, encoded image bytes,
+                    an RGB numpy array (e.g. a rendered PDF page) or the
+                    DocumentContext of a PDF.
 
     Returns:
         The extracted text from the title block, or None if the image
@@ -21,14 +61,24 @@ def extract_text_titleblock(image_path: str) -> str | None:
     import cv2
     import pytesseract
 
+    if isinstance(image_path, documents.DocumentContext):
+        return extract_text_titleblock_pdf(image_path)
+
     try:
         # --- Step 1: Load image ------------------------------------------------
-        image = cv2.imread(image_path)
-        if image is None:
-            return None
+        if isinstance(image_path, np.ndarray):
+            # Already decoded (RGB), e.g. a page rendered in memory
+            image_rgb = image_path
+        else:
+            if isinstance(image_path, (bytes, bytearray)):
+                image = cv2.imdecode(np.frombuffer(image_path, dtype=np.uint8), cv2.IMREAD_COLOR)
+            else:
+                image = cv2.imread(image_path)
+            if image is None:
+                return None
 
-        # OpenCV loads images as BGR; convert to RGB for Tesseract
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            # OpenCV loads images as BGR; convert to RGB for Tesseract
+            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
         # --- Step 2: First OCR pass — collect word-level bounding boxes ---------
         # output_type=DICT gives us parallel lists (text, conf, left, top, …)
@@ -66,7 +116,89 @@ def extract_text_titleblock(image_path: str) -> str | None:
         return None
 
 
-def extract_right_side_titleblock(image_rgb, data:dict)->dict:
+def extract_text_titleblock_pdf(document, page: int = 0) -> str | None:
+    """
+    OCR only the title block of a PDF page, rendered as a high-DPI clip.
+
+    Args:
+        document: DocumentContext of the PDF.
+        page:     Zero-based page index.
+
+    Returns:
+        The extracted text from the title block, or None if it could not be
+        located or OCR failed.
+    """
+    import pytesseract
+
+    try:
+        clip = locate_titleblock(document, page)
+        if clip is None:
+            print("Deterministic parsing failed: no title block text found")
+            return None
+        titleblock = document.render(page, OCR_DPI, clip)
+        print(f"Title block clip {clip.width:.0f}x{clip.height:.0f} pt "
+              f"({titleblock.shape[1]}x{titleblock.shape[0]} px at {OCR_DPI} DPI)")
+        text_title_block = pytesseract.image_to_string(titleblock)
+
+        print(text_title_block)
+        return text_title_block
+
+    except (pytesseract.TesseractError, RuntimeError, ValueError) as e:
+        print("Deterministic parsing failed due to tesseract or PDF rendering")
+        print(e)
+        return None
+
+
+def locate_titleblock(document, page: int = 0):
+    """
+    Locate the title block of a PDF page without a full-resolution render.
+
+    Uses the words of the vector text layer right of RIGHT_SIDE of the page
+    width; sheets without a text layer there (scans) are located by OCR of the
+    right strip of a LOCATE_DPI page render.
+
+    Args:
+        document: DocumentContext of the PDF.
+        page:     Zero-based page index.
+
+    Returns:
+        fitz.Rect | None: Title block area in PDF points, or None if no text
+        was found in the right part of the page.
+    """
+    import fitz
+
+    rect = document.page(page).rect
+    search_area = fitz.Rect(rect.x0 + rect.width * RIGHT_SIDE, rect.y0, rect.x1, rect.y1)
+
+    # 1. Vector text layer: exact word boxes, nothing to rasterize
+    words = [word for word in document.words(page, search_area) if word[4].strip()]
+    if words:
+        clip = fitz.Rect(
+            min(word[0] for word in words), min(word[1] for word in words),
+            max(word[2] for word in words), max(word[3] for word in words),
+        )
+        # Same margin as the image path (10 px at 300 DPI)
+        margin = 10 * 72 / 300
+        return (clip + (-margin, -margin, margin, margin)) & rect
+
+    # 2. Scanned sheet: OCR the right strip of a low-DPI render
+    import pytesseract
+
+    image = document.render(page, LOCATE_DPI)
+    offset = int(image.shape[1] * RIGHT_SIDE)
+    data = pytesseract.image_to_data(image[:, offset:], output_type=pytesseract.Output.DICT)
+    data["left"] = [left + offset for left in data["left"]]
+    region = extract_right_side_titleblock(image, data, margin=max(2, round(10 * LOCATE_DPI / 300)))
+    if region is None:
+        return None
+    scale = 72 / LOCATE_DPI
+    clip = fitz.Rect(
+        region["x"], region["y"], region["x"] + region["width"], region["y"] + region["height"]
+    ) * scale
+    return (clip + (rect.x0, rect.y0, rect.x0, rect.y0)) & rect
+
+
+def extract_right_side_titleblock(image_rgb, data:dict, margin: int = 10)->dict:
     """
     Estimate the bounding rectangle of the title block by clustering all
     high-confidence OCR text boxes found in the right 30% of the image.
@@ -78,6 +210,7 @@ def extract_right_side_titleblock(image_rgb, data:dict)->dict:
         image_rgb:  The floor plan image as a NumPy array (H × W × 3).
         data:       Tesseract word-level detection output (dict of parallel
                     lists: 'left', 'top', 'width', 'height', 'conf', 'text', …).
+        margin:     Padding in pixels around the text (10 px at 300 DPI).
 
     Returns:
         A dict with keys {'x', 'y', 'width', 'height'} describing the
@@ -87,7 +220,7 @@ def extract_right_side_titleblock(image_rgb, data:dict)->dict:
 
     # Only consider text whose left edge starts past 70% of the image width.
     # This filters out the main drawing area and keeps title block text.
-    right_boundary = int(width * 0.7)
+    right_boundary = int(width * RIGHT_SIDE)
 
     # Collect all text boxes that pass the position and confidence filters
     titleblock_text_boxes = []
@@ -119,7 +252,6 @@ def extract_right_side_titleblock(image_rgb, data:dict)->dict:
 
     # Add a small margin so the crop doesn't clip text at the edges,
     # while clamping to image bounds to avoid out-of-range slicing.
-    margin = 10
     titleblock_region = {
         'x': max(0, min_x - margin),
         'y': max(0, min_y - margin),
@@ -5,6 +5,9 @@ import pymupdf
 import json
 from PIL import Image
 
+import src.common.documents as documents
+import src.common.fanout as fanout
+import src.common.tiler as tiler
 import src.plan2data.mistralConnection as mistral
 
 
@@ -112,64 +115,35 @@ def convert_pdf2img(input_file: str, pages: Tuple = None):
 # Room Extraction via Voronoi — Image Splitting Strategy - Future Work
 #
 # Large architectural drawings often exceed what a vision model can process
-# in one pass. These functions split a page into 4 quadrant chunks so each
-# piece can be sent to Mistral individually for room name detection.
+# in one pass. These functions split a page into chunks so each piece can
+# be sent to Mistral individually for room name detection.
 ###############################################################################
 
 
 def pdf_to_split_images(path, page_number):
     """
-    Render a single PDF page at 300 DPI and split it into 4 equal quadrants.
+    Split a PDF page into a grid of tiles, rendered one at a time.
 
-    The quadrants (top-left, top-right, bottom-left, bottom-right) are saved
-    as individual PNG files for independent processing.
+    The grid follows the page size and the model's pixel limits (an A0 sheet
+    gets more tiles than an A3 one), each cut is moved to where it crosses
+    the fewest room labels and walls, and every tile is rendered directly
+    from the page at the resolution the model accepts (see
+    src/common/tiler.py). Nothing is written to disk.
 
     Args:
-        path:        Path to the PDF file.
+        path:        Path to the PDF file, the PDF bytes, or a DocumentContext.
         page_number: Zero-based page index to render and split.
 
-    Returns:
-        List of 4 file paths to the saved quadrant PNGs.
+    Yields:
+        PIL images of the tiles in reading order.
     """
-    doc = pymupdf.open(path)
-    page = doc[page_number]
-
-    # Render at 300 DPI for sufficient detail to read room labels
-    pix = page.get_pixmap(dpi=300)
-
-    # Convert PyMuPDF pixmap → PIL Image for easy cropping
-    img_data = pix.tobytes("png")
-    img = Image.open(io.BytesIO(img_data))
-
-    # Calculate the midpoint for a 2×2 grid split
-    width, height = img.size
-    mid_w = width // 2
-    mid_h = height // 2
-
-    # Crop into 4 quadrants
-    chunks = [
-        img.crop((0, 0, mid_w, mid_h)),          # top-left
-        img.crop((mid_w, 0, width, mid_h)),       # top-right
-        img.crop((0, mid_h, mid_w, height)),      # bottom-left
-        img.crop((mid_w, mid_h, width, height)),  # bottom-right
-    ]
-
-    # Save each quadrant as a temporary PNG
-    output_files = []
-    base_name = os.path.splitext(os.path.basename(path))[0]
-
-    for idx, chunk in enumerate(chunks):
-        output_file = f"{base_name}_page{page_number + 1}_chunk{idx + 1}.png"
-        chunk.save(output_file)
-        output_files.append(output_file)
-
-    doc.close()
-    return output_files
+    with documents.document_context(path) as document:
+        yield from tiler.tiles(document, page_number)
 
 
 def page_to_split_images(page):
     """
-    Same quadrant-splitting logic as `pdf_to_split_images`, but accepts a
+    Former quadrant-splitting logic of `pdf_to_split_images`, but accepts a
     PyMuPDF page object directly instead of a file path + page number.
 
     NOTE: This function currently has a bug — it calls `os.path.basename(page)`
@@ -213,44 +187,40 @@ def page_to_split_images(page):
 
 def extract_room_names_from_chunks(chunked_plan):
     """
-    Send each image chunk to Mistral for room name extraction, then
-    clean up all temporary chunk files regardless of success or failure.
+    Send the image chunks to Mistral for room name extraction in parallel,
+    releasing each chunk (temporary file or in-memory tile) as soon as it
+    has been processed.
 
-    Each chunk is processed independently and the results are merged into
-    a single flat list. If Mistral returns invalid JSON for a chunk, that
-    chunk is skipped with a warning rather than aborting the whole batch.
+    Chunks are fanned out through `src.common.fanout.map_chunks` (bounded
+    concurrency, rate-limited LLM calls) and the results are merged into a
+    single flat list in chunk order. If Mistral returns invalid JSON for a
+    chunk, the chunk is retried and finally skipped with a warning rather
+    than aborting the whole batch.
 
     Args:
-        chunked_plan: List of file paths to quadrant image PNGs
-                      (typically produced by `pdf_to_split_images`).
+        chunked_plan: Image file paths or in-memory tiles, as a list or a
+                      generator (typically `pdf_to_split_images`, whose
+                      tiles are then rendered as slots free up).
 
     Returns:
         A combined list of room name strings from all chunks.
     """
-    all_room_names = []
-
-    try:
-        for image_path in chunked_plan:
-            rooms_json = mistral.call_mistral_for_room_extraction_voronoi(image_path)
-
-            try:
-                rooms_list = json.loads(rooms_json)
-                all_room_names.extend(rooms_list)
-            except json.JSONDecodeError as e:
-                # Non-fatal: log the error and continue with remaining chunks
-                print(f"Warning: Could not parse JSON from {image_path}: {e}")
-                print(f"Raw response: {rooms_json}")
-                continue
-    finally:
-        # Always clean up temp files, even if an exception interrupted processing
-        for image_path in chunked_plan:
-            try:
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-                    print(f"Deleted: {image_path}")
-            except Exception as e:
-                print(f"Warning: Could not delete {image_path}: {e}")
+    def extract(chunk):
+        rooms_json = mistral.call_mistral_for_room_extraction_voronoi(chunk)
+        try:
+            return json.loads(rooms_json)
+        except json.JSONDecodeError:
+            print(f"Raw response for {chunk if isinstance(chunk, str) else 'tile'}: {rooms_json}")
+            raise
+
+    results = fanout.map_chunks(
+        "extract_room_names_from_chunks", extract, chunked_plan, release=fanout.release_chunk
+    )
 
+    all_room_names = []
+    for rooms_list in results:
+        if rooms_list is not None:
+            all_room_names.extend(rooms_list)
     return all_room_names
 
 
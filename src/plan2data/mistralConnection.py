@@ -1,21 +1,19 @@
 
+import asyncio
 import json
-from mistralai import Mistral
 import base64
-import time
+import src.common.documents as documents
+import src.common.image_encoder as image_encoder
+import src.common.llm_gateway as llm_gateway
+import src.common.pipelines as pipelines
 
 # ==================== API CONFIGURATION ====================
 
 ## Retrieve the API key from environment variables
 # api_key = os.environ["MISTRAL_API_KEY"]
 
-# Mistral API configuration
-model = "mistral-small-2503"  # Model version for API calls
-from dotenv import load_dotenv
-import os
-load_dotenv()
-api_key = os.getenv("MISTRAL_API_KEY")
-client = Mistral(api_key=api_key)
+# Mistral API configuration (the shared client lives in src/common/llm_gateway.py)
+model = pipelines.PARSER_MODELS["drawing"]  # Model version for API calls
 
 
 # ==================== TITLE BLOCK EXTRACTION (TEXT-BASED) ====================
@@ -51,8 +49,7 @@ def call_mistral_for_content_extraction(text_title_block):
     ]
     
     # Call Mistral API with JSON response format
-    chat_response = client.chat.complete(
-        model=model,
+    chat_response = llm_gateway.complete("call_mistral_for_content_extraction", model,
         messages=messages,
         response_format={
             "type": "json_object",
@@ -63,6 +60,28 @@ def call_mistral_for_content_extraction(text_title_block):
     return response
 
 
+async def call_mistral_for_content_extraction_async(text_title_block):
+    """
+    Async variant of `call_mistral_for_content_extraction`.
+
+    Cancelling the awaiting task aborts the request (used by the hedged
+    title block mode in titleBlockInfo.py).
+    """
+    messages = [
+        {
+            "role": "user",
+            "content": create_detailed_title_block_extraction_promt_with_confidence_value(text_title_block),
+        }
+    ]
+    chat_response = await llm_gateway.complete_async("call_mistral_for_content_extraction", model,
+        messages=messages,
+        response_format={
+            "type": "json_object",
+        }
+    )
+    return chat_response.choices[0].message.content
+
+
 # ==================== TITLE BLOCK EXTRACTION (IMAGE-BASED) ====================
 
 def call_mistral_for_titleblock_extraction_from_image(path):
@@ -86,8 +105,7 @@ def call_mistral_for_titleblock_extraction_from_image(path):
     message = create_message_for_titleblock_extraction_from_image(path)
     
     # Call Mistral Vision API
-    chat_response = client.chat.complete(
-        model=model,
+    chat_response = llm_gateway.complete("call_mistral_for_titleblock_extraction_from_image", model,
         messages=message,
         response_format={
             "type": "json_object",
@@ -97,6 +115,23 @@ def call_mistral_for_titleblock_extraction_from_image(path):
     return chat_response.choices[0].message.content
 
 
+async def call_mistral_for_titleblock_extraction_from_image_async(path):
+    """
+    Async variant of `call_mistral_for_titleblock_extraction_from_image`.
+
+    The image is encoded in a thread; cancelling the awaiting task aborts
+    the request (used by the hedged title block mode in titleBlockInfo.py).
+    """
+    message = await asyncio.to_thread(create_message_for_titleblock_extraction_from_image, path)
+    chat_response = await llm_gateway.complete_async("call_mistral_for_titleblock_extraction_from_image", model,
+        messages=message,
+        response_format={
+            "type": "json_object",
+        }
+    )
+    return chat_response.choices[0].message.content
+
+
 def create_message_for_titleblock_extraction_from_image(path):
     """
     Create Mistral API message structure for title block extraction from image.
@@ -124,7 +159,7 @@ def create_message_for_titleblock_extraction_from_image(path):
                 },
                 {
                     "type": "image_url",
-                    "image_url": f"data:image/jpeg;base64,{base64_image}"
+                    "image_url": image_encoder.as_data_url(base64_image)
                 }
             ]
         }
@@ -163,8 +198,7 @@ def call_mistral_for_room_adjacency_extraction(path):
     message = create_message_for_room_adjacency_extraction(path)
     
     # Call Mistral API
-    chat_response = client.chat.complete(
-        model=model,
+    chat_response = llm_gateway.complete("call_mistral_for_room_adjacency_extraction", model,
         messages=message,
         response_format={
             "type": "json_object",
@@ -246,8 +280,7 @@ def call_mistral_for_room_extraction_voronoi(image):
     message = create_message_for_room_extraction_voronoi(base64_image)
     
     # Call Mistral API
-    chat_response = client.chat.complete(
-        model=model,
+    chat_response = llm_gateway.complete("call_mistral_for_room_extraction_voronoi", model,
         messages=message,
         response_format={
             "type": "json_object",
@@ -279,7 +312,7 @@ def create_message_for_room_extraction_voronoi(base64_image):
                 },
                 {
                     "type": "image_url",
-                    "image_url": f"data:image/png;base64,{base64_image}"
+                    "image_url": image_encoder.as_data_url(base64_image)
                 }
             ]
         }
@@ -318,8 +351,7 @@ def call_mistral_roomnames(text):
     message = create_message_roomnames(text)
     
     # Call Mistral API
-    chat_response = client.chat.complete(
-        model=model,
+    chat_response = llm_gateway.complete("call_mistral_roomnames", model,
         messages=message,
         response_format={
             "type": "json_object",
@@ -394,30 +426,15 @@ def call_mistral_connected_rooms(base64_image, text):
         Voronoi may show rooms as neighbors if they share a wall, but this function
         identifies only those with doorways/openings.
     """
-    max_retries = 3 # To avoid to many attempts at the 
-    retry_delay = 60 # Start with 5 seconds
     message = create_message_connected(base64_image, text)
-    for attempt in range(max_retries):
-        try:
-             # Call Mistral Vision API
-            chat_response = client.chat.complete(
-                model=model,
-                messages=message,
-                response_format={
-                    "type": "json_object",
-                }
-            )
-    
-            return chat_response.choices[0].message.content  
-            
-        except Exception as e:
-            if "429" in str(e) and attempt < max_retries - 1:
-                print(f"⏳ Rate limited. Waiting {retry_delay} seconds... (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(retry_delay)
-                retry_delay *= 2  # Double the delay each time
-            else:
-                raise  # Re-raise if not rate limit or max retries reached
-    # Create message with image and neighbor data
+    # Rate limits (429) are retried with backoff by the gateway (src/common/rate_limit.py)
+    chat_response = llm_gateway.complete("call_mistral_connected_rooms", model,
+        messages=message,
+        response_format={
+            "type": "json_object",
+        }
+    )
+    return chat_response.choices[0].message.content
     
     
    
@@ -454,7 +471,7 @@ def create_message_connected(base64_image, text):
                 },
                 {
                     "type": "image_url",
-                    "image_url": f"data:image/jpeg;base64,{base64_image}"
+                    "image_url": image_encoder.as_data_url(base64_image)
                 }
             ]
         }
@@ -467,10 +484,16 @@ def create_message_connected(base64_image, text):
 
 def encode_image(image_path):
     """
-    Encode an image file to base64 string for API transmission.
+    Encode an image to base64 string for API transmission.
+
+    The image is scaled to the model's pixel limits and encoded as PNG, JPEG
+    or WebP depending on its content (see src/common/image_encoder.py); wrap
+    the result with `image_encoder.as_data_url` to get the matching media type.
     
     Args:
-        image_path (str): Path to image file (JPG, PNG, etc.)
+        image_path (str | bytes | np.ndarray | PIL.Image): Path to image file
+                   (JPG, PNG, etc.), encoded image bytes, or an in-memory image
+                   (e.g. a page rendered with documents.render_page)
     
     Returns:
         str: Base64-encoded string of image data, or None if error
@@ -480,8 +503,7 @@ def encode_image(image_path):
         >>> # Can now send to vision API
     """
     try:
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+        return image_encoder.encode(image_path)[0]
     except FileNotFoundError:
         print(f"Error: The file {image_path} was not found.")
         return None
@@ -495,11 +517,13 @@ def encode_pdf(pdf_path):
     Encode a PDF file to base64 string for API transmission.
     
     Args:
-        pdf_path (str): Path to PDF file
+        pdf_path (str | bytes): Path to PDF file, or the PDF bytes
     
     Returns:
         str: Base64-encoded string of PDF data, or None if error
     """
+    if isinstance(pdf_path, (bytes, bytearray)):
+        return base64.b64encode(pdf_path).decode('utf-8')
     try:
         with open(pdf_path, "rb") as pdf_file:
             return base64.b64encode(pdf_file.read()).decode('utf-8')
@@ -516,7 +540,7 @@ def get_file_type(file_path):
     Determine file type based on file extension.
     
     Args:
-        file_path (str): Path to file
+        file_path (str | bytes): Path to file, or the file content
     
     Returns:
         str: 'pdf', 'image', or 'unknown'
@@ -525,6 +549,10 @@ def get_file_type(file_path):
         - PDF: .pdf
         - Images: .jpg, .jpeg, .png, .gif, .bmp, .webp
     """
+    if isinstance(file_path, (bytes, bytearray)):
+        # In-memory upload: PDFs are kept as-is, images are stored as JPEG
+        return 'pdf' if documents.is_pdf(file_path) else 'image'
+
     extension = file_path.lower().split('.')[-1]
     
     if extension in ['pdf']:
@@ -543,13 +571,14 @@ def encode_file(file_path):
     returning both the base64 data and metadata needed for API calls.
     
     Args:
-        file_path (str): Path to file (image or PDF)
+        file_path (str | bytes): Path to file (image or PDF), or its content
     
     Returns:
         tuple: (base64_data, file_type, media_type)
             - base64_data (str): Base64-encoded file content
             - file_type (str): 'pdf' or 'image'
-            - media_type (str): MIME type for API ('application/pdf' or 'image/jpeg')
+            - media_type (str): MIME type for API ('application/pdf', 'image/png',
+                                'image/jpeg' or 'image/webp')
     
     Raises:
         ValueError: If file type is unsupported or encoding fails
@@ -567,17 +596,21 @@ def encode_file(file_path):
         base64_data = encode_pdf(file_path)
         media_type = "application/pdf"
     elif file_type == 'image':
-        base64_data = encode_image(file_path)
-        media_type = "image/jpeg"
+        # Scaled and encoded by content, so the media type comes from the encoder
+        try:
+            base64_data, media_type = image_encoder.encode(file_path)
+        except Exception as e:
+            print(f"Error: {e}")
+            base64_data = None
     else:
         raise ValueError(
-            f"Unsupported file type for {file_path}. "
+            f"Unsupported file type for {file_path if isinstance(file_path, str) else 'upload'}. "
             "Supported types: PDF, JPG, JPEG, PNG, GIF, BMP, WEBP"
         )
     
     # Validate encoding succeeded
     if base64_data is None:
-        raise ValueError(f"Failed to encode file: {file_path}")
+        raise ValueError(f"Failed to encode file: {file_path if isinstance(file_path, str) else 'upload'}")
     
     return base64_data, file_type, media_type
 
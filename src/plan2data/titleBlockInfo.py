@@ -1,7 +1,21 @@
+import asyncio
+import io
 import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
 import src.plan2data.extractionLogictitleBlock as title_block_tesseract
 import src.plan2data.mistralConnection as mistral
 import src.plan2data.helper as helper
+import src.common.documents as documents
+import src.common.image_encoder as image_encoder
+import src.common.llm_gateway as llm_gateway
+import src.common.metrics as metrics
+import src.common.progress as progress
 
 
 ###############################################################################
@@ -18,35 +32,206 @@ import src.plan2data.helper as helper
 #
 # The primary entrypoint `get_title_block_info` tries the fast OCR path
 # first and falls back to the AI path when confidence is too low.
+#
+# Run back to back, low-confidence drawings paid for both paths. In the
+# hedged mode (TITLEBLOCK_MODE=hedged, default) both paths race:
+#   - the vision request starts TITLEBLOCK_HEDGE_DELAY_SECONDS after the OCR
+#     path, at once if `predict_ocr_failure` expects OCR to fail, or as soon
+#     as the OCR path ends below the confidence threshold
+#   - the first result at or above TITLEBLOCK_CONFIDENCE_THRESHOLD wins and
+#     the other path is cancelled (a pending vision call is never sent, a
+#     running one is aborted; a running Tesseract pass finishes in the
+#     background and is discarded)
+#   - outcomes are counted in titleblock_hedge_total (winner, vision start),
+#     from which the hedge win rate follows
+# Hedging runs its own event loop, so with parsers inline on the API's loop
+# (PARSER_POOL_WORKERS=0) the sequential mode is used.
 ###############################################################################
 
 
-def get_title_block_info(path: str) -> dict | None:
+# ==================== CONFIGURATION ====================
+
+# "hedged" (race OCR and vision) or "sequential" (vision only after OCR failed)
+TITLEBLOCK_MODE = os.getenv("TITLEBLOCK_MODE", "hedged")
+
+# Results below this confidence are not accepted (fallback / keep racing)
+CONFIDENCE_THRESHOLD = float(os.getenv("TITLEBLOCK_CONFIDENCE_THRESHOLD", "0.6"))
+
+# Seconds the OCR path runs alone before the vision request is started
+HEDGE_DELAY = float(os.getenv("TITLEBLOCK_HEDGE_DELAY_SECONDS", "8"))
+
+# OCR failure prediction: share of dark pixels in the right third of the
+# drawing (where the title block is searched) above which OCR is unreliable
+OCR_INK_LIMIT = float(os.getenv("TITLEBLOCK_OCR_INK_LIMIT", "0.12"))
+
+
+def get_title_block_info(path) -> tuple:
     """
     Main entrypoint: extract title block metadata with automatic fallback.
 
     Attempts OCR-based extraction first. If the result is empty or the
-    confidence score is below 0.6, falls back to full AI-based extraction.
+    confidence score is below CONFIDENCE_THRESHOLD, the AI-based extraction
+    is used; in hedged mode it may already be running (see module header).
 
     Args:
-        path: File path to the floor plan image.
+        path: File path to the floor plan image, image bytes, an RGB numpy
+              array of a rendered page, or the DocumentContext of a PDF (OCR
+              then renders only the title block clip, see
+              extractionLogictitleBlock).
 
     Returns:
-        A dict of extracted title block fields, or None if both methods fail.
+        tuple: (output, method, is_successful, confidence)
+            - output (dict): Extracted title block fields ({} if both methods failed)
+            - method (str): "hybrid" (OCR + LLM) or "ai" (vision LLM)
+            - is_successful (bool): True if confidence ≥ CONFIDENCE_THRESHOLD
+            - confidence (float | None): Confidence of the returned result
     """
-    output = json.loads(extract_title_block_info(path))
+    if TITLEBLOCK_MODE == "hedged" and not _loop_running():
+        output, method = asyncio.run(_get_title_block_info_hedged(path))
+    else:
+        output, method = _get_title_block_info_sequential(path)
 
-    # Fall back to AI if OCR returned nothing
-    if not output:
-        print("AI localization started")
-        return json.loads(extract_title_block_info_with_ai(path))
+    confidence = _confidence(output)
+    is_successful = confidence is not None and confidence >= CONFIDENCE_THRESHOLD
+    return output or {}, method, is_successful, confidence
+
+
+def _get_title_block_info_sequential(path) -> tuple:
+    """OCR path, then the vision path if OCR returned nothing or low confidence."""
+    output = _parse(extract_title_block_info(path))
+    if _accepted(output):
+        return output, "hybrid"
+
+    # Fall back to AI if OCR returned nothing or confidence is below the threshold
+    print("AI localization started")
+    return _parse(extract_title_block_info_with_ai(path)), "ai"
+
+
+# ---------------------------------------------------------------------------
+# Hedged mode
+# ---------------------------------------------------------------------------
+
+
+def _loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def predict_ocr_failure(image) -> bool:
+    """
+    Cheap guess whether the OCR path will fail on a drawing.
+
+    Looks at a thumbnail only: scans and shaded renderings (not line art,
+    see image_encoder.analyze) and drawings whose right third is dense with
+    ink (hatching, overlapping geometry) rarely give Tesseract a clean title
+    block.
+
+    Args:
+        image: File path, image bytes, RGB numpy array or the DocumentContext
+               of a PDF (uses the low-DPI render that also locates scanned
+               title blocks).
+
+    Returns:
+        bool: True if the vision request should start at once.
+    """
+    try:
+        if isinstance(image, documents.DocumentContext):
+            thumb = Image.fromarray(image.render(0, title_block_tesseract.LOCATE_DPI))
+        elif isinstance(image, np.ndarray):
+            thumb = Image.fromarray(image)
+        else:
+            thumb = Image.open(io.BytesIO(image) if isinstance(image, (bytes, bytearray)) else image)
+            thumb.draft("L", (image_encoder.THUMBNAIL * 2, image_encoder.THUMBNAIL * 2))
+        thumb = thumb.convert("L")
+        thumb.thumbnail((image_encoder.THUMBNAIL * 2, image_encoder.THUMBNAIL * 2))
+    except Exception as e:
+        print(f"Could not classify image for OCR: {e}")
+        return True
+
+    _, line_art = image_encoder.analyze(thumb)
+    luminance = np.asarray(thumb)
+    right_third = luminance[:, 2 * luminance.shape[1] // 3:]
+    ink = float((right_third < 128).mean()) if right_third.size else 0.0
+    return not line_art or ink > OCR_INK_LIMIT
+
+
+async def _get_title_block_info_hedged(path) -> tuple:
+    """
+    Race the OCR path against the (delayed) vision path.
+
+    Returns:
+        tuple: (output or None, method)
+    """
+    immediate = predict_ocr_failure(path)
+    start_vision = asyncio.Event()
+    if immediate:
+        start_vision.set()
+    vision_start = {"reason": "immediate" if immediate else "not_started"}
+
+    # Tesseract runs on its own thread pool so a losing OCR pass does not
+    # hold up the return (asyncio.run waits for the default executor only)
+    ocr_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="titleblock-ocr")
+
+    async def ocr_path():
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(ocr_pool, _extract_text, path)
+        if not text:
+            return None
+        return _parse(await mistral.call_mistral_for_content_extraction_async(text))
 
-    # Fall back to AI if OCR confidence is below the threshold
-    if output["confidence"] < 0.6:
+    async def vision_path():
+        try:
+            await asyncio.wait_for(start_vision.wait(), HEDGE_DELAY)
+        except asyncio.TimeoutError:
+            pass
+        if vision_start["reason"] == "not_started":
+            vision_start["reason"] = "delayed"
         print("AI localization started")
-        return json.loads(extract_title_block_info_with_ai(path))
+        return _parse(await mistral.call_mistral_for_titleblock_extraction_from_image_async(path))
 
-    return output
+    start = time.perf_counter()
+    tasks = {
+        asyncio.create_task(ocr_path()): "hybrid",
+        asyncio.create_task(vision_path()): "ai",
+    }
+    pending = set(tasks)
+    best, best_method = None, "hybrid"
+    winner = "none"
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                method = tasks[task]
+                try:
+                    output = task.result()
+                except Exception as e:
+                    print(f"Title block {method} path failed: {e}")
+                    output = None
+                if _accepted(output):
+                    best, best_method, winner = output, method, "ocr" if method == "hybrid" else "vision"
+                    pending.clear()
+                    break
+                if output and (_confidence(output) or 0) > (_confidence(best) or -1):
+                    best, best_method = output, method
+                if method == "hybrid" and vision_start["reason"] == "not_started":
+                    # OCR ended without an accepted result: no reason to wait any longer
+                    vision_start["reason"] = "after_ocr"
+                    start_vision.set()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        ocr_pool.shutdown(wait=False, cancel_futures=True)
+        await llm_gateway.aclose()
+
+    metrics.inc("titleblock_hedge_total", winner=winner, vision_start=vision_start["reason"])
+    print(f"Title block: {winner} path won after {time.perf_counter() - start:.1f} s "
+          f"(vision request {vision_start['reason'].replace('_', ' ')})")
+    return best, best_method
 
 
 # ---------------------------------------------------------------------------
@@ -54,6 +239,37 @@ def get_title_block_info(path: str) -> dict | None:
 # ---------------------------------------------------------------------------
 
 
+def _parse(response) -> dict | None:
+    """Parse an LLM answer; None for empty or invalid JSON."""
+    if not response:
+        return None
+    try:
+        output = json.loads(response)
+    except json.JSONDecodeError as e:
+        print(f"Title block answer is not valid JSON: {e}")
+        return None
+    return output if isinstance(output, dict) and output else None
+
+
+def _confidence(output) -> float | None:
+    if not output:
+        return None
+    try:
+        return float(output.get("confidence"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _accepted(output) -> bool:
+    confidence = _confidence(output)
+    return confidence is not None and confidence >= CONFIDENCE_THRESHOLD
+
+
+def _extract_text(image_path):
+    with progress.stage("ocr"):
+        return title_block_tesseract.extract_text_titleblock(image_path)
+
+
 def extract_title_block_info(image_path):
     """
     OCR-based extraction pipeline.
@@ -64,7 +280,7 @@ def extract_title_block_info(image_path):
     Returns:
         JSON string of structured title block fields.
     """
-    text_title_block = title_block_tesseract.extract_text_titleblock(image_path)
+    text_title_block = _extract_text(image_path)
     mistral_response_content = mistral.call_mistral_for_content_extraction(text_title_block)
     return mistral_response_content
 
@@ -81,5 +297,3 @@ def extract_title_block_info_with_ai(image_path):
     """
     mistral_response = mistral.call_mistral_for_titleblock_extraction_from_image(image_path)
     return mistral_response
-
-
@@ -9,52 +9,39 @@ import fitz
 import json
 import re 
 from scipy.spatial import Voronoi
-import matplotlib.pyplot as plt
-from scipy.spatial import voronoi_plot_2d
 import numpy as np
 from collections import defaultdict
 import src.plan2data.mistralConnection as mistral
-import base64
 import pymupdf
 import src.plan2data.titleBlockInfo as tb
+import src.common.documents as documents
+import src.common.image_encoder as image_encoder
+import src.common.progress as progress
 
 
 
 def convert_pdf_to_base64(pdf_path: str, page: int = 0):
     """
-    Convert a specific PDF page to base64-encoded PNG image string.
+    Convert a specific PDF page to a base64-encoded image string.
     
     Used for sending floor plan images to AI vision models for analysis.
+    The page is rendered at the resolution the model accepts and encoded
+    by content (see src/common/image_encoder.py).
     
     Args:
-        pdf_path (str): Path to the PDF file
+        pdf_path (str | bytes | DocumentContext): Path to the PDF file, the PDF
+                  bytes, or the request's document context (render memoized)
         page (int): Page number to convert (default: 0 for first page)
     
     Returns:
-        str: Base64-encoded PNG image as string
+        str: Base64-encoded image (PNG for line drawings) as string
     
     Example:
         >>> base64_img = convert_pdf_to_base64("floorplan.pdf")
         >>> # Can now send to vision API
     """
-    # Open the document
-    pdfIn = pymupdf.open(pdf_path)
-    
-    # Select the page
-    page_obj = pdfIn[page]
-    
-    # Convert to image at 300 DPI for good quality
-    pix = page_obj.get_pixmap(dpi=300)
-    
-    # Convert to PNG bytes
-    img_bytes = pix.pil_tobytes(format="PNG")
-    
-    # Encode to base64 string
-    base64_image = base64.b64encode(img_bytes).decode('utf-8')
-    
-    pdfIn.close()
-    
-    return base64_image
+    image = image_encoder.render_pdf_page(pdf_path, page)
+    return image_encoder.encode(image)[0]
 
 
 def is_number_like(text):
@@ -176,7 +163,8 @@ def extract_text_from_pdf(pdf_path, clean=True):
     coordinates, and technical annotations to focus on room names and labels.
     
     Args:
-        pdf_path (str): Path to the input PDF file
+        pdf_path (str | bytes | DocumentContext): Path to the input PDF file, the
+                  PDF bytes, or the request's document context
         clean (bool): If True, filter out numbers, coordinates, and short strings (default: True)
     
     Returns:
@@ -185,17 +173,14 @@ def extract_text_from_pdf(pdf_path, clean=True):
     Note:
         Prints extraction statistics when clean=True, showing how many elements were filtered.
     """
-    doc = fitz.open(pdf_path)
-    
     all_text = []
     filtered_count = 0
     total_count = 0
     
-    # Process each page
-    for page in doc:
-        textpage = page.get_textpage()
-        text_dict = textpage.extractDICT()
-        
+    # Process each page (text dicts are memoized in the document context)
+    with documents.document_context(pdf_path) as document:
+        text_dicts = [document.text_dict(page) for page in range(document.page_count)]
+    for text_dict in text_dicts:
         for block in text_dict["blocks"]:
             if "lines" in block:
                 for line in block["lines"]:
@@ -219,8 +204,6 @@ def extract_text_from_pdf(pdf_path, clean=True):
                         
                         all_text.append(text)
     
-    doc.close()
-    
     # Print extraction statistics
     if clean:
         print(f"📊 Text Extraction Statistics:")
@@ -241,7 +224,8 @@ def ai_roomnames_from_pdf(pdf_path):
     which text elements are actual room names vs. technical annotations.
     
     Args:
-        pdf_path (str): Path to the floor plan PDF
+        pdf_path (str | bytes | DocumentContext): Path to the floor plan PDF, the
+                  PDF bytes, or the request's document context
     
     Returns:
         list: List of identified room names from AI
@@ -772,7 +756,8 @@ def neighboring_rooms_voronoi(pdf_path):
     7. Identify neighboring rooms from shared Voronoi edges
     
     Args:
-        pdf_path (str): Path to the PDF floor plan file
+        pdf_path (str | bytes | DocumentContext): Path to the PDF floor plan file,
+                  the PDF bytes, or the request's document context
     
     Returns:
         dict: Dictionary mapping room names to lists of neighboring room names
@@ -783,12 +768,18 @@ def neighboring_rooms_voronoi(pdf_path):
         centerpoints create adjacent Voronoi cells are likely to be neighboring
         rooms on the floor plan.
     """
+    with documents.document_context(pdf_path) as document:
+        return _neighboring_rooms_voronoi(document)
+
+
+def _neighboring_rooms_voronoi(document):
     # Get AI-identified room names
-    room_names_ai = ai_roomnames_from_pdf(pdf_path)
+    with progress.stage("room-names"):
+        room_names_ai = ai_roomnames_from_pdf(document)
+    progress.partial("room-names", room_names_ai)
     
-    # Open PDF
-    doc = fitz.open(pdf_path)
-    page = doc[0]
+    # First page of the shared document handle
+    page = document.page(0)
     
     # Define clip rectangle to exclude title block and margins
     # Use 80% of width to exclude right-side plan information
@@ -804,8 +795,7 @@ def neighboring_rooms_voronoi(pdf_path):
     )
     
     # Extract words from clipped region
-    word = page.get_textpage(clip_rect)
-    bbox = word.extractWORDS()
+    bbox = document.words(0, clip_rect)
     
     # Filter 1: Valid room names (using AI list)
     filtered_bbox_string_1 = [
@@ -842,12 +832,11 @@ def neighboring_rooms_voronoi(pdf_path):
     flipped_centerpoints = make_names_unique(flipped_centerpoints)
     
     # Create Voronoi diagram and extract neighbors
-    neighbors, vor = extract_bounded_voronoi_neighbors_detailed(
-        flipped_centerpoints, 
-        flipped_rect
-    )
-    
-    doc.close()
+    with progress.stage("voronoi-diagram"):
+        neighbors, vor = extract_bounded_voronoi_neighbors_detailed(
+            flipped_centerpoints, 
+            flipped_rect
+        )
     
     return neighbors
 
@@ -864,6 +853,10 @@ def visualize_voronoi_cells(vor, centerpoints, neighbors, save_path=None):
     Returns:
         None
     """
+    # matplotlib is only needed for debugging, keep it out of the parser import
+    import matplotlib.pyplot as plt
+    from scipy.spatial import voronoi_plot_2d
+
     fig, ax = plt.subplots(1, 1, figsize=(12, 10))
     voronoi_plot_2d(vor, ax=ax, show_vertices=False, line_colors='blue', line_width=2)
     for i, cp in enumerate(centerpoints):
@@ -896,7 +889,9 @@ def extract_full_floorplan(pdf_path):
     5. Combine all data into structured JSON output
     
     Args:
-        pdf_path (str): Path to the PDF floor plan file
+        pdf_path (str | bytes | DocumentContext): Path to the PDF floor plan file,
+                  the PDF bytes, or the request's document context (opened once
+                  for the text, the words and the render)
     
     Returns:
         str: JSON string containing:
@@ -921,26 +916,36 @@ def extract_full_floorplan(pdf_path):
             }
         }
     """
+    with documents.document_context(pdf_path) as document:
+        return _extract_full_floorplan(document)
+
+
+def _extract_full_floorplan(pdf_path):
     try:
         # 1. Get neighboring rooms from Voronoi analysis
         print("🔍 Step 1: Getting Voronoi neighbors...")
-        neighbors_vor = neighboring_rooms_voronoi(pdf_path)
+        with progress.stage("voronoi"):
+            neighbors_vor = neighboring_rooms_voronoi(pdf_path)
         print(f"✅ Got neighbors: {type(neighbors_vor)}")
         
         print("🔍 Step 2: Converting to dict...")
         if isinstance(neighbors_vor, str):
             neighbors_vor = json.loads(neighbors_vor)
         print(f"✅ Neighbors dict: {neighbors_vor}")
+        # Neighbours are usable before the vision call returns
+        progress.partial("voronoi", {"neighboring_rooms": neighbors_vor})
         
         print("🔍 Step 3: Converting PDF to base64...")
-        base64_image = convert_pdf_to_base64(pdf_path)
+        with progress.stage("render"):
+            base64_image = convert_pdf_to_base64(pdf_path)
         print(f"✅ Got base64 image: {len(base64_image)} characters")
         
         print("🔍 Step 4: Calling Mistral API...")
-        connected_rooms_response = mistral.call_mistral_connected_rooms(
-            base64_image, 
-            json.dumps(neighbors_vor)
-        )
+        with progress.stage("connected-rooms"):
+            connected_rooms_response = mistral.call_mistral_connected_rooms(
+                base64_image, 
+                json.dumps(neighbors_vor)
+            )
         print(f"✅ Got Mistral response: {type(connected_rooms_response)}")
         
         print("🔍 Step 5: Parsing response...")
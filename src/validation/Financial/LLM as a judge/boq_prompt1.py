@@ -1,20 +1,19 @@
+import sys
+from pathlib import Path
+
+# Add project root to Python path (this script is run directly)
+root = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(root))
+
 import json
-from mistralai import Mistral
-from mistralai.client import MistralClient
+import src.common.llm_gateway as llm_gateway
 
 
 ## Retrieve the API key from environment variables
 #api_key = os.environ["MISTRAL_API_KEY"]
-from dotenv import load_dotenv
-import os
-load_dotenv()
-api_key = os.getenv("MISTRAL_API_KEY")
-import json
-from mistralai import Mistral
 from typing import Any, Dict
 
 model = "mistral-small-2503"
-client = Mistral(api_key=api_key)
 
 
 def create_prompt_boq(ground_truth: Dict[str, Any], parser_result: Dict[str, Any]) -> str:
@@ -103,8 +102,8 @@ def call_mistral_evaluation(ground_truth: Dict[str, Any], parser_result: Dict[st
     print(f"Estimated tokens: ~{len(message) // 4}")
     
     try:
-        chat_response = client.chat.complete(
-            model=model,
+        chat_response = llm_gateway.complete("judge_boq", model,
+            priority="validation",
             messages=[
                 {
                     "role": "user",
@@ -1,15 +1,17 @@
+import sys
+from pathlib import Path
+
+# Add project root to Python path (this script is run directly)
+root = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(root))
+
 import json
-from mistralai import Mistral
+import src.common.llm_gateway as llm_gateway
 
 ## Retrieve the API key from environment variables
 #api_key = os.environ["MISTRAL_API_KEY"]
 
 model = "mistral-small-2503"
-from dotenv import load_dotenv
-import os
-load_dotenv()
-api_key = os.getenv("MISTRAL_API_KEY")
-client = Mistral(api_key=api_key)
 def create_prompt_full_plan_ai(ground_truth, parser_result):
     """
     Combined evaluation prompt for full plan AI extraction (title block + neighboring rooms)
@@ -330,8 +332,8 @@ def call_mistral_evaluation(ground_truth, parser_result):
         "content": message
         }
     ]
-    chat_response = client.chat.complete(
-        model = model,
+    chat_response = llm_gateway.complete("judge_full_plan_ai", model,
+        priority="validation",
         messages = messages,
         response_format = {
             "type": "json_object",
@@ -1,14 +1,16 @@
+import sys
+from pathlib import Path
+
+# Add project root to Python path (this script is run directly)
+root = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(root))
+
 import json
 from typing import Dict, Any
-from mistralai import Mistral
+import src.common.llm_gateway as llm_gateway
 
 # Configuration for Mistral AI model
 model = "mistral-small-2503"
-from dotenv import load_dotenv
-import os
-load_dotenv()
-api_key = os.getenv("MISTRAL_API_KEY")
-client = Mistral(api_key=api_key)
 
 def create_prompt_neighboring_rooms(ground_truth, parser_result):
     """
@@ -245,8 +247,8 @@ def call_mistral_evaluation(ground_truth: Dict[str, Any], parser_result: Dict[st
     
     try:
         # Call Mistral API with JSON response format enforcement
-        chat_response = client.chat.complete(
-            model=model,
+        chat_response = llm_gateway.complete("judge_neighboring_rooms", model,
+            priority="validation",
             messages=[
                 {
                     "role": "user",
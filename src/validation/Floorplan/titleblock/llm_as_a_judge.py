@@ -1,15 +1,10 @@
 import json
-from mistralai import Mistral
+import src.common.llm_gateway as llm_gateway
 
 ## Retrieve the API key from environment variables
 #api_key = os.environ["MISTRAL_API_KEY"]
 
 model = "mistral-small-2503"
-from dotenv import load_dotenv
-import os
-load_dotenv()
-api_key = os.getenv("MISTRAL_API_KEY")
-client = Mistral(api_key=api_key)
 def create_prompt_titleblock(ground_truth, parser_result):
     """
     Evaluation prompt for title block extraction evaluation, llm as a judge
@@ -339,8 +334,8 @@ def call_mistral_evaluation(ground_truth, parser_result):
         "content": message
         }
     ]
-    chat_response = client.chat.complete(
-        model = model,
+    chat_response = llm_gateway.complete("judge_titleblock", model,
+        priority="validation",
         messages = messages,
         response_format = {
             "type": "json_object",
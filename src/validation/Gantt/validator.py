@@ -1,14 +1,9 @@
 import json
-from mistralai import Mistral
+import src.common.llm_gateway as llm_gateway
 
 ## Retrieve the API key from environment variables
 
 model = "mistral-small-2503"
-from dotenv import load_dotenv
-import os
-load_dotenv()
-api_key = os.getenv("MISTRAL_API_KEY")
-client = Mistral(api_key=api_key)
 
 def create_prompt_gantt_new(ground_truth, parser_result):
     """
@@ -265,8 +260,8 @@ def call_mistral_evaluation(ground_truth, parser_result):
         "content": message
         }
     ]
-    chat_response = client.chat.complete(
-        model = model,
+    chat_response = llm_gateway.complete("judge_gantt", model,
+        priority="validation",
         messages = messages,
         response_format = {
             "type": "json_object",
@@ -282,8 +277,8 @@ def call_mistral_evaluation_visual(ground_truth, parser_result):
         "content": message
         }
     ]
-    chat_response = client.chat.complete(
-        model = model,
+    chat_response = llm_gateway.complete("judge_gantt_visual", model,
+        priority="validation",
         messages = messages,
         response_format = {
             "type": "json_object",
@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+# Modules read their configuration from the environment at import time:
+# keep stores, caches and spools of the test run out of the working tree.
+_STORE = tempfile.mkdtemp(prefix="parser-tests-")
+os.environ.setdefault("JOB_STORE_DIR", _STORE)
+os.environ.setdefault("SESSION_STORE_DIR", _STORE)
+os.environ.setdefault("RESULT_CACHE_DIR", os.path.join(_STORE, "results"))
+os.environ.setdefault("LLM_CACHE_DIR", os.path.join(_STORE, "llm"))
+os.environ.setdefault("PARSER_POOL_WORKERS", "0")
+os.environ.setdefault("PARSER_POOL_PREWARM", "0")
+os.environ.setdefault("MISTRAL_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MPLBACKEND", "Agg")  # camelot imports matplotlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,36 @@
+import json
+
+import pymupdf
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+import src.common.result_cache as result_cache
+
+
+def pdf_bytes(text: str) -> bytes:
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_each_document_reports_its_own_status(monkeypatch):
+    async def run_parser_cached(parser, source, variant, input_format, **kwargs):
+        if b"huge" in source:
+            raise HTTPException(status_code=413, detail="Document would need about 4096 MiB to process")
+        if b"broken" in source:
+            raise RuntimeError("parser crashed")
+        return {"items": []}, "stub", True, 0.9
+
+    monkeypatch.setattr(result_cache, "run_parser_cached", run_parser_cached)
+    # Page text is stored compressed; the marker is appended in plain bytes
+    files = [("files", (name, pdf_bytes(name) + name.encode(), "application/pdf")) for name in ("ok", "huge", "broken")]
+    with TestClient(main.app) as client:
+        response = client.post("/financial_parser/batch/", files=files)
+    lines = {line["filename"]: line for line in map(json.loads, response.text.splitlines())}
+    assert lines["ok"]["status_code"] == 200
+    assert lines["huge"]["status_code"] == 413
+    assert lines["huge"]["detail"].startswith("Document would need")
+    assert lines["broken"]["status_code"] == 500
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import src.boq2data.camelot_setup.Camelot_Functions as cam
+import src.boq2data.camelot_setup.boq2data_mistral as boq
+
+COLUMNS = ["Item_Number", "Description", "Unit", "Quantity", "Rate", "Amount"]
+
+
+def row(*cells) -> dict:
+    cells = list(cells) + [""] * (len(COLUMNS) - len(cells))
+    return dict(zip(COLUMNS, cells))
+
+
+def heading(number: str, title: str) -> dict:
+    return row(number, title)
+
+
+def item(number: str, description: str = "Concrete C30/37 in foundations") -> dict:
+    return row(number, description, "m3", "150", "25.00", "3750.00")
+
+
+def section(number: int, items: int) -> list[dict]:
+    return [heading(str(number), f"Section {number}")] + [item(f"{number}.{i}") for i in range(1, items + 1)]
+
+
+def tokens(rows: list[dict]) -> int:
+    return sum(len(boq.compact_row(r)) // 4 + 1 for r in rows)
+
+
+# ==================== SHARDING ====================
+
+def test_small_table_is_one_shard_without_the_column_row():
+    rows = [row(*COLUMNS)] + section(1, 3)
+    shards = boq.shard_rows(rows, max_tokens=10000)
+    assert len(shards) == 1
+    index, shard, context = shards[0]
+    assert (index, context) == (0, None)
+    assert shard == section(1, 3)
+
+
+def test_shards_are_cut_before_section_headings():
+    rows = section(1, 4) + section(2, 4) + section(3, 4)
+    budget = tokens(section(1, 4)) + 3  # room for a section, not for the next heading and item
+    shards = boq.shard_rows(rows, max_tokens=budget)
+    assert [shard for _, shard, _ in shards] == [section(1, 4), section(2, 4), section(3, 4)]
+    assert all(context is None for _, _, context in shards)
+
+
+def test_long_section_carries_its_heading_as_context():
+    rows = section(1, 30) + section(2, 2)
+    shards = boq.shard_rows(rows, max_tokens=tokens(section(1, 30)) // 3)
+    assert len(shards) > 2
+    assert [index for index, _, _ in shards] == list(range(len(shards)))
+    assert sum(len(shard) for _, shard, _ in shards) == len(rows)
+    heading_1 = boq.compact_row(heading("1", "Section 1"))
+    for _, shard, context in shards[1:]:
+        if boq.is_section_heading(shard[0]):
+            assert context is None
+        else:
+            assert context == heading_1 or shard[0]["Item_Number"].startswith("2.")
+    # The continuation context is sent with the shard's rows
+    _, shard, context = shards[1]
+    assert f"(these rows continue the section: {heading_1})" in boq.compact_table(COLUMNS, shard, context)
+
+
+# ==================== MERGING ====================
+
+def answer(confidence: float, *sections) -> dict:
+    return {"Sections": [{"Section Title": title, "Items": list(items)} for title, items in sections],
+            "confidence": confidence}
+
+
+def test_section_split_across_shards_is_joined():
+    merged = boq.merge_boq_shards(
+        [answer(0.9, ("1 Earthwork", ["1.1"]), ("2 Concrete", ["2.1", "2.2"])),
+         answer(0.9, ("2 Concrete", ["2.3"]), ("3 Masonry", ["3.1"]))],
+        [10, 10],
+    )
+    assert [(s["Section Title"], s["Items"]) for s in merged["Sections"]] == [
+        ("1 Earthwork", ["1.1"]), ("2 Concrete", ["2.1", "2.2", "2.3"]), ("3 Masonry", ["3.1"]),
+    ]
+    assert "failed_shards" not in merged
+
+
+def test_confidence_is_row_weighted_and_failed_shards_count_as_zero():
+    merged = boq.merge_boq_shards(
+        [answer(0.9, ("1", ["1.1"])), None, answer(0.6, ("3", ["3.1"]))],
+        [30, 10, 60],
+    )
+    assert merged["confidence"] == pytest.approx((0.9 * 30 + 0.6 * 60) / 100)
+    assert merged["failed_shards"] == [2]
+    assert [s["Section Title"] for s in merged["Sections"]] == ["1", "3"]
+
+
+def test_bare_array_answers_are_wrapped():
+    assert boq.normalize_boq_output([{"Section Title": "1"}]) == {"Sections": [{"Section Title": "1"}], "confidence": 0.5}
+    with pytest.raises(ValueError):
+        boq.normalize_boq_output("not a BOQ")
+
+
+# ==================== PAGE HEADERS ====================
+
+def table(page: int, rows: list[list[str]]):
+    return SimpleNamespace(page=page, df=pd.DataFrame(rows))
+
+
+@pytest.fixture
+def no_plot(monkeypatch):
+    monkeypatch.setattr(cam.camelot, "plot", lambda *args, **kwargs: SimpleNamespace(show=lambda: None))
+
+
+def test_repeated_page_headers_are_dropped_but_repeated_items_kept(no_plot):
+    header = ["Item", "Description", "Unit", "Qty", "Rate", "Amount"]
+    provisional = ["PS", "Provisional sum for dewatering", "item", "1", "500.00", "500.00"]
+    rows = cam.cam_stream_merge([
+        table(1, [header, provisional, ["2.1", "Excavation", "m3", "100", "5.00", "500.00"]]),
+        table(2, [header, provisional, ["2.3", "Blinding", "m2", "80", "4.00", "320.00"]]),
+    ])
+    descriptions = [r["Description"] for r in rows]
+    assert descriptions.count("Description") == 1  # column row kept once (it names the columns)
+    assert descriptions.count("Provisional sum for dewatering") == 2
+    assert "Blinding" in descriptions
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import src.common.executor as executor
+import src.common.memory as memory
+
+
+@pytest.fixture
+def inline():
+    executor.configure(workers=0, queue_depth=2)
+    yield
+    executor.configure(workers=0)
+
+
+@pytest.fixture
+def pool():
+    executor.configure(workers=1, queue_depth=2)
+    yield
+    executor.configure(workers=0)
+
+
+def test_full_endpoint_queue_answers_429(inline, monkeypatch):
+    gate = executor._get_gate("financial")
+    executor.admit("financial")
+    monkeypatch.setattr(gate, "pending", gate.concurrency + gate.queue_depth)
+    with pytest.raises(HTTPException) as e:
+        executor.admit("financial")
+    assert e.value.status_code == 429
+    assert e.value.headers["Retry-After"] == str(executor.RETRY_AFTER_SECONDS)
+    executor.admit("drawing")  # other endpoints are not affected
+
+
+def test_saturated_pool_answers_503(inline, monkeypatch):
+    monkeypatch.setattr(executor, "_pending", executor._pool_capacity())
+    with pytest.raises(HTTPException) as e:
+        executor.admit("drawing")
+    assert e.value.status_code == 503
+
+
+def test_document_above_the_job_budget_answers_413(inline, monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_JOB_BUDGET", 100 * memory.MIB)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(executor.run_parser("drawing", len, b"", predicted_bytes=200 * memory.MIB))
+    assert e.value.status_code == 413
+    # Inline mode still runs documents within the budget
+    assert asyncio.run(executor.run_parser("drawing", len, b"abc", predicted_bytes=memory.MIB)) == 3
+
+
+def test_waiting_jobs_are_served_without_backpressure(inline, monkeypatch):
+    gate = executor._get_gate("gantt")
+    monkeypatch.setattr(gate, "pending", gate.concurrency + gate.queue_depth)
+    assert asyncio.run(executor.run_parser("gantt", len, b"ab", backpressure=False)) == 2
+
+
+def test_reservation_outlives_a_cancelled_request(pool):
+    predicted = 10 * memory.MIB
+
+    async def scenario():
+        await executor.run_parser("drawing", time.sleep, 0)  # start the worker
+        task = asyncio.create_task(executor.run_parser("drawing", time.sleep, 1.0, predicted_bytes=predicted))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The worker still runs the job: its memory stays reserved
+        assert executor._reserved == predicted
+        deadline = time.time() + 5
+        while executor._reserved and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        assert executor._reserved == 0
+
+    asyncio.run(scenario())
+
+
+def test_reservation_is_released_after_a_job(pool):
+    async def scenario():
+        assert await executor.run_parser("drawing", len, b"abcd", predicted_bytes=memory.MIB) == 4
+        await asyncio.sleep(0.05)
+        return executor._reserved
+
+    assert asyncio.run(scenario()) == 0
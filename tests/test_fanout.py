@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import src.common.fanout as fanout
+import src.common.llm_cache as llm_cache
+import src.common.llm_gateway as llm_gateway
+import src.common.rate_limit as rate_limit
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(fanout, "FANOUT_RETRY_DELAY", 0)
+
+
+class Chunks:
+    """Generator-like chunk source that records what was produced and whether it was closed."""
+
+    def __init__(self, count: int):
+        self.produced = []
+        self.closed = False
+        self._source = self._generate(count)
+
+    def _generate(self, count):
+        for index in range(count):
+            self.produced.append(index)
+            yield index
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._source)
+
+    def close(self):
+        self.closed = True
+        self._source.close()
+
+
+def test_results_keep_chunk_order():
+    def task(chunk):
+        time.sleep(0.01 * (4 - chunk))  # later chunks finish first
+        return chunk * 10
+
+    assert fanout.map_chunks("test", task, [0, 1, 2, 3], concurrency=4) == [0, 10, 20, 30]
+
+
+def test_failed_chunks_are_retried_then_skipped():
+    attempts = {}
+
+    def task(chunk):
+        attempts[chunk] = attempts.get(chunk, 0) + 1
+        if chunk == 1 and attempts[chunk] < 2:
+            raise ValueError("unparsable answer")
+        if chunk == 2:
+            raise ValueError("always broken")
+        return chunk
+
+    assert fanout.map_chunks("test", task, [0, 1, 2], concurrency=3, retries=2) == [0, 1, None]
+    assert attempts == {0: 1, 1: 2, 2: 3}
+
+
+def test_each_chunk_is_released_once_after_its_task():
+    released = []
+    lock = threading.Lock()
+
+    def release(chunk):
+        with lock:
+            released.append(chunk)
+
+    def task(chunk):
+        assert chunk not in released
+        if chunk == 2:
+            raise ValueError("broken")
+        return chunk
+
+    fanout.map_chunks("test", task, [0, 1, 2, 3], release=release, concurrency=2, retries=1)
+    assert sorted(released) == [0, 1, 2, 3]
+
+
+def test_generator_is_consumed_lazily():
+    chunks = Chunks(6)
+    ahead = []
+
+    def task(chunk):
+        ahead.append(len(chunks.produced) - chunk)
+        time.sleep(0.01)
+        return chunk
+
+    assert fanout.map_chunks("test", task, chunks, concurrency=2) == list(range(6))
+    assert max(ahead) <= 2  # never more than `concurrency` chunks produced ahead
+    assert chunks.closed
+
+
+def test_interrupted_caller_closes_the_generator(monkeypatch):
+    chunks = Chunks(10)
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(fanout, "wait", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        fanout.map_chunks("test", lambda chunk: chunk, chunks, concurrency=2)
+    assert chunks.closed
+    assert chunks.produced == [0, 1]
+
+
+def test_removed_chunk_files(tmp_path, capsys):
+    path = tmp_path / "chunk.png"
+    path.write_bytes(b"png")
+    fanout.remove_file(str(path))
+    fanout.remove_file(str(path))
+    assert not path.exists()
+    assert capsys.readouterr().out == ""
+
+
+# ==================== RETRIES AND THE LLM CACHE ====================
+
+@pytest.fixture
+def llm(monkeypatch, tmp_path):
+    """Fake OpenAI client answering from `answers`, behind an LLM cache in read mode."""
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MODE", "read")
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_cache, "_db", None)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_SHARED", False)
+    monkeypatch.setattr(rate_limit, "_db", None)
+    monkeypatch.setenv("LLM_REQUESTS_PER_MINUTE_OPENAI", "60000")
+    monkeypatch.setenv("LLM_TOKENS_PER_MINUTE_OPENAI", "0")
+
+    answers = []
+
+    def create(model, messages, **kwargs):
+        return llm_cache.from_content("openai", model, answers.pop(0))
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setitem(llm_gateway._clients, "openai", fake)
+    yield answers
+    llm_cache._db.close()
+
+
+def parse_chunk(chunk):
+    response = llm_gateway.complete("test", "model", [{"role": "user", "content": f"chunk {chunk}"}],
+                                    provider="openai")
+    return json.loads(response.choices[0].message.content)
+
+
+def test_retry_does_not_get_the_cached_bad_answer(llm):
+    llm.extend(["not json", '{"rooms": 1}'])
+    assert fanout.map_chunks("test", parse_chunk, [0], retries=1) == [{"rooms": 1}]
+    assert llm == []
+    # The good answer replaced the bad one in the cache
+    assert fanout.map_chunks("test", parse_chunk, [0], retries=1) == [{"rooms": 1}]
+
+
+def test_replay_mode_does_not_retry(llm, monkeypatch):
+    llm.append("not json")
+    fanout.map_chunks("test", parse_chunk, [0], retries=0)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MODE", "replay")
+    attempts = []
+
+    def task(chunk):
+        attempts.append(chunk)
+        return parse_chunk(chunk)
+
+    assert fanout.map_chunks("test", task, [0], retries=2) == [None]
+    assert attempts == [0]
@@ -0,0 +1,39 @@
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+import src.common.image_encoder as image_encoder
+import src.common.metrics as metrics
+
+
+def images_counted(**labels) -> float:
+    return metrics._counters.get(metrics._key("vision_images_total", labels), 0)
+
+
+def test_line_drawing_is_sent_as_png_without_logging(capsys):
+    drawing = np.full((400, 600, 3), 255, dtype=np.uint8)
+    drawing[100:102, :] = 0
+    drawing[:, 300:302] = 0
+    before = images_counted(format="png", content="line_art", color="gray")
+
+    encoded, media_type = image_encoder.encode(drawing)
+
+    assert media_type == "image/png"
+    with Image.open(io.BytesIO(base64.b64decode(encoded))) as im:
+        assert (im.size, im.mode) == ((600, 400), "L")
+    assert images_counted(format="png", content="line_art", color="gray") == before + 1
+    assert capsys.readouterr().out == ""
+
+
+def test_oversized_photo_is_scaled_to_the_model_limits():
+    rng = np.random.default_rng(0)
+    photo = rng.integers(0, 255, (2000, 3000, 3), dtype=np.uint8)
+
+    encoded, media_type = image_encoder.encode(photo)
+
+    assert media_type == "image/jpeg"
+    with Image.open(io.BytesIO(base64.b64decode(encoded))) as im:
+        assert max(im.size) <= image_encoder.MAX_DIMENSION
+        assert im.width * im.height <= image_encoder.MAX_PIXELS
@@ -0,0 +1,103 @@
+import asyncio
+import io
+import os
+import time
+
+import pymupdf
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+import src.common.jobs as jobs
+import src.common.result_cache as result_cache
+
+
+def pdf_bytes() -> bytes:
+    doc = pymupdf.open()
+    doc.new_page()
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (20, 20)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Replace the parsers: records the stored inputs, waits while state["block"] is set."""
+    calls = []
+    state = {"block": False}
+
+    async def run_parser_cached(parser, source, variant, input_format, **kwargs):
+        calls.append({"parser": parser, "source": source, "input_format": input_format,
+                      "exists": os.path.exists(source)})
+        while state["block"]:
+            await asyncio.sleep(0.01)
+        return {"rooms": []}, "test", True, None
+
+    monkeypatch.setattr(result_cache, "run_parser_cached", run_parser_cached)
+    return calls, state
+
+
+def wait_for(client: TestClient, job_id: str, status: str) -> dict:
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {status}: {job}")
+
+
+def test_job_lifecycle(parsed):
+    calls, _ = parsed
+    with TestClient(main.app) as client:
+        job = client.post("/jobs/financial", files={"file": ("boq.pdf", pdf_bytes(), "application/pdf")}).json()
+        assert job["status"] == jobs.QUEUED
+        finished = wait_for(client, job["job_id"], jobs.SUCCEEDED)
+    assert finished["result"]["result"] == {"rooms": []}
+    assert finished["filename"] == "boq.pdf"
+    assert not os.path.exists(calls[0]["source"])  # upload removed once parsed
+
+
+@pytest.mark.parametrize("filename, content, extension", [
+    ("blob", pdf_bytes(), ".pdf"),  # drawing PDF without a file extension
+    ("plan.png", png_bytes(), ".jpg"),  # image stored as the JPEG ingest produced
+])
+def test_stored_extension_follows_the_content(parsed, filename, content, extension):
+    calls, _ = parsed
+    with TestClient(main.app) as client:
+        job = client.post("/jobs/drawing?variant=rooms-ai", files={"file": (filename, content)}).json()
+        wait_for(client, job["job_id"], jobs.SUCCEEDED)
+    assert os.path.splitext(calls[0]["source"])[1] == extension
+
+
+def test_cancel_running_job(parsed):
+    calls, state = parsed
+    state["block"] = True
+    with TestClient(main.app) as client:
+        job = client.post("/jobs/financial", files={"file": ("boq.pdf", pdf_bytes(), "application/pdf")}).json()
+        wait_for(client, job["job_id"], jobs.RUNNING)
+        assert client.delete(f"/jobs/{job['job_id']}").json()["status"] == jobs.CANCELLED
+        cancelled = wait_for(client, job["job_id"], jobs.CANCELLED)
+    assert cancelled["finished_at"] is not None
+    assert not os.path.exists(calls[0]["source"])
+
+
+def test_full_job_queue_is_rejected(parsed, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_QUEUE_DEPTH", 0)
+    with TestClient(main.app) as client:
+        response = client.post("/jobs/financial", files={"file": ("boq.pdf", pdf_bytes(), "application/pdf")})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == str(jobs.JOB_RETRY_AFTER)
+
+
+def test_unknown_job(parsed):
+    with TestClient(main.app) as client:
+        assert client.get("/jobs/missing").status_code == 404
+        assert client.delete("/jobs/missing").status_code == 404
@@ -0,0 +1,174 @@
+import asyncio
+import base64
+import io
+import threading
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+import src.common.llm_cache as llm_cache
+import src.common.llm_gateway as llm_gateway
+import src.common.rate_limit as rate_limit
+
+
+def image_url(encoded: str) -> list:
+    return [{"role": "user", "content": [
+        {"type": "text", "text": "Which rooms are shown?"},
+        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{encoded}"}},
+    ]}]
+
+
+def test_key_ignores_transport_arguments_and_image_encoding():
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "white").save(buffer, "PNG")
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    wrapped = "\n".join(encoded[i:i + 16] for i in range(0, len(encoded), 16))
+
+    key = llm_cache.make_key("mistral", "model", image_url(encoded), {"temperature": 0})
+    assert key == llm_cache.make_key("mistral", "model", image_url(wrapped), {"temperature": 0, "timeout_ms": 5})
+    assert key != llm_cache.make_key("mistral", "model", image_url(encoded), {"temperature": 1})
+    assert key != llm_cache.make_key("mistral", "other-model", image_url(encoded), {"temperature": 0})
+    assert key != llm_cache.make_key("openai", "model", image_url(encoded), {"temperature": 0})
+
+
+@pytest.fixture
+def llm(monkeypatch, tmp_path):
+    """Fake OpenAI client numbering its answers; the cache lives in a temporary directory."""
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_cache, "_db", None)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_SHARED", False)
+    monkeypatch.setattr(rate_limit, "_db", None)
+    monkeypatch.setenv("LLM_REQUESTS_PER_MINUTE_OPENAI", "60000")
+    monkeypatch.setenv("LLM_TOKENS_PER_MINUTE_OPENAI", "0")
+    calls = []
+
+    def create(model, messages, **kwargs):
+        calls.append(messages)
+        return llm_cache.from_content("openai", model, f"answer {len(calls)}")
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setitem(llm_gateway._clients, "openai", fake)
+
+    def mode(value: str):
+        monkeypatch.setattr(llm_cache, "LLM_CACHE_MODE", value)
+
+    yield SimpleNamespace(calls=calls, mode=mode)
+    if llm_cache._db is not None:
+        llm_cache._db.close()
+
+
+def ask(question: str = "How many rooms?") -> str:
+    response = llm_gateway.complete("test", "model", [{"role": "user", "content": question}], provider="openai")
+    return response.choices[0].message.content
+
+
+def test_read_mode_calls_once_then_serves_the_stored_answer(llm):
+    llm.mode("read")
+    assert ask() == "answer 1"
+    assert ask() == "answer 1"
+    assert ask("   How many rooms?  ") == "answer 1"  # whitespace is normalized
+    assert len(llm.calls) == 1
+    assert ask("Which floor?") == "answer 2"
+
+
+def test_record_mode_always_calls_and_refreshes_the_recording(llm):
+    llm.mode("read")
+    ask()
+    llm.mode("record")
+    assert ask() == "answer 2"
+    llm.mode("read")
+    assert ask() == "answer 2"
+    assert len(llm.calls) == 2
+
+
+def test_replay_mode_serves_recordings_and_never_calls(llm):
+    llm.mode("record")
+    ask()
+    llm.mode("replay")
+    assert ask() == "answer 1"
+    with pytest.raises(llm_cache.LLMCacheMiss):
+        ask("Not recorded")
+    assert len(llm.calls) == 1
+
+
+def test_off_mode_does_not_store(llm):
+    llm.mode("off")
+    ask()
+    ask()
+    assert len(llm.calls) == 2
+    llm.mode("replay")
+    with pytest.raises(llm_cache.LLMCacheMiss):
+        ask()
+
+
+def test_expired_answers_are_refreshed(llm, monkeypatch):
+    llm.mode("read")
+    ask()
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_TTL", -1)
+    assert ask() == "answer 2"
+
+
+def test_least_recently_used_answers_are_evicted(llm, monkeypatch):
+    llm.mode("read")
+    ask("first")
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MAX_BYTES", llm_cache.stats()["bytes"] + 10)
+    ask("second")
+    assert llm_cache.stats()["entries"] == 1
+    assert ask("second") == "answer 2"
+    assert ask("first") == "answer 3"
+
+
+class FakeStream:
+    def __init__(self, pieces: list):
+        self.pieces = list(pieces)
+
+    async def __anext__(self):
+        if not self.pieces:
+            raise StopAsyncIteration
+        delta = SimpleNamespace(content=self.pieces.pop(0))
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta)])
+
+    async def close(self):
+        pass
+
+
+def test_async_calls_use_the_cache_off_the_event_loop(llm, monkeypatch):
+    llm.mode("read")
+    threads = []
+    get, put = llm_cache.get, llm_cache.put
+
+    def record(fn):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return fn(*args, **kwargs)
+        return wrapper
+
+    async def create(model, messages, stream=False, **kwargs):
+        llm.calls.append(messages)
+        if stream:
+            return FakeStream(["streamed ", "answer"])
+        return llm_cache.from_content("openai", model, f"answer {len(llm.calls)}")
+
+    async def async_client(provider):
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    monkeypatch.setattr(llm_cache, "get", record(get))
+    monkeypatch.setattr(llm_cache, "put", record(put))
+    monkeypatch.setattr(llm_gateway, "async_client", async_client)
+    messages = [{"role": "user", "content": "How many rooms?"}]
+
+    async def scenario():
+        first = await llm_gateway.complete_async("test", "model", messages, provider="openai")
+        again = await llm_gateway.complete_async("test", "model", messages, provider="openai")
+        stream = [piece async for piece in llm_gateway.stream_async("test", "model", messages[:1] * 2, provider="openai")]
+        replayed = [piece async for piece in llm_gateway.stream_async("test", "model", messages[:1] * 2, provider="openai")]
+        return first, again, stream, replayed
+
+    first, again, stream, replayed = asyncio.run(scenario())
+    assert first.choices[0].message.content == again.choices[0].message.content == "answer 1"
+    assert "".join(piece.get("delta", "") for piece in stream) == "streamed answer"
+    assert replayed[0] == {"delta": "streamed answer"}
+    assert len(llm.calls) == 2
+    assert len(threads) == 6  # 4 lookups, 2 stores
+    assert threading.get_ident() not in threads
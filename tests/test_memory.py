@@ -0,0 +1,74 @@
+import asyncio
+import os
+
+import pymupdf
+import pytest
+
+import src.common.executor as executor
+import src.common.image_encoder as image_encoder
+import src.common.memory as memory
+import src.common.pipelines as pipelines
+import src.common.result_cache as result_cache
+import src.common.uploads as uploads
+
+
+def a0_pdf(padding: int) -> bytes:
+    """One A0 sheet carrying about `padding` bytes of incompressible embedded data."""
+    doc = pymupdf.open()
+    doc.new_page(width=3370, height=2384).insert_text((72, 72), "Ground floor plan")
+    doc.embfile_add("scan.bin", os.urandom(padding))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Parsers replaced by a stub; returns the predictions passed to the executor."""
+    predictions = []
+    run_parser = executor.run_parser
+
+    async def record(*args, predicted_bytes=0, **kwargs):
+        predictions.append(predicted_bytes)
+        return await run_parser(*args, predicted_bytes=predicted_bytes, **kwargs)
+
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_ENABLED", False)
+    monkeypatch.setattr(executor, "run_parser", record)
+    monkeypatch.setattr(pipelines, "run", lambda *args, **kwargs: ({}, "stub", True, None))
+    return predictions
+
+
+def parse(upload: bytes, parser: str, variant: str | None):
+    return asyncio.run(result_cache.run_parser_cached(parser, upload, variant, "application/pdf"))
+
+
+def test_full_plan_prediction_uses_the_fitted_render():
+    upload = a0_pdf(1024 * 1024)
+    dpi = image_encoder.fitted_dpi(3370, 2384)
+    assert dpi < 100
+    predicted = pipelines.predict_memory("drawing", upload, "full-plan-ai", "application/pdf")
+    assert predicted == memory.predict(upload, dpi, True)
+
+
+def test_a0_full_plan_below_the_upload_limit_is_admitted(parsed):
+    upload = a0_pdf(11 * 1024 * 1024)
+    assert len(upload) < uploads.UPLOAD_MAX_BYTES
+    assert parse(upload, "drawing", "full-plan-ai") == ({}, "stub", True, None)
+    assert parsed[0] <= memory.MEMORY_JOB_BUDGET
+
+
+@pytest.mark.parametrize("parser, variant", [("financial", None), ("drawing", "titleblock-hybrid"),
+                                             ("drawing", "full-plan-ai")])
+def test_pdf_at_the_upload_limit_is_admitted(parsed, parser, variant):
+    upload = a0_pdf(uploads.UPLOAD_MAX_BYTES - 64 * 1024)
+    assert uploads.UPLOAD_MAX_BYTES - 1024 * 1024 < len(upload) <= uploads.UPLOAD_MAX_BYTES
+    assert parse(upload, parser, variant) == ({}, "stub", True, None)
+    assert parsed[0] <= memory.MEMORY_JOB_BUDGET
+
+
+def test_object_allowance_is_bounded(monkeypatch):
+    upload = a0_pdf(1024 * 1024)
+    monkeypatch.setattr(memory, "PDF_OBJECT_MAX", 10 * memory.MIB)
+    assert memory.predict(upload, None, True) == memory.JOB_OVERHEAD + 10 * memory.MIB
+    monkeypatch.setattr(memory, "PDF_OBJECT_MAX", 0)
+    assert memory.predict(upload, None, True) == memory.JOB_OVERHEAD + len(upload) * memory.PDF_OBJECT_FACTOR
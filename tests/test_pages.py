@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+import pymupdf
+import pytest
+from fastapi import HTTPException
+
+import src.common.documents as documents
+import src.common.pages as pages
+
+
+def pdf_bytes(page_count: int) -> bytes:
+    doc = pymupdf.open()
+    for _ in range(page_count):
+        doc.new_page()
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("all", [0, 1, 2, 3, 4]),
+    (" ALL ", [0, 1, 2, 3, 4]),
+    ("2", [1]),
+    ("1-3,5", [0, 1, 2, 4]),
+    ("4-5, 1, 2-3", [0, 1, 2, 3, 4]),
+    ("2,2,1-2,", [0, 1]),
+])
+def test_page_ranges(spec, expected):
+    assert pages.parse_spec(spec, 5) == expected
+
+
+@pytest.mark.parametrize("spec", ["0", "6", "4-6", "3-2"])
+def test_out_of_range_selection(spec):
+    with pytest.raises(ValueError, match="outside"):
+        pages.parse_spec(spec, 5)
+
+
+@pytest.mark.parametrize("spec", ["first", "1-x", "1..3", "2-3-4", "-2"])
+def test_malformed_selection(spec):
+    with pytest.raises(ValueError, match="Invalid page selection"):
+        pages.parse_spec(spec, 5)
+
+
+def test_empty_selection():
+    with pytest.raises(ValueError, match="Empty"):
+        pages.parse_spec(" , ", 5)
+
+
+def test_select_opens_the_pdf_off_the_event_loop(monkeypatch):
+    threads = []
+    open_pdf = documents.open_pdf
+
+    def record(source):
+        threads.append(threading.get_ident())
+        return open_pdf(source)
+
+    monkeypatch.setattr(documents, "open_pdf", record)
+    assert asyncio.run(pages.select(pdf_bytes(3), "application/pdf", "2-3")) == [1, 2]
+    assert threads and threading.get_ident() not in threads
+
+    for source, input_format, spec in [(b"jpeg", "image/jpeg", "1"), (pdf_bytes(3), "application/pdf", "4")]:
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(pages.select(source, input_format, spec))
+        assert e.value.status_code == 400
+
+
+def page(number: int, tasks) -> dict:
+    return {"page": number, "result": tasks, "extraction_method": "tabular",
+            "is_extraction_succesful": True, "confident_value": None}
+
+
+def test_continuation_pages_repeat_tasks_once():
+    first = [
+        {"task": "Foundations", "start": "2024-01-08", "finish": "2024-02-02"},
+        {"task": "Structure", "start": "2024-02-05", "finish": "2024-04-26"},
+    ]
+    second = [
+        {"task": " structure ", "start": "2024-02-05", "finish": "2024-04-26"},  # repeated row
+        {"task": "Structure", "start": "2024-05-06", "finish": "2024-05-31"},    # same name, other dates
+        {"name": "Roof", "start": "2024-05-06", "end": "2024-06-14"},
+    ]
+    merged = pages.merge_tasks([page(1, first), page(2, second)])
+    assert [(task.get("task") or task.get("name"), task["page"]) for task in merged] == [
+        ("Foundations", 1), ("Structure", 1), ("Structure", 2), ("Roof", 2),
+    ]
+
+
+def test_unnamed_and_malformed_entries():
+    tasks = [{"start": "2024-01-08"}, {"start": "2024-01-08"}, "not a task"]
+    merged = pages.merge_tasks([page(1, tasks), page(2, {"error": "no table"})])
+    assert len(merged) == 2  # unnamed rows are never treated as repeats
+
+
+def test_failed_pages_are_left_out_of_the_merge():
+    results = [page(1, [{"task": "A"}]), {"page": 2, "error": "timeout"}, page(3, {"rooms": []})]
+    assert [task["page"] for task in pages.merge("gantt", results)] == [1]
+    assert pages.merge("drawing", results) == {"page 1": [{"task": "A"}], "page 3": {"rooms": []}}
@@ -0,0 +1,59 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import src.common.progress as progress
+
+
+@pytest.fixture(autouse=True)
+def event_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(progress, "EVENT_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(progress, "_db", None)
+    yield
+    if progress._db is not None:
+        progress._db.close()
+
+
+def test_stage_events_are_read_in_order():
+    with progress.bind("job-1"):
+        with progress.stage("voronoi"):
+            progress.partial("voronoi", {"rooms": 3})
+    progress.emit("stage_start", "ignored")  # outside of a job
+    events = progress.events("job-1")
+    assert [event["event"] for event in events] == ["stage_start", "partial", "stage_end"]
+    assert events[1]["data"] == {"stage": "voronoi", "result": {"rooms": 3}}
+    assert progress.events("job-1", after=events[1]["id"]) == events[2:]
+    progress.prune("job-1")
+    assert progress.events("job-1") == []
+
+
+def test_concurrent_readers_share_one_connection(monkeypatch):
+    connections = []
+    connect = sqlite3.connect
+
+    def slow_connect(*args, **kwargs):
+        time.sleep(0.05)  # widen the window in which a second thread could connect as well
+        connections.append(connect(*args, **kwargs))
+        return connections[-1]
+
+    monkeypatch.setattr(progress.sqlite3, "connect", slow_connect)
+    with progress.bind("job-2"):
+        for index in range(20):
+            progress.emit("partial", "rooms", index=index)
+
+    progress._db.close()
+    monkeypatch.setattr(progress, "_db", None)
+    connections.clear()
+    start = threading.Barrier(8)
+
+    def read(_):
+        start.wait()
+        return [event["data"]["index"] for event in progress.events("job-2")]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(read, range(8)))
+    assert len(connections) == 1
+    assert all(result == list(range(20)) for result in results)
@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+import src.common.rate_limit as rate_limit
+
+
+@pytest.fixture(autouse=True)
+def private_bucket(monkeypatch):
+    """Each test gets its own in-memory bucket store, 120 requests per minute."""
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_SHARED", False)
+    monkeypatch.setattr(rate_limit, "_db", None)
+    monkeypatch.setenv("LLM_REQUESTS_PER_MINUTE_TEST", "120")
+    monkeypatch.setenv("LLM_TOKENS_PER_MINUTE_TEST", "0")
+
+
+def set_bucket(requests: float, blocked_until: float = 0.0):
+    with rate_limit._transaction() as db:
+        rate_limit._store(db, "test", {"requests": requests, "tokens": 0, "blocked_until": blocked_until}, time.time())
+
+
+def shared_waiters() -> int:
+    with rate_limit._transaction() as db:
+        return db.execute("SELECT COUNT(*) FROM waiters").fetchone()[0]
+
+
+def test_async_waiters_are_served_by_priority_class():
+    async def scenario():
+        set_bucket(0)  # next request in 0.5 s
+        order = []
+
+        async def call(name: str, priority: str):
+            await rate_limit.acquire_async("test", 10, priority)
+            order.append(name)
+
+        tasks = []
+        for name, priority in [("batch", "batch"), ("validation", "validation"), ("interactive", "interactive")]:
+            tasks.append(asyncio.create_task(call(name, priority)))
+            await asyncio.sleep(0.05)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "batch", "validation"]
+
+
+def test_same_class_is_first_come_first_served():
+    async def scenario():
+        set_bucket(0)
+        order = []
+
+        async def call(index: int):
+            await rate_limit.acquire_async("test", 10, "batch")
+            order.append(index)
+
+        tasks = []
+        for index in range(3):
+            tasks.append(asyncio.create_task(call(index)))
+            await asyncio.sleep(0.02)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == [0, 1, 2]
+
+
+def test_retry_after_blocks_the_bucket():
+    set_bucket(120, blocked_until=time.time() + 0.6)
+    waited = asyncio.run(rate_limit.acquire_async("test", 10, "interactive"))
+    assert waited >= 0.5
+    # The blocking variant honours it as well
+    set_bucket(120, blocked_until=time.time() + 0.3)
+    assert rate_limit.acquire("test", 10, "interactive") >= 0.25
+
+
+def test_cancelled_waiter_leaves_both_queues():
+    async def scenario():
+        set_bucket(0)
+        head = asyncio.create_task(rate_limit.acquire_async("test", 10, "interactive"))
+        behind = asyncio.create_task(rate_limit.acquire_async("test", 10, "batch"))
+        await asyncio.sleep(0.2)
+        assert shared_waiters() == 1  # only the head polls the shared bucket
+        head.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await head
+        # The next waiter takes over and is granted when the bucket refills
+        await asyncio.wait_for(behind, 2)
+        assert rate_limit._local_queue().waiting == []
+
+    asyncio.run(scenario())
+    assert shared_waiters() == 0
+
+
+def test_waiting_does_not_block_the_event_loop():
+    async def scenario():
+        set_bucket(0)
+        waiter = asyncio.create_task(rate_limit.acquire_async("test", 10, "interactive"))
+        ticks = 0
+        while not waiter.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return ticks
+
+    # 0.5 s of waiting leaves the loop free for other work
+    assert asyncio.run(scenario()) >= 20
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pymupdf
+import pytest
+
+import src.common.executor as executor
+import src.common.pipelines as pipelines
+import src.common.result_cache as result_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_ENABLED", True)
+    result_cache.clear()
+    yield
+    result_cache.clear()
+
+
+def response(value: str = "x") -> dict:
+    return {"is_extraction_succesful": True, "confident_value": 0.9,
+            "extraction_method": "test", "result": {"value": value}}
+
+
+def test_key_covers_upload_parser_variant_model_and_version(monkeypatch):
+    digest = result_cache.file_digest(b"upload")
+    key = result_cache.make_key(digest, "gantt", "visual")
+    assert key == result_cache.make_key(result_cache.file_digest(b"upload"), "gantt", "visual")
+    assert key != result_cache.make_key(result_cache.file_digest(b"other"), "gantt", "visual")
+    assert key != result_cache.make_key(digest, "gantt", "tabular")
+    assert key != result_cache.make_key(digest, "drawing", "visual")
+
+    monkeypatch.setattr(pipelines, "PARSER_VERSION", "2")
+    bumped = result_cache.make_key(digest, "gantt", "visual")
+    assert bumped != key
+    monkeypatch.setitem(pipelines.PARSER_MODELS, "gantt", "another-model")
+    assert result_cache.make_key(digest, "gantt", "visual") not in (key, bumped)
+
+
+def test_digest_of_a_file_matches_its_bytes(tmp_path):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF" * 1000)
+    assert result_cache.file_digest(str(path)) == result_cache.file_digest(b"%PDF" * 1000)
+
+
+def test_parser_version_bump_invalidates_stored_results(monkeypatch):
+    key = result_cache.make_key(result_cache.file_digest(b"upload"), "financial", None)
+    result_cache.put(key, response())
+    assert result_cache.get(key) == response()
+    monkeypatch.setattr(pipelines, "PARSER_VERSION", "2")
+    new_key = result_cache.make_key(result_cache.file_digest(b"upload"), "financial", None)
+    assert result_cache.get(new_key) is None
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    result_cache.put("key", response())
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_TTL", 0)
+    time.sleep(0.01)
+    assert result_cache.get("key") is None
+    assert result_cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    result_cache.put("old", response("a"))
+    result_cache.put("new", response("b"))
+    time.sleep(0.01)
+    result_cache.get("old")  # now the most recently used
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_MAX_BYTES", 2 * len(str(response())) + 10)
+    result_cache.put("newest", response("c"))
+    assert result_cache.get("new") is None
+    assert result_cache.get("old") == response("a")
+    assert result_cache.get("newest") == response("c")
+
+
+def test_hit_skips_the_parser_and_blocking_work_leaves_the_loop(monkeypatch):
+    calls = []
+    threads = set()
+    predict_memory = pipelines.predict_memory
+
+    def predict(*args):
+        threads.add(threading.get_ident())
+        return predict_memory(*args)
+
+    async def run_parser(parser, fn, *args, **kwargs):
+        calls.append(kwargs["predicted_bytes"])
+        return {"rooms": []}, "test", True, None
+
+    monkeypatch.setattr(pipelines, "predict_memory", predict)
+    monkeypatch.setattr(executor, "run_parser", run_parser)
+
+    doc = pymupdf.open()
+    doc.new_page()
+    upload = doc.tobytes()
+    doc.close()
+
+    def parse():
+        return asyncio.run(result_cache.run_parser_cached("drawing", upload, "rooms-ai", "application/pdf"))
+
+    assert parse() == ({"rooms": []}, "test", True, None)
+    assert parse() == ({"rooms": []}, "test", True, None)
+    assert len(calls) == 1
+    assert threads and threading.get_ident() not in threads
+
+
+def test_model_name_does_not_import_the_parsers():
+    code = (
+        "import sys\n"
+        "import src.common.pipelines as pipelines\n"
+        "assert [pipelines.model_name(p) for p in pipelines.PARSERS]\n"
+        "loaded = [m for m in sys.modules if m.startswith(('src.gantt2data', 'src.boq2data', 'src.plan2data'))]\n"
+        "assert not loaded, loaded\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
+
+
+def test_parser_modules_use_the_configured_models():
+    import src.boq2data.camelot_setup.boq2data_mistral as boq
+    assert boq.model == pipelines.model_name("financial")
@@ -0,0 +1,71 @@
+import src.common.retrieval as retrieval
+
+
+def boq(sections: int = 10, items: int = 20) -> dict:
+    return {
+        "Sections": [
+            {
+                "Section Title": f"{number}. Section {number}",
+                "Items": [
+                    {"Item Number": f"{number}.{item}", "Item Description": f"Generic work item {number}.{item}",
+                     "Unit": "m2", "Quantity": item, "Rate": 10.0}
+                    for item in range(1, items + 1)
+                ],
+            }
+            for number in range(1, sections + 1)
+        ],
+        "confidence": 0.85,
+    }
+
+
+def test_items_become_addressable_chunks_with_their_section():
+    chunks = retrieval.chunk_document(boq(2, 3))
+    items = [chunk for chunk in chunks if ".Items[" in chunk.path]
+    assert len(items) == 6
+    assert items[0].path == "Sections[0].Items[0]"
+    assert items[0].context == "1. Section 1"
+
+
+def test_search_finds_the_matching_item():
+    document = boq()
+    document["Sections"][6]["Items"][4]["Item Description"] = "Reinforced concrete foundation slab"
+    index = retrieval.Index(document)
+    results = index.search("How much concrete is in the foundation slab?", top_k=3)
+    assert results[0].path == "Sections[6].Items[4]"
+
+
+def test_search_returns_chunks_in_document_order():
+    document = boq()
+    for section, item in [(8, 2), (1, 7), (4, 0)]:
+        document["Sections"][section]["Items"][item]["Item Description"] = "Timber formwork"
+    index = retrieval.Index(document)
+    results = index.search("timber formwork", top_k=3)
+    assert [chunk.path for chunk in results] == ["Sections[1].Items[7]", "Sections[4].Items[0]", "Sections[8].Items[2]"]
+    positions = [index.chunks.index(chunk) for chunk in results]
+    assert positions == sorted(positions)
+
+
+def test_search_respects_top_k_and_token_budget():
+    index = retrieval.Index(boq())
+    question = "generic work item"
+    assert len(index.search(question, top_k=5, max_tokens=100000)) == 5
+    budget = 3 * index.chunks[-1].tokens
+    results = index.search(question, top_k=50, max_tokens=budget)
+    assert sum(chunk.tokens for chunk in results) <= budget
+    assert 0 < len(results) < 50
+
+
+def test_question_without_matches_gets_the_start_of_the_document():
+    index = retrieval.Index(boq())
+    results = index.search("zzz qqq", top_k=4)
+    assert [chunk.path for chunk in results] == [chunk.path for chunk in index.chunks[:4]]
+
+
+def test_small_documents_are_sent_whole_large_ones_by_retrieval():
+    text, stats = retrieval.build_context(boq(1, 2), "quantity?")
+    assert stats["mode"] == "full"
+    text, stats = retrieval.build_context(boq(), "quantity of item 3.4?")
+    assert stats["mode"] == "retrieval"
+    assert stats["chunks_sent"] < stats["chunks_total"]
+    assert stats["context_tokens"] < stats["document_tokens"]
+    assert "Sections[2].Items[3]" in text
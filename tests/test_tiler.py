@@ -0,0 +1,115 @@
+import numpy as np
+import pymupdf
+import pytest
+
+import src.common.documents as documents
+import src.common.image_encoder as image_encoder
+import src.common.tiler as tiler
+
+
+def a0_pdf(rows: int = 60) -> bytes:
+    """A0 landscape page with `rows` text rows and a frame around the page."""
+    doc = pymupdf.open()
+    page = doc.new_page(width=3370, height=2384)
+    page.draw_rect(pymupdf.Rect(10, 10, 3360, 2374), color=(0, 0, 0))
+    for row in range(rows):
+        y = 60 + row * 38
+        for column in range(8):
+            page.insert_text((40 + column * 410, y), f"Task {row}.{column}", fontsize=18)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def document():
+    with documents.DocumentContext(a0_pdf()) as document:
+        yield document
+
+
+def pixels(width: float, height: float) -> tuple[float, float]:
+    scale = tiler.TILE_MIN_DPI / 72
+    return width * scale, height * scale
+
+
+def test_small_page_is_one_tile():
+    assert tiler.tile_counts(500, 700) == (1, 1)
+    assert tiler.tile_counts(500, 700, rows_only=True) == (1, 1)
+
+
+def test_tiles_keep_text_within_the_model_limits(monkeypatch):
+    monkeypatch.setattr(tiler, "TILE_MAX_COUNT", 100)
+    columns, rows = tiler.tile_counts(3370, 2384)
+    w, h = pixels(3370 / columns, 2384 / rows)
+    assert max(w, h) <= image_encoder.MAX_DIMENSION
+    assert w * h <= image_encoder.MAX_PIXELS
+    assert columns * rows > 1
+
+
+def test_tile_count_is_capped(monkeypatch):
+    monkeypatch.setattr(tiler, "TILE_MAX_COUNT", 3)
+    columns, rows = tiler.tile_counts(10000, 10000)
+    assert columns * rows <= 3
+    columns, rows = tiler.tile_counts(1000, 20000, rows_only=True)
+    assert (columns, rows) == (1, 3)
+
+
+def test_rows_mode_keeps_full_width_strips_and_reserves_the_header():
+    columns, rows = tiler.tile_counts(3370, 2384, rows_only=True)
+    assert columns == 1
+    _, with_header = tiler.tile_counts(3370, 2384, rows_only=True, header=300)
+    assert with_header >= rows
+
+
+def test_snap_moves_cuts_off_text(document):
+    profile = tiler.cost_profile(document, 0, 1)
+    rect = document.page(0).rect
+    words = document.words(0)
+    for nominal in np.linspace(200, 2200, 9):
+        cut = tiler.snap(profile, rect.y0, nominal, 30)
+        assert abs(cut - nominal) <= 30
+        assert not any(word[1] < cut < word[3] for word in words)
+
+
+def test_cuts_are_ordered_and_cover_the_range(document):
+    profile = tiler.cost_profile(document, 0, 1)
+    boundaries = tiler.cuts(profile, 0, 0, 2384, 4)
+    assert len(boundaries) == 5
+    assert boundaries[0] == 0 and boundaries[-1] == 2384
+    assert boundaries == sorted(boundaries)
+    step = 2384 / 4
+    for index, cut in enumerate(boundaries[1:-1], start=1):
+        assert abs(cut - index * step) <= tiler.TILE_SNAP * step
+
+
+def test_plan_covers_the_page_with_overlap(document):
+    clips, header = tiler.plan_tiles(document)
+    rect = document.page(0).rect
+    assert header is None
+    assert len(clips) > 1
+    assert min(c[0] for c in clips) == rect.x0 and max(c[2] for c in clips) == rect.x1
+    assert min(c[1] for c in clips) == rect.y0 and max(c[3] for c in clips) == rect.y1
+    # Neighbours overlap; reading order is row by row
+    assert clips[1][0] < clips[0][2]
+    assert clips == sorted(clips, key=lambda c: (c[1], c[0]))
+
+
+def test_header_is_stacked_on_every_strip_and_not_kept(document, capsys):
+    clips, header = tiler.plan_tiles(document, rows_only=True, header_ratio=0.1)
+    assert header is not None and all(clip[1] >= header[3] for clip in clips)
+
+    images = list(tiler.tiles(document, rows_only=True, header_ratio=0.1))
+    assert len(images) == len(clips)
+    for image, clip in zip(images, clips):
+        dpi = tiler.tile_dpi(clip[2] - clip[0], clip[3] - clip[1] + header[3] - header[1])
+        assert image.height == pytest.approx((clip[3] - clip[1] + header[3] - header[1]) * dpi / 72, abs=3)
+        image.close()
+    assert not any(artifact == "render" for artifact, _ in document._artifacts)
+    assert capsys.readouterr().out == ""
+
+
+def test_tiles_fit_the_model_limits(document):
+    for image in tiler.tiles(document):
+        assert max(image.size) <= image_encoder.MAX_DIMENSION
+        assert image.width * image.height <= image_encoder.MAX_PIXELS
+        image.close()
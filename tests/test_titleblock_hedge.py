@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import src.common.metrics as metrics
+import src.plan2data.titleBlockInfo as title_block
+
+
+def answer(confidence: float, source: str) -> str:
+    return json.dumps({"project": source, "confidence": confidence})
+
+
+def hedge_count(**labels) -> float:
+    return metrics._counters.get(metrics._key("titleblock_hedge_total", labels), 0)
+
+
+@pytest.fixture
+def hedge(monkeypatch):
+    """
+    Both title block paths replaced by stubs.
+
+    Set `ocr_text` / `ocr_answer` / `vision_answer` to the stub results, or
+    the matching `*_blocked` event to make that step wait; cancelled LLM
+    calls are listed in `cancelled`, started ones in `calls`.
+    """
+    state = SimpleNamespace(
+        immediate=False, ocr_text="Project: Villa", ocr_answer=answer(0.9, "ocr"), vision_answer=answer(0.9, "vision"),
+        ocr_blocked=None, ocr_llm_blocked=None, vision_blocked=None, calls=[], cancelled=[],
+    )
+
+    def extract_text(path):
+        if state.ocr_blocked is not None:
+            state.ocr_blocked.wait(5)
+        return state.ocr_text
+
+    async def llm(name, blocked, result):
+        state.calls.append(name)
+        try:
+            if blocked is not None:
+                await blocked.wait()
+        except asyncio.CancelledError:
+            state.cancelled.append(name)
+            raise
+        return result
+
+    async def content_extraction(text):
+        return await llm("ocr", state.ocr_llm_blocked, state.ocr_answer)
+
+    async def vision_extraction(path):
+        return await llm("vision", state.vision_blocked, state.vision_answer)
+
+    async def aclose():
+        pass
+
+    monkeypatch.setattr(title_block, "predict_ocr_failure", lambda path: state.immediate)
+    monkeypatch.setattr(title_block, "_extract_text", extract_text)
+    monkeypatch.setattr(title_block.mistral, "call_mistral_for_content_extraction_async", content_extraction)
+    monkeypatch.setattr(title_block.mistral, "call_mistral_for_titleblock_extraction_from_image_async",
+                        vision_extraction)
+    monkeypatch.setattr(title_block.llm_gateway, "aclose", aclose)
+    monkeypatch.setattr(title_block, "HEDGE_DELAY", 5.0)
+    monkeypatch.setattr(title_block, "CONFIDENCE_THRESHOLD", 0.6)
+    yield state
+    if state.ocr_blocked is not None:
+        state.ocr_blocked.set()  # let a discarded Tesseract pass finish
+
+
+def run(path="plan.png"):
+    return asyncio.run(title_block._get_title_block_info_hedged(path))
+
+
+def test_accepted_ocr_result_wins_before_vision_starts(hedge):
+    before = hedge_count(winner="ocr", vision_start="not_started")
+    output, method = run()
+    assert (output["project"], method) == ("ocr", "hybrid")
+    assert hedge.calls == ["ocr"]  # the pending vision request is never sent
+    assert hedge_count(winner="ocr", vision_start="not_started") == before + 1
+
+
+def test_vision_starts_after_the_delay_and_the_slow_ocr_path_is_dropped(hedge, monkeypatch):
+    monkeypatch.setattr(title_block, "HEDGE_DELAY", 0.05)
+    hedge.ocr_blocked = threading.Event()  # Tesseract still running
+    before = hedge_count(winner="vision", vision_start="delayed")
+    output, method = run()
+    assert (output["project"], method) == ("vision", "ai")
+    hedge.ocr_blocked.set()
+    assert hedge.calls == ["vision"]  # the OCR answer is never requested
+    assert hedge_count(winner="vision", vision_start="delayed") == before + 1
+
+
+def test_predicted_ocr_failure_starts_vision_at_once_and_cancels_ocr(hedge):
+    hedge.immediate = True
+    hedge.ocr_llm_blocked = asyncio.Event()
+    before = hedge_count(winner="vision", vision_start="immediate")
+    output, method = run()
+    assert (output["project"], method) == ("vision", "ai")
+    assert sorted(hedge.calls) == ["ocr", "vision"]
+    assert hedge.cancelled == ["ocr"]
+    assert hedge_count(winner="vision", vision_start="immediate") == before + 1
+
+
+def test_running_vision_request_is_cancelled_when_ocr_wins(hedge, monkeypatch):
+    monkeypatch.setattr(title_block, "HEDGE_DELAY", 0.01)
+    hedge.ocr_blocked = threading.Event()
+    hedge.vision_blocked = asyncio.Event()
+
+    async def scenario():
+        task = asyncio.create_task(title_block._get_title_block_info_hedged("plan.png"))
+        while "vision" not in hedge.calls:
+            await asyncio.sleep(0.01)
+        hedge.ocr_blocked.set()
+        return await task
+
+    output, method = asyncio.run(scenario())
+    assert (output["project"], method) == ("ocr", "hybrid")
+    assert hedge.cancelled == ["vision"]
+
+
+def test_failed_ocr_starts_vision_and_best_result_below_threshold_is_kept(hedge):
+    hedge.ocr_answer = answer(0.3, "ocr")
+    hedge.vision_answer = answer(0.5, "vision")
+    before = hedge_count(winner="none", vision_start="after_ocr")
+    output, method = run()
+    assert (output["project"], method) == ("vision", "ai")
+    assert hedge.calls == ["ocr", "vision"]  # vision did not wait out the delay
+    assert hedge_count(winner="none", vision_start="after_ocr") == before + 1
+
+    hedge.vision_answer = answer(0.1, "vision")
+    assert run() == ({"project": "ocr", "confidence": 0.3}, "hybrid")
+
+
+def test_empty_ocr_text_falls_back_to_vision(hedge, monkeypatch):
+    monkeypatch.setattr(title_block, "TITLEBLOCK_MODE", "hedged")
+    hedge.ocr_text = ""
+    hedge.vision_answer = answer(0.4, "vision")
+    output, method, is_successful, confidence = title_block.get_title_block_info("plan.png")
+    assert (output["project"], method, is_successful, confidence) == ("vision", "ai", False, 0.4)
+    assert hedge.calls == ["vision"]
+
+    hedge.vision_answer = "not json"
+    assert title_block.get_title_block_info("plan.png") == ({}, "hybrid", False, None)
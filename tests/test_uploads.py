@@ -0,0 +1,103 @@
+import asyncio
+import io
+import tempfile
+
+import pymupdf
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+
+import src.common.uploads as uploads
+
+
+def pdf_bytes(pages: int = 1) -> bytes:
+    doc = pymupdf.open()
+    for _ in range(pages):
+        doc.new_page().insert_text((72, 72), "Room 1.01")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def png_bytes(size=(40, 30), mode="RGBA") -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def upload(content: bytes, filename: str = "upload", content_type: str | None = None, sized: bool = True) -> UploadFile:
+    spool = tempfile.SpooledTemporaryFile()
+    spool.write(content)
+    spool.seek(0)
+    headers = {"content-type": content_type} if content_type else None
+    return UploadFile(spool, size=len(content) if sized else None, filename=filename,
+                      headers=Headers(headers) if headers else None)
+
+
+def ingest(file: UploadFile, parser: str = "financial", variant: str | None = None):
+    return asyncio.run(uploads.ingest(file, parser, variant))
+
+
+@pytest.mark.parametrize("sized", [True, False])
+def test_pdf_is_returned_unchanged(sized):
+    data = pdf_bytes()
+    content, mime_type = ingest(upload(data, sized=sized))
+    assert content == data
+    assert mime_type == "application/pdf"
+
+
+def test_type_is_sniffed_not_taken_from_the_client():
+    content, mime_type = ingest(upload(pdf_bytes(), content_type="image/png"))
+    assert mime_type == "application/pdf"
+    with pytest.raises(HTTPException) as e:
+        ingest(upload(png_bytes(), content_type="application/pdf"), "gantt", "visual")
+    assert e.value.status_code == 400
+
+
+@pytest.mark.parametrize("sized", [True, False])
+def test_oversized_upload_is_rejected(monkeypatch, sized):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 1000)
+    monkeypatch.setattr(uploads, "READ_BLOCK_SIZE", 256)
+    with pytest.raises(HTTPException) as e:
+        ingest(upload(b"%PDF-1.7\n" + b"0" * 5000, sized=sized))
+    assert e.value.status_code == 413
+
+
+def test_preflight_limits(monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_PAGES", 2)
+    with pytest.raises(HTTPException) as e:
+        ingest(upload(pdf_bytes(pages=3)))
+    assert e.value.status_code == 413
+    with pytest.raises(HTTPException) as e:
+        ingest(upload(b"%PDF-1.7\nnot a pdf"))
+    assert e.value.status_code == 400
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_IMAGE_PIXELS", 100)
+    with pytest.raises(HTTPException) as e:
+        ingest(upload(png_bytes()))
+    assert e.value.status_code == 413
+
+
+def test_images_are_normalized_to_rgb_jpeg():
+    content, mime_type = ingest(upload(png_bytes()))
+    assert mime_type == "image/png"  # type of the original upload
+    with Image.open(io.BytesIO(content)) as im:
+        assert (im.format, im.mode) == ("JPEG", "RGB")
+
+
+def test_full_queue_is_rejected_before_the_body_is_read(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    import src.common.executor as executor
+
+    def fail(*args, **kwargs):
+        raise AssertionError("upload read although the queue is full")
+
+    monkeypatch.setattr(uploads, "ingest", fail)
+    gate = executor._get_gate("financial")
+    monkeypatch.setattr(gate, "pending", gate.concurrency + gate.queue_depth)
+    with TestClient(main.app) as client:
+        response = client.post("/financial_parser/", files={"file": ("boq.pdf", pdf_bytes(), "application/pdf")})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == str(executor.RETRY_AFTER_SECONDS)